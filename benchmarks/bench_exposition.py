@@ -0,0 +1,84 @@
+"""
+Benchmark: serialization cost and payload size of the exposition formats.
+
+Builds a registry shaped like a large host (per-core, per-disk and
+per-interface series) and times text, OpenMetrics and protobuf rendering
+from one collection, plus the gzip step the exporter caches alongside.
+
+Usage:
+    python benchmarks/bench_exposition.py [--cores N] [--disks N] [--interfaces N] [--iterations N]
+"""
+import argparse
+import gzip
+import os
+import sys
+import timeit
+from prometheus_client import CollectorRegistry, Counter, Gauge
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.exporters.exposition import ExpositionCache, TEXT, OPENMETRICS, PROTOBUF
+from src.exporters.scrape_collector import DISK_RATE_METRICS
+
+
+def build_registry(cores, disks, interfaces):
+    """Return a registry with per-core, per-disk and per-interface series."""
+    registry = CollectorRegistry()
+    cpu = Gauge('node_cpu_core_usage_percent', 'Per-core CPU usage', ['core', 'mode'], registry=registry)
+    for core in range(cores):
+        for mode in ('user', 'system', 'idle', 'iowait'):
+            cpu.labels(str(core), mode).set(core % 100 + 0.5)
+
+    read_bytes = Counter('node_disk_io_read_bytes', 'Total bytes read from disk', ['device'], registry=registry)
+    rate_gauges = [Gauge(name, doc, ['device'], registry=registry) for _, name, doc in DISK_RATE_METRICS]
+    for disk in range(disks):
+        device = f'nvme{disk}n1'
+        read_bytes.labels(device).inc(disk * 4096)
+        for gauge in rate_gauges:
+            gauge.labels(device).set(disk * 1.5)
+
+    counters = [Counter(name, doc, ['interface'], registry=registry) for name, doc in (
+        ('node_network_receive_bytes', 'Total bytes received'),
+        ('node_network_transmit_bytes', 'Total bytes transmitted'),
+        ('node_network_receive_packets', 'Total packets received'),
+        ('node_network_transmit_packets', 'Total packets transmitted'),
+    )]
+    for interface in range(interfaces):
+        for counter in counters:
+            counter.labels(f'veth{interface:05d}').inc(interface * 1000)
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare exposition formats')
+    parser.add_argument('--cores', type=int, default=128)
+    parser.add_argument('--disks', type=int, default=64)
+    parser.add_argument('--interfaces', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=50, help='renders per measurement')
+    args = parser.parse_args()
+
+    registry = build_registry(args.cores, args.disks, args.interfaces)
+    cache = ExpositionCache(registry)
+    cache.render()
+    families = cache._families
+    series = sum(len(family.samples) for family in families.families)
+    print(f"{series} samples in {len(families.families)} families")
+
+    print(f"{'format':<14}{'render ms':>12}{'gzip ms':>10}{'bytes':>12}{'gzipped':>10}")
+    for fmt in (TEXT, OPENMETRICS, PROTOBUF):
+        def render():
+            cache._bodies = {}
+            return cache._render(fmt)
+        rendered = render()
+        total_ms = timeit.timeit(render, number=args.iterations) / args.iterations * 1000
+        gzip_ms = timeit.timeit(lambda: gzip.compress(rendered.body, compresslevel=cache.compresslevel, mtime=0),
+                                number=args.iterations) / args.iterations * 1000
+        # _render includes compression and hashing; report serialization alone
+        print(f"{fmt:<14}{total_ms - gzip_ms:>12.2f}{gzip_ms:>10.2f}{len(rendered.body):>12}"
+              f"{len(rendered.gzipped):>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Benchmark suite: every collector and a full exporter cycle on a synthetic host.
+
+Builds a synthetic /proc and /sys tree (see synthetic_proc.SyntheticHost)
+of the requested size and measures, per case, the latency of one call, the
+peak memory it allocates (tracemalloc, measured on a separate call) and,
+for the exporter cases, the size of the scrape. The host's counters are
+advanced before every timed call, outside the timing.
+
+Results can be written as JSON and compared with a previous run, so
+regressions in latency, memory and scrape size show up between versions.
+The same cases run under pytest-benchmark from benchmarks/test_suite.py.
+
+Usage:
+    python benchmarks/bench_suite.py [--scale cores=64,disks=16,interfaces=64,processes=2000,sockets=10000]
+                                     [--rounds N] [--case NAME] [--json FILE]
+                                     [--compare FILE] [--threshold RATIO]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic_proc import SyntheticHost, DEFAULT_SCALE, parse_scale
+from src.collectors import CPUCollector, MemoryCollector, DiskCollector, NetworkCollector, ProcessCollector
+from src.collectors.procfs import ProcfsReader
+from src.exporters.exposition import TEXT
+from src.exporters.metrics_exporter import MetricsExporter
+
+# run: the measured call; info: optional callable returning extra results
+Case = namedtuple('Case', ['name', 'run', 'info'])
+
+CASE_NAMES = (
+    'collector.cpu',
+    'collector.memory',
+    'collector.disk',
+    'collector.network',
+    'collector.process',
+    'exporter.update_metrics',
+    'exporter.scrape',
+)
+
+# Results compared by --compare; a larger value is worse for all of them
+COMPARED = ('median', 'peak_memory_bytes', 'scrape_bytes')
+
+
+def scrape_size(rendered):
+    """Size of one rendered text exposition."""
+    body = rendered.body
+    return {
+        'scrape_bytes': len(body),
+        'scrape_gzip_bytes': len(rendered.gzipped),
+        'scrape_samples': sum(1 for line in body.splitlines() if line and not line.startswith(b'#')),
+    }
+
+
+def build_cases(host):
+    """
+    Create every case against the host's /proc and /sys trees.
+
+    Returns:
+        ({name: Case}, close) where close() releases the exporters.
+    """
+    procfs = ProcfsReader(host.proc_root, host.sys_root)
+    cases = [
+        Case('collector.cpu', CPUCollector(procfs=procfs).collect, None),
+        Case('collector.memory', MemoryCollector(procfs=procfs).collect, None),
+        Case('collector.disk', DiskCollector(procfs=procfs).collect, None),
+        Case('collector.network', NetworkCollector(procfs=procfs).collect, None),
+        Case('collector.process', ProcessCollector(procfs=procfs).collect, None),
+    ]
+
+    # Every collector runs on every cycle
+    options = {
+        'backend': 'procfs',
+        'procfs_root': host.proc_root,
+        'sysfs_root': host.sys_root,
+        'intervals': dict.fromkeys(MetricsExporter.DEFAULT_INTERVALS, 0),
+    }
+    push = MetricsExporter(**options)
+    scrape = MetricsExporter(mode='scrape', min_freshness=0, **options)
+    cases += [
+        Case('exporter.update_metrics', push.update_metrics, lambda: scrape_size(push.exposition.get(TEXT))),
+        Case('exporter.scrape', lambda: scrape.exposition.get(TEXT),
+             lambda: scrape_size(scrape.exposition.get(TEXT))),
+    ]
+
+    def close():
+        push.shutdown()
+        scrape.shutdown()
+        procfs.close()
+    return {case.name: case for case in cases}, close
+
+
+def peak_memory(case, host):
+    """Return the peak bytes traced by tracemalloc during one call."""
+    host.tick()
+    tracemalloc.start()
+    try:
+        case.run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def case_info(case, host):
+    """Return the untimed results of a case: peak memory and its extra info."""
+    info = {'peak_memory_bytes': peak_memory(case, host)}
+    if case.info is not None:
+        info.update(case.info())
+    return info
+
+
+def measure(case, host, rounds, warmup=1):
+    """
+    Time rounds calls of a case, ticking the host before each.
+
+    Returns:
+        Timings in seconds plus the case_info() results.
+    """
+    for _ in range(warmup):
+        host.tick()
+        case.run()
+    times = []
+    for _ in range(rounds):
+        host.tick()
+        start = time.perf_counter()
+        case.run()
+        times.append(time.perf_counter() - start)
+    result = {
+        'rounds': rounds,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stddev': statistics.stdev(times) if rounds > 1 else 0.0,
+    }
+    result.update(case_info(case, host))
+    return result
+
+
+def version():
+    """Return `git describe` of the tree, or None outside a checkout."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scale, rounds, names=CASE_NAMES, root=None):
+    """
+    Build a synthetic host of the given scale and measure the named cases.
+
+    Returns:
+        The JSON-serialisable results document.
+    """
+    with tempfile.TemporaryDirectory(dir=root) as directory:
+        host = SyntheticHost(directory, scale)
+        host.write()
+        cases, close = build_cases(host)
+        try:
+            results = {name: measure(cases[name], host, rounds) for name in names}
+        finally:
+            close()
+    return {
+        'version': version(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'scale': scale._asdict(),
+        'cases': results,
+    }
+
+
+def compare(previous, current, threshold):
+    """
+    Compare two results documents.
+
+    Returns:
+        [(case, key, previous value, current value, ratio)] for every
+        compared value present in both, and the subset whose ratio exceeds
+        threshold.
+    """
+    rows = []
+    for name, result in current['cases'].items():
+        before = previous['cases'].get(name)
+        if before is None:
+            continue
+        for key in COMPARED:
+            if before.get(key) and key in result:
+                rows.append((name, key, before[key], result[key], result[key] / before[key]))
+    return rows, [row for row in rows if row[4] > threshold]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the collectors and exporter on a synthetic host')
+    parser.add_argument('--scale', default='',
+                        help='host size, e.g. cores=256,disks=64 (default: ' +
+                             ','.join(f'{name}={count}' for name, count in DEFAULT_SCALE._asdict().items()) + ')')
+    parser.add_argument('--rounds', type=int, default=20, help='timed calls per case')
+    parser.add_argument('--case', action='append', choices=CASE_NAMES, help='run only this case (repeatable)')
+    parser.add_argument('--json', metavar='FILE', help='write the results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare with the results in FILE')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='ratio over the compared run reported as a regression (default: 1.25)')
+    args = parser.parse_args()
+
+    if not ProcfsReader.available():
+        print("the synthetic host benchmarks require Linux")
+        return 1
+    try:
+        scale = parse_scale(args.scale)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = run_suite(scale, args.rounds, args.case or CASE_NAMES)
+    print(f"scale: {', '.join(f'{name}={count}' for name, count in scale._asdict().items())}")
+    print(f"{'case':<26}{'median ms':>11}{'min ms':>10}{'peak KiB':>11}{'scrape bytes':>14}")
+    for name, result in results['cases'].items():
+        print(f"{name:<26}{result['median'] * 1000:>11.2f}{result['min'] * 1000:>10.2f}"
+              f"{result['peak_memory_bytes'] / 1024:>11.0f}{result.get('scrape_bytes', ''):>14}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get('scale') != results['scale']:
+            print("warning: the compared run used another scale")
+        rows, regressions = compare(previous, results, args.threshold)
+        print(f"\n{'case':<26}{'value':<20}{'ratio':>8}")
+        for name, key, _, _, ratio in rows:
+            flag = '  REGRESSION' if ratio > args.threshold else ''
+            print(f"{name:<26}{key:<20}{ratio:>7.2f}x{flag}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark: pure-Python vs. NumPy computation of per-core and per-device values.
+
+Times one cycle of CPUSampler percentages, DiskCollector rates and
+per-interface totals over synthetic counters, for growing core and device
+counts. Reading /proc is excluded: both paths parse the same files.
+
+Usage:
+    python benchmarks/bench_vectorized.py [--scales 8,64,256,1024] [--iterations N]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from array import array
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.collectors import vectorized
+from src.collectors.cpu_sampler import CPUSampler
+from src.collectors.disk_collector import DiskCollector, DiskSample
+from src.collectors.network_collector import IO_FIELDS as NET_FIELDS
+from src.collectors.procfs import CPU_TIME_FIELDS
+from src.collectors.snapshot import CounterTable, DeviceTable
+
+
+def cpu_case(cores, vectorize, seed=0):
+    """Return a callable computing one CPUSampler cycle over `cores` cores."""
+    rng = random.Random(seed)
+    snapshots = []
+    for step in range(2):
+        snapshots.append([
+            tuple(float(step * 100 + rng.randint(0, 100)) for _ in CPU_TIME_FIELDS)
+            for _ in range(cores)
+        ])
+    sampler = CPUSampler(lambda: (CPU_TIME_FIELDS, snapshots[1]), vectorized=vectorize)
+
+    def run():
+        # Restore the baseline so every call computes the same delta
+        sampler._prev = snapshots[0]
+        return sampler.sample()
+    return run
+
+
+def disk_case(devices, vectorize, seed=0):
+    """Return a callable computing one cycle of per-disk rates over `devices` disks."""
+    rng = random.Random(seed)
+    table = DeviceTable()
+    previous, current = DiskSample(table), DiskSample(table)
+    for step, sample in enumerate((previous, current)):
+        sample.time = step * 10.0
+        sample.has_io = True
+        sample.io.begin()
+        for device in range(devices):
+            sample.io.put(f'nvme{device}n1', [step * 10000 + rng.randint(0, 10000) for _ in sample.io.fields])
+    collector = DiskCollector(vectorized=vectorize)
+    return lambda: collector._compute_rates(current, previous)
+
+
+def network_case(interfaces, vectorize, seed=0):
+    """Return a callable summing the counters of `interfaces` interfaces."""
+    rng = random.Random(seed)
+    io = CounterTable(NET_FIELDS, DeviceTable())
+    for interface in range(interfaces):
+        io.put(f'veth{interface:05d}', [rng.randint(0, 2 ** 40) for _ in NET_FIELDS])
+    into = array('Q', bytes(8 * len(NET_FIELDS)))
+    if vectorize:
+        return lambda: vectorized.totals(io, into)
+    return lambda: io.totals(into)
+
+
+def bench(func, iterations):
+    """Return mean microseconds per call."""
+    func()
+    return timeit.timeit(func, number=iterations) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare pure-Python and NumPy per-core/per-device paths')
+    parser.add_argument('--scales', default='8,64,256,1024',
+                        help='comma-separated core/device counts (default: 8,64,256,1024)')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per measurement')
+    args = parser.parse_args()
+
+    if not vectorized.available():
+        print("NumPy is not installed; the vectorized path is unavailable")
+        return 1
+
+    print(f"{'case':<12}{'count':>8}{'python us':>12}{'numpy us':>12}{'speedup':>10}")
+    for name, case in (('cpu', cpu_case), ('disk', disk_case), ('network', network_case)):
+        for scale in (int(value) for value in args.scales.split(',')):
+            python_us = bench(case(scale, False), args.iterations)
+            numpy_us = bench(case(scale, True), args.iterations)
+            print(f"{name:<12}{scale:>8}{python_us:>12.1f}{numpy_us:>12.1f}{python_us / numpy_us:>9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Synthetic /proc trees for benchmarks.
+Writes just enough of procfs for the collectors (and psutil, through
+psutil.PROCFS_PATH) to run against hosts far larger than the build machine.
+"""
+import os
+import random
+from collections import namedtuple
+
+BOOT_TIME = 1700000000
+
+MEMINFO = """MemTotal:       {total_kb} kB
+MemFree:        {free_kb} kB
+MemAvailable:   {free_kb} kB
+Buffers:               0 kB
+Cached:                0 kB
+Shmem:                 0 kB
+Active:                0 kB
+Inactive:              0 kB
+SwapTotal:             0 kB
+SwapFree:              0 kB
+"""
+
+STATUS = """Name:\t{comm}
+State:\t{state} (sleeping)
+Pid:\t{pid}
+PPid:\t1
+Uid:\t0\t0\t0\t0
+Gid:\t0\t0\t0\t0
+Threads:\t{threads}
+voluntary_ctxt_switches:\t10
+nonvoluntary_ctxt_switches:\t1
+"""
+
+
+# Size of a synthetic host
+Scale = namedtuple('Scale', ['cores', 'disks', 'interfaces', 'processes', 'sockets'])
+
+DEFAULT_SCALE = Scale(cores=64, disks=16, interfaces=64, processes=2000, sockets=10000)
+
+# /proc/net/tcp state codes, most sockets established like a busy server
+TCP_STATES = ['01'] * 6 + ['06', '08', '0A']
+
+NET_DEV_HEADER = (
+    'Inter-|   Receive                                                |  Transmit\n'
+    ' face |bytes    packets errs drop fifo frame compressed multicast|'
+    'bytes    packets errs drop fifo colls carrier compressed\n'
+)
+
+SOCKET_HEADER = ('  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt'
+                 '   uid  timeout inode\n')
+
+
+def parse_scale(text, base=DEFAULT_SCALE):
+    """
+    Parse "cores=128,disks=32" into a Scale, defaulting the other fields to base.
+
+    Raises:
+        ValueError: On an unknown field or a non-integer count.
+    """
+    values = base._asdict()
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, count = item.partition('=')
+        if name not in values:
+            raise ValueError(f"unknown scale field '{name}' (expected one of {', '.join(Scale._fields)})")
+        values[name] = int(count)
+    return Scale(**values)
+
+
+def _write(path, content):
+    # Rewritten in place (same inode): ProcfsReader keeps its files open
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def write_process_table(root, processes, seed=0):
+    """
+    Write a /proc tree with `processes` synthetic processes.
+
+    Args:
+        root: Directory to populate.
+        processes: Number of /proc/<pid> directories to create.
+        seed: Random seed, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    _write(os.path.join(root, 'meminfo'), MEMINFO.format(total_kb=64 * 1024 * 1024, free_kb=32 * 1024 * 1024))
+    _write(os.path.join(root, 'uptime'), '100000.00 50000.00\n')
+    _write(os.path.join(root, 'stat'),
+           'cpu  100 0 100 1000 0 0 0 0 0 0\ncpu0 100 0 100 1000 0 0 0 0 0 0\n'
+           f'btime {BOOT_TIME}\n')
+
+    for pid in range(1, processes + 1):
+        proc_dir = os.path.join(root, str(pid))
+        os.makedirs(proc_dir, exist_ok=True)
+        comm = f'worker-{pid % 97}'
+        state = 'Z' if pid % 500 == 0 else 'S'
+        threads = rng.randint(1, 64)
+        utime = rng.randint(0, 500000)
+        stime = rng.randint(0, 100000)
+        starttime = rng.randint(0, 9000000)
+        rss = rng.randint(100, 500000)
+        _write(os.path.join(proc_dir, 'stat'),
+               f'{pid} ({comm}) {state} 1 {pid} {pid} 0 -1 4194560 100 0 0 0 {utime} {stime} 0 0 '
+               f'20 0 {threads} 0 {starttime} {rss * 4096 * 2} {rss} 18446744073709551615 '
+               + ' '.join(['0'] * 27) + '\n')
+        _write(os.path.join(proc_dir, 'statm'), f'{rss * 2} {rss} 100 10 0 {rss} 0\n')
+        _write(os.path.join(proc_dir, 'status'), STATUS.format(comm=comm, state=state, pid=pid, threads=threads))
+
+
+class SyntheticHost:
+    """
+    A synthetic /proc and /sys tree of a given Scale.
+
+    write() lays out /proc/stat (one line per core), meminfo, vmstat,
+    loadavg, diskstats, net/dev, net/{tcp,tcp6,udp,udp6}, the mount table
+    and the process table, plus /sys/block for the whole disks. tick()
+    advances every counter as if `seconds` had passed, so rates and CPU
+    percentages take their normal (non-zero delta) path.
+    """
+
+    def __init__(self, root, scale=DEFAULT_SCALE, seed=0):
+        """
+        Args:
+            root: Directory to populate; proc/ and sys/ are created in it.
+            scale: Host size.
+            seed: Random seed, so runs are comparable.
+        """
+        self.proc_root = os.path.join(root, 'proc')
+        self.sys_root = os.path.join(root, 'sys')
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self._cpu = [[self.rng.randint(0, 10 ** 6) for _ in range(10)] for _ in range(scale.cores)]
+        self._disks = [[self.rng.randint(0, 10 ** 9) for _ in range(11)] for _ in range(scale.disks)]
+        self._interfaces = [[self.rng.randint(0, 10 ** 12) for _ in range(16)] for _ in range(scale.interfaces)]
+
+    def write(self):
+        """Write the whole tree."""
+        scale = self.scale
+        write_process_table(self.proc_root, scale.processes, seed=self.rng.randint(0, 2 ** 32))
+        _write(os.path.join(self.proc_root, 'loadavg'), f'1.50 1.20 0.90 4/{scale.processes} {scale.processes}\n')
+        _write(os.path.join(self.proc_root, 'vmstat'), 'nr_free_pages 1000\npswpin 10\npswpout 20\n')
+        _write(os.path.join(self.proc_root, 'filesystems'), 'nodev\tsysfs\nnodev\tproc\n\text4\n')
+        os.makedirs(os.path.join(self.proc_root, 'self'), exist_ok=True)
+        _write(os.path.join(self.proc_root, 'self', 'mountinfo'),
+               '22 1 259:1 / / rw,relatime shared:1 - ext4 /dev/nvme0n1p1 rw\n'
+               '23 22 0:21 / /proc rw,nosuid shared:2 - proc proc rw\n')
+        for disk in range(scale.disks):
+            os.makedirs(os.path.join(self.sys_root, 'block', f'nvme{disk}n1'), exist_ok=True)
+        os.makedirs(os.path.join(self.proc_root, 'net'), exist_ok=True)
+        self._write_sockets()
+        self._write_counters()
+
+    def tick(self, seconds=10.0):
+        """Advance the CPU, disk and interface counters by `seconds` of activity."""
+        rng = self.rng
+        ticks = int(seconds * 100)
+        for times in self._cpu:
+            busy = rng.randint(0, ticks)
+            times[0] += busy // 2
+            times[2] += busy - busy // 2
+            times[3] += ticks - busy
+        for counters in self._disks:
+            for i in (0, 2, 4, 6):
+                counters[i] += rng.randint(0, 1000)
+            counters[9] += rng.randint(0, int(seconds * 1000))
+        for counters in self._interfaces:
+            counters[0] += rng.randint(0, 10 ** 7)
+            counters[1] += rng.randint(0, 10 ** 4)
+            counters[8] += rng.randint(0, 10 ** 7)
+            counters[9] += rng.randint(0, 10 ** 4)
+        self.ticks += 1
+        self._write_counters()
+
+    def _write_counters(self):
+        """Write the counter files: stat, diskstats and net/dev."""
+        lines = ['cpu  ' + ' '.join(str(sum(column)) for column in zip(*self._cpu))]
+        lines += [f'cpu{core} ' + ' '.join(map(str, times)) for core, times in enumerate(self._cpu)]
+        lines += ['ctxt 1000000', f'btime {BOOT_TIME}', f'processes {self.scale.processes}',
+                  'procs_running 4', 'procs_blocked 0']
+        _write(os.path.join(self.proc_root, 'stat'), '\n'.join(lines) + '\n')
+
+        lines = []
+        for disk, counters in enumerate(self._disks):
+            values = ' '.join(map(str, counters))
+            lines.append(f' 259 {disk * 2} nvme{disk}n1 {values} 0 0 0 0 0 0')
+            # A partition: not a /sys/block entry, so excluded from totals
+            lines.append(f' 259 {disk * 2 + 1} nvme{disk}n1p1 {values} 0 0 0 0 0 0')
+        _write(os.path.join(self.proc_root, 'diskstats'), '\n'.join(lines) + '\n')
+
+        lines = [f'veth{interface:05d}: ' + ' '.join(map(str, counters))
+                 for interface, counters in enumerate(self._interfaces)]
+        _write(os.path.join(self.proc_root, 'net', 'dev'), NET_DEV_HEADER + '\n'.join(lines) + '\n')
+
+    def _write_sockets(self):
+        """Write net/{tcp,tcp6,udp,udp6}: 80% TCP, split evenly between IPv4 and IPv6."""
+        rng = self.rng
+        tcp = self.scale.sockets * 4 // 5
+        counts = {'tcp': tcp - tcp // 2, 'tcp6': tcp // 2}
+        udp = self.scale.sockets - tcp
+        counts.update({'udp': udp - udp // 2, 'udp6': udp // 2})
+        for name, count in counts.items():
+            address = '0100007F' if not name.endswith('6') else '0' * 24 + '01000000'
+            lines = [SOCKET_HEADER]
+            for i in range(count):
+                state = rng.choice(TCP_STATES) if name.startswith('tcp') else '07'
+                lines.append(f'{i:4d}: {address}:{8000 + i % 1000:04X} {address}:{i % 60000:04X} {state} '
+                             f'00000000:00000000 00:00000000 00000000     0        0 {100000 + i} 1\n')
+            _write(os.path.join(self.proc_root, 'net', name), ''.join(lines))
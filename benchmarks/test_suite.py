@@ -0,0 +1,43 @@
+"""
+pytest-benchmark entry point for the benchmark suite (bench_suite.py).
+
+    pip install pytest-benchmark
+    BENCH_SCALE=cores=256,processes=20000 python -m pytest benchmarks/test_suite.py \
+        --benchmark-json=results.json
+
+Peak memory and scrape size are stored in each benchmark's extra_info;
+compare runs with `pytest-benchmark compare`. BENCH_ROUNDS sets the timed
+rounds per case (default 20).
+"""
+import os
+import sys
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from benchmarks.bench_suite import CASE_NAMES, build_cases, case_info
+from benchmarks.synthetic_proc import SyntheticHost, parse_scale
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+
+
+@pytest.fixture(scope='module')
+def host_cases(tmp_path_factory):
+    """Synthetic host of BENCH_SCALE and the cases built against it."""
+    host = SyntheticHost(str(tmp_path_factory.mktemp('host')), parse_scale(os.environ.get('BENCH_SCALE', '')))
+    host.write()
+    cases, close = build_cases(host)
+    yield host, cases
+    close()
+
+
+@pytest.mark.parametrize('name', CASE_NAMES)
+def test_case(benchmark, host_cases, name):
+    """Benchmark one case, ticking the host before every round."""
+    host, cases = host_cases
+    case = cases[name]
+    host.tick()
+    case.run()
+    benchmark.extra_info['scale'] = host.scale._asdict()
+    benchmark.pedantic(case.run, setup=host.tick, rounds=int(os.environ.get('BENCH_ROUNDS', 20)))
+    benchmark.extra_info.update(case_info(case, host))
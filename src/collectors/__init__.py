@@ -1,16 +1,24 @@
 """Metric collectors for system resources."""
 from .base_collector import BaseCollector
 from .cpu_collector import CPUCollector
+from .cpu_sampler import CPUSampler
 from .memory_collector import MemoryCollector
 from .disk_collector import DiskCollector
 from .network_collector import NetworkCollector
 from .process_collector import ProcessCollector
+from .cgroup_collector import CgroupCollector
+from .pressure import PressureCollector
+from .host_facts import HostFactsCache
 
 __all__ = [
     'BaseCollector',
     'CPUCollector',
+    'CPUSampler',
     'MemoryCollector',
     'DiskCollector',
     'NetworkCollector',
     'ProcessCollector',
+    'CgroupCollector',
+    'PressureCollector',
+    'HostFactsCache',
 ]
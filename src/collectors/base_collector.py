@@ -20,6 +20,16 @@ class BaseCollector(ABC):
         """
         pass
 
+    def sample(self) -> Any:
+        """
+        Collect metrics in the collector's native snapshot form.
+
+        Collectors with per-device fan-out override this to return a
+        reused record instead of a fresh dict; collect() is then a view of
+        it. Defaults to collect().
+        """
+        return self.collect()
+
     def get_name(self) -> str:
         """Return the collector name."""
         return self.__class__.__name__
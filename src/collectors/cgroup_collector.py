@@ -0,0 +1,262 @@
+"""
+cgroup v2 collector.
+Reports CPU, memory, I/O and pressure per cgroup (containers, pods and
+systemd units) from the unified hierarchy. Each cgroup's directory is kept
+open and its files are read relative to that handle; the tree is rescanned
+only when inotify reports a cgroup created or removed.
+"""
+import errno
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from .base_collector import BaseCollector
+from .inotify import IN_ONLYDIR, IN_Q_OVERFLOW, TREE_EVENTS, open_inotify
+from .procfs import parse_pressure
+
+# cpu.stat keys (microseconds unless noted)
+CPU_STAT_KEYS = ('usage_usec', 'user_usec', 'system_usec', 'nr_periods', 'nr_throttled', 'throttled_usec')
+
+# memory.stat keys exported, in bytes except the fault counters
+MEMORY_STAT_KEYS = ('anon', 'file', 'kernel', 'kernel_stack', 'slab', 'sock', 'shmem',
+                    'file_dirty', 'file_writeback', 'pgfault', 'pgmajfault')
+
+# io.stat keys, summed over devices
+IO_STAT_KEYS = ('rbytes', 'wbytes', 'rios', 'wios')
+
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+
+# Largest cgroup file read (memory.stat is about 1.5 KiB)
+READ_SIZE = 16384
+
+
+class CgroupCollector(BaseCollector):
+    """
+    Collects per-cgroup resource usage from a cgroup v2 hierarchy.
+
+    The walk is breadth first and bounded: cgroups deeper than max_depth
+    below the root are not visited, and at most max_cgroups are tracked
+    (shallower cgroups first, so slices are kept before their leaves).
+    Without inotify the tree is rescanned every rescan_interval seconds.
+    """
+
+    def __init__(self, root: str = '/sys/fs/cgroup', max_depth: int = 4, max_cgroups: int = 1000,
+                 rescan_interval: float = 60.0):
+        """
+        Args:
+            root: Mount point of the cgroup v2 (unified) hierarchy.
+            max_depth: Levels below the root that are tracked.
+            max_cgroups: Upper bound on tracked cgroups (root included).
+            rescan_interval: Seconds between rescans when inotify is not
+                available.
+
+        Raises:
+            ValueError: If root is not a cgroup v2 hierarchy or a limit is
+                not positive.
+        """
+        if max_depth < 0 or max_cgroups < 1:
+            raise ValueError("max_depth must be >= 0 and max_cgroups >= 1")
+        if not os.path.exists(os.path.join(root, 'cgroup.controllers')):
+            raise ValueError(f"{root} is not a cgroup v2 hierarchy")
+        self.root = root
+        self.max_depth = max_depth
+        self.max_cgroups = max_cgroups
+        self.rescan_interval = rescan_interval
+        self.rescans = 0
+        # Subdirectories not tracked because of max_cgroups at the last scan
+        self.dropped = 0
+        # cgroup name ('/' for the root, '/system.slice/...' below) -> directory fd
+        self._dirs: Dict[str, int] = {}
+        self._stale = True
+        self._scanned_at = 0.0
+        self._inotify = None
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Collect cgroup metrics.
+
+        Returns:
+            Dictionary with:
+            - cgroups: {name: {'cpu': {...}, 'memory_current': bytes,
+              'memory': {...}, 'io': {...}, 'pressure': {resource: {...}}}};
+              parts other than cpu are present only where the controller
+              (or PSI) is enabled
+            - cgroup_count: Tracked cgroups
+            - cgroup_dropped: Cgroups skipped by the cardinality limit
+            - cgroup_rescans: Tree scans since start
+        """
+        if self._changed():
+            self._scan()
+        cgroups = {}
+        vanished = False
+        for name, fd in self._dirs.items():
+            stats = self._read_cgroup(fd)
+            if stats is None:
+                vanished = True
+                continue
+            cgroups[name] = stats
+        if vanished:
+            # Removed between scans (or the event was missed): rescan next time
+            self._stale = True
+        return {
+            'cgroups': cgroups,
+            'cgroup_count': len(cgroups),
+            'cgroup_dropped': self.dropped,
+            'cgroup_rescans': self.rescans,
+        }
+
+    def close(self):
+        """Close the directory handles and the inotify instance."""
+        for fd in self._dirs.values():
+            os.close(fd)
+        self._dirs = {}
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._stale = True
+
+    def _changed(self) -> bool:
+        """Return True if the tree must be rescanned."""
+        if self._stale:
+            return True
+        if self._inotify is not None:
+            # Any event on a watched directory: a cgroup appeared or went away
+            return bool(self._inotify.read_events())
+        return time.monotonic() - self._scanned_at >= self.rescan_interval
+
+    def _scan(self):
+        """Walk the tree breadth first, reopen the directory handles and reset the watches."""
+        found, dropped = self._walk()
+        for name in set(self._dirs) - set(found):
+            os.close(self._dirs.pop(name))
+        for name in found:
+            if name not in self._dirs:
+                try:
+                    self._dirs[name] = os.open(self._path(name), os.O_RDONLY | os.O_DIRECTORY)
+                except OSError:
+                    # Removed since the walk
+                    continue
+        self.dropped = dropped
+        self._watch(name for name in found if self._depth(name) < self.max_depth)
+        self.rescans += 1
+        self._scanned_at = time.monotonic()
+        self._stale = False
+
+    def _walk(self) -> Tuple[List[str], int]:
+        """Return (cgroup names within the limits in breadth-first order, names dropped)."""
+        found = ['/']
+        dropped = 0
+        queue = deque([('/', 0)])
+        while queue:
+            name, depth = queue.popleft()
+            if depth >= self.max_depth:
+                continue
+            try:
+                with os.scandir(self._path(name)) as entries:
+                    children = sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+            for child in children:
+                if len(found) >= self.max_cgroups:
+                    dropped += 1
+                    continue
+                child_name = name.rstrip('/') + '/' + child
+                found.append(child_name)
+                queue.append((child_name, depth + 1))
+        return found, dropped
+
+    def _watch(self, names):
+        """Replace the inotify watches with one per directory whose children are tracked."""
+        if self._inotify is not None:
+            self._inotify.close()
+        self._inotify = open_inotify()
+        if self._inotify is None:
+            return
+        try:
+            for name in names:
+                self._inotify.add_watch(self._path(name), TREE_EVENTS | IN_ONLYDIR | IN_Q_OVERFLOW)
+        except OSError:
+            # Watch limit reached or directory gone: fall back to periodic rescans
+            self._inotify.close()
+            self._inotify = None
+
+    def _read_cgroup(self, fd: int) -> Optional[Dict[str, Any]]:
+        """Read one cgroup's files; None if the cgroup was removed."""
+        stats: Dict[str, Any] = {}
+        try:
+            data = _read_at(fd, 'cpu.stat')
+            if data is None:
+                # Every v2 cgroup has cpu.stat: the directory was removed
+                return None
+            values = _flat_keyed(data)
+            stats['cpu'] = {key: values.get(key, 0) for key in CPU_STAT_KEYS}
+
+            data = _read_at(fd, 'memory.current')
+            if data is not None:
+                stats['memory_current'] = int(data)
+            data = _read_at(fd, 'memory.stat')
+            if data is not None:
+                values = _flat_keyed(data)
+                stats['memory'] = {key: values[key] for key in MEMORY_STAT_KEYS if key in values}
+
+            data = _read_at(fd, 'io.stat')
+            if data is not None:
+                stats['io'] = _sum_io_stat(data)
+
+            pressure = {}
+            for resource in PRESSURE_RESOURCES:
+                data = _read_at(fd, resource + '.pressure')
+                if data is not None:
+                    pressure[resource] = parse_pressure(data)
+            if pressure:
+                stats['pressure'] = pressure
+        except OSError as e:
+            # ENODEV: the cgroup was removed while a file was being read
+            if e.errno == errno.ENODEV:
+                return None
+            raise
+        return stats
+
+    def _path(self, name: str) -> str:
+        """Filesystem path of a cgroup name."""
+        return self.root if name == '/' else self.root + name
+
+    @staticmethod
+    def _depth(name: str) -> int:
+        """Levels below the root ('/' is 0)."""
+        return 0 if name == '/' else name.count('/')
+
+
+def _read_at(dir_fd: int, name: str) -> Optional[bytes]:
+    """Read a file relative to a directory handle; None if the file does not exist."""
+    try:
+        fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+    except FileNotFoundError:
+        # Controller not enabled for this cgroup
+        return None
+    try:
+        return os.read(fd, READ_SIZE)
+    finally:
+        os.close(fd)
+
+
+def _flat_keyed(data: bytes) -> Dict[str, int]:
+    """Parse a flat keyed file ("key value" per line)."""
+    values = {}
+    for line in data.splitlines():
+        key, _, value = line.partition(b' ')
+        if value:
+            values[key.decode()] = int(value)
+    return values
+
+
+def _sum_io_stat(data: bytes) -> Dict[str, int]:
+    """Sum the IO_STAT_KEYS of io.stat ("MAJ:MIN rbytes=.. wbytes=.. ..." per device)."""
+    totals = dict.fromkeys(IO_STAT_KEYS, 0)
+    for line in data.splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition(b'=')
+            key = key.decode()
+            if key in totals:
+                totals[key] += int(value)
+    return totals
@@ -2,51 +2,77 @@
 CPU metrics collector using psutil.
 Collects CPU usage, load average, and per-core metrics.
 """
-import platform
 import psutil
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_collector import BaseCollector
+from .cpu_sampler import CPUSampler
+from .host_facts import HostFactsCache
+from .procfs import ProcfsReader
 
 
 class CPUCollector(BaseCollector):
     """Collects CPU-related metrics."""
 
+    def __init__(self, procfs: Optional[ProcfsReader] = None, vectorized: bool = False,
+                 facts: Optional[HostFactsCache] = None):
+        """
+        Args:
+            procfs: Optional Linux /proc reader used instead of psutil for
+                CPU times and load average.
+            vectorized: Compute per-core percentages with NumPy.
+            facts: Host facts (core counts, frequency limits, OS), shared
+                with the other users; a private cache by default.
+        """
+        self.procfs = procfs
+        self.facts = facts or HostFactsCache(procfs)
+
+        # Usage percentages are computed from the delta since the previous
+        # collect() instead of blocking in psutil.cpu_percent(interval=...)
+        self.sampler = CPUSampler(procfs.cpu_times if procfs else None, vectorized=vectorized)
+
     def collect(self) -> Dict[str, Any]:
         """
         Collect CPU metrics.
 
         Returns:
             Dictionary with CPU metrics:
-            - cpu_usage_percent: Overall CPU usage
+            - cpu_usage_percent: Overall CPU usage since the previous call
             - cpu_count: Number of CPU cores
             - cpu_per_core: List of per-core usage percentages
             - load_average: Load averages (1, 5, 15 min) - Linux/macOS only
         """
         metrics = {}
+        # Re-read only after a CPU hotplug
+        facts = self.facts.get()
 
-        # Overall CPU usage
-        metrics['cpu_usage_percent'] = psutil.cpu_percent(interval=1)
+        # Overall, per-core and per-mode usage from one consistent delta
+        sample = self.sampler.sample()
+        metrics['cpu_usage_percent'] = sample['usage_percent']
 
         # CPU count
-        metrics['cpu_count'] = psutil.cpu_count(logical=True)
-        metrics['cpu_count_physical'] = psutil.cpu_count(logical=False)
+        metrics['cpu_count'] = facts.cpu_count
+        metrics['cpu_count_physical'] = facts.cpu_count_physical
 
         # Per-core CPU usage
-        per_cpu = psutil.cpu_percent(interval=0.1, percpu=True)
-        metrics['cpu_per_core'] = per_cpu
+        metrics['cpu_per_core'] = sample['per_core']
 
         # CPU times breakdown
-        cpu_times = psutil.cpu_times_percent(interval=0.1)
-        metrics['cpu_time_user'] = cpu_times.user
-        metrics['cpu_time_system'] = cpu_times.system
-        metrics['cpu_time_idle'] = cpu_times.idle
+        modes = sample['modes']
+        metrics['cpu_time_user'] = modes['user']
+        metrics['cpu_time_system'] = modes['system']
+        metrics['cpu_time_idle'] = modes['idle']
 
         # Platform-specific metrics
-        if hasattr(cpu_times, 'iowait'):
-            metrics['cpu_time_iowait'] = cpu_times.iowait
+        if 'iowait' in modes:
+            metrics['cpu_time_iowait'] = modes['iowait']
 
         # Load average (Linux/macOS only)
-        if platform.system() != 'Windows':
+        if self.procfs is not None:
+            load_avg = self.procfs.loadavg()
+            metrics['load_average_1m'] = load_avg[0]
+            metrics['load_average_5m'] = load_avg[1]
+            metrics['load_average_15m'] = load_avg[2]
+        elif facts.os != 'Windows':
             try:
                 load_avg = psutil.getloadavg()
                 metrics['load_average_1m'] = load_avg[0]
@@ -55,14 +81,15 @@ class CPUCollector(BaseCollector):
             except (AttributeError, OSError):
                 pass
 
-        # CPU frequency (if available)
-        try:
-            freq = psutil.cpu_freq()
-            if freq:
-                metrics['cpu_freq_current'] = freq.current
-                metrics['cpu_freq_min'] = freq.min
-                metrics['cpu_freq_max'] = freq.max
-        except (AttributeError, NotImplementedError):
-            pass
+        # CPU frequency (if available); the limits are host facts
+        if facts.cpu_freq_max is not None:
+            try:
+                freq = psutil.cpu_freq()
+                if freq:
+                    metrics['cpu_freq_current'] = freq.current
+                    metrics['cpu_freq_min'] = facts.cpu_freq_min
+                    metrics['cpu_freq_max'] = facts.cpu_freq_max
+            except (AttributeError, NotImplementedError):
+                pass
 
         return metrics
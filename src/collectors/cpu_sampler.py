@@ -0,0 +1,138 @@
+"""
+Non-blocking CPU sampler.
+Computes overall, per-core and per-mode CPU percentages from the delta
+between two raw CPU time snapshots instead of sleeping inside psutil.
+"""
+import psutil
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+from . import vectorized as _vectorized
+
+# Modes that are already accounted for in 'user'/'nice' on Linux and must
+# not be counted twice when computing the total elapsed time.
+GUEST_FIELDS = ('guest', 'guest_nice')
+
+# Modes that count as "not busy" for the usage percentage.
+IDLE_FIELDS = ('idle', 'iowait')
+
+
+def _psutil_cpu_times() -> Tuple[Tuple[str, ...], List[Sequence[float]]]:
+    """Read raw per-core CPU times (seconds) via psutil (/proc/stat on Linux)."""
+    per_core = psutil.cpu_times(percpu=True)
+    return per_core[0]._fields, [tuple(times) for times in per_core]
+
+
+class CPUSampler:
+    """
+    Stateful CPU usage sampler.
+
+    Keeps the previous raw per-core snapshot and derives every percentage
+    from one consistent delta covering the interval since the last call,
+    so sample() returns immediately and total, per-core and per-mode values
+    agree with each other. The first call is computed against the
+    since-boot counters.
+    """
+
+    def __init__(self, times_source: Optional[Callable] = None, vectorized: bool = False):
+        """
+        Args:
+            times_source: Callable returning (field_names, per_core_times),
+                where per_core_times is a list of sequences of cumulative
+                seconds ordered like field_names. Defaults to psutil.
+            vectorized: Compute every core at once with NumPy (raises
+                ValueError if NumPy is not installed).
+        """
+        if vectorized:
+            _vectorized.require()
+        self.vectorized = vectorized
+        self._read_times = times_source or _psutil_cpu_times
+        self._prev: Optional[List[Sequence[float]]] = None
+        self._last: Optional[Dict[str, Any]] = None
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Take a snapshot and compute percentages since the previous one.
+
+        Returns:
+            Dictionary with:
+            - usage_percent: Overall busy percentage across all cores
+            - per_core: List of per-core busy percentages
+            - modes: Dict mapping CPU mode (user, system, ...) to percentage
+        """
+        fields, current = self._read_times()
+        prev = self._prev
+        if prev is None or len(prev) != len(current):
+            # No baseline yet (or CPUs were hotplugged): use since-boot totals
+            prev = [(0.0,) * len(fields)] * len(current)
+
+        if self.vectorized:
+            return self._sample_vectorized(fields, current, prev)
+
+        guest_idx = [i for i, name in enumerate(fields) if name in GUEST_FIELDS]
+        idle_idx = [i for i, name in enumerate(fields) if name in IDLE_FIELDS]
+
+        mode_deltas = [0.0] * len(fields)
+        per_core = []
+        last_per_core = self._last['per_core'] if self._last else None
+
+        for core, (now, before) in enumerate(zip(current, prev)):
+            # Clamp negative deltas: some hypervisors report idle going backwards
+            deltas = [max(n - b, 0.0) for n, b in zip(now, before)]
+            total = sum(deltas) - sum(deltas[i] for i in guest_idx)
+            if total <= 0:
+                # No tick elapsed on this core since the last sample
+                if last_per_core is not None and core < len(last_per_core):
+                    per_core.append(last_per_core[core])
+                else:
+                    per_core.append(0.0)
+                continue
+
+            idle = sum(deltas[i] for i in idle_idx)
+            per_core.append(_percent(total - idle, total))
+            for i, delta in enumerate(deltas):
+                mode_deltas[i] += delta
+
+        all_total = sum(mode_deltas) - sum(mode_deltas[i] for i in guest_idx)
+        if all_total > 0:
+            all_idle = sum(mode_deltas[i] for i in idle_idx)
+            result = {
+                'usage_percent': _percent(all_total - all_idle, all_total),
+                'per_core': per_core,
+                'modes': {
+                    name: _percent(mode_deltas[i], all_total)
+                    for i, name in enumerate(fields)
+                },
+            }
+        elif self._last is not None:
+            # Called again within the same clock tick: reuse the last result
+            result = self._last
+        else:
+            result = {
+                'usage_percent': 0.0,
+                'per_core': per_core,
+                'modes': {name: 0.0 for name in fields},
+            }
+
+        self._prev = current
+        self._last = result
+        return result
+
+    def _sample_vectorized(self, fields: Sequence[str], current: List[Sequence[float]],
+                           prev: List[Sequence[float]]) -> Dict[str, Any]:
+        """sample() computed by the NumPy path; same results and fallbacks."""
+        last_per_core = self._last['per_core'] if self._last else None
+        usage, per_core, modes = _vectorized.cpu_percentages(fields, current, prev, last_per_core,
+                                                             GUEST_FIELDS, IDLE_FIELDS)
+        if usage is not None:
+            result = {'usage_percent': usage, 'per_core': per_core, 'modes': modes}
+        elif self._last is not None:
+            result = self._last
+        else:
+            result = {'usage_percent': 0.0, 'per_core': per_core, 'modes': {name: 0.0 for name in fields}}
+        self._prev = current
+        self._last = result
+        return result
+
+
+def _percent(part: float, total: float) -> float:
+    """Return part/total as a percentage rounded like psutil, clamped to 0-100."""
+    return round(min(max(part / total * 100.0, 0.0), 100.0), 1)
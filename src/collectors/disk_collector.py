@@ -2,9 +2,65 @@
 Disk metrics collector using psutil.
 Collects disk usage and I/O statistics.
 """
+import re
+import time
 import psutil
-from typing import Dict, Any, List
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+from operator import attrgetter
+from typing import Dict, Any, List, Optional, Sequence
 from .base_collector import BaseCollector
+from .mount_table import Mount, MountTable
+from .procfs import ProcfsReader
+from .snapshot import CounterTable, DeviceTable
+from . import vectorized as _vectorized
+
+# Per-disk I/O counters reported by collect()
+IO_FIELDS = ('read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_time', 'write_time')
+
+# Millisecond counters kept in 32 bits by the kernel (io_ticks and the
+# per-direction times); the other counters going back is a device reset
+WRAPPING_FIELDS = ('read_time', 'write_time', 'busy_time')
+
+# Per-disk rates reported in disk_io_rates
+RATE_FIELDS = ('read_bytes_per_sec', 'write_bytes_per_sec', 'read_iops', 'write_iops',
+               'read_await_ms', 'write_await_ms', 'await_ms', 'util_percent')
+
+
+class DiskSample:
+    """
+    Result of one DiskCollector.sample() call.
+
+    The collector alternates between two samples and overwrites them in
+    place, so a sample stays valid until the second sample() call after it.
+    """
+
+    __slots__ = ('time', 'partitions', 'io', 'io_total', 'has_io', 'has_io_total', 'has_busy_time', 'rates')
+
+    def __init__(self, devices: DeviceTable):
+        self.time = 0.0
+        self.partitions: List[Dict[str, Any]] = []
+        # busy_time (ms) is kept even where collect() does not report it
+        self.io = CounterTable(IO_FIELDS + ('busy_time',), devices)
+        self.io_total = array('Q', bytes(8 * len(self.io.fields)))
+        self.has_io = False
+        self.has_io_total = False
+        self.has_busy_time = False
+        self.rates = CounterTable(RATE_FIELDS, devices, 'd')
+
+    def rate_fields(self) -> Sequence[str]:
+        """Return the rate fields measured on this platform."""
+        return RATE_FIELDS if self.has_busy_time else RATE_FIELDS[:-1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the sample in the collect() dictionary format."""
+        metrics: Dict[str, Any] = {'disk_partitions': self.partitions}
+        if self.has_io:
+            metrics['disk_io'] = self.io.as_dict(self.io.fields if self.has_busy_time else IO_FIELDS)
+        if self.has_io_total:
+            metrics['disk_io_total'] = dict(zip(IO_FIELDS, self.io_total))
+        metrics['disk_io_rates'] = self.rates.as_dict(self.rate_fields())
+        return metrics
 
 
 class DiskCollector(BaseCollector):
@@ -13,6 +69,52 @@ class DiskCollector(BaseCollector):
     # Pseudo filesystems to filter out in production
     PSEUDO_FS_TYPES = {'tmpfs', 'devtmpfs', 'squashfs', 'overlay'}
 
+    IO_FIELDS = IO_FIELDS
+
+    # WRAPPING_FIELDS counters wrap at 2**32
+    COUNTER_WRAP = 2 ** 32
+
+    def __init__(self, procfs: Optional[ProcfsReader] = None,
+                 include: Optional[str] = None, exclude: Optional[str] = None,
+                 fstype_exclude: Optional[str] = None,
+                 statvfs_timeout: float = 2.0, statvfs_workers: int = 4, vectorized: bool = False):
+        """
+        Args:
+            procfs: Optional Linux /proc reader used instead of psutil for
+                I/O counters.
+            include: Regex; only mountpoints matching it are reported.
+            exclude: Regex; mountpoints matching it are skipped.
+            fstype_exclude: Regex; filesystem types matching it are skipped
+                (in addition to PSEUDO_FS_TYPES).
+            statvfs_timeout: Seconds to wait for the usage of all mounts.
+            statvfs_workers: Number of mounts queried in parallel.
+            vectorized: Compute per-disk rates and totals with NumPy
+                (raises ValueError if NumPy is not installed).
+        """
+        if vectorized:
+            _vectorized.require()
+        self.vectorized = vectorized
+        self.procfs = procfs
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+        self.fstype_exclude = re.compile(fstype_exclude) if fstype_exclude else None
+        self.statvfs_timeout = statvfs_timeout
+
+        self.mount_table = MountTable(procfs.root if procfs else '/proc')
+        self._statvfs_pool = ThreadPoolExecutor(max_workers=statvfs_workers, thread_name_prefix='statvfs')
+        # Mountpoints whose statvfs call is still running after a timeout
+        self._pending: Dict[str, Any] = {}
+        self._filtered_for = None
+        self._filtered: List[Mount] = []
+
+        # Two samples sharing one device table, written alternately
+        devices = DeviceTable()
+        self._samples = (DiskSample(devices), DiskSample(devices))
+        self._current = 1
+        self._io_getter = attrgetter(*IO_FIELDS)
+        self._deltas = array('Q', bytes(8 * len(self._samples[0].io.fields)))
+        self._wrapping = tuple(field in WRAPPING_FIELDS for field in self._samples[0].io.fields)
+
     def collect(self) -> Dict[str, Any]:
         """
         Collect disk metrics.
@@ -22,51 +124,147 @@ class DiskCollector(BaseCollector):
             - disk_partitions: List of partition info
             - disk_usage: Usage info per partition
             - disk_io: I/O statistics per disk
+            - disk_io_rates: Per-disk rates since the previous call
+              (empty on the first call)
+        """
+        return self.sample().as_dict()
+
+    def close(self):
+        """Stop the statvfs pool and close the mount table."""
+        # Queued queries are dropped; a call hung on a dead mount is not waited for
+        self._statvfs_pool.shutdown(wait=False, cancel_futures=True)
+        self._pending = {}
+        self.mount_table.close()
+
+    def sample(self) -> DiskSample:
         """
-        metrics = {}
+        Collect disk metrics into a reused DiskSample.
+
+        Returns:
+            The sample written by this call (see DiskSample for how long it
+            stays valid).
+        """
+        previous = self._samples[self._current]
+        self._current ^= 1
+        sample = self._samples[self._current]
+        sample.time = time.monotonic()
 
         # Disk partitions and usage
-        partitions = psutil.disk_partitions(all=False)
-        partition_metrics = []
+        sample.partitions = self._collect_usage(self._monitored_mounts())
+
+        sample.io.begin()
+        if self.procfs is not None:
+            self._collect_io_procfs(sample)
+        else:
+            self._collect_io_psutil(sample)
+        sample.io.sweep()
+
+        # Per-second rates, latency and utilisation since the previous sample
+        self._compute_rates(sample, previous)
+
+        return sample
+
+    def _monitored_mounts(self) -> List[Mount]:
+        """
+        Return the filtered, deduplicated mount list.
 
-        for partition in partitions:
+        Filtering only reruns when the cached mount table changed.
+        """
+        mounts = self.mount_table.mounts()
+        if mounts is self._filtered_for:
+            return self._filtered
+
+        selected = {}
+        for mount in mounts:
             # Skip pseudo filesystems in production
-            if partition.fstype.lower() in self.PSEUDO_FS_TYPES:
+            fstype = mount.fstype.lower()
+            if fstype in self.PSEUDO_FS_TYPES:
+                continue
+            if self.fstype_exclude and self.fstype_exclude.search(fstype):
+                continue
+            if self.include and not self.include.search(mount.mountpoint):
                 continue
+            if self.exclude and self.exclude.search(mount.mountpoint):
+                continue
+
+            # Bind mounts of one filesystem report the same usage: keep the
+            # shortest mountpoint per device
+            current = selected.get(mount.dev_id)
+            if current is None or len(mount.mountpoint) < len(current.mountpoint):
+                selected[mount.dev_id] = mount
 
+        self._filtered_for = mounts
+        self._filtered = sorted(selected.values(), key=lambda m: m.mountpoint)
+        return self._filtered
+
+    def _collect_usage(self, mounts: List[Mount]) -> List[Dict[str, Any]]:
+        """
+        Query usage of every mount in parallel.
+
+        A mount whose statvfs does not return within statvfs_timeout (for
+        example a hung NFS server) is left out, and is not queried again
+        until the stuck call returns.
+        """
+        # Drop stuck calls that have since completed
+        for mountpoint in [mp for mp, future in self._pending.items() if future.done()]:
+            del self._pending[mountpoint]
+
+        futures = {}
+        for mount in mounts:
+            if mount.mountpoint not in self._pending:
+                futures[self._statvfs_pool.submit(psutil.disk_usage, mount.mountpoint)] = mount
+
+        done, not_done = wait(futures, timeout=self.statvfs_timeout)
+        for future in not_done:
+            self._pending[futures[future].mountpoint] = future
+
+        partition_metrics = []
+        for future, mount in futures.items():
+            if future not in done:
+                continue
             try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                partition_info = {
-                    'device': partition.device,
-                    'mountpoint': partition.mountpoint,
-                    'fstype': partition.fstype,
-                    'total': usage.total,
-                    'used': usage.used,
-                    'free': usage.free,
-                    'percent': usage.percent
-                }
-                partition_metrics.append(partition_info)
+                usage = future.result()
             except (PermissionError, OSError):
                 # Skip partitions we can't access
                 continue
+            partition_metrics.append({
+                'device': mount.device,
+                'mountpoint': mount.mountpoint,
+                'fstype': mount.fstype,
+                'total': usage.total,
+                'used': usage.used,
+                'free': usage.free,
+                'percent': usage.percent
+            })
+        return partition_metrics
 
-        metrics['disk_partitions'] = partition_metrics
+    def _collect_io_procfs(self, sample: DiskSample):
+        """Collect per-disk and total I/O counters from /proc/diskstats."""
+        self.procfs.diskstats_into(sample.io)
+        # Totals only count whole disks; partitions are already included
+        if self.vectorized:
+            _vectorized.totals(sample.io, sample.io_total, self.procfs.is_storage_device)
+        else:
+            sample.io.totals(sample.io_total, self.procfs.is_storage_device)
+        sample.has_io = sample.has_io_total = sample.has_busy_time = True
+
+    def _collect_io_psutil(self, sample: DiskSample):
+        """Collect per-disk and total I/O counters with psutil."""
+        sample.has_io = sample.has_io_total = False
 
         # Disk I/O counters
         try:
             disk_io = psutil.disk_io_counters(perdisk=True)
             if disk_io:
-                io_metrics = {}
+                get_counters = self._io_getter
+                busy_time = sample.io.column('busy_time')
+                # Time spent doing I/O (Linux, FreeBSD)
+                sample.has_busy_time = hasattr(next(iter(disk_io.values())), 'busy_time')
                 for disk_name, counters in disk_io.items():
-                    io_metrics[disk_name] = {
-                        'read_count': counters.read_count,
-                        'write_count': counters.write_count,
-                        'read_bytes': counters.read_bytes,
-                        'write_bytes': counters.write_bytes,
-                        'read_time': counters.read_time,
-                        'write_time': counters.write_time
-                    }
-                metrics['disk_io'] = io_metrics
+                    slot = sample.io.put(disk_name, get_counters(counters))
+                    if sample.has_busy_time:
+                        busy_time[slot] = counters.busy_time
+                sample.has_io = True
         except (AttributeError, RuntimeError):
             # Some systems don't support per-disk I/O
             pass
@@ -75,15 +273,80 @@ class DiskCollector(BaseCollector):
         try:
             total_io = psutil.disk_io_counters()
             if total_io:
-                metrics['disk_io_total'] = {
-                    'read_count': total_io.read_count,
-                    'write_count': total_io.write_count,
-                    'read_bytes': total_io.read_bytes,
-                    'write_bytes': total_io.write_bytes,
-                    'read_time': total_io.read_time,
-                    'write_time': total_io.write_time
-                }
+                for i, value in enumerate(self._io_getter(total_io)):
+                    sample.io_total[i] = value
+                sample.has_io_total = True
         except (AttributeError, RuntimeError):
             pass
 
-        return metrics
+    def _compute_rates(self, sample: DiskSample, previous: DiskSample):
+        """
+        Derive per-disk rates from the counters of the previous sample.
+
+        Fills sample.rates with, per disk:
+        - read_bytes_per_sec / write_bytes_per_sec: Throughput
+        - read_iops / write_iops: Completed operations per second
+        - read_await_ms / write_await_ms / await_ms: Average time per
+          completed operation
+        - util_percent: Share of time the device was busy (when the
+          platform reports busy_time)
+
+        Disks that are new, or whose counters were reset, get rates from
+        the next sample. Disks that disappeared have no row.
+        """
+        rates = sample.rates
+        rates.begin()
+        elapsed = sample.time - previous.time
+        if not previous.has_io or elapsed <= 0:
+            return
+        if self.vectorized:
+            _vectorized.disk_rates(sample.io, previous.io, rates, elapsed, self.COUNTER_WRAP, WRAPPING_FIELDS)
+            return
+
+        current_io = sample.io
+        previous_io = previous.io
+        deltas = self._deltas
+        wrapping = self._wrapping
+        for disk_name, slot in current_io.items():
+            # Same slot in both samples unless the disk is new
+            if not previous_io.has(slot, disk_name):
+                continue
+            for i, column in enumerate(current_io.columns):
+                delta = self._counter_delta(column[slot], previous_io.columns[i][slot], wrapping[i])
+                if delta is None:
+                    break
+                deltas[i] = delta
+            else:
+                rates.put(disk_name, self._disk_rates(deltas, elapsed))
+
+    def _counter_delta(self, current: int, previous: int, wraps: bool) -> Optional[int]:
+        """Return the counter increase, handling 32-bit wraps of wrapping counters; None on reset."""
+        if current >= previous:
+            return current - previous
+        if wraps and previous < self.COUNTER_WRAP:
+            return current + self.COUNTER_WRAP - previous
+        return None
+
+    @staticmethod
+    def _disk_rates(deltas: array, elapsed: float) -> tuple:
+        """
+        Compute rates for one disk from counter deltas over elapsed seconds.
+
+        Args:
+            deltas: Counter increases in DiskSample.io field order.
+
+        Returns:
+            Values in RATE_FIELDS order.
+        """
+        reads, writes, read_bytes, write_bytes, read_time, write_time, busy_time = deltas
+        return (
+            read_bytes / elapsed,
+            write_bytes / elapsed,
+            reads / elapsed,
+            writes / elapsed,
+            read_time / reads if reads else 0.0,
+            write_time / writes if writes else 0.0,
+            (read_time + write_time) / (reads + writes) if reads + writes else 0.0,
+            # busy_time is in milliseconds
+            min(busy_time / (elapsed * 1000) * 100, 100.0),
+        )
@@ -0,0 +1,251 @@
+"""
+High-resolution sampler.
+Samples cheap /proc sources (CPU busy and iowait share, runnable tasks,
+available memory) many times per second on a background thread and keeps
+only per-window aggregates, so sub-second spikes show up in a 15s scrape.
+"""
+import bisect
+import math
+import threading
+import time
+from array import array
+from collections import namedtuple
+from typing import Dict, List, Optional, Sequence, Tuple
+from .procfs import ProcfsReader
+
+# Aggregates of one window; None fields when the window had no samples
+WindowStats = namedtuple('WindowStats', ['count', 'min', 'max', 'p50', 'p99'])
+
+# Samples of one value between two drains: exact count, min and max, and
+# the latest samples (up to the buffer capacity), oldest first
+WindowSegment = namedtuple('WindowSegment', ['count', 'min', 'max', 'values'])
+
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+TASK_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Sampled values: name -> histogram buckets (None: window stats only)
+SOURCES = {
+    'cpu_busy_ratio': RATIO_BUCKETS,
+    'cpu_iowait_ratio': RATIO_BUCKETS,
+    'procs_running': TASK_BUCKETS,
+    'memory_available_bytes': None,
+}
+
+
+class WindowBuffer:
+    """
+    Fixed-size ring buffer of one value's samples in the current window.
+
+    min, max and count are exact for the window; percentiles are taken
+    over the last `capacity` samples. Histogram bucket counts, sum and
+    count are cumulative, as Prometheus histograms are.
+    """
+
+    __slots__ = ('capacity', 'buckets', 'bucket_counts', 'total_count', 'total_sum',
+                 '_values', '_next', '_count', '_min', '_max')
+
+    def __init__(self, capacity: int, buckets: Optional[Sequence[float]] = None):
+        """
+        Args:
+            capacity: Samples kept for percentiles.
+            buckets: Upper bounds of the cumulative histogram (optional).
+        """
+        self.capacity = capacity
+        self.buckets = tuple(buckets or ())
+        # One count per bucket plus +Inf; non-cumulative until exported
+        self.bucket_counts = array('Q', bytes(8 * (len(self.buckets) + 1)))
+        self.total_count = 0
+        self.total_sum = 0.0
+        self._values = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        self._min = math.inf
+        self._max = -math.inf
+
+    def add(self, value: float):
+        """Record one sample."""
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count += 1
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        if self.buckets:
+            self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total_count += 1
+        self.total_sum += value
+
+    def drain(self) -> WindowStats:
+        """Return the current window's aggregates and start a new window."""
+        return window_stats([self.drain_segment()])
+
+    def drain_segment(self) -> WindowSegment:
+        """Return the current window's samples and start a new window."""
+        count = self._count
+        if not count:
+            return WindowSegment(0, None, None, [])
+        kept = min(count, self.capacity)
+        end = self._next or self.capacity
+        values = (self._values[end - kept:end] if kept <= end
+                  else self._values[end - kept:] + self._values[:end])
+        segment = WindowSegment(count, self._min, self._max, values.tolist())
+        self._count = 0
+        self._min = math.inf
+        self._max = -math.inf
+        return segment
+
+    def cumulative_buckets(self) -> List[Tuple[str, int]]:
+        """Return [(le, cumulative count)] including +Inf."""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.bucket_counts):
+            running += count
+            result.append(('+Inf' if bound == math.inf else repr(float(bound)), running))
+        return result
+
+
+class HiresSampler:
+    """
+    Background sampler with a CPU budget.
+
+    The per-sample CPU cost (thread time, smoothed) is measured on every
+    sample; the sampling interval is stretched to cost / cpu_budget when
+    the target rate would exceed the budget, and returns to the target
+    once sampling gets cheaper again.
+    """
+
+    def __init__(self, procfs: ProcfsReader, rate: float = 20.0, cpu_budget: float = 0.05,
+                 window_capacity: int = 4096):
+        """
+        Args:
+            procfs: Reader of the sampled /proc files (a dedicated one
+                avoids contending with the collectors' file locks).
+            rate: Target samples per second.
+            cpu_budget: Fraction of one CPU the sampler may use.
+            window_capacity: Samples per value kept for percentiles.
+        """
+        if rate <= 0 or cpu_budget <= 0:
+            raise ValueError("rate and cpu_budget must be positive")
+        self.procfs = procfs
+        self.target_interval = 1.0 / rate
+        self.cpu_budget = cpu_budget
+        self.interval = self.target_interval
+        # Smoothed CPU seconds per sample
+        self.cost = 0.0
+        self.samples = 0
+        # Samples taken at a stretched interval because of the budget
+        self.throttled = 0
+        self.window_capacity = window_capacity
+        self.buffers: Dict[str, WindowBuffer] = {
+            name: WindowBuffer(window_capacity, buckets) for name, buckets in SOURCES.items()
+        }
+        self._lock = threading.Lock()
+        self._prev_cpu: Optional[Tuple[int, int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_once(self):
+        """Read every source once and record the values."""
+        cpu = self.procfs.cpu_total_ticks()
+        running = self.procfs.procs_running()
+        available = self.procfs.mem_available()
+        prev = self._prev_cpu
+        self._prev_cpu = cpu
+        with self._lock:
+            buffers = self.buffers
+            if prev is not None and cpu[2] > prev[2]:
+                # No sample when no clock tick elapsed since the previous one
+                total = cpu[2] - prev[2]
+                buffers['cpu_busy_ratio'].add(min(max((cpu[0] - prev[0]) / total, 0.0), 1.0))
+                buffers['cpu_iowait_ratio'].add(min(max((cpu[1] - prev[1]) / total, 0.0), 1.0))
+            buffers['procs_running'].add(running)
+            buffers['memory_available_bytes'].add(available)
+            self.samples += 1
+
+    def drain(self) -> Dict[str, WindowStats]:
+        """Return every value's window aggregates and start new windows."""
+        with self._lock:
+            return {name: buffer.drain() for name, buffer in self.buffers.items()}
+
+    def drain_segments(self) -> Dict[str, WindowSegment]:
+        """Return every value's window samples and start new windows."""
+        with self._lock:
+            return {name: buffer.drain_segment() for name, buffer in self.buffers.items()}
+
+    def histograms(self) -> Dict[str, Tuple[List[Tuple[str, int]], float]]:
+        """Return {name: (cumulative buckets, sum)} for values with buckets."""
+        with self._lock:
+            return {
+                name: (buffer.cumulative_buckets(), buffer.total_sum)
+                for name, buffer in self.buffers.items() if buffer.buckets
+            }
+
+    def record_cost(self, cost: float):
+        """Fold one sample's CPU cost into the budget and pick the next interval."""
+        self.cost = 0.9 * self.cost + 0.1 * cost if self.cost else cost
+        self.interval = max(self.target_interval, self.cost / self.cpu_budget)
+        if self.interval > self.target_interval:
+            self.throttled += 1
+
+    def start(self):
+        """Start sampling on a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='hires-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Sample at the current interval until stopped."""
+        next_time = time.monotonic()
+        while not self._stop.wait(max(next_time - time.monotonic(), 0.0)):
+            start = time.thread_time()
+            try:
+                self.sample_once()
+            except (OSError, ValueError):
+                # A transient read error skips this sample only
+                pass
+            self.record_cost(time.thread_time() - start)
+            # Do not burst to catch up after a stall
+            next_time = max(next_time + self.interval, time.monotonic())
+
+
+def merge_segments(older: WindowSegment, newer: WindowSegment, capacity: int) -> WindowSegment:
+    """Return one segment covering two consecutive ones, keeping the latest capacity samples."""
+    if not older.count:
+        return newer
+    if not newer.count:
+        return older
+    return WindowSegment(older.count + newer.count, min(older.min, newer.min), max(older.max, newer.max),
+                         (older.values + newer.values)[-capacity:])
+
+
+def window_stats(segments: Sequence[WindowSegment], capacity: Optional[int] = None) -> WindowStats:
+    """
+    Aggregate consecutive segments into one window.
+
+    min, max and count are exact; percentiles are taken over the latest
+    capacity samples (all kept samples if None).
+    """
+    count = sum(segment.count for segment in segments)
+    if not count:
+        return WindowStats(0, None, None, None, None)
+    values = [value for segment in segments for value in segment.values]
+    if capacity is not None:
+        values = values[-capacity:]
+    values.sort()
+    return WindowStats(count, min(segment.min for segment in segments if segment.count),
+                       max(segment.max for segment in segments if segment.count),
+                       _quantile(values, 0.5), _quantile(values, 0.99))
+
+
+def _quantile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank quantile of sorted values."""
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
@@ -0,0 +1,158 @@
+"""
+Static host facts.
+Core counts, frequency limits, total memory, OS, kernel and CPU model are
+read once and cached. On Linux they are re-read only when the kernel
+announces a CPU or memory block going online or offline (a hotplug
+uevent); elsewhere they are re-read on a fixed interval.
+"""
+import os
+import platform
+import socket
+import time
+import psutil
+from collections import namedtuple
+from typing import Optional
+from .procfs import ProcfsReader
+
+HostFacts = namedtuple('HostFacts', [
+    'os', 'kernel', 'machine', 'cpu_model',
+    'cpu_count', 'cpu_count_physical',
+    # MHz (0 where the limits are unknown); None where the platform does
+    # not report CPU frequency at all
+    'cpu_freq_min', 'cpu_freq_max',
+    'memory_total',
+])
+
+NETLINK_KOBJECT_UEVENT = 15
+
+# Subsystems and actions of the uevents that change the facts
+HOTPLUG_SUBSYSTEMS = (b'cpu', b'memory')
+HOTPLUG_ACTIONS = (b'online', b'offline', b'add', b'remove')
+
+
+def open_uevent_socket() -> Optional[socket.socket]:
+    """Return a non-blocking socket receiving kernel uevents, or None if unavailable."""
+    if not hasattr(socket, 'AF_NETLINK'):
+        return None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    except OSError:
+        return None
+    try:
+        # Multicast group 1: events sent by the kernel (2 is udev's)
+        sock.bind((0, 1))
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def is_hotplug_event(message: bytes) -> bool:
+    """
+    Return True if a uevent is a CPU or memory block hotplug.
+
+    Format: "ACTION@DEVPATH\\0KEY=VALUE\\0..." with ACTION, DEVPATH and
+    SUBSYSTEM among the keys.
+    """
+    fields = dict(field.partition(b'=')[::2] for field in message.split(b'\0')[1:] if field)
+    return fields.get(b'SUBSYSTEM') in HOTPLUG_SUBSYSTEMS and fields.get(b'ACTION') in HOTPLUG_ACTIONS
+
+
+class HostFactsCache:
+    """Host facts cached until a hotplug event (or the refresh interval, without uevents)."""
+
+    def __init__(self, procfs: Optional[ProcfsReader] = None, proc_root: str = '/proc',
+                 refresh_interval: float = 300.0):
+        """
+        Args:
+            procfs: Optional /proc reader used for total memory.
+            proc_root: procfs mount point, for the CPU model.
+            refresh_interval: Seconds between re-reads where uevents are
+                not available.
+        """
+        self.procfs = procfs
+        self.proc_root = procfs.root if procfs else proc_root
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self._facts: Optional[HostFacts] = None
+        self._loaded_at = 0.0
+        self._uevents = open_uevent_socket()
+
+    def invalidate(self):
+        """Force the next get() call to re-read the facts."""
+        self._facts = None
+
+    def changed(self) -> bool:
+        """Return True if the facts must be re-read."""
+        if self._facts is None:
+            return True
+        if self._uevents is not None:
+            return self._drain_uevents()
+        return time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def _drain_uevents(self) -> bool:
+        """Read the pending uevents; True if one was a CPU or memory hotplug."""
+        hotplug = False
+        while True:
+            try:
+                message = self._uevents.recv(8192)
+            except BlockingIOError:
+                return hotplug
+            except OSError:
+                # ENOBUFS: events were dropped, one of them may have been a hotplug
+                hotplug = True
+                continue
+            hotplug = hotplug or is_hotplug_event(message)
+
+    def get(self) -> HostFacts:
+        """Return the cached facts, re-reading them after a hotplug."""
+        if self.changed():
+            self._facts = self._load()
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        return self._facts
+
+    def _load(self) -> HostFacts:
+        """Read every fact."""
+        freq_min = freq_max = None
+        try:
+            freq = psutil.cpu_freq()
+            if freq:
+                freq_min, freq_max = freq.min, freq.max
+        except (AttributeError, NotImplementedError, OSError):
+            pass
+        if self.procfs is not None:
+            memory_total = self.procfs.meminfo()[b'MemTotal']
+        else:
+            memory_total = psutil.virtual_memory().total
+        return HostFacts(
+            os=platform.system(),
+            kernel=platform.release(),
+            machine=platform.machine(),
+            cpu_model=self._cpu_model(),
+            cpu_count=psutil.cpu_count(logical=True),
+            cpu_count_physical=psutil.cpu_count(logical=False),
+            cpu_freq_min=freq_min,
+            cpu_freq_max=freq_max,
+            memory_total=memory_total,
+        )
+
+    def _cpu_model(self) -> str:
+        """Return the CPU model name from cpuinfo, or the platform's processor string."""
+        try:
+            with open(os.path.join(self.proc_root, 'cpuinfo'), 'rb') as f:
+                for line in f:
+                    key, _, value = line.partition(b':')
+                    # x86 and most others; "Hardware" or "cpu" on some ARM and POWER kernels
+                    if key.strip() in (b'model name', b'Hardware', b'cpu'):
+                        return value.strip().decode(errors='replace')
+        except OSError:
+            pass
+        return platform.processor()
+
+    def close(self):
+        """Close the uevent socket."""
+        if self._uevents is not None:
+            self._uevents.close()
+            self._uevents = None
@@ -0,0 +1,116 @@
+"""
+Minimal inotify binding (Linux, through ctypes).
+Used to notice directory tree changes without rescanning the tree on
+every collection.
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from typing import List, Optional, Tuple
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+# Children appearing or disappearing in a watched directory
+TREE_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+
+def _load_libc():
+    """Return libc with the inotify functions, or None."""
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+class Inotify:
+    """
+    A non-blocking inotify instance.
+
+    Raises OSError from the constructor or add_watch() when inotify cannot
+    be used (not Linux, or the watch limit is reached); callers fall back
+    to periodic rescans.
+    """
+
+    def __init__(self):
+        libc = _load_libc() if sys.platform.startswith('linux') else None
+        if libc is None:
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    @staticmethod
+    def available() -> bool:
+        """Return True if inotify can be used here."""
+        return sys.platform.startswith('linux') and _load_libc() is not None
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Watch path for the events in mask.
+
+        Returns:
+            The watch descriptor.
+
+        Raises:
+            OSError: e.g. ENOSPC once fs.inotify.max_user_watches is reached.
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Return the pending (wd, mask, name) events without blocking."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        """Close the inotify descriptor (removing every watch)."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def open_inotify() -> Optional[Inotify]:
+    """Return a new Inotify, or None if inotify is unavailable."""
+    try:
+        return Inotify()
+    except OSError:
+        return None
@@ -3,13 +3,26 @@ Memory metrics collector using psutil.
 Collects RAM and swap memory metrics.
 """
 import psutil
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_collector import BaseCollector
+from .procfs import ProcfsReader, SWAP_PAGE_SIZE, usage_percent
+
+# psutil 7.1 made Linux "used" total - available (as procps free does);
+# earlier versions report total - free - buffers - cached. The procfs path
+# follows the installed psutil so memory_used means the same on both.
+USED_EXCLUDES_AVAILABLE = psutil.version_info >= (7, 1)
 
 
 class MemoryCollector(BaseCollector):
     """Collects memory-related metrics."""
 
+    def __init__(self, procfs: Optional[ProcfsReader] = None):
+        """
+        Args:
+            procfs: Optional Linux /proc reader used instead of psutil.
+        """
+        self.procfs = procfs
+
     def collect(self) -> Dict[str, Any]:
         """
         Collect memory metrics.
@@ -24,6 +37,9 @@ class MemoryCollector(BaseCollector):
             - swap_used: Used swap memory in bytes
             - swap_percent: Swap usage percentage
         """
+        if self.procfs is not None:
+            return self._collect_procfs()
+
         metrics = {}
 
         # Virtual memory (RAM)
@@ -58,3 +74,48 @@ class MemoryCollector(BaseCollector):
             metrics['swap_sout'] = swap.sout
 
         return metrics
+
+    @staticmethod
+    def _used(total: int, free: int, buffers: int, cached: int, available: int) -> int:
+        """Return used memory as psutil.virtual_memory().used computes it on Linux."""
+        if USED_EXCLUDES_AVAILABLE:
+            return total - available
+        used = total - free - buffers - cached
+        # Cached can exceed total - free in containers (LXC)
+        return used if used >= 0 else total - free
+
+    def _collect_procfs(self) -> Dict[str, Any]:
+        """Collect the same metrics from /proc/meminfo and /proc/vmstat."""
+        mem = self.procfs.meminfo()
+        total = mem[b'MemTotal']
+        free = mem[b'MemFree']
+        buffers = mem.get(b'Buffers', 0)
+        # Like free(1) and psutil, reclaimable slab counts as cache
+        cached = mem.get(b'Cached', 0) + mem.get(b'SReclaimable', 0)
+        available = mem.get(b'MemAvailable', free + buffers + cached)
+        if not 0 <= available <= total:
+            available = free
+
+        metrics = {}
+        metrics['memory_total'] = total
+        metrics['memory_available'] = available
+        metrics['memory_used'] = self._used(total, free, buffers, cached, available)
+        metrics['memory_free'] = free
+        metrics['memory_percent'] = usage_percent(total - available, total)
+        metrics['memory_active'] = mem.get(b'Active', 0)
+        metrics['memory_inactive'] = mem.get(b'Inactive', 0)
+        metrics['memory_buffers'] = buffers
+        metrics['memory_cached'] = cached
+
+        swap_total = mem.get(b'SwapTotal', 0)
+        swap_free = mem.get(b'SwapFree', 0)
+        metrics['swap_total'] = swap_total
+        metrics['swap_used'] = swap_total - swap_free
+        metrics['swap_free'] = swap_free
+        metrics['swap_percent'] = usage_percent(swap_total - swap_free, swap_total)
+
+        swap_io = self.procfs.vmstat((b'pswpin', b'pswpout'))
+        metrics['swap_sin'] = swap_io.get(b'pswpin', 0) * SWAP_PAGE_SIZE
+        metrics['swap_sout'] = swap_io.get(b'pswpout', 0) * SWAP_PAGE_SIZE
+
+        return metrics
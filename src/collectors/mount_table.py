@@ -0,0 +1,140 @@
+"""
+Cached mount table.
+On Linux the table is parsed from /proc/self/mountinfo and re-parsed only
+when the kernel signals a mount change (POLLPRI on the open file);
+elsewhere psutil.disk_partitions is re-read on a fixed interval.
+"""
+import os
+import re
+import select
+import sys
+import time
+import psutil
+from collections import namedtuple
+from typing import List, Optional, Set
+
+# dev_id identifies the mounted filesystem (major:minor on Linux); two
+# mounts with the same dev_id report identical statvfs results
+Mount = namedtuple('Mount', ['device', 'mountpoint', 'fstype', 'dev_id'])
+
+# Octal escapes used in mountinfo paths (space, tab, newline, backslash)
+_ESCAPE = re.compile(rb'\\([0-7]{3})')
+
+
+def _unescape(value: bytes) -> str:
+    """Decode a mountinfo path field."""
+    return _ESCAPE.sub(lambda m: bytes([int(m.group(1), 8)]), value).decode(errors='replace')
+
+
+def parse_mountinfo(data: bytes) -> List[Mount]:
+    """
+    Parse the contents of /proc/<pid>/mountinfo.
+
+    Format (proc(5)):
+        36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw
+        id parent major:minor root mountpoint options [optional...] - fstype source superopts
+    """
+    mounts = []
+    for line in data.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index(b'-', 6)
+        except ValueError:
+            continue
+        if len(fields) < separator + 3:
+            continue
+        mounts.append(Mount(
+            device=_unescape(fields[separator + 2]),
+            mountpoint=_unescape(fields[4]),
+            fstype=fields[separator + 1].decode(),
+            dev_id=fields[2].decode(),
+        ))
+    return mounts
+
+
+def physical_fs_types(proc_root: str = '/proc') -> Optional[Set[str]]:
+    """Return filesystem types not marked 'nodev' in /proc/filesystems."""
+    try:
+        with open(os.path.join(proc_root, 'filesystems')) as f:
+            types = {line.split()[0] for line in f if line.strip() and not line.startswith('nodev')}
+    except OSError:
+        return None
+    # zfs is registered as nodev but backed by real disks (psutil does the same)
+    types.add('zfs')
+    return types
+
+
+class MountTable:
+    """
+    Mount table cached between collections.
+
+    Only physical filesystems are returned (like psutil.disk_partitions
+    with all=False).
+    """
+
+    def __init__(self, proc_root: str = '/proc', refresh_interval: float = 300.0):
+        """
+        Args:
+            proc_root: procfs mount point.
+            refresh_interval: Seconds between re-reads where mount change
+                notifications are not available.
+        """
+        self.proc_root = proc_root
+        self.refresh_interval = refresh_interval
+        self.reloads = 0
+        self._mounts: Optional[List[Mount]] = None
+        self._loaded_at = 0.0
+        self._file = None
+        self._poller = None
+
+        if sys.platform.startswith('linux') and hasattr(select, 'poll'):
+            try:
+                self._file = open(os.path.join(proc_root, 'self', 'mountinfo'), 'rb')
+            except OSError:
+                self._file = None
+            else:
+                self._poller = select.poll()
+                self._poller.register(self._file.fileno(), select.POLLPRI | select.POLLERR)
+                self._fs_types = physical_fs_types(proc_root)
+
+    def invalidate(self):
+        """Force the next mounts() call to re-read the table."""
+        self._mounts = None
+
+    def changed(self) -> bool:
+        """Return True if the table must be re-read."""
+        if self._mounts is None:
+            return True
+        if self._poller is not None:
+            # The kernel flags POLLPRI|POLLERR once per mount/unmount
+            return any(event & (select.POLLPRI | select.POLLERR) for _, event in self._poller.poll(0))
+        return time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def mounts(self) -> List[Mount]:
+        """Return the cached mount list, re-reading it if it changed."""
+        if self.changed():
+            self._mounts = self._load()
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+        return self._mounts
+
+    def _load(self) -> List[Mount]:
+        """Read the mount table from mountinfo, or psutil elsewhere."""
+        if self._file is not None:
+            self._file.seek(0)
+            mounts = parse_mountinfo(self._file.read())
+            if self._fs_types is not None:
+                mounts = [m for m in mounts if m.fstype in self._fs_types]
+            return [m for m in mounts if m.device not in ('', 'none')]
+
+        return [
+            Mount(p.device, p.mountpoint, p.fstype, p.device)
+            for p in psutil.disk_partitions(all=False)
+        ]
+
+    def close(self):
+        """Close the mountinfo file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._poller = None
@@ -2,14 +2,85 @@
 Network metrics collector using psutil.
 Collects network I/O and connection statistics.
 """
+import sys
 import psutil
-from typing import Dict, Any
+from array import array
+from operator import attrgetter
+from typing import Dict, Any, Optional
 from .base_collector import BaseCollector
+from .procfs import ProcfsReader
+from .snapshot import CounterTable, DeviceTable
+from . import vectorized as _vectorized
+from .sock_diag import SockDiagCounter, count_proc_net, empty_histogram
+
+# Per-interface I/O counters reported by collect()
+IO_FIELDS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+             'errin', 'errout', 'dropin', 'dropout')
+
+
+class NetworkSample:
+    """
+    Result of one NetworkCollector.sample() call.
+
+    The collector alternates between two samples and overwrites them in
+    place, so a sample stays valid until the second sample() call after it.
+    """
+
+    __slots__ = ('io', 'io_total', 'has_io', 'connections', 'connections_total')
+
+    def __init__(self, devices: DeviceTable):
+        self.io = CounterTable(IO_FIELDS, devices)
+        self.io_total = array('Q', bytes(8 * len(IO_FIELDS)))
+        self.has_io = False
+        # Socket counts by state, or None when they could not be read
+        self.connections: Optional[Dict[str, int]] = None
+        self.connections_total = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the sample in the collect() dictionary format."""
+        metrics: Dict[str, Any] = {}
+        if self.has_io:
+            metrics['network_io'] = self.io.as_dict()
+            metrics['network_io_total'] = dict(zip(IO_FIELDS, self.io_total))
+        if self.connections is not None:
+            metrics['network_connections'] = dict(self.connections)
+            metrics['network_connections_total'] = self.connections_total
+        return metrics
 
 
 class NetworkCollector(BaseCollector):
     """Collects network-related metrics."""
 
+    IO_FIELDS = IO_FIELDS
+
+    def __init__(self, procfs: Optional[ProcfsReader] = None, vectorized: bool = False):
+        """
+        Args:
+            procfs: Optional Linux /proc reader used instead of psutil for
+                interface counters.
+            vectorized: Sum interface counters with NumPy (raises
+                ValueError if NumPy is not installed).
+        """
+        if vectorized:
+            _vectorized.require()
+        self.vectorized = vectorized
+        self.procfs = procfs
+        self.proc_root = procfs.root if procfs else '/proc'
+
+        # On Linux, count sockets by state without psutil.net_connections,
+        # which builds an object per socket and maps each one to a PID.
+        # Netlink only sees our own namespace, so another procfs root
+        # (a host /proc mounted in a container) is read from its files
+        self.count_states = sys.platform.startswith('linux')
+        self.sock_diag = (SockDiagCounter() if SockDiagCounter.available() and self.proc_root == '/proc'
+                          else None)
+
+        # Two samples sharing one interface table, written alternately
+        devices = DeviceTable()
+        self._samples = (NetworkSample(devices), NetworkSample(devices))
+        self._current = 1
+        self._io_getter = attrgetter(*IO_FIELDS)
+
     def collect(self) -> Dict[str, Any]:
         """
         Collect network metrics.
@@ -19,73 +90,73 @@ class NetworkCollector(BaseCollector):
             - network_io: I/O statistics per interface
             - network_connections: Connection statistics by state
         """
-        metrics = {}
+        return self.sample().as_dict()
 
-        # Network I/O per interface
-        try:
-            net_io = psutil.net_io_counters(pernic=True)
-            if net_io:
-                io_metrics = {}
-                for interface, counters in net_io.items():
-                    io_metrics[interface] = {
-                        'bytes_sent': counters.bytes_sent,
-                        'bytes_recv': counters.bytes_recv,
-                        'packets_sent': counters.packets_sent,
-                        'packets_recv': counters.packets_recv,
-                        'errin': counters.errin,
-                        'errout': counters.errout,
-                        'dropin': counters.dropin,
-                        'dropout': counters.dropout
-                    }
-                metrics['network_io'] = io_metrics
-        except (AttributeError, RuntimeError):
-            pass
-
-        # Total network I/O
-        try:
-            total_io = psutil.net_io_counters()
-            if total_io:
-                metrics['network_io_total'] = {
-                    'bytes_sent': total_io.bytes_sent,
-                    'bytes_recv': total_io.bytes_recv,
-                    'packets_sent': total_io.packets_sent,
-                    'packets_recv': total_io.packets_recv,
-                    'errin': total_io.errin,
-                    'errout': total_io.errout,
-                    'dropin': total_io.dropin,
-                    'dropout': total_io.dropout
-                }
-        except (AttributeError, RuntimeError):
-            pass
+    def sample(self) -> NetworkSample:
+        """
+        Collect network metrics into a reused NetworkSample.
+
+        Returns:
+            The sample written by this call (see NetworkSample for how long
+            it stays valid).
+        """
+        self._current ^= 1
+        sample = self._samples[self._current]
+
+        sample.io.begin()
+        if self.procfs is not None:
+            # Fast path: per-interface I/O from /proc/net/dev
+            self.procfs.net_dev_into(sample.io)
+            sample.has_io = True
+        else:
+            # Network I/O per interface
+            sample.has_io = False
+            try:
+                net_io = psutil.net_io_counters(pernic=True)
+                if net_io:
+                    get_counters = self._io_getter
+                    for interface, counters in net_io.items():
+                        sample.io.put(interface, get_counters(counters))
+                    sample.has_io = True
+            except (AttributeError, RuntimeError):
+                pass
+        sample.io.sweep()
+        # Total network I/O (psutil's total is the same sum over interfaces)
+        if self.vectorized:
+            _vectorized.totals(sample.io, sample.io_total)
+        else:
+            sample.io.totals(sample.io_total)
 
         # Network connections by state
+        if self.count_states:
+            sample.connections = self._count_connection_states()
+            sample.connections_total = sum(sample.connections.values())
+            return sample
+
         try:
             connections = psutil.net_connections(kind='inet')
-            connection_stats = {
-                'ESTABLISHED': 0,
-                'SYN_SENT': 0,
-                'SYN_RECV': 0,
-                'FIN_WAIT1': 0,
-                'FIN_WAIT2': 0,
-                'TIME_WAIT': 0,
-                'CLOSE': 0,
-                'CLOSE_WAIT': 0,
-                'LAST_ACK': 0,
-                'LISTEN': 0,
-                'CLOSING': 0,
-                'NONE': 0
-            }
+            connection_stats = empty_histogram()
 
             for conn in connections:
                 status = conn.status
                 if status in connection_stats:
                     connection_stats[status] += 1
 
-            metrics['network_connections'] = connection_stats
-            metrics['network_connections_total'] = len(connections)
+            sample.connections = connection_stats
+            sample.connections_total = len(connections)
 
         except (PermissionError, psutil.AccessDenied):
             # Requires elevated privileges on some systems
-            pass
+            sample.connections = None
 
-        return metrics
+        return sample
+
+    def _count_connection_states(self) -> Dict[str, int]:
+        """Count inet sockets by state via sock_diag, or /proc/net as fallback."""
+        if self.sock_diag is not None:
+            try:
+                return self.sock_diag.count(self.proc_root)
+            except OSError:
+                # Netlink blocked (e.g. seccomp); stop trying and stream /proc
+                self.sock_diag = None
+        return count_proc_net(self.proc_root)
@@ -0,0 +1,185 @@
+"""
+Pressure Stall Information (PSI) collector and trigger watcher.
+Reads system-wide stall times from /proc/pressure/{cpu,memory,io}, and
+registers kernel PSI triggers so the exporter is woken as soon as stalls
+cross a threshold instead of at its next collection tick.
+"""
+import os
+import select
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Optional
+from .base_collector import BaseCollector
+from .procfs import ProcFile, parse_pressure
+
+RESOURCES = ('cpu', 'memory', 'io')
+KINDS = ('some', 'full')
+
+# The kernel accepts trigger windows between 500ms and 10s
+MIN_WINDOW_US = 500000
+MAX_WINDOW_US = 10000000
+
+# Fire when tasks stalled on resource (some or all of them: kind) for
+# stall_us within any window_us
+Trigger = namedtuple('Trigger', ['resource', 'kind', 'stall_us', 'window_us'])
+
+
+def parse_trigger(text: str) -> Trigger:
+    """
+    Parse RESOURCE:KIND:STALL_MS:WINDOW_MS, e.g. memory:some:150:1000.
+
+    Raises:
+        ValueError: On an unknown resource or kind, or a stall or window
+            the kernel would reject.
+    """
+    parts = text.split(':')
+    if len(parts) != 4:
+        raise ValueError(f"invalid PSI trigger '{text}': expected RESOURCE:KIND:STALL_MS:WINDOW_MS")
+    resource, kind, stall, window = parts
+    if resource not in RESOURCES or kind not in KINDS:
+        raise ValueError(f"invalid PSI trigger '{text}': resource must be one of {RESOURCES}, "
+                         f"kind one of {KINDS}")
+    try:
+        stall_us = int(float(stall) * 1000)
+        window_us = int(float(window) * 1000)
+    except ValueError:
+        raise ValueError(f"invalid PSI trigger '{text}': stall and window are milliseconds") from None
+    if not MIN_WINDOW_US <= window_us <= MAX_WINDOW_US or not 0 < stall_us <= window_us:
+        raise ValueError(f"invalid PSI trigger '{text}': window must be 500-10000ms "
+                         f"and stall at most the window")
+    return Trigger(resource, kind, stall_us, window_us)
+
+
+class PressureCollector(BaseCollector):
+    """Collects system-wide PSI from the files under <procfs>/pressure."""
+
+    def __init__(self, procfs_root: str = '/proc'):
+        """
+        Args:
+            procfs_root: procfs mount point.
+
+        Raises:
+            ValueError: If the kernel does not expose PSI (before 4.20,
+                or booted with psi=0).
+        """
+        self.files: Dict[str, ProcFile] = {}
+        for resource in RESOURCES:
+            path = os.path.join(procfs_root, 'pressure', resource)
+            try:
+                self.files[resource] = ProcFile(path)
+            except OSError:
+                # PSI enabled but one resource missing (e.g. io on some kernels)
+                continue
+        if not self.files:
+            raise ValueError(f"{procfs_root}/pressure is not available")
+
+    def collect(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Collect PSI.
+
+        Returns:
+            {resource: {'some': {'avg10', 'avg60', 'avg300', 'total'},
+            'full': {...}}}; avg* are percentages, total is microseconds.
+        """
+        return {resource: parse_pressure(proc_file.read()) for resource, proc_file in self.files.items()}
+
+    def close(self):
+        """Close the pressure files."""
+        for proc_file in self.files.values():
+            proc_file.close()
+
+
+class PressureWatcher:
+    """
+    Registers PSI triggers and calls back when one fires.
+
+    Each trigger keeps its pressure file open (closing it removes the
+    trigger); a background thread polls them for POLLPRI, so no CPU is
+    spent while the system is not stalled. The kernel rate-limits events
+    to one per trigger window.
+    """
+
+    def __init__(self, triggers: Iterable[Trigger], callback: Callable[[Trigger], None],
+                 procfs_root: str = '/proc'):
+        """
+        Args:
+            triggers: Thresholds to register.
+            callback: Called with the Trigger on the watcher thread each
+                time it fires.
+            procfs_root: procfs mount point.
+
+        Raises:
+            OSError: If a trigger cannot be registered (no PSI, no
+                permission, or a window the kernel rejects).
+        """
+        self.callback = callback
+        # Events per trigger since start, and Unix time of the latest one
+        self.events: Dict[Trigger, int] = {}
+        self.last_event: Dict[Trigger, float] = {}
+        self._fds: Dict[int, Trigger] = {}
+        self._poll = select.poll()
+        self._stop_read, self._stop_write = os.pipe()
+        self._poll.register(self._stop_read, select.POLLIN)
+        self._thread: Optional[threading.Thread] = None
+        try:
+            for trigger in triggers:
+                self._register(trigger, os.path.join(procfs_root, 'pressure', trigger.resource))
+        except OSError:
+            self.close()
+            raise
+
+    def _register(self, trigger: Trigger, path: str):
+        """Open path and write the trigger's threshold to it."""
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            os.write(fd, f'{trigger.kind} {trigger.stall_us} {trigger.window_us}\0'.encode())
+        except OSError:
+            os.close(fd)
+            raise
+        self._fds[fd] = trigger
+        self.events[trigger] = 0
+        self._poll.register(fd, select.POLLPRI)
+
+    @property
+    def triggers(self) -> List[Trigger]:
+        """The registered triggers."""
+        return list(self._fds.values())
+
+    def start(self):
+        """Start waiting for events on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='psi-watcher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Dispatch trigger events until stopped."""
+        while True:
+            for fd, event in self._poll.poll():
+                if fd == self._stop_read:
+                    return
+                trigger = self._fds.get(fd)
+                if trigger is None:
+                    continue
+                if event & (select.POLLERR | select.POLLNVAL):
+                    # The trigger was destroyed (e.g. procfs unmounted): stop polling it
+                    self._poll.unregister(fd)
+                    continue
+                self.events[trigger] += 1
+                self.last_event[trigger] = time.time()
+                self.callback(trigger)
+
+    def close(self):
+        """Stop the watcher thread and remove the triggers."""
+        if self._stop_write < 0:
+            return
+        os.write(self._stop_write, b'\0')
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = {}
+        for fd in (self._stop_read, self._stop_write):
+            os.close(fd)
+        self._stop_read = self._stop_write = -1
@@ -1,15 +1,137 @@
 """
-Process metrics collector using psutil.
+Process metrics collector.
 Collects process count, top processes, and zombie processes.
+
+On Linux the process table is scanned in a single pass over
+/proc/<pid>/stat; elsewhere a single pass over cached psutil.Process
+handles is used. Top processes are kept in bounded heaps instead of
+sorting the table, and CPU% is the delta since the previous cycle.
 """
+import heapq
+import os
+import sys
+import time
 import psutil
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from .base_collector import BaseCollector
+from .host_facts import HostFactsCache
+from .procfs import ProcfsReader
+
+# Field positions in /proc/<pid>/stat after the ") " that closes comm
+# (field 3 of proc(5) is index 0)
+STAT_STATE = 0
+STAT_UTIME = 11
+STAT_STIME = 12
+STAT_NUM_THREADS = 17
+STAT_STARTTIME = 19
+STAT_RSS = 21
+
+# Heap entry: (sort value, pid, name, cpu_percent, memory_percent)
+HeapEntry = Tuple[float, int, str, float, float]
+
+
+class CachedProcess:
+    """Per-process state carried between collection cycles."""
+
+    __slots__ = ('create_time', 'name', 'cpu_time', 'sample_time', 'generation', 'handle')
+
+    def __init__(self, create_time: float, name: str, handle: Optional[psutil.Process] = None):
+        self.create_time = create_time
+        self.name = name
+        self.cpu_time = 0.0
+        self.sample_time = 0.0
+        self.generation = 0
+        self.handle = handle
+
+
+class ProcessCache:
+    """
+    PID-keyed cache of process state, validated by create time.
+
+    An entry whose create time no longer matches belongs to a reused PID
+    and is replaced. Entries not seen in the latest cycle are evicted, and
+    at most max_entries processes are tracked.
+    """
+
+    def __init__(self, max_entries: int = 32768):
+        self.max_entries = max_entries
+        self.entries: Dict[int, CachedProcess] = {}
+        self.generation = 0
+
+    def start_cycle(self):
+        """Begin a collection cycle."""
+        self.generation += 1
+
+    def get(self, pid: int, create_time: float) -> Optional[CachedProcess]:
+        """Return the entry for pid if it is the same process, else drop it."""
+        entry = self.entries.get(pid)
+        if entry is not None and entry.create_time != create_time:
+            # PID was reused by a new process
+            del self.entries[pid]
+            return None
+        return entry
+
+    def add(self, pid: int, entry: CachedProcess) -> bool:
+        """Track a new process; returns False when the cache is full."""
+        if len(self.entries) >= self.max_entries:
+            return False
+        self.entries[pid] = entry
+        return True
+
+    def cpu_percent(self, entry: CachedProcess, cpu_time: float, now: float,
+                    fallback: float) -> float:
+        """
+        Return CPU% since the entry's previous sample and record this one.
+
+        Args:
+            entry: Cached process state.
+            cpu_time: Cumulative user+system CPU seconds.
+            now: Monotonic timestamp of this sample.
+            fallback: Value used when there is no previous sample.
+        """
+        elapsed = now - entry.sample_time
+        if entry.generation and elapsed > 0:
+            percent = max(cpu_time - entry.cpu_time, 0.0) / elapsed * 100
+        else:
+            percent = fallback
+        entry.cpu_time = cpu_time
+        entry.sample_time = now
+        entry.generation = self.generation
+        return percent
+
+    def evict_exited(self):
+        """Drop processes that were not seen in the current cycle."""
+        generation = self.generation
+        exited = [pid for pid, entry in self.entries.items() if entry.generation != generation]
+        for pid in exited:
+            del self.entries[pid]
 
 
 class ProcessCollector(BaseCollector):
     """Collects process-related metrics."""
 
+    def __init__(self, top_n: int = 10, procfs: Optional[ProcfsReader] = None,
+                 max_cached_processes: int = 32768, facts: Optional[HostFactsCache] = None):
+        """
+        Args:
+            top_n: Number of processes reported in the top CPU/memory lists.
+            procfs: Optional /proc reader; its root is scanned on Linux and
+                its meminfo is used for total memory.
+            max_cached_processes: Upper bound on processes whose state is
+                kept between cycles for CPU% deltas.
+            facts: Optional host facts; total memory is then taken from
+                them instead of being read every cycle.
+        """
+        self.top_n = top_n
+        self.cache = ProcessCache(max_cached_processes)
+        self.procfs = procfs
+        self.facts = facts
+        self.proc_root = procfs.root if procfs else '/proc'
+        self.scan_proc = sys.platform.startswith('linux') and os.path.isdir(self.proc_root)
+        if hasattr(os, 'sysconf'):
+            self._clock_ticks = os.sysconf('SC_CLK_TCK')
+            self._page_size = os.sysconf('SC_PAGE_SIZE')
+
     def collect(self) -> Dict[str, Any]:
         """
         Collect process metrics.
@@ -18,64 +140,173 @@ class ProcessCollector(BaseCollector):
             Dictionary with process metrics:
             - process_count: Total number of running processes
             - process_zombie_count: Number of zombie processes
+            - thread_count_total: Total number of threads
             - top_processes_cpu: Top N processes by CPU usage
             - top_processes_memory: Top N processes by memory usage
         """
-        metrics = {}
-
         try:
-            # Get all processes
-            all_processes = list(psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']))
+            if self.scan_proc:
+                return self._collect_proc()
+            return self._collect_psutil()
+        except Exception:
+            # If we can't collect process metrics, return minimal info
+            return {
+                'process_count': 0,
+                'process_zombie_count': 0,
+                'top_processes_cpu': [],
+                'top_processes_memory': [],
+            }
+
+    def _collect_proc(self) -> Dict[str, Any]:
+        """Scan /proc/<pid>/stat once per process."""
+        root = self.proc_root
+        ticks = float(self._clock_ticks)
+        memory_total = self._memory_total()
+        uptime = self._uptime()
+        now = time.monotonic()
+        cache = self.cache
+        cache.start_cycle()
 
-            # Total process count
-            metrics['process_count'] = len(all_processes)
+        process_count = 0
+        zombie_count = 0
+        thread_count = 0
+        top_cpu: List[HeapEntry] = []
+        top_memory: List[HeapEntry] = []
 
-            # Count zombie processes
-            zombie_count = 0
-            for proc in all_processes:
+        for entry in os.scandir(root):
+            name = entry.name
+            if not name.isdigit():
+                continue
+            try:
+                fd = os.open(f'{root}/{name}/stat', os.O_RDONLY)
                 try:
-                    if proc.info['status'] == psutil.STATUS_ZOMBIE:
-                        zombie_count += 1
-                except (psutil.NoSuchProcess, psutil.AccessDenied, KeyError):
-                    continue
+                    data = os.read(fd, 4096)
+                finally:
+                    os.close(fd)
+            except OSError:
+                # Process exited between listing and reading
+                continue
 
-            metrics['process_zombie_count'] = zombie_count
+            # comm may contain spaces and parentheses: split around the last ')'
+            close = data.rfind(b')')
+            fields = data[close + 2:].split()
+            process_count += 1
+            thread_count += int(fields[STAT_NUM_THREADS])
+            if fields[STAT_STATE] == b'Z':
+                zombie_count += 1
 
-            # Get processes with CPU and memory info
-            process_list = []
-            for proc in all_processes:
-                try:
-                    info = proc.info
-                    if info['cpu_percent'] is not None and info['memory_percent'] is not None:
-                        process_list.append({
-                            'pid': info['pid'],
-                            'name': info['name'],
-                            'cpu_percent': info['cpu_percent'],
-                            'memory_percent': info['memory_percent']
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, KeyError):
-                    continue
-
-            # Top 10 processes by CPU
-            top_cpu = sorted(process_list, key=lambda x: x['cpu_percent'], reverse=True)[:10]
-            metrics['top_processes_cpu'] = top_cpu
-
-            # Top 10 processes by Memory
-            top_memory = sorted(process_list, key=lambda x: x['memory_percent'], reverse=True)[:10]
-            metrics['top_processes_memory'] = top_memory
-
-            # Thread count (total)
+            pid = int(name)
+            starttime = int(fields[STAT_STARTTIME])
+            cpu_time = (int(fields[STAT_UTIME]) + int(fields[STAT_STIME])) / ticks
+            # Processes seen for the first time report their average CPU
+            # since start, like ps(1) %CPU
+            age = uptime - starttime / ticks
+            lifetime_percent = cpu_time / age * 100 if age > 0 else 0.0
+
+            entry = cache.get(pid, starttime)
+            if entry is None:
+                entry = CachedProcess(starttime, data[data.find(b'(') + 1:close].decode(errors='replace'))
+                # When the cache is full the process is reported but not tracked
+                cache.add(pid, entry)
+            cpu_percent = cache.cpu_percent(entry, cpu_time, now, lifetime_percent)
+            memory_percent = int(fields[STAT_RSS]) * self._page_size / memory_total * 100
+
+            _push(top_cpu, (cpu_percent, pid, entry.name, cpu_percent, memory_percent), self.top_n)
+            _push(top_memory, (memory_percent, pid, entry.name, cpu_percent, memory_percent), self.top_n)
+
+        cache.evict_exited()
+
+        return {
+            'process_count': process_count,
+            'process_zombie_count': zombie_count,
+            'thread_count_total': thread_count,
+            'top_processes_cpu': _ranked(top_cpu),
+            'top_processes_memory': _ranked(top_memory),
+        }
+
+    def _collect_psutil(self) -> Dict[str, Any]:
+        """Single pass over cached psutil.Process handles for platforms without /proc."""
+        now = time.monotonic()
+        wall_now = time.time()
+        cache = self.cache
+        cache.start_cycle()
+        memory_total = self._memory_total()
+
+        process_count = 0
+        zombie_count = 0
+        thread_count = 0
+        top_cpu: List[HeapEntry] = []
+        top_memory: List[HeapEntry] = []
+
+        for pid in psutil.pids():
             try:
-                total_threads = sum(p.num_threads() for p in psutil.process_iter() if p.is_running())
-                metrics['thread_count_total'] = total_threads
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+                entry = cache.entries.get(pid)
+                if entry is None or not entry.handle.is_running():
+                    # New process, or the PID now belongs to a different one
+                    handle = psutil.Process(pid)
+                    entry = CachedProcess(handle.create_time(), handle.name(), handle)
+                    cache.entries.pop(pid, None)
+                    cache.add(pid, entry)
+
+                with entry.handle.oneshot():
+                    status = entry.handle.status()
+                    threads = entry.handle.num_threads()
+                    cpu_times = entry.handle.cpu_times()
+                    rss = entry.handle.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+            process_count += 1
+            thread_count += threads
+            if status == psutil.STATUS_ZOMBIE:
+                zombie_count += 1
+
+            cpu_time = cpu_times.user + cpu_times.system
+            age = wall_now - entry.create_time
+            lifetime_percent = cpu_time / age * 100 if age > 0 else 0.0
+            cpu_percent = cache.cpu_percent(entry, cpu_time, now, lifetime_percent)
+            memory_percent = rss / memory_total * 100
+
+            _push(top_cpu, (cpu_percent, pid, entry.name, cpu_percent, memory_percent), self.top_n)
+            _push(top_memory, (memory_percent, pid, entry.name, cpu_percent, memory_percent), self.top_n)
+
+        cache.evict_exited()
+
+        return {
+            'process_count': process_count,
+            'process_zombie_count': zombie_count,
+            'thread_count_total': thread_count,
+            'top_processes_cpu': _ranked(top_cpu),
+            'top_processes_memory': _ranked(top_memory),
+        }
+
+    def _memory_total(self) -> int:
+        """Return total physical memory in bytes."""
+        if self.facts is not None:
+            return self.facts.get().memory_total
+        if self.procfs is not None:
+            return self.procfs.meminfo()[b'MemTotal']
+        return psutil.virtual_memory().total
+
+    def _uptime(self) -> float:
+        """Return seconds since boot from <proc_root>/uptime."""
+        with open(f'{self.proc_root}/uptime', 'rb') as f:
+            return float(f.read().split()[0])
+
+
+def _push(heap: List[HeapEntry], item: HeapEntry, size: int):
+    """Keep the largest `size` items in a min-heap."""
+    if size <= 0:
+        return
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
 
-        except Exception as e:
-            # If we can't collect process metrics, return minimal info
-            metrics['process_count'] = 0
-            metrics['process_zombie_count'] = 0
-            metrics['top_processes_cpu'] = []
-            metrics['top_processes_memory'] = []
 
-        return metrics
+def _ranked(heap: List[HeapEntry]) -> List[Dict[str, Any]]:
+    """Return heap contents as process dicts, largest first."""
+    return [
+        {'pid': pid, 'name': name, 'cpu_percent': cpu_percent, 'memory_percent': memory_percent}
+        for _, pid, name, cpu_percent, memory_percent in sorted(heap, reverse=True)
+    ]
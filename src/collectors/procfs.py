@@ -0,0 +1,296 @@
+"""
+Direct /proc readers for Linux.
+Keeps the /proc files open and re-reads them with preadv into reusable
+buffers, parsing the raw bytes without building psutil namedtuples.
+"""
+import os
+import sys
+import threading
+from operator import itemgetter
+from typing import Dict, Callable, Iterator, List, Optional, Sequence, Tuple
+from .snapshot import CounterTable
+
+# /proc/diskstats always counts 512-byte sectors, whatever the device
+DISK_SECTOR_SIZE = 512
+
+# /proc/vmstat pswpin/pswpout are counted in 4 KiB pages (matches psutil)
+SWAP_PAGE_SIZE = 4 * 1024
+
+# Column order of the cpu lines in /proc/stat
+CPU_TIME_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq',
+                   'softirq', 'steal', 'guest', 'guest_nice')
+
+# Values of each /proc/diskstats row, in order (names as in psutil)
+DISKSTATS_FIELDS = ('read_count', 'read_merged_count', 'read_bytes', 'read_time', 'write_count',
+                    'write_merged_count', 'write_bytes', 'write_time', 'busy_time')
+
+# /proc/net/dev columns after "iface:" for each psutil counter name
+NET_DEV_FIELDS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                  'errin', 'errout', 'dropin', 'dropout')
+NET_DEV_COLUMNS = (8, 0, 9, 1, 2, 10, 3, 11)
+
+
+class ProcFile:
+    """A /proc file kept open and re-read from offset 0 into a reusable buffer."""
+
+    def __init__(self, path: str, bufsize: int = 4096):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+        self._buf = bytearray(bufsize)
+        self._lock = threading.Lock()
+
+    def read(self) -> bytes:
+        """Return the current file contents."""
+        with self._lock:
+            while True:
+                size = os.preadv(self._fd, [self._buf], 0)
+                if size < len(self._buf):
+                    return bytes(memoryview(self._buf)[:size])
+                # Buffer was filled: the file may be longer, grow and retry
+                self._buf = bytearray(len(self._buf) * 2)
+
+    def close(self):
+        """Close the file descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __del__(self):
+        try:
+            self.close()
+        except (AttributeError, OSError):
+            pass
+
+
+class ProcfsReader:
+    """
+    Fast-path reader for the Linux /proc files used by the collectors.
+
+    Files are opened lazily on first use and stay open between calls.
+    """
+
+    def __init__(self, root: str = '/proc', sys_root: str = '/sys'):
+        """
+        Args:
+            root: procfs mount point (overridable for tests and containers).
+            sys_root: sysfs mount point, used to tell disks from partitions.
+        """
+        self.root = root
+        self.sys_root = sys_root
+        self._files: Dict[str, ProcFile] = {}
+        self._clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._storage_devices: Dict[str, bool] = {}
+
+    @staticmethod
+    def available(root: str = '/proc') -> bool:
+        """Return True if the fast path can be used on this system."""
+        return (sys.platform.startswith('linux') and hasattr(os, 'preadv')
+                and os.path.exists(os.path.join(root, 'stat')))
+
+    def _read(self, name: str) -> bytes:
+        """Read a file relative to the procfs root, opening it once."""
+        proc_file = self._files.get(name)
+        if proc_file is None:
+            proc_file = self._files[name] = ProcFile(os.path.join(self.root, name))
+        return proc_file.read()
+
+    def close(self):
+        """Close every open file."""
+        for proc_file in self._files.values():
+            proc_file.close()
+        self._files.clear()
+
+    def meminfo(self) -> Dict[bytes, int]:
+        """Parse /proc/meminfo into {b'MemTotal': bytes, ...}."""
+        values = {}
+        for line in self._read('meminfo').splitlines():
+            key, _, rest = line.partition(b':')
+            fields = rest.split()
+            if fields:
+                value = int(fields[0])
+                values[key] = value * 1024 if len(fields) > 1 else value
+        return values
+
+    def vmstat(self, keys: Sequence[bytes]) -> Dict[bytes, int]:
+        """Return the requested counters from /proc/vmstat."""
+        wanted = set(keys)
+        values = {}
+        for line in self._read('vmstat').splitlines():
+            key, _, value = line.partition(b' ')
+            if key in wanted:
+                values[key] = int(value)
+                if len(values) == len(wanted):
+                    break
+        return values
+
+    def cpu_times(self) -> Tuple[Tuple[str, ...], List[Tuple[float, ...]]]:
+        """
+        Parse the per-core lines of /proc/stat.
+
+        Returns:
+            (field_names, per_core_times) with times in seconds, in the
+            format expected by CPUSampler.
+        """
+        ticks = float(self._clock_ticks)
+        per_core = []
+        width = len(CPU_TIME_FIELDS)
+        for line in self._read('stat').splitlines():
+            if not line.startswith(b'cpu'):
+                # cpu lines come first; stop at the first other line
+                if per_core:
+                    break
+                continue
+            if line[3:4] == b' ':
+                # Aggregate "cpu" line; totals are derived from the cores
+                continue
+            fields = line.split()[1:width + 1]
+            per_core.append(tuple(int(value) / ticks for value in fields))
+        width = min((len(times) for times in per_core), default=width)
+        return CPU_TIME_FIELDS[:width], [times[:width] for times in per_core]
+
+    def loadavg(self) -> Tuple[float, float, float]:
+        """Parse /proc/loadavg."""
+        fields = self._read('loadavg').split()
+        return float(fields[0]), float(fields[1]), float(fields[2])
+
+    def cpu_total_ticks(self) -> Tuple[int, int, int]:
+        """
+        Parse only the aggregate "cpu" line of /proc/stat.
+
+        Returns:
+            (busy, iowait, total) clock ticks since boot, guest time
+            excluded (it is already counted in user and nice).
+        """
+        data = self._read('stat')
+        values = [int(value) for value in data[:data.index(b'\n')].split()[1:]]
+        # guest and guest_nice (columns 9 and 10) are part of user/nice
+        total = sum(values[:8])
+        idle = values[3] + values[4]
+        return total - idle, values[4], total
+
+    def procs_running(self) -> int:
+        """Return the number of runnable tasks (4th field of /proc/loadavg)."""
+        data = self._read('loadavg')
+        start = data.index(b' ', data.index(b' ', data.index(b' ') + 1) + 1) + 1
+        return int(data[start:data.index(b'/', start)])
+
+    def mem_available(self) -> int:
+        """Return MemAvailable from /proc/meminfo in bytes, without parsing the other lines."""
+        data = self._read('meminfo')
+        start = data.index(b'MemAvailable:') + len(b'MemAvailable:')
+        return int(data[start:data.index(b'kB', start)]) * 1024
+
+    def diskstats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Parse /proc/diskstats.
+
+        Returns:
+            Dictionary mapping device name to read/write counts, bytes,
+            times (ms), merged counts and busy_time (ms), like psutil.
+        """
+        return {name: dict(zip(DISKSTATS_FIELDS, values)) for name, values in self._diskstats_rows()}
+
+    def diskstats_into(self, table: CounterTable):
+        """Write /proc/diskstats rows into table (fields must be DISKSTATS_FIELDS names)."""
+        pick = _row_getter(DISKSTATS_FIELDS, table.fields)
+        for name, values in self._diskstats_rows():
+            table.put(name, pick(values))
+
+    def _diskstats_rows(self) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+        """Yield (device, values in DISKSTATS_FIELDS order) per /proc/diskstats line."""
+        for line in self._read('diskstats').splitlines():
+            fields = line.split()
+            if len(fields) >= 14:
+                yield fields[2].decode(), (
+                    int(fields[3]),
+                    int(fields[4]),
+                    int(fields[5]) * DISK_SECTOR_SIZE,
+                    int(fields[6]),
+                    int(fields[7]),
+                    int(fields[8]),
+                    int(fields[9]) * DISK_SECTOR_SIZE,
+                    int(fields[10]),
+                    int(fields[12]),
+                )
+            elif len(fields) == 7:
+                # Old kernels: short partition line
+                yield fields[2].decode(), (
+                    int(fields[3]), 0, int(fields[4]) * DISK_SECTOR_SIZE, 0,
+                    int(fields[5]), 0, int(fields[6]) * DISK_SECTOR_SIZE, 0, 0,
+                )
+
+    def is_storage_device(self, name: str) -> bool:
+        """Return True for whole disks (sda, nvme0n1) rather than partitions."""
+        cached = self._storage_devices.get(name)
+        if cached is None:
+            path = os.path.join(self.sys_root, 'block', name.replace('/', '!'))
+            cached = self._storage_devices[name] = os.path.exists(path)
+        return cached
+
+    def net_dev(self) -> Dict[str, Dict[str, int]]:
+        """
+        Parse /proc/net/dev.
+
+        Returns:
+            Dictionary mapping interface name to the psutil counter names.
+        """
+        return {name: dict(zip(NET_DEV_FIELDS, values)) for name, values in self._net_dev_rows()}
+
+    def net_dev_into(self, table: CounterTable):
+        """Write /proc/net/dev rows into table (fields must be NET_DEV_FIELDS names)."""
+        pick = _row_getter(NET_DEV_FIELDS, table.fields)
+        for name, values in self._net_dev_rows():
+            table.put(name, pick(values))
+
+    def _net_dev_rows(self) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+        """Yield (interface, values in NET_DEV_FIELDS order) per /proc/net/dev line."""
+        for line in self._read('net/dev').splitlines()[2:]:
+            name, _, rest = line.rpartition(b':')
+            fields = rest.split()
+            yield name.strip().decode(), tuple(int(fields[column]) for column in NET_DEV_COLUMNS)
+
+
+def usage_percent(used: float, total: float) -> float:
+    """Return used/total as a percentage rounded to one decimal (0 if total is 0)."""
+    return round(used / total * 100, 1) if total else 0.0
+
+
+def parse_pressure(data: bytes) -> Dict[str, Dict[str, float]]:
+    """
+    Parse a PSI file (/proc/pressure/*, a cgroup's *.pressure).
+
+    Returns:
+        {'some': {'avg10': %, 'avg60': %, 'avg300': %, 'total': usec}, 'full': ...};
+        'full' is missing for CPU on older kernels.
+    """
+    pressure = {}
+    for line in data.splitlines():
+        kind, *fields = line.split()
+        values = {}
+        for field in fields:
+            key, _, value = field.partition(b'=')
+            values[key.decode()] = int(value) if key == b'total' else float(value)
+        pressure[kind.decode()] = values
+    return pressure
+
+
+def sum_counters(counters: Dict[str, Dict[str, int]], keys: Sequence[str]) -> Dict[str, int]:
+    """Sum the given keys over a per-device counter dict."""
+    totals = dict.fromkeys(keys, 0)
+    for values in counters.values():
+        for key in keys:
+            totals[key] += values[key]
+    return totals
+
+
+def _row_getter(row_fields: Sequence[str], fields: Sequence[str]) -> Callable[[Tuple], Tuple]:
+    """Return a callable picking fields, in that order, out of a row_fields tuple."""
+    getter = itemgetter(*[row_fields.index(field) for field in fields])
+    if len(fields) == 1:
+        return lambda row: (getter(row),)
+    return getter
+
+
+def open_default_reader(root: str = '/proc', sys_root: str = '/sys') -> Optional[ProcfsReader]:
+    """Return a ProcfsReader of root if it is usable here, otherwise None."""
+    return ProcfsReader(root, sys_root) if ProcfsReader.available(root) else None
@@ -0,0 +1,179 @@
+"""
+Reusable snapshot buffers for per-device collector results.
+Counters are written in place into preallocated arrays indexed by a stable
+device table, instead of rebuilding nested dicts every cycle.
+"""
+from array import array
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+class DeviceTable:
+    """
+    Stable mapping of device (or interface) names to array slots.
+
+    A name keeps its slot for as long as it is present; slots of names
+    that disappear are reused by new names, so the arrays do not grow with
+    device churn (e.g. veth interfaces of short-lived containers).
+    """
+
+    __slots__ = ('slots', 'names', '_free')
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}
+        self.names: List[Optional[str]] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @property
+    def capacity(self) -> int:
+        """Number of slots allocated so far."""
+        return len(self.names)
+
+    def slot(self, name: str) -> int:
+        """Return the slot of name, assigning one on first sight."""
+        index = self.slots.get(name)
+        if index is None:
+            if self._free:
+                index = self._free.pop()
+                self.names[index] = name
+            else:
+                index = len(self.names)
+                self.names.append(name)
+            self.slots[name] = index
+        return index
+
+    def release(self, name: str):
+        """Free the slot of a name that is no longer present."""
+        index = self.slots.pop(name)
+        self.names[index] = None
+        self._free.append(index)
+
+
+class CounterTable:
+    """
+    Struct-of-arrays table of per-device values for one collection.
+
+    Each field is an array indexed by DeviceTable slot. A row counts as
+    present when it was written during the current cycle; begin() starts a
+    new cycle without clearing the arrays.
+    """
+
+    __slots__ = ('fields', 'devices', 'columns', 'names', 'cycle', '_seen', '_typecode')
+
+    def __init__(self, fields: Sequence[str], devices: DeviceTable, typecode: str = 'Q'):
+        """
+        Args:
+            fields: Column names.
+            devices: Slot table, shared by every table holding the same devices.
+            typecode: array typecode of the columns ('Q' for counters, 'd'
+                for rates).
+        """
+        self.fields = tuple(fields)
+        self.devices = devices
+        self.columns: Tuple[array, ...] = tuple(array(typecode) for _ in self.fields)
+        # Name written to each slot, to detect a slot reused by another device
+        self.names: List[Optional[str]] = []
+        # Unwritten slots are marked 0, so cycles start at 1
+        self.cycle = 1
+        self._seen = array('Q')
+        self._typecode = typecode
+
+    def begin(self):
+        """Start a cycle; rows from the previous cycle stop being present."""
+        self.cycle += 1
+
+    def put(self, name: str, values: Sequence) -> int:
+        """
+        Write one row (values in field order) and mark it present.
+
+        Returns:
+            Slot of the row.
+        """
+        slot = self.devices.slot(name)
+        if slot >= len(self.names):
+            # Grow geometrically so a first cycle over many devices does
+            # not reallocate per device
+            self.reserve(slot + 1)
+        for column, value in zip(self.columns, values):
+            column[slot] = value
+        self.names[slot] = name
+        self._seen[slot] = self.cycle
+        return slot
+
+    def reserve(self, size: int):
+        """Make sure slots below size exist (for writers filling columns in bulk)."""
+        if size > len(self.names):
+            self._grow(max(size, 2 * len(self.names), 8))
+
+    def mark(self, slot: int, name: str):
+        """Mark a slot whose columns were written in bulk as present for name."""
+        self.names[slot] = name
+        self._seen[slot] = self.cycle
+
+    @property
+    def seen(self) -> array:
+        """Cycle in which each slot was last written."""
+        return self._seen
+
+    def has(self, slot: int, name: str) -> bool:
+        """Return True if slot holds a row for name in the current cycle."""
+        return (slot < len(self.names) and self._seen[slot] == self.cycle
+                and self.names[slot] == name)
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """Yield (name, slot) for every present row."""
+        seen = self._seen
+        cycle = self.cycle
+        names = self.names
+        for slot in range(len(names)):
+            if seen[slot] == cycle:
+                yield names[slot], slot
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def column(self, field: str) -> array:
+        """Return the array holding field."""
+        return self.columns[self.fields.index(field)]
+
+    def sweep(self):
+        """Release device slots that were not written this cycle."""
+        seen = self._seen
+        names = self.devices.names
+        for slot in range(len(names)):
+            name = names[slot]
+            if name is not None and (slot >= len(seen) or seen[slot] != self.cycle):
+                self.devices.release(name)
+
+    def totals(self, into: array, where: Optional[Callable[[str], bool]] = None):
+        """
+        Sum every column over the present rows into `into`.
+
+        Args:
+            into: Array with one element per field, overwritten in place.
+            where: Optional predicate on the row name selecting the rows.
+        """
+        for i in range(len(self.columns)):
+            into[i] = 0
+        for name, slot in self.items():
+            if where is None or where(name):
+                for i, column in enumerate(self.columns):
+                    into[i] += column[slot]
+
+    def as_dict(self, fields: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Return the present rows as {name: {field: value}} (compatibility view)."""
+        selected = [(field, self.columns[self.fields.index(field)]) for field in (fields or self.fields)]
+        return {
+            name: {field: column[slot] for field, column in selected}
+            for name, slot in self.items()
+        }
+
+    def _grow(self, size: int):
+        """Extend every array to at least size slots."""
+        missing = size - len(self.names)
+        for column in self.columns:
+            column.extend(array(self._typecode, bytes(missing * column.itemsize)))
+        self._seen.extend(array('Q', bytes(missing * self._seen.itemsize)))
+        self.names.extend([None] * missing)
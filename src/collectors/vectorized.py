@@ -0,0 +1,153 @@
+"""
+Optional NumPy computation path.
+Computes per-core CPU percentages, per-disk rates and per-interface totals
+in one vectorised step per cycle, reading the CounterTable columns in place
+through zero-copy array views. Used when NumPy is installed and the
+collectors are created with vectorized=True.
+"""
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .snapshot import CounterTable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+def available() -> bool:
+    """Return True if NumPy can be imported."""
+    return np is not None
+
+
+def require():
+    """
+    Check that the vectorised path can be used.
+
+    Raises:
+        ValueError: If NumPy is not installed.
+    """
+    if np is None:
+        raise ValueError("The vectorized computation path requires NumPy")
+
+
+def _column_view(column: array, size: int):
+    """Zero-copy view of the first size elements of an array column."""
+    dtype = np.uint64 if column.typecode == 'Q' else np.float64
+    return np.frombuffer(column, dtype=dtype, count=size)
+
+
+def _present(table: CounterTable, size: int):
+    """Boolean mask of the slots written in the table's current cycle."""
+    return _column_view(table.seen, size) == table.cycle
+
+
+def cpu_percentages(fields: Sequence[str], current: Sequence[Sequence[float]],
+                    previous: Sequence[Sequence[float]], last_per_core: Optional[List[float]],
+                    guest_fields: Sequence[str], idle_fields: Sequence[str]
+                    ) -> Tuple[Optional[float], List[float], Dict[str, float]]:
+    """
+    Compute CPUSampler percentages for every core at once.
+
+    Returns:
+        (usage_percent, per_core, modes); usage_percent is None when no
+        core advanced, in which case modes is empty. Cores that did not
+        advance keep their value from last_per_core (0.0 if unknown).
+    """
+    now = np.asarray(current, dtype=np.float64)
+    before = np.asarray(previous, dtype=np.float64)
+    # Clamp negative deltas: some hypervisors report idle going backwards
+    deltas = np.maximum(now - before, 0.0)
+    guest = [i for i, name in enumerate(fields) if name in guest_fields]
+    idle_idx = [i for i, name in enumerate(fields) if name in idle_fields]
+
+    totals = deltas.sum(axis=1) - deltas[:, guest].sum(axis=1)
+    idle = deltas[:, idle_idx].sum(axis=1)
+    advanced = totals > 0
+    busy = np.divide(totals - idle, totals, out=np.zeros_like(totals), where=advanced)
+    per_core = np.round(np.clip(busy * 100.0, 0.0, 100.0), 1)
+    if not advanced.all():
+        fallback = np.zeros(len(totals))
+        if last_per_core is not None:
+            kept = min(len(last_per_core), len(totals))
+            fallback[:kept] = last_per_core[:kept]
+        per_core = np.where(advanced, per_core, fallback)
+
+    mode_deltas = deltas[advanced].sum(axis=0)
+    all_total = mode_deltas.sum() - mode_deltas[guest].sum()
+    if all_total <= 0:
+        return None, per_core.tolist(), {}
+    all_idle = mode_deltas[idle_idx].sum()
+    percents = np.round(np.clip(mode_deltas / all_total * 100.0, 0.0, 100.0), 1)
+    usage = round(min(max((all_total - all_idle) / all_total * 100.0, 0.0), 100.0), 1)
+    return usage, per_core.tolist(), dict(zip(fields, percents.tolist()))
+
+
+def disk_rates(current: CounterTable, previous: CounterTable, rates: CounterTable,
+               elapsed: float, counter_wrap: int, wrapping: Sequence[str]):
+    """
+    Fill rates (RATE_FIELDS columns) from two DiskSample.io tables.
+
+    Same semantics as DiskCollector._compute_rates: disks absent from the
+    previous sample, or with a counter that went backwards (other than a
+    32-bit wrap of one of the wrapping fields), get no row.
+    rates.begin() must have been called.
+    """
+    size = len(current.names)
+    if not size:
+        return
+    mask = _present(current, size)
+    previous_size = min(len(previous.names), size)
+    previous_mask = np.zeros(size, dtype=bool)
+    previous_mask[:previous_size] = _present(previous, previous_size)
+    # A slot may have been reused by another device since the previous sample
+    same = np.fromiter((a == b for a, b in zip(current.names, previous.names)), dtype=bool,
+                       count=previous_size)
+    previous_mask[:previous_size] &= same
+    mask &= previous_mask
+    slots = np.flatnonzero(mask)
+    if not len(slots):
+        return
+
+    now = np.stack([_column_view(column, size)[slots] for column in current.columns])
+    before = np.stack([_column_view(column, len(previous.names))[slots] for column in previous.columns])
+    wraps = np.array([field in wrapping for field in current.fields], dtype=bool)[:, None]
+    backwards = now < before
+    wrapped = backwards & wraps & (before < np.uint64(counter_wrap))
+    # uint64 arithmetic: now + wrap - before is exact for 32-bit wraps
+    deltas = np.where(wrapped, now + np.uint64(counter_wrap) - before, now - before)
+    valid = ~(backwards & ~wrapped).any(axis=0)
+    slots = slots[valid]
+    reads, writes, read_bytes, write_bytes, read_time, write_time, busy_time = deltas[:, valid].astype(np.float64)
+
+    def ratio(numerator, denominator):
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    values = (
+        read_bytes / elapsed,
+        write_bytes / elapsed,
+        reads / elapsed,
+        writes / elapsed,
+        ratio(read_time, reads),
+        ratio(write_time, writes),
+        ratio(read_time + write_time, reads + writes),
+        # busy_time is in milliseconds
+        np.minimum(busy_time / (elapsed * 1000) * 100, 100.0),
+    )
+    rates.reserve(size)
+    for column, value in zip(rates.columns, values):
+        _column_view(column, size)[slots] = value
+    names = current.names
+    for slot in slots.tolist():
+        rates.mark(slot, names[slot])
+
+
+def totals(table: CounterTable, into: array, where: Optional[Any] = None):
+    """Vectorised CounterTable.totals(); where is the same optional name predicate."""
+    size = len(table.names)
+    mask = _present(table, size)
+    if where is not None:
+        names = table.names
+        mask &= np.fromiter((name is not None and where(name) for name in names), dtype=bool, count=size)
+    for i, column in enumerate(table.columns):
+        into[i] = _column_view(column, size)[mask].sum().item()
@@ -0,0 +1,222 @@
+"""
+asyncio HTTP server for the exporter.
+Serves /metrics, /healthz, /api/snapshot and extra routes from one event loop with
+keep-alive, a connection limit and per-request timeouts; blocking work
+(collection, rendering) runs on a single-thread executor.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .exposition import (ExpositionCache, Route, METRICS_PATHS, json_body, metrics_response, negotiate,
+                         query_params, route_body)
+
+# Largest request head (request line + headers) accepted
+MAX_HEAD_SIZE = 16 * 1024
+
+REASONS = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 408: 'Request Timeout', 413: 'Payload Too Large',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+Response = Tuple[int, List[Tuple[str, str]], bytes]
+
+
+class AsyncMetricsServer:
+    """
+    Event-loop HTTP/1.1 server for scrapes, health checks and JSON snapshots.
+
+    Connections beyond max_connections are answered with 503 and closed
+    instead of queueing. A connection that sends no complete request head
+    within request_timeout (or idles longer than keepalive_timeout between
+    requests) is closed.
+    """
+
+    def __init__(self, cache: ExpositionCache,
+                 snapshot_fn: Callable[[], Dict[str, Any]],
+                 health_fn: Callable[[], Tuple[bool, Dict[str, Any]]],
+                 host: str = '', port: int = 9100, max_connections: int = 64,
+                 request_timeout: float = 5.0, keepalive_timeout: float = 30.0,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 routes: Optional[Dict[str, Route]] = None):
+        """
+        Args:
+            cache: Exposition served on /metrics.
+            snapshot_fn: Blocking callable returning the JSON-serialisable
+                snapshot served on /api/snapshot.
+            health_fn: Callable returning (healthy, details) for /healthz;
+                must not block.
+            host: Address to bind ('' for all interfaces).
+            port: Port to bind (0 picks a free one).
+            max_connections: Open connections served at once.
+            request_timeout: Seconds to receive a request head.
+            keepalive_timeout: Seconds an idle keep-alive connection is kept.
+            executor: Executor for blocking work (defaults to one thread, so
+                at most one collection or rendering runs at a time).
+            routes: Extra endpoints by path (JSON or plain text). Handlers
+                may block; they run on the loop's default executor so a
+                long one (e.g. a profile capture) cannot stall collection.
+        """
+        self.cache = cache
+        self.snapshot_fn = snapshot_fn
+        self.health_fn = health_fn
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.routes = routes or {}
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='exporter-io')
+        self.connections = 0
+        self.rejected = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Bind and start accepting connections."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host or None, self.port,
+                                                  limit=MAX_HEAD_SIZE)
+        # Report the bound port when 0 was requested
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting connections and wait for the listener to close."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def run_blocking(self, fn: Callable, *args) -> Any:
+        """Run a blocking callable on the executor."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes or times out."""
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            await self._send(writer, (503, [('Retry-After', '1')], b''), keep_alive=False)
+            await self._close(writer)
+            return
+
+        self.connections += 1
+        try:
+            timeout = self.request_timeout
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+                except asyncio.TimeoutError:
+                    # Idle keep-alive connections are closed silently
+                    if timeout == self.request_timeout:
+                        await self._send(writer, (408, [], b''), keep_alive=False)
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, (413, [], b''), keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                request = _parse_head(head)
+                if request is None:
+                    await self._send(writer, (400, [], b''), keep_alive=False)
+                    break
+                method, path, version, headers = request
+
+                keep_alive = _keep_alive(version, headers.get('connection', ''))
+                if headers.get('content-length', '0') != '0' or 'transfer-encoding' in headers:
+                    # Request bodies are not read; close rather than misparse them
+                    keep_alive = False
+                try:
+                    response = await self._dispatch(method, path, headers)
+                except Exception:
+                    # A failing collector or route must not drop the connection without a reply
+                    response, keep_alive = (500, [], b''), False
+                await self._send(writer, response, keep_alive, send_body=method != 'HEAD')
+                if not keep_alive:
+                    break
+                # Between requests the client may idle up to keepalive_timeout
+                timeout = self.keepalive_timeout
+        finally:
+            self.connections -= 1
+            await self._close(writer)
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str]) -> Response:
+        """Route one request to its endpoint."""
+        if method not in ('GET', 'HEAD'):
+            return 405, [('Allow', 'GET, HEAD')], b''
+
+        path, _, query = path.partition('?')
+        if path in METRICS_PATHS:
+            fmt = negotiate(headers.get('accept'))
+            rendered = self.cache.fresh(fmt)
+            if rendered is None:
+                # Collecting or rendering blocks: keep it off the loop
+                rendered = await self.run_blocking(self.cache.get, fmt)
+            return metrics_response(rendered, headers.get('accept-encoding'), headers.get('if-none-match'))
+        if path == '/healthz':
+            healthy, details = self.health_fn()
+            details = {'status': 'ok' if healthy else 'unhealthy', **details}
+            return _json_response(200 if healthy else 503, details)
+        if path == '/api/snapshot':
+            return _json_response(200, await self.run_blocking(self.snapshot_fn))
+        route = self.routes.get(path)
+        if route is not None:
+            loop = asyncio.get_running_loop()
+            status, payload = await loop.run_in_executor(None, route, query_params('?' + query))
+            content_type, body = route_body(payload)
+            return status, [('Content-Type', content_type)], body
+        return 404, [], b''
+
+    async def _send(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool,
+                    send_body: bool = True):
+        """Write a response and wait for the transport to drain."""
+        status, headers, body = response
+        lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}']
+        lines.extend(f'{name}: {value}' for name, value in headers)
+        if not any(name == 'Content-Length' for name, _ in headers) and status != 304:
+            lines.append(f'Content-Length: {len(body)}')
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if send_body and body:
+            writer.write(body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter):
+        """Close a connection, ignoring clients that already went away."""
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def _parse_head(head: bytes) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """Parse a request head into (method, path, version, lower-cased headers)."""
+    try:
+        lines = head.decode('latin-1').split('\r\n')
+        method, path, version = lines[0].split(' ')
+    except ValueError:
+        return None
+    if not version.startswith('HTTP/1.'):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return method, path, version, headers
+
+
+def _keep_alive(version: str, connection: str) -> bool:
+    """Return True if the connection stays open after this request."""
+    connection = connection.lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def _json_response(status: int, payload: Any) -> Response:
+    """Build a JSON response."""
+    return status, [('Content-Type', 'application/json')], json_body(payload)
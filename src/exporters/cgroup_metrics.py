@@ -0,0 +1,110 @@
+"""
+Prometheus collector for the cgroup v2 collector's results.
+Builds node_cgroup_* families from the latest CgroupCollector result held
+by the scheduler, so push and scrape mode export the same series.
+"""
+from typing import Any, Callable, Dict, Iterator
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# (cpu.stat key, metric name, help, scale to seconds)
+CPU_METRICS = [
+    ('usage_usec', 'node_cgroup_cpu_usage_seconds', 'CPU time consumed by the cgroup', 1e-6),
+    ('user_usec', 'node_cgroup_cpu_user_seconds', 'User CPU time consumed by the cgroup', 1e-6),
+    ('system_usec', 'node_cgroup_cpu_system_seconds', 'System CPU time consumed by the cgroup', 1e-6),
+    ('nr_throttled', 'node_cgroup_cpu_throttled_periods', 'Enforcement periods in which the cgroup was throttled', 1),
+    ('throttled_usec', 'node_cgroup_cpu_throttled_seconds', 'Time the cgroup was throttled for', 1e-6),
+]
+
+# (io.stat key, metric name, help), summed over devices
+IO_METRICS = [
+    ('rbytes', 'node_cgroup_io_read_bytes', 'Bytes read by the cgroup'),
+    ('wbytes', 'node_cgroup_io_write_bytes', 'Bytes written by the cgroup'),
+    ('rios', 'node_cgroup_io_reads', 'Read operations of the cgroup'),
+    ('wios', 'node_cgroup_io_writes', 'Write operations of the cgroup'),
+]
+
+# memory.stat counters; the other exported keys are byte gauges
+MEMORY_COUNTERS = {
+    'pgfault': ('node_cgroup_memory_page_faults', 'Page faults in the cgroup'),
+    'pgmajfault': ('node_cgroup_memory_major_page_faults', 'Major page faults in the cgroup'),
+}
+
+
+class CgroupMetricsCollector(Collector):
+    """
+    Exports the latest cgroup collection.
+
+    Registered after the collectors that run the scheduler (scrape mode),
+    so each scrape sees the result of its own collection.
+    """
+
+    def __init__(self, result_fn: Callable[[], Dict[str, Any]]):
+        """
+        Args:
+            result_fn: Returns the latest CgroupCollector.collect() result
+                ({} before the first collection).
+        """
+        self.result_fn = result_fn
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def collect(self) -> Iterator:
+        """Yield the per-cgroup families and the walk's own metrics."""
+        result = self.result_fn()
+        if not result:
+            return
+        cgroups = result['cgroups']
+
+        cpu = [CounterMetricFamily(name, documentation, labels=['cgroup'])
+               for _, name, documentation, _ in CPU_METRICS]
+        memory_current = GaugeMetricFamily('node_cgroup_memory_current_bytes', 'Memory charged to the cgroup',
+                                           labels=['cgroup'])
+        memory_stat = GaugeMetricFamily('node_cgroup_memory_stat_bytes',
+                                        'Memory of the cgroup by type (memory.stat)', labels=['cgroup', 'type'])
+        faults = {key: CounterMetricFamily(name, documentation, labels=['cgroup'])
+                  for key, (name, documentation) in MEMORY_COUNTERS.items()}
+        io = [CounterMetricFamily(name, documentation, labels=['cgroup']) for _, name, documentation in IO_METRICS]
+        stalled = CounterMetricFamily('node_cgroup_pressure_stalled_seconds',
+                                      'Time tasks of the cgroup were stalled on the resource (PSI total)',
+                                      labels=['cgroup', 'resource', 'kind'])
+        pressure = GaugeMetricFamily('node_cgroup_pressure_avg10_percent',
+                                     'Share of the last 10s tasks of the cgroup were stalled on the resource',
+                                     labels=['cgroup', 'resource', 'kind'])
+
+        for name, stats in cgroups.items():
+            labels = [name]
+            for family, (key, _, _, scale) in zip(cpu, CPU_METRICS):
+                family.add_metric(labels, stats['cpu'][key] * scale)
+            if 'memory_current' in stats:
+                memory_current.add_metric(labels, stats['memory_current'])
+            for key, value in stats.get('memory', {}).items():
+                if key in faults:
+                    faults[key].add_metric(labels, value)
+                else:
+                    memory_stat.add_metric([name, key], value)
+            if 'io' in stats:
+                for family, (key, _, _) in zip(io, IO_METRICS):
+                    family.add_metric(labels, stats['io'][key])
+            for resource, kinds in stats.get('pressure', {}).items():
+                for kind, values in kinds.items():
+                    stalled.add_metric([name, resource, kind], values['total'] * 1e-6)
+                    pressure.add_metric([name, resource, kind], values['avg10'])
+
+        yield from cpu
+        yield memory_current
+        yield memory_stat
+        yield from faults.values()
+        yield from io
+        yield stalled
+        yield pressure
+
+        yield GaugeMetricFamily('exporter_cgroup_tracked', 'Cgroups tracked by the cgroup collector',
+                                value=result['cgroup_count'])
+        yield GaugeMetricFamily('exporter_cgroup_dropped',
+                                'Cgroups not tracked because of the cardinality limit',
+                                value=result['cgroup_dropped'])
+        yield CounterMetricFamily('exporter_cgroup_rescans', 'Walks of the cgroup tree',
+                                  value=result['cgroup_rescans'])
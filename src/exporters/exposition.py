@@ -0,0 +1,351 @@
+"""
+Cached /metrics exposition.
+Collects the registry once per collection cycle and serves the same bytes
+(plain or pre-gzipped) to every scrape, with ETag/304 support. The text,
+OpenMetrics and protobuf formats are negotiated from the Accept header and
+each is rendered at most once per cycle.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.openmetrics import exposition as openmetrics
+from . import protobuf
+
+# One rendering of the registry; etag is a quoted strong validator
+RenderedBody = namedtuple('RenderedBody', ['body', 'gzipped', 'etag', 'rendered_at', 'content_type'])
+
+# Exposition formats
+TEXT = 'text'
+OPENMETRICS = 'openmetrics'
+PROTOBUF = 'protobuf'
+
+CONTENT_TYPES = {
+    TEXT: CONTENT_TYPE_LATEST,
+    OPENMETRICS: openmetrics.CONTENT_TYPE_LATEST,
+    PROTOBUF: protobuf.CONTENT_TYPE,
+}
+
+# Paths the exposition is served on
+METRICS_PATHS = ('/metrics', '/')
+
+# The body depends on both negotiated headers
+VARY = 'Accept, Accept-Encoding'
+
+# Handler of an extra endpoint: query parameters -> (status, payload); str
+# payloads are sent as plain text, anything else as JSON
+Route = Callable[[Dict[str, str]], Tuple[int, Any]]
+
+
+class _CollectedFamilies:
+    """Registry stand-in replaying metric families collected once."""
+
+    def __init__(self, families: List):
+        self.families = families
+
+    def collect(self):
+        return iter(self.families)
+
+
+class ExpositionCache:
+    """
+    Holds the latest exposition of a registry in each requested format.
+
+    The registry is collected once per cycle; each format is serialised
+    from those families the first time it is requested in that cycle. In
+    push mode render() starts a cycle after each collection. With max_age
+    set (scrape mode), get() starts a new cycle once the current one is
+    older than max_age seconds; concurrent scrapes wait for the rendering
+    in flight.
+
+    Callables in listeners are called with (families, unix time) after
+    every collection, e.g. to record history. Callables in
+    served_listeners are called with the monotonic collection time of
+    every body returned by fresh() or get(), i.e. served to a scrape.
+    """
+
+    def __init__(self, registry: CollectorRegistry, max_age: Optional[float] = None,
+                 compresslevel: int = 6):
+        """
+        Args:
+            registry: Registry to render.
+            max_age: Seconds a cycle is served for before get() starts a
+                new one, or None to only start cycles on render().
+            compresslevel: gzip level of the compressed copies.
+        """
+        self.registry = registry
+        self.max_age = max_age
+        self.compresslevel = compresslevel
+        self.renders = 0
+        self._lock = threading.Lock()
+        self._families: Optional[_CollectedFamilies] = None
+        self._collected_at = 0.0
+        self._bodies: Dict[str, RenderedBody] = {}
+        self.listeners: List[Callable[[List, float], None]] = []
+        self.served_listeners: List[Callable[[float], None]] = []
+
+    def render(self, fmt: str = TEXT) -> RenderedBody:
+        """Collect the registry now (starting a cycle) and render fmt."""
+        with self._lock:
+            self._collect()
+            return self._render(fmt)
+
+    def fresh(self, fmt: str = TEXT) -> Optional[RenderedBody]:
+        """Return the body in fmt if it can be served as is, without blocking."""
+        if self._families is None or self._expired():
+            return None
+        rendered = self._bodies.get(fmt)
+        if rendered is not None:
+            self._served(rendered)
+        return rendered
+
+    def get(self, fmt: str = TEXT) -> RenderedBody:
+        """Return the body in fmt, collecting or rendering it if needed."""
+        rendered = self.fresh(fmt)
+        if rendered is not None:
+            return rendered
+        with self._lock:
+            # Another scrape may have rendered while we waited
+            if self._families is None or self._expired():
+                self._collect()
+            rendered = self._bodies.get(fmt)
+            if rendered is None:
+                rendered = self._render(fmt)
+        self._served(rendered)
+        return rendered
+
+    def _served(self, rendered: RenderedBody):
+        """Tell served_listeners which collection a scrape received."""
+        for listener in self.served_listeners:
+            listener(rendered.rendered_at)
+
+    def invalidate(self):
+        """Make the next get() start a new cycle, whatever max_age."""
+        with self._lock:
+            self._families = None
+            self._bodies = {}
+
+    def _expired(self) -> bool:
+        """Return True if the current cycle is older than max_age."""
+        return self.max_age is not None and time.monotonic() - self._collected_at >= self.max_age
+
+    def _collect(self):
+        """Collect the registry's families and drop the previous bodies (caller holds the lock)."""
+        self._families = _CollectedFamilies(list(self.registry.collect()))
+        self._collected_at = time.monotonic()
+        self._bodies = {}
+        if self.listeners:
+            now = time.time()
+            for listener in self.listeners:
+                listener(self._families.families, now)
+
+    def _render(self, fmt: str) -> RenderedBody:
+        """Serialise, compress and hash the collected families (caller holds the lock)."""
+        if fmt == PROTOBUF:
+            body = protobuf.encode_families(self._families.families)
+        elif fmt == OPENMETRICS:
+            body = openmetrics.generate_latest(self._families)
+        else:
+            body = generate_latest(self._families)
+        # mtime=0 keeps the compressed bytes identical for identical bodies
+        gzipped = gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        rendered = RenderedBody(body, gzipped, etag, self._collected_at, CONTENT_TYPES[fmt])
+        # Replace rather than mutate, so lock-free readers see a complete dict
+        self._bodies = {**self._bodies, fmt: rendered}
+        self.renders += 1
+        return rendered
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the exposition format for an Accept header.
+
+    The supported media range with the highest q wins (earliest on ties);
+    anything else, including a missing header, gets the text format.
+    """
+    best, best_q = TEXT, 0.0
+    for media_range in (accept or '').split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        options = {}
+        for param in params:
+            key, _, value = param.partition('=')
+            options[key.strip().lower()] = value.strip().strip('"')
+        try:
+            q = float(options.get('q', 1))
+        except ValueError:
+            continue
+
+        media_type = media_type.lower()
+        if media_type == 'application/vnd.google.protobuf':
+            if (options.get('proto') != 'io.prometheus.client.MetricFamily'
+                    or options.get('encoding') != 'delimited'):
+                continue
+            fmt = PROTOBUF
+        elif media_type == 'application/openmetrics-text':
+            fmt = OPENMETRICS
+        elif media_type == 'text/plain':
+            fmt = TEXT
+        else:
+            continue
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def query_params(path: str) -> Dict[str, str]:
+    """Return the query parameters of a request path (last value wins)."""
+    return dict(parse_qsl(path.partition('?')[2]))
+
+
+def json_body(payload: Any) -> bytes:
+    """Serialise a JSON endpoint payload."""
+    return json.dumps(payload, separators=(',', ':'), default=str).encode()
+
+
+def route_body(payload: Any) -> Tuple[str, bytes]:
+    """Return (content type, body) of a route payload."""
+    if isinstance(payload, str):
+        return 'text/plain; charset=utf-8', payload.encode()
+    return 'application/json', json_body(payload)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Return True if an Accept-Encoding header allows gzip (q > 0)."""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() not in ('gzip', 'x-gzip', '*'):
+            continue
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True if an If-None-Match header matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def metrics_response(rendered: RenderedBody, accept_encoding: Optional[str],
+                     if_none_match: Optional[str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """
+    Build the /metrics response for a cached body.
+
+    Returns:
+        (status, headers, body): 304 with no body if the client's ETag
+        matches, otherwise 200 with the plain or gzipped body.
+    """
+    if etag_matches(if_none_match, rendered.etag):
+        return 304, [('ETag', rendered.etag), ('Vary', VARY)], b''
+
+    gzipped = accepts_gzip(accept_encoding)
+    body = rendered.gzipped if gzipped else rendered.body
+    headers = [
+        ('Content-Type', rendered.content_type),
+        ('Content-Length', str(len(body))),
+        ('ETag', rendered.etag),
+        ('Vary', VARY),
+    ]
+    if gzipped:
+        headers.append(('Content-Encoding', 'gzip'))
+    return 200, headers, body
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the cached exposition of the server's ExpositionCache and its extra routes."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """Send the cached body, gzipped when accepted, or 304 if unchanged."""
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        """Send the headers of a GET response."""
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool):
+        path = self.path.split('?', 1)[0]
+        route = self.server.routes.get(path)
+        if route is not None:
+            status, payload = route(query_params(self.path))
+            content_type, body = route_body(payload)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        if path not in METRICS_PATHS:
+            self.send_error(404)
+            return
+
+        rendered = self.server.cache.get(negotiate(self.headers.get('Accept')))
+        status, headers, body = metrics_response(rendered,
+                                                 self.headers.get('Accept-Encoding'),
+                                                 self.headers.get('If-None-Match'))
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Do not log every scrape."""
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Threaded HTTP server exposing an ExpositionCache and optional extra routes."""
+
+    daemon_threads = True
+
+    def __init__(self, address, cache: ExpositionCache, handler=MetricsHandler,
+                 routes: Optional[Dict[str, Route]] = None):
+        self.cache = cache
+        self.routes = routes or {}
+        super().__init__(address, handler)
+
+
+def start_metrics_server(port: int, cache: ExpositionCache, addr: str = '',
+                         routes: Optional[Dict[str, Route]] = None) -> MetricsServer:
+    """
+    Serve cache on addr:port from a daemon thread.
+
+    Args:
+        port: Port to bind (0 picks a free one).
+        cache: Exposition served on /metrics.
+        addr: Address to bind ('' for all interfaces).
+        routes: Extra endpoints by path (JSON or plain text).
+
+    Returns:
+        The running server (call shutdown() to stop it).
+    """
+    server = MetricsServer((addr, port), cache, routes=routes)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    return server
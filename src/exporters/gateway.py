@@ -0,0 +1,337 @@
+"""
+Multi-host aggregation gateway.
+Scrapes many exporters concurrently over pooled keep-alive connections and
+serves their series as one exposition, each labelled with its target's
+instance, optionally alongside fleet-wide sums and percentiles.
+"""
+import gzip
+import http.client
+import math
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlsplit
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.parser import text_string_to_metric_families
+from prometheus_client.registry import Collector
+
+# host:port/path of one scraped exporter, exported as its instance label
+Target = namedtuple('Target', ['instance', 'host', 'port', 'path'])
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def parse_target(text: str) -> Target:
+    """
+    Parse "host:port", "http://host:port/path" or "instance=<either>".
+
+    The instance defaults to host:port and the path to /metrics.
+
+    Raises:
+        ValueError: If the target has no host or uses another scheme.
+    """
+    instance, sep, address = text.partition('=')
+    if not sep:
+        instance, address = '', text
+    if '://' not in address:
+        address = 'http://' + address
+    parts = urlsplit(address)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise ValueError(f"invalid gateway target '{text}' (expected [instance=]host:port[/path])")
+    port = parts.port or 80
+    return Target(instance or f'{parts.hostname}:{port}', parts.hostname, port, parts.path or '/metrics')
+
+
+def read_targets(path: str) -> List[Target]:
+    """Parse a targets file: one target per line, # starts a comment."""
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [parse_target(line) for line in lines if line]
+
+
+class ConnectionPool:
+    """
+    Idle keep-alive connections per target.
+
+    A scrape takes a connection (or opens one) and returns it afterwards
+    unless the exchange failed; concurrent scrapes of one target each get
+    their own connection.
+    """
+
+    def __init__(self, timeout: float):
+        """
+        Args:
+            timeout: Socket timeout of new connections (connect and each read).
+        """
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: Dict[Target, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, target: Target) -> http.client.HTTPConnection:
+        """Return an idle connection to target, or a new one."""
+        with self._lock:
+            idle = self._idle.get(target)
+            if idle:
+                return idle.pop()
+            self.opened += 1
+        return http.client.HTTPConnection(target.host, target.port, timeout=self.timeout)
+
+    def put(self, target: Target, connection: http.client.HTTPConnection):
+        """Return a connection for reuse."""
+        with self._lock:
+            self._idle.setdefault(target, []).append(connection)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class TargetState:
+    """Outcome of a target's latest scrape."""
+
+    __slots__ = ('up', 'duration', 'samples', 'errors', 'families', 'future')
+
+    def __init__(self):
+        self.up = False
+        self.duration = 0.0
+        self.samples = 0
+        self.errors = 0
+        self.families: List[Metric] = []
+        # Scrape still running past its deadline, if any
+        self.future = None
+
+
+class GatewayCollector(Collector):
+    """
+    Custom prometheus_client collector that scrapes the targets on collect().
+
+    Every target is scraped concurrently; one that fails or exceeds the
+    timeout is reported down and contributes no series to that cycle.
+    Series keep their names and labels plus instance; a label named
+    instance on the target is kept as exported_instance, as Prometheus does.
+    Collection is meant to run behind an ExpositionCache with a max_age,
+    so concurrent scrapes of the gateway share one fan-out.
+    """
+
+    def __init__(self, targets: Sequence[Target], timeout: float = 5.0, max_workers: int = 32,
+                 aggregate: Sequence[str] = (), quantiles: Sequence[float] = DEFAULT_QUANTILES):
+        """
+        Args:
+            targets: Exporters to scrape.
+            timeout: Seconds each target has to answer.
+            max_workers: Targets scraped at once.
+            aggregate: Sample names (e.g. node_cpu_usage_percent) to also
+                export as fleet:<name>:{sum,avg,min,max,quantile} gauges,
+                grouped by their labels other than instance.
+            quantiles: Quantiles of the aggregated samples.
+        """
+        if not targets:
+            raise ValueError("the gateway needs at least one target")
+        instances = [target.instance for target in targets]
+        if len(set(instances)) != len(instances):
+            raise ValueError("gateway target instances must be unique")
+        if any(not 0 <= q <= 1 for q in quantiles):
+            raise ValueError("quantiles must be within [0, 1]")
+        self.targets = list(targets)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.aggregate = set(aggregate)
+        self.quantiles = tuple(quantiles)
+        self.pool = ConnectionPool(timeout)
+        self.states: Dict[Target, TargetState] = {target: TargetState() for target in self.targets}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gateway')
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def scrape(self, target: Target) -> List[Metric]:
+        """
+        Fetch and parse one target's text exposition (called on a worker thread).
+
+        Raises:
+            OSError, http.client.HTTPException, ValueError: On a failed
+            connection, a non-200 response or an unparsable body.
+        """
+        connection = self.pool.get(target)
+        # Idle pooled connections are already connected
+        reused = connection.sock is not None
+        try:
+            try:
+                response, body = self._fetch(connection, target)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The target closed the idle connection; retry once on a new one
+                connection.close()
+                response, body = self._fetch(connection, target)
+            if response.status != 200:
+                raise ValueError(f'HTTP {response.status}')
+            if response.getheader('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            families = list(text_string_to_metric_families(body.decode()))
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.put(target, connection)
+        return families
+
+    @staticmethod
+    def _fetch(connection: http.client.HTTPConnection, target: Target) -> Tuple[http.client.HTTPResponse, bytes]:
+        """Send one GET on connection and read the whole response."""
+        connection.request('GET', target.path, headers={'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def down(self) -> List[str]:
+        """Return the instances that were down at the latest scrape."""
+        return [target.instance for target, state in self.states.items() if not state.up]
+
+    def collect(self) -> Iterator[Metric]:
+        """Scrape every target and yield the merged families, aggregates and gateway metrics."""
+        self._fan_out()
+        merged = self._merge()
+        yield from merged.values()
+        if self.aggregate:
+            yield from self._aggregates(merged)
+        yield from self._gateway_families()
+
+    def close(self):
+        """Stop the workers and close the pooled connections."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+    def _fan_out(self):
+        """Scrape the targets concurrently, recording each outcome in its TargetState."""
+        started = time.monotonic()
+        running = {}
+        for target, state in self.states.items():
+            if state.future is not None and not state.future.done():
+                # Still stuck in the previous cycle: do not pile up scrapes
+                state.up = False
+                state.errors += 1
+                continue
+            running[self._executor.submit(self._timed_scrape, target)] = target
+
+        # Targets queue for a worker, so allow one timeout per wave
+        waves = math.ceil(len(running) / self.max_workers) if running else 0
+        done, _ = wait(running, timeout=self.timeout * waves)
+        for future, target in running.items():
+            state = self.states[target]
+            state.future = None
+            if future in done and future.exception() is None:
+                state.families, state.duration = future.result()
+                state.up = True
+                state.samples = sum(len(family.samples) for family in state.families)
+                continue
+            if future not in done:
+                state.future = future
+                state.duration = time.monotonic() - started
+            state.up = False
+            state.errors += 1
+            state.families = []
+            state.samples = 0
+
+    def _timed_scrape(self, target: Target) -> Tuple[List[Metric], float]:
+        """Scrape a target and return (families, seconds taken)."""
+        start = time.monotonic()
+        families = self.scrape(target)
+        return families, time.monotonic() - start
+
+    def _merge(self) -> Dict[str, Metric]:
+        """Merge the families of every target that is up, adding the instance label."""
+        merged: Dict[str, Metric] = {}
+        for target, state in self.states.items():
+            if not state.up:
+                continue
+            instance = target.instance
+            for family in state.families:
+                into = merged.get(family.name)
+                if into is None:
+                    into = merged[family.name] = Metric(family.name, family.documentation, family.type,
+                                                        family.unit)
+                elif into.type != family.type:
+                    # Exporter versions disagree; the first type seen wins
+                    continue
+                for sample in family.samples:
+                    labels = dict(sample.labels)
+                    if 'instance' in labels:
+                        labels['exported_instance'] = labels['instance']
+                    labels['instance'] = instance
+                    into.samples.append(sample._replace(labels=labels))
+        return merged
+
+    def _aggregates(self, merged: Dict[str, Metric]) -> Iterator[Metric]:
+        """Yield fleet:<name>:<op> gauges of the aggregated sample names."""
+        groups: Dict[str, Dict[Tuple, List[float]]] = {name: {} for name in self.aggregate}
+        for family in merged.values():
+            for sample in family.samples:
+                by_labels = groups.get(sample.name)
+                if by_labels is None or math.isnan(sample.value):
+                    continue
+                key = tuple(sorted((name, value) for name, value in sample.labels.items()
+                                   if name not in ('instance', 'exported_instance')))
+                by_labels.setdefault(key, []).append(sample.value)
+
+        for name in sorted(groups):
+            by_labels = groups[name]
+            if not by_labels:
+                continue
+            label_names = [label for label, _ in next(iter(by_labels))]
+            families = {op: GaugeMetricFamily(f'fleet:{name}:{op}', f'{op} of {name} across the gateway targets',
+                                              labels=label_names)
+                        for op in ('sum', 'avg', 'min', 'max', 'count')}
+            quantile = GaugeMetricFamily(f'fleet:{name}:quantile', f'Quantiles of {name} across the gateway targets',
+                                         labels=label_names + ['quantile'])
+            for key, values in by_labels.items():
+                labels = [value for _, value in key]
+                values.sort()
+                total = math.fsum(values)
+                families['sum'].add_metric(labels, total)
+                families['avg'].add_metric(labels, total / len(values))
+                families['min'].add_metric(labels, values[0])
+                families['max'].add_metric(labels, values[-1])
+                families['count'].add_metric(labels, len(values))
+                for q in self.quantiles:
+                    quantile.add_metric(labels + [repr(q)], _quantile(values, q))
+            yield from families.values()
+            yield quantile
+
+    def _gateway_families(self) -> Iterator[Metric]:
+        """Yield the per-target scrape outcome metrics."""
+        up = GaugeMetricFamily('exporter_gateway_target_up', 'Whether the latest scrape of the target succeeded',
+                               labels=['instance'])
+        duration = GaugeMetricFamily('exporter_gateway_target_scrape_duration_seconds',
+                                     'Duration of the latest scrape of the target', labels=['instance'])
+        samples = GaugeMetricFamily('exporter_gateway_target_samples',
+                                    'Samples in the latest scrape of the target', labels=['instance'])
+        errors = CounterMetricFamily('exporter_gateway_target_scrape_errors',
+                                     'Failed or timed-out scrapes of the target', labels=['instance'])
+        for target, state in self.states.items():
+            labels = [target.instance]
+            up.add_metric(labels, 1 if state.up else 0)
+            duration.add_metric(labels, state.duration)
+            samples.add_metric(labels, state.samples)
+            errors.add_metric(labels, state.errors)
+        yield from (up, duration, samples, errors)
+        yield CounterMetricFamily('exporter_gateway_connections_opened',
+                                  'Connections opened to targets (pooled connections are reused)',
+                                  value=self.pool.opened)
+
+
+def _quantile(values: Sequence[float], q: float) -> float:
+    """Quantile of sorted values, interpolated like PromQL's quantile()."""
+    rank = q * (len(values) - 1)
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
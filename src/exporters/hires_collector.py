@@ -0,0 +1,101 @@
+"""
+Prometheus collector for the high-resolution sampler.
+Exports each sampled value's cumulative histogram and the min/max/p50/p99
+of the samples taken since the body last served to a scrape was collected
+(the scrape window).
+"""
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.registry import Collector
+
+from src.collectors.hires_sampler import HiresSampler, WindowSegment, WindowStats, merge_segments, window_stats
+
+HELP = {
+    'cpu_busy_ratio': 'Share of CPU time spent busy between high-resolution samples',
+    'cpu_iowait_ratio': 'Share of CPU time spent in iowait between high-resolution samples',
+    'procs_running': 'Runnable tasks at each high-resolution sample',
+    'memory_available_bytes': 'Available memory at each high-resolution sample',
+}
+
+WINDOW_STATS = ('min', 'max', 'p50', 'p99')
+
+# Collections kept apart before the oldest are merged (no scrape for a while)
+MAX_SEGMENTS = 16
+
+
+class HiresCollector(Collector):
+    """
+    Exports HiresSampler aggregates.
+
+    Every collect() drains the sampler into a segment; the window stats
+    cover the segments collected since the body last served to a scrape,
+    so push-mode cycles between two scrapes do not lose spikes. served()
+    must be called with the collection time of each served body (as
+    ExpositionCache.served_listeners does). A window without samples
+    re-exports the previous window's stats.
+    """
+
+    def __init__(self, sampler: HiresSampler):
+        self.sampler = sampler
+        self._last: Dict[str, WindowStats] = {}
+        self._lock = threading.Lock()
+        # (monotonic collection time, drained samples) since the last served collection
+        self._segments: List[Tuple[float, Dict[str, WindowSegment]]] = []
+
+    def served(self, collected_at: float):
+        """Start the window after the collection (monotonic time) whose body was served."""
+        with self._lock:
+            self._segments = [segment for segment in self._segments if segment[0] > collected_at]
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def collect(self) -> Iterator:
+        """Yield the window stats, histograms and sampler self-metrics."""
+        capacity = self.sampler.window_capacity
+        collected_at = time.monotonic()
+        drained = self.sampler.drain_segments()
+        with self._lock:
+            segments = self._segments
+            segments.append((collected_at, drained))
+            if len(segments) > MAX_SEGMENTS:
+                # Served after the later of the two, the merged one is dropped with it
+                (_, older), (at, newer) = segments[:2]
+                segments[:2] = [(at, {name: merge_segments(older[name], newer[name], capacity)
+                                      for name in newer})]
+            windows = [segment for _, segment in segments]
+        for name in drained:
+            stats = window_stats([window[name] for window in windows], capacity)
+            if stats.count:
+                self._last[name] = stats
+        histograms = self.sampler.histograms()
+
+        for name, documentation in HELP.items():
+            if name in histograms:
+                buckets, total = histograms[name]
+                yield HistogramMetricFamily(f'node_hires_{name}', documentation,
+                                            buckets=buckets, sum_value=total)
+            stats = self._last.get(name)
+            if stats is not None:
+                window = GaugeMetricFamily(f'node_hires_{name}_window',
+                                           f'{documentation}, aggregated over the last scrape window',
+                                           labels=['stat'])
+                for stat in WINDOW_STATS:
+                    window.add_metric([stat], getattr(stats, stat))
+                yield window
+
+        sampler = self.sampler
+        yield GaugeMetricFamily('exporter_hires_sample_interval_seconds',
+                                'Current interval between high-resolution samples',
+                                value=sampler.interval)
+        yield GaugeMetricFamily('exporter_hires_sample_cost_seconds',
+                                'Smoothed CPU time of one high-resolution sample',
+                                value=sampler.cost)
+        yield CounterMetricFamily('exporter_hires_samples', 'High-resolution samples taken',
+                                  value=sampler.samples)
+        yield CounterMetricFamily('exporter_hires_throttled_samples',
+                                  'Samples taken below the target rate to stay within the CPU budget',
+                                  value=sampler.throttled)
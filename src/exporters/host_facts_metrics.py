@@ -0,0 +1,54 @@
+"""
+Prometheus collector for the static host facts.
+Exports node_info and the invariant gauges from the HostFactsCache, so
+they are read once (and after hotplug) instead of being set every cycle.
+"""
+from typing import Iterator
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, InfoMetricFamily
+from prometheus_client.registry import Collector
+
+from src.collectors.host_facts import HostFactsCache
+
+
+def _label(value) -> str:
+    """Label value of a fact ('' when unknown)."""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:g}'
+    return str(value)
+
+
+class HostFactsCollector(Collector):
+    """Exports the host facts: node_info, core counts and total memory."""
+
+    def __init__(self, facts: HostFactsCache):
+        self.facts = facts
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def collect(self) -> Iterator:
+        """Yield node_info, the fact gauges and the refresh count."""
+        facts = self.facts.get()
+        info = InfoMetricFamily('node', 'Static host facts, refreshed on CPU and memory hotplug')
+        info.add_metric([], {
+            'os': facts.os,
+            'kernel': facts.kernel,
+            'machine': facts.machine,
+            'cpu_model': facts.cpu_model,
+            'cpu_count': _label(facts.cpu_count),
+            'cpu_count_physical': _label(facts.cpu_count_physical),
+            'cpu_freq_min_mhz': _label(facts.cpu_freq_min),
+            'cpu_freq_max_mhz': _label(facts.cpu_freq_max),
+            'memory_total_bytes': _label(facts.memory_total),
+        })
+        yield info
+
+        yield GaugeMetricFamily('node_cpu_count', 'Number of CPU cores', value=facts.cpu_count or 0)
+        yield GaugeMetricFamily('node_cpu_physical_count', 'Number of physical CPU cores',
+                                value=facts.cpu_count_physical or 0)
+        yield GaugeMetricFamily('node_memory_total_bytes', 'Total memory in bytes', value=facts.memory_total)
+        yield CounterMetricFamily('exporter_host_facts_refreshes', 'Reads of the host facts (startup and hotplug)',
+                                  value=self.facts.refreshes)
@@ -4,35 +4,279 @@ Exposes system metrics at :9100/metrics endpoint.
 """
 import time
 import argparse
-from prometheus_client import Gauge, Counter, CollectorRegistry, generate_latest
-from prometheus_client import start_http_server
+import asyncio
+import math
+import socket
+import threading
+from prometheus_client import Gauge, Counter, Histogram, CollectorRegistry, generate_latest
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.collectors import CPUCollector, MemoryCollector, DiskCollector, NetworkCollector
+from src.collectors import (CPUCollector, MemoryCollector, DiskCollector, NetworkCollector, ProcessCollector,
+                            CgroupCollector, PressureCollector)
+from src.collectors.hires_sampler import HiresSampler
+from src.collectors.host_facts import HostFactsCache
+from src.collectors.pressure import PressureWatcher, parse_trigger
+from src.collectors.procfs import open_default_reader
+from src.exporters.scrape_collector import SystemMetricsCollector, DISK_RATE_METRICS
+from src.exporters.scheduler import AdaptiveInterval, CollectionScheduler, DURATION_BUCKETS
+from src.exporters.profiler import CollectionProfiler, ProfileBusyError
+from src.exporters.exposition import ExpositionCache, start_metrics_server
+from src.exporters.async_server import AsyncMetricsServer
+from src.exporters.remote_write import RemoteWriter
+from src.exporters.hires_collector import HiresCollector
+from src.exporters.gateway import GatewayCollector, parse_target, read_targets
+from src.exporters.cgroup_metrics import CgroupMetricsCollector
+from src.exporters.host_facts_metrics import HostFactsCollector
+from src.exporters.pressure_metrics import PressureMetricsCollector
+from src.storage import RingStore, family_samples
+
+
+def disk_activity(sample):
+    """Watched values of a DiskSample: total throughput and the busiest device's utilisation."""
+    rates = sample.rates
+    slots = [slot for _, slot in rates.items()]
+    read, write = rates.column('read_bytes_per_sec'), rates.column('write_bytes_per_sec')
+    values = {'throughput_mib': sum(read[slot] + write[slot] for slot in slots) / (1024 * 1024)}
+    if sample.has_busy_time:
+        util = rates.column('util_percent')
+        values['util_percent'] = max((util[slot] for slot in slots), default=0.0)
+    return values
 
 
 class MetricsExporter:
     """
     Prometheus metrics exporter using Registry pattern.
     Collects system metrics and exposes them in Prometheus format.
+
+    Modes:
+    - push: a background loop collects every 15s and sets Gauge/Counter values
+    - scrape: metrics are collected on each scrape by a custom Collector,
+      reusing a snapshot younger than min_freshness seconds
+    - gateway: other exporters are scraped concurrently on each scrape and
+      served as one exposition with an instance label, reused for
+      min_freshness seconds
     """
 
-    def __init__(self, port=9100):
+    MODES = ('push', 'scrape', 'gateway')
+    SERVERS = ('threaded', 'asyncio')
+    BACKENDS = ('psutil', 'procfs')
+
+    # Seconds between collections per collector
+    DEFAULT_INTERVALS = {'cpu': 15, 'memory': 5, 'disk': 60, 'network': 15, 'process': 30, 'cgroup': 15,
+                         'pressure': 15}
+
+    # Adaptive intervals: watched values per collector and the change between
+    # two collections that counts as volatile (network counters and cgroups
+    # keep their fixed interval)
+    ADAPTIVE_THRESHOLDS = {
+        'cpu': ({'cpu_usage_percent': 10.0, 'load_average_1m': 1.0}, None),
+        'memory': ({'memory_percent': 2.0, 'swap_percent': 1.0}, None),
+        'disk': ({'util_percent': 10.0, 'throughput_mib': 20.0}, disk_activity),
+        'process': ({'process_count': 20, 'process_zombie_count': 1}, None),
+        'pressure': ({'cpu': 5.0, 'memory': 2.0, 'io': 5.0},
+                     lambda result: {resource: kinds['some']['avg10'] for resource, kinds in result.items()}),
+    }
+    # Adaptive range relative to the configured interval
+    ADAPTIVE_FLOOR = 1 / 3
+    ADAPTIVE_CEILING = 4
+
+    # Collectors run out of cycle when a PSI trigger on the resource fires
+    PRESSURE_COLLECTORS = {
+        'cpu': ('pressure', 'cpu', 'process', 'cgroup'),
+        'memory': ('pressure', 'memory', 'process', 'cgroup'),
+        'io': ('pressure', 'disk', 'cgroup'),
+    }
+
+    def __init__(self, port=9100, mode='push', min_freshness=5.0, intervals=None,
+                 collector_timeout=10.0, max_workers=4, backend='psutil', top_processes=10,
+                 disk_filters=None, server='threaded', max_connections=64, request_timeout=5.0,
+                 history_dir=None, history_size_mb=4.0, history_max_series=512,
+                 remote_write_url=None, remote_write_labels=None, hires_rate=0.0, hires_cpu_budget=0.05,
+                 vectorized=False, profiling=False, procfs_root='/proc', sysfs_root='/sys',
+                 gateway_targets=None, gateway_timeout=5.0, gateway_workers=32, gateway_aggregate=None,
+                 cgroups=False, cgroup_root='/sys/fs/cgroup', cgroup_max_depth=4, cgroup_max_count=1000,
+                 pressure=False, pressure_triggers=None, adaptive=False):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown exporter mode: {mode}")
+        if server not in self.SERVERS:
+            raise ValueError(f"Unknown HTTP server: {server}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown collector backend: {backend}")
+        if remote_write_url and mode != 'push':
+            raise ValueError("remote_write requires push mode")
+        if (mode == 'gateway') != bool(gateway_targets):
+            raise ValueError("gateway mode requires gateway targets, and targets require gateway mode")
+        if cgroups and mode == 'gateway':
+            raise ValueError("cgroup collection is not available in gateway mode")
+        if (pressure or pressure_triggers) and mode == 'gateway':
+            raise ValueError("PSI collection is not available in gateway mode")
+
         self.port = port
+        self.mode = mode
+        # threaded: http.server thread per connection; asyncio: one event
+        # loop also serving /healthz and /api/snapshot
+        self.server = server
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
         self.registry = CollectorRegistry()
 
-        # Initialize collectors
-        self.cpu_collector = CPUCollector()
-        self.memory_collector = MemoryCollector()
-        self.disk_collector = DiskCollector()
-        self.network_collector = NetworkCollector()
+        # Direct /proc readers on Linux; falls back to psutil elsewhere
+        self.procfs = open_default_reader(procfs_root, sysfs_root) if backend == 'procfs' else None
+
+        # Core counts, frequency limits, total memory, OS and CPU model: read
+        # once and again only after a CPU or memory hotplug
+        self.host_facts = HostFactsCache(self.procfs, proc_root=procfs_root)
+
+        # Initialize collectors; vectorized computes per-core and per-device
+        # values with NumPy (large hosts)
+        self.cpu_collector = CPUCollector(procfs=self.procfs, vectorized=vectorized, facts=self.host_facts)
+        self.memory_collector = MemoryCollector(procfs=self.procfs)
+        # disk_filters: DiskCollector include/exclude/fstype_exclude regexes
+        self.disk_collector = DiskCollector(procfs=self.procfs, vectorized=vectorized, **(disk_filters or {}))
+        self.network_collector = NetworkCollector(procfs=self.procfs, vectorized=vectorized)
+        # top_processes bounds the per-process series: top-N by CPU + top-N by memory
+        self.process_collector = ProcessCollector(top_n=top_processes, procfs=self.procfs, facts=self.host_facts)
+
+        # The gateway's local collectors stay idle: their self-metrics go to
+        # a registry that is not served, next to the targets' families. In
+        # scrape mode it is served after the scrape collector (below)
+        local_registry = self.registry if mode == 'push' else CollectorRegistry()
+
+        # Run collectors in parallel, each with its own interval and deadline
+        intervals = {**self.DEFAULT_INTERVALS, **(intervals or {})}
+        self.scheduler = CollectionScheduler(max_workers=max_workers, registry=local_registry)
+        # adaptive: steady collectors back off up to ADAPTIVE_CEILING times
+        # their interval, volatile ones tighten down to ADAPTIVE_FLOOR times
+        self.adaptive = adaptive
+        self.scheduler.add('cpu', self.cpu_collector, intervals['cpu'], collector_timeout,
+                           self._policy('cpu', intervals))
+        self.scheduler.add('memory', self.memory_collector, intervals['memory'], collector_timeout,
+                           self._policy('memory', intervals))
+        self.scheduler.add('disk', self.disk_collector, intervals['disk'], collector_timeout,
+                           self._policy('disk', intervals))
+        self.scheduler.add('network', self.network_collector, intervals['network'], collector_timeout)
+        self.scheduler.add('process', self.process_collector, intervals['process'], collector_timeout,
+                           self._policy('process', intervals))
+        # Optional per-cgroup usage (containers, systemd units); bounded walk
+        self.cgroup_collector = None
+        if cgroups:
+            self.cgroup_collector = CgroupCollector(cgroup_root, max_depth=cgroup_max_depth,
+                                                    max_cgroups=cgroup_max_count)
+            self.scheduler.add('cgroup', self.cgroup_collector, intervals['cgroup'], collector_timeout)
+        # Optional system-wide PSI; triggers wake the collection loop as soon
+        # as stalls cross a threshold instead of at the next interval
+        self.pressure_collector = None
+        self.pressure_watcher = None
+        if pressure or pressure_triggers:
+            self.pressure_collector = PressureCollector(procfs_root)
+            self.scheduler.add('pressure', self.pressure_collector, intervals['pressure'], collector_timeout,
+                               self._policy('pressure', intervals))
+        if pressure_triggers:
+            try:
+                self.pressure_watcher = PressureWatcher(pressure_triggers, self._pressure_event, procfs_root)
+            except OSError as e:
+                raise ValueError(f"PSI triggers cannot be registered: {e}") from e
+        # Set to end the push loop's wait early
+        self._wakeup = threading.Event()
+        self._wake = self._wakeup.set
+        self.cycle_metric = Histogram(
+            'exporter_collector_cycle_seconds',
+            'Wall time of one push-mode update_metrics() cycle, rendering included',
+            buckets=DURATION_BUCKETS,
+            registry=local_registry
+        )
 
         # Create Prometheus metrics
-        self._create_metrics()
+        self.gateway = None
+        if mode == 'scrape':
+            self.scrape_collector = SystemMetricsCollector(self.collect_snapshot, min_freshness)
+            self.registry.register(self.scrape_collector)
+            # After the scrape collector, so a scrape reports the collection it ran
+            self.registry.register(local_registry)
+        elif mode == 'gateway':
+            # Only the targets are exported
+            self.gateway = GatewayCollector(gateway_targets, timeout=gateway_timeout, max_workers=gateway_workers,
+                                            aggregate=gateway_aggregate or ())
+            self.registry.register(self.gateway)
+        else:
+            self._create_metrics()
+        if mode != 'gateway':
+            # node_info, node_cpu_count and node_memory_total_bytes
+            self.registry.register(HostFactsCollector(self.host_facts))
+        if self.cgroup_collector is not None:
+            # After the scrape collector, which runs the scheduler on each scrape
+            self.registry.register(CgroupMetricsCollector(lambda: self.scheduler.snapshot()['cgroup']))
+        if self.pressure_collector is not None:
+            self.registry.register(PressureMetricsCollector(lambda: self.scheduler.snapshot()['pressure'],
+                                                            self.pressure_watcher))
+
+        # Optional sub-second sampling of cheap /proc sources, exported as
+        # per-window aggregates; it uses its own reader (Linux only)
+        self.hires_sampler = None
+        hires_collector = None
+        if hires_rate:
+            hires_procfs = open_default_reader(procfs_root, sysfs_root)
+            if hires_procfs is None:
+                raise ValueError("High-resolution sampling requires Linux /proc")
+            self.hires_sampler = HiresSampler(hires_procfs, rate=hires_rate, cpu_budget=hires_cpu_budget)
+            hires_collector = HiresCollector(self.hires_sampler)
+            self.registry.register(hires_collector)
+
+        # /metrics body rendered once per cycle (push) or per min_freshness
+        # window (scrape, gateway) and shared by every scrape
+        self.exposition = ExpositionCache(self.registry, max_age=min_freshness if mode != 'push' else None)
+        if hires_collector is not None:
+            # The hires window spans the cycles between two scrapes
+            self.exposition.served_listeners.append(hires_collector.served)
+
+        # Optional on-disk history of every exposed series, recorded on each
+        # exposition cycle (in scrape mode: only when scraped)
+        self.history = None
+        self.routes = {}
+        if history_dir:
+            self.history = RingStore(history_dir, max_bytes=int(history_size_mb * 1024 * 1024),
+                                     max_series=history_max_series)
+            self.history_dropped = Counter(
+                'exporter_history_dropped_series',
+                'Series samples not recorded because every history column held a live series',
+                registry=self.registry
+            )
+            self.history_reclaimed = Counter(
+                'exporter_history_reclaimed_series',
+                'History columns freed from series not written for a full ring',
+                registry=self.registry
+            )
+            self.exposition.listeners.append(self._record_history)
+            self.routes = {'/api/history': self.history_query, '/api/history/series': self.history_series}
+
+        # Opt-in /debug/profile: cProfile + tracemalloc of the collection
+        # loop over a requested number of seconds
+        self.profiler = None
+        if profiling:
+            self.profiler = CollectionProfiler()
+            self.scheduler.profiler = self.profiler
+            self.routes['/debug/profile'] = self.debug_profile
+
+        # Optional remote_write push of every cycle, for hosts that cannot
+        # be scraped; series get an instance label unless labels are given
+        self.remote_writer = None
+        if remote_write_url:
+            labels = remote_write_labels if remote_write_labels is not None else {'instance': socket.gethostname()}
+            self.remote_writer = RemoteWriter(remote_write_url, registry=self.registry, external_labels=labels)
+            self.exposition.listeners.append(self.remote_writer.enqueue)
+
+    def _policy(self, name, intervals):
+        """Return the AdaptiveInterval of a collector, or None with fixed intervals."""
+        if not self.adaptive:
+            return None
+        thresholds, values = self.ADAPTIVE_THRESHOLDS[name]
+        interval = intervals[name]
+        return AdaptiveInterval(interval * self.ADAPTIVE_FLOOR, interval * self.ADAPTIVE_CEILING,
+                                thresholds, values)
 
     def _create_metrics(self):
         """Create Prometheus Gauge and Counter metrics."""
@@ -43,11 +287,6 @@ class MetricsExporter:
             'CPU usage percentage',
             registry=self.registry
         )
-        self.cpu_count = Gauge(
-            'node_cpu_count',
-            'Number of CPU cores',
-            registry=self.registry
-        )
         self.load_average = Gauge(
             'node_load_average',
             'Load average',
@@ -55,12 +294,7 @@ class MetricsExporter:
             registry=self.registry
         )
 
-        # Memory metrics
-        self.memory_total = Gauge(
-            'node_memory_total_bytes',
-            'Total memory in bytes',
-            registry=self.registry
-        )
+        # Memory metrics (total memory is a host fact)
         self.memory_used = Gauge(
             'node_memory_used_bytes',
             'Used memory in bytes',
@@ -124,6 +358,13 @@ class MetricsExporter:
             registry=self.registry
         )
 
+        # Disk I/O rates derived in-process from consecutive samples
+        self.disk_rate_gauges = {}
+        for key, name, documentation in DISK_RATE_METRICS:
+            self.disk_rate_gauges[key] = Gauge(name, documentation, ['device'], registry=self.registry)
+        # Devices exported in the previous cycle, to remove vanished ones
+        self._disk_rate_devices = set()
+
         # Network metrics
         self.network_receive_bytes = Counter(
             'node_network_receive_bytes_total',
@@ -155,13 +396,178 @@ class MetricsExporter:
             registry=self.registry
         )
 
+        # Process metrics
+        self.process_count = Gauge(
+            'node_processes',
+            'Number of processes',
+            registry=self.registry
+        )
+        self.process_zombie_count = Gauge(
+            'node_processes_zombie',
+            'Number of zombie processes',
+            registry=self.registry
+        )
+        self.thread_count = Gauge(
+            'node_threads',
+            'Total number of threads',
+            registry=self.registry
+        )
+        self.top_process_cpu = Gauge(
+            'node_top_process_cpu_percent',
+            'CPU usage of the top processes by CPU',
+            ['name', 'pid'],
+            registry=self.registry
+        )
+        self.top_process_memory = Gauge(
+            'node_top_process_memory_percent',
+            'Memory usage of the top processes by memory',
+            ['name', 'pid'],
+            registry=self.registry
+        )
+        # Label sets exported in the previous cycle, to remove stale series
+        self._top_process_series = {self.top_process_cpu: set(), self.top_process_memory: set()}
+
+    def collect_snapshot(self):
+        """
+        Run every due collector through the scheduler.
+
+        Returns:
+            Dictionary mapping collector key ('cpu', 'memory', 'disk',
+            'network', 'process') to that collector's latest sample: a dict,
+            or a DiskSample / NetworkSample for disk and network. Results of
+            collectors that timed out or failed are the previous ones.
+        """
+        return self.scheduler.run_due()
+
+    def snapshot_dict(self):
+        """
+        Return the latest collector results as plain JSON-serialisable data.
+
+        Returns:
+            Dictionary mapping collector key to its collect()-format dict,
+            plus 'stale': the collectors whose result is stale.
+        """
+        if self.mode == 'scrape':
+            snapshot = self.scrape_collector.get_snapshot()
+        else:
+            snapshot = self.scheduler.snapshot()
+        result = {
+            name: sample.as_dict() if hasattr(sample, 'as_dict') else sample
+            for name, sample in snapshot.items()
+        }
+        result['stale'] = self.scheduler.stale_collectors()
+        return result
+
+    def health(self):
+        """
+        Report exporter health for /healthz.
+
+        Returns:
+            (healthy, details): unhealthy only once collection has started
+            and every collector's result is stale. In gateway mode,
+            unhealthy once every target was down at the latest scrape.
+        """
+        if self.gateway is not None:
+            down = self.gateway.down()
+            started = any(state.up or state.errors for state in self.gateway.states.values())
+            return not started or len(down) < len(self.gateway.targets), {'stale': [], 'down': down}
+        stale = self.scheduler.stale_collectors()
+        started = any(entry.next_due for entry in self.scheduler.entries.values())
+        healthy = not started or len(stale) < len(self.scheduler.entries)
+        return healthy, {'stale': stale}
+
+    def _record_history(self, families, timestamp):
+        """Append one exposition cycle to the history store."""
+        dropped, reclaimed = self.history.dropped_series, self.history.reclaimed_series
+        self.history.append(timestamp, family_samples(families))
+        self.history_dropped.inc(self.history.dropped_series - dropped)
+        self.history_reclaimed.inc(self.history.reclaimed_series - reclaimed)
+
+    def history_query(self, params):
+        """
+        Serve /api/history?series=NAME[&start=T][&end=T][&step=S].
+
+        Returns:
+            (status, payload): 200 with the series' points ([t, v], or
+            [t, min, max, avg] with step), 400 on bad parameters, 404 for
+            an unknown series.
+        """
+        name = params.get('series')
+        if not name:
+            return 400, {'error': 'missing series parameter'}
+        try:
+            start = float(params.get('start', 0))
+            end = float(params.get('end', 'inf'))
+            step = float(params['step']) if 'step' in params else None
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        if step is not None and not (math.isfinite(step) and step > 0):
+            return 400, {'error': 'step must be a positive number of seconds'}
+        if math.isnan(start) or math.isnan(end):
+            # Infinite bounds just leave the range open
+            return 400, {'error': 'start and end must be numbers'}
+        try:
+            points = self.history.query(name, start, end, step)
+        except KeyError:
+            return 404, {'error': f'unknown series: {name}'}
+        return 200, {'series': name, 'step': step, 'points': points}
+
+    def history_series(self, params):
+        """Serve /api/history/series: the names of the recorded series."""
+        return 200, {'series': self.history.series(), 'dropped': self.history.dropped_series}
+
+    def debug_profile(self, params):
+        """
+        Serve /debug/profile?seconds=N (default 10).
+
+        Returns:
+            (status, payload): 200 with the text report once the capture
+            ends, 400 on a bad duration, 409 if a capture is running.
+        """
+        try:
+            seconds = float(params.get('seconds', 10))
+            return 200, self.profiler.capture(seconds)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except ProfileBusyError as e:
+            return 409, {'error': str(e)}
+
+    def _pressure_event(self, trigger):
+        """
+        Collect the stalled resource out of cycle (called on the PSI watcher thread).
+
+        Push mode: wakes the collection loop, which runs the expedited
+        collectors now. Scrape mode: the next scrape collects them, even
+        within min_freshness.
+        """
+        self.scheduler.expedite(self.PRESSURE_COLLECTORS[trigger.resource])
+        if self.mode == 'scrape':
+            self.scrape_collector.invalidate()
+            self.exposition.invalidate()
+        self._wake()
+
     def update_metrics(self):
         """Collect and update all metrics."""
+        if self.mode != 'push':
+            # Scrape and gateway modes collect on demand; nothing to push
+            return
+
+        start = time.monotonic()
+        snapshot = self.collect_snapshot()
+        # Collections are profiled on the scheduler's workers; the loop's own
+        # work separately, not around them (profiles must not nest)
+        if self.profiler is not None:
+            self.profiler.profile(self._update_metrics, snapshot)
+        else:
+            self._update_metrics(snapshot)
+        self.cycle_metric.observe(time.monotonic() - start)
+
+    def _update_metrics(self, snapshot):
+        """Set the metrics from one push-mode cycle's snapshot and render."""
 
         # CPU metrics
-        cpu_metrics = self.cpu_collector.collect()
+        cpu_metrics = snapshot.get('cpu', {})
         self.cpu_usage.set(cpu_metrics.get('cpu_usage_percent', 0))
-        self.cpu_count.set(cpu_metrics.get('cpu_count', 0))
 
         if 'load_average_1m' in cpu_metrics:
             self.load_average.labels(period='1m').set(cpu_metrics['load_average_1m'])
@@ -169,8 +575,7 @@ class MetricsExporter:
             self.load_average.labels(period='15m').set(cpu_metrics['load_average_15m'])
 
         # Memory metrics
-        mem_metrics = self.memory_collector.collect()
-        self.memory_total.set(mem_metrics.get('memory_total', 0))
+        mem_metrics = snapshot.get('memory', {})
         self.memory_used.set(mem_metrics.get('memory_used', 0))
         self.memory_available.set(mem_metrics.get('memory_available', 0))
         self.memory_percent.set(mem_metrics.get('memory_percent', 0))
@@ -178,9 +583,32 @@ class MetricsExporter:
         self.swap_used.set(mem_metrics.get('swap_used', 0))
         self.swap_percent.set(mem_metrics.get('swap_percent', 0))
 
-        # Disk metrics
-        disk_metrics = self.disk_collector.collect()
-        for partition in disk_metrics.get('disk_partitions', []):
+        # Disk metrics (a DiskSample once the disk collector has run)
+        disk = snapshot.get('disk')
+        if disk:
+            self._update_disk_metrics(disk)
+
+        # Network metrics (a NetworkSample)
+        network = snapshot.get('network')
+        if network:
+            self._update_network_metrics(network)
+
+        # Process metrics
+        proc_metrics = snapshot.get('process', {})
+        if proc_metrics:
+            self.process_count.set(proc_metrics.get('process_count', 0))
+            self.process_zombie_count.set(proc_metrics.get('process_zombie_count', 0))
+            self.thread_count.set(proc_metrics.get('thread_count_total', 0))
+            self._set_top_processes(self.top_process_cpu, proc_metrics.get('top_processes_cpu', []), 'cpu_percent')
+            self._set_top_processes(self.top_process_memory, proc_metrics.get('top_processes_memory', []),
+                                    'memory_percent')
+
+        # Render /metrics once for all scrapes until the next cycle
+        self.exposition.render()
+
+    def _update_disk_metrics(self, disk):
+        """Set disk usage, I/O counter and rate metrics from a DiskSample."""
+        for partition in disk.partitions:
             device = partition['device']
             mountpoint = partition['mountpoint']
             self.disk_total.labels(device=device, mountpoint=mountpoint).set(partition['total'])
@@ -188,37 +616,155 @@ class MetricsExporter:
             self.disk_usage_percent.labels(device=device, mountpoint=mountpoint).set(partition['percent'])
 
         # Disk I/O
-        disk_io = disk_metrics.get('disk_io', {})
-        for device, counters in disk_io.items():
-            # Note: Counter values should only increase, so we use _total suffix
-            self.disk_io_read_bytes.labels(device=device)._value.set(counters['read_bytes'])
-            self.disk_io_write_bytes.labels(device=device)._value.set(counters['write_bytes'])
+        if disk.has_io:
+            read_bytes = disk.io.column('read_bytes')
+            write_bytes = disk.io.column('write_bytes')
+            for device, slot in disk.io.items():
+                # Note: Counter values should only increase, so we use _total suffix
+                self.disk_io_read_bytes.labels(device=device)._value.set(read_bytes[slot])
+                self.disk_io_write_bytes.labels(device=device)._value.set(write_bytes[slot])
 
-        # Network metrics
-        net_metrics = self.network_collector.collect()
-        net_io = net_metrics.get('network_io', {})
-        for interface, counters in net_io.items():
-            self.network_receive_bytes.labels(interface=interface)._value.set(counters['bytes_recv'])
-            self.network_transmit_bytes.labels(interface=interface)._value.set(counters['bytes_sent'])
-            self.network_receive_packets.labels(interface=interface)._value.set(counters['packets_recv'])
-            self.network_transmit_packets.labels(interface=interface)._value.set(counters['packets_sent'])
+        # Disk I/O rates
+        rates = disk.rates
+        for key in disk.rate_fields():
+            gauge = self.disk_rate_gauges[key]
+            column = rates.column(key)
+            for device, slot in rates.items():
+                gauge.labels(device=device).set(column[slot])
+        devices = {device for device, _ in rates.items()}
+        for device in self._disk_rate_devices - devices:
+            for gauge in self.disk_rate_gauges.values():
+                try:
+                    gauge.remove(device)
+                except KeyError:
+                    pass
+        self._disk_rate_devices = devices
+
+    def _update_network_metrics(self, network):
+        """Set interface counters and the connection count from a NetworkSample."""
+        io = network.io
+        counters = [
+            (self.network_receive_bytes, io.column('bytes_recv')),
+            (self.network_transmit_bytes, io.column('bytes_sent')),
+            (self.network_receive_packets, io.column('packets_recv')),
+            (self.network_transmit_packets, io.column('packets_sent')),
+        ]
+        if network.has_io:
+            for interface, slot in io.items():
+                for counter, column in counters:
+                    counter.labels(interface=interface)._value.set(column[slot])
+
+        if network.connections is not None:
+            self.network_connections_total.set(network.connections_total)
+
+    def _set_top_processes(self, gauge, processes, key):
+        """
+        Export a top-N process list, removing processes that dropped out.
 
-        if 'network_connections_total' in net_metrics:
-            self.network_connections_total.set(net_metrics['network_connections_total'])
+        Without the removal every PID that was ever in the top-N would stay
+        in the registry, so series would grow without bound.
+        """
+        current = set()
+        for proc in processes:
+            labels = (proc['name'], str(proc['pid']))
+            gauge.labels(*labels).set(proc[key])
+            current.add(labels)
+
+        for labels in self._top_process_series[gauge] - current:
+            gauge.remove(*labels)
+        self._top_process_series[gauge] = current
 
     def run(self):
         """Start the HTTP server and continuously update metrics."""
+        if self.remote_writer is not None:
+            self.remote_writer.start()
+        if self.hires_sampler is not None:
+            self.hires_sampler.start()
+        if self.pressure_watcher is not None:
+            self.pressure_watcher.start()
+        if self.server == 'asyncio':
+            try:
+                asyncio.run(self._run_async())
+            except KeyboardInterrupt:
+                print("\nShutting down...")
+            finally:
+                self.shutdown()
+            return
+
         # Start Prometheus HTTP server
-        start_http_server(self.port, registry=self.registry)
-        print(f"Metrics exporter running on http://localhost:{self.port}/metrics")
+        server = start_metrics_server(self.port, self.exposition, routes=self.routes)
+        print(f"Metrics exporter running on http://localhost:{self.port}/metrics ({self.mode} mode)")
         print("Press Ctrl+C to stop")
 
         try:
             while True:
+                if self.mode != 'push':
+                    # Collection happens in the HTTP server threads
+                    time.sleep(3600)
+                    continue
                 self.update_metrics()
-                time.sleep(15)  # Update every 15 seconds
+                # Sleep until the next collector is due or a PSI trigger fires
+                self._wakeup.wait(max(self.scheduler.seconds_until_due(), 1.0))
+                self._wakeup.clear()
         except KeyboardInterrupt:
             print("\nShutting down...")
+        finally:
+            server.shutdown()
+            self.shutdown()
+
+    async def _run_async(self):
+        """Serve HTTP and run the collection loop on one event loop."""
+        server = AsyncMetricsServer(self.exposition, self.snapshot_dict, self.health,
+                                    port=self.port, max_connections=self.max_connections,
+                                    request_timeout=self.request_timeout, routes=self.routes)
+        await server.start()
+        print(f"Metrics exporter running on http://localhost:{server.port}/metrics ({self.mode} mode, asyncio)")
+        print("Press Ctrl+C to stop")
+
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        # PSI triggers fire on the watcher thread
+        self._wake = lambda: loop.call_soon_threadsafe(wakeup.set)
+        try:
+            if self.mode != 'push':
+                # Collection happens on demand in request handlers
+                await asyncio.Event().wait()
+            while True:
+                # Collection blocks; it runs on the server's executor
+                await server.run_blocking(self.update_metrics)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), max(self.scheduler.seconds_until_due(), 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+        finally:
+            self._wake = self._wakeup.set
+            await server.close()
+
+    def shutdown(self):
+        """Stop collection and sampling, flush remote_write and close the history store."""
+        self.scheduler.shutdown()
+        self.disk_collector.close()
+        if self.gateway is not None:
+            self.gateway.close()
+        if self.cgroup_collector is not None:
+            self.cgroup_collector.close()
+        self.host_facts.close()
+        if self.pressure_watcher is not None:
+            self.pressure_watcher.close()
+        if self.pressure_collector is not None:
+            self.pressure_collector.close()
+        if self.hires_sampler is not None:
+            self.hires_sampler.stop()
+        if self.remote_writer is not None:
+            self.remote_writer.close()
+        self.close_history()
+
+    def close_history(self):
+        """Flush and close the history store, if any."""
+        if self.history is not None:
+            self.history.close()
+            self.history = None
 
 
 def main():
@@ -226,10 +772,145 @@ def main():
     parser = argparse.ArgumentParser(description='System Resource Monitoring Exporter')
     parser.add_argument('--port', type=int, default=9100, help='Port to expose metrics (default: 9100)')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--mode', choices=MetricsExporter.MODES, default='push',
+                        help='push: collect every 15s in the background; scrape: collect on each scrape; '
+                             'gateway: scrape the --target exporters on each scrape (default: push)')
+    parser.add_argument('--min-freshness', type=float, default=5.0,
+                        help='Seconds a scrape-mode snapshot is reused for concurrent scrapes (default: 5)')
+    parser.add_argument('--interval', action='append', default=[], metavar='COLLECTOR=SECONDS',
+                        help='Collection interval per collector, e.g. disk=60 (repeatable)')
+    parser.add_argument('--adaptive-intervals', action='store_true',
+                        help='Back off collectors whose values are steady (up to 4x their interval) and '
+                             'tighten volatile ones (down to 1/3)')
+    parser.add_argument('--collector-timeout', type=float, default=10.0,
+                        help='Seconds before a collection is marked stale (default: 10)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Collection thread pool size (default: 4)')
+    parser.add_argument('--backend', choices=MetricsExporter.BACKENDS, default='psutil',
+                        help='procfs: read /proc directly on Linux, psutil elsewhere (default: psutil)')
+    parser.add_argument('--procfs-root', default='/proc', metavar='DIR',
+                        help='procfs backend: procfs mount point, e.g. a host /proc in a container (default: /proc)')
+    parser.add_argument('--sysfs-root', default='/sys', metavar='DIR',
+                        help='procfs backend: sysfs mount point (default: /sys)')
+    parser.add_argument('--cgroups', action='store_true',
+                        help='Export CPU, memory, I/O and pressure per cgroup v2 (containers, systemd units)')
+    parser.add_argument('--cgroup-root', default='/sys/fs/cgroup', metavar='DIR',
+                        help='cgroup v2 mount point (default: /sys/fs/cgroup)')
+    parser.add_argument('--cgroup-max-depth', type=int, default=4,
+                        help='Levels of the cgroup tree tracked below the root (default: 4)')
+    parser.add_argument('--cgroup-max-count', type=int, default=1000,
+                        help='Cgroups tracked at most, shallowest first (default: 1000)')
+    parser.add_argument('--pressure', action='store_true',
+                        help='Export system-wide Pressure Stall Information from /proc/pressure (Linux 4.20+)')
+    parser.add_argument('--pressure-trigger', action='append', default=[],
+                        metavar='RESOURCE:KIND:STALL_MS:WINDOW_MS',
+                        help='Collect at once when stalls cross a threshold, e.g. memory:some:150:1000 '
+                             '(repeatable; implies --pressure)')
+    parser.add_argument('--top-processes', type=int, default=10,
+                        help='Processes exported per top-N list, bounds per-process series (default: 10)')
+    parser.add_argument('--disk-include', metavar='REGEX',
+                        help='Only report mountpoints matching this regex')
+    parser.add_argument('--disk-exclude', metavar='REGEX',
+                        help='Skip mountpoints matching this regex')
+    parser.add_argument('--disk-fstype-exclude', metavar='REGEX',
+                        help='Skip filesystem types matching this regex (e.g. "^(nfs|cifs)")')
+    parser.add_argument('--server', choices=MetricsExporter.SERVERS, default='threaded',
+                        help='HTTP server: threaded, or asyncio with /healthz and /api/snapshot (default: threaded)')
+    parser.add_argument('--max-connections', type=int, default=64,
+                        help='asyncio server: connections served at once (default: 64)')
+    parser.add_argument('--request-timeout', type=float, default=5.0,
+                        help='asyncio server: seconds to receive a request (default: 5)')
+    parser.add_argument('--history-dir', metavar='DIR',
+                        help='Record every series in a ring buffer in DIR, queried on /api/history')
+    parser.add_argument('--history-size-mb', type=float, default=4.0,
+                        help='Size of the history ring buffer file (default: 4)')
+    parser.add_argument('--history-max-series', type=int, default=512,
+                        help='Series kept in the history; further series are dropped (default: 512)')
+    parser.add_argument('--hires-rate', type=float, default=0.0, metavar='HZ',
+                        help='Sample CPU, runnable tasks and memory HZ times per second and export '
+                             'per-scrape aggregates (Linux; default: off)')
+    parser.add_argument('--hires-cpu-budget', type=float, default=0.05,
+                        help='Share of one CPU the high-resolution sampler may use (default: 0.05)')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Compute per-core and per-device values with NumPy (for large hosts)')
+    parser.add_argument('--enable-profiling', action='store_true',
+                        help='Serve /debug/profile?seconds=N (cProfile and tracemalloc of the collection loop)')
+    parser.add_argument('--target', action='append', default=[], metavar='[INSTANCE=]HOST:PORT[/PATH]',
+                        help='gateway mode: exporter to scrape (repeatable; instance defaults to HOST:PORT)')
+    parser.add_argument('--targets-file', metavar='FILE',
+                        help='gateway mode: file of targets, one per line')
+    parser.add_argument('--gateway-timeout', type=float, default=5.0,
+                        help='gateway mode: seconds each target has to answer (default: 5)')
+    parser.add_argument('--gateway-workers', type=int, default=32,
+                        help='gateway mode: targets scraped at once (default: 32)')
+    parser.add_argument('--gateway-aggregate', action='append', default=[], metavar='METRIC',
+                        help='gateway mode: also export fleet sums and quantiles of METRIC (repeatable)')
+    parser.add_argument('--remote-write-url', metavar='URL',
+                        help='Push every cycle to this Prometheus remote_write endpoint (push mode)')
+    parser.add_argument('--remote-write-label', action='append', default=[], metavar='NAME=VALUE',
+                        help='Label added to pushed series (repeatable; default: instance=<hostname>)')
 
     args = parser.parse_args()
 
-    exporter = MetricsExporter(port=args.port)
+    intervals = {}
+    for item in args.interval:
+        name, _, seconds = item.partition('=')
+        try:
+            interval = float(seconds)
+        except ValueError:
+            interval = math.nan
+        if name not in MetricsExporter.DEFAULT_INTERVALS or not (math.isfinite(interval) and interval > 0):
+            parser.error(f"invalid --interval '{item}': expected COLLECTOR=SECONDS with SECONDS > 0")
+        intervals[name] = interval
+
+    remote_write_labels = None
+    if args.remote_write_label:
+        remote_write_labels = {}
+        for item in args.remote_write_label:
+            name, sep, value = item.partition('=')
+            if not name or not sep:
+                parser.error(f"invalid --remote-write-label '{item}'")
+            remote_write_labels[name] = value
+
+    try:
+        targets = [parse_target(target) for target in args.target]
+        if args.targets_file:
+            targets += read_targets(args.targets_file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    try:
+        pressure_triggers = [parse_trigger(trigger) for trigger in args.pressure_trigger]
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        exporter = MetricsExporter(port=args.port, mode=args.mode, min_freshness=args.min_freshness,
+                                   intervals=intervals, collector_timeout=args.collector_timeout,
+                                   max_workers=args.workers, backend=args.backend,
+                                   procfs_root=args.procfs_root, sysfs_root=args.sysfs_root,
+                                   top_processes=args.top_processes,
+                                   disk_filters={'include': args.disk_include, 'exclude': args.disk_exclude,
+                                                 'fstype_exclude': args.disk_fstype_exclude},
+                                   server=args.server, max_connections=args.max_connections,
+                                   request_timeout=args.request_timeout, history_dir=args.history_dir,
+                                   history_size_mb=args.history_size_mb,
+                                   history_max_series=args.history_max_series,
+                                   remote_write_url=args.remote_write_url,
+                                   remote_write_labels=remote_write_labels,
+                                   hires_rate=args.hires_rate, hires_cpu_budget=args.hires_cpu_budget,
+                                   vectorized=args.vectorized, profiling=args.enable_profiling,
+                                   gateway_targets=targets, gateway_timeout=args.gateway_timeout,
+                                   gateway_workers=args.gateway_workers,
+                                   gateway_aggregate=args.gateway_aggregate,
+                                   cgroups=args.cgroups, cgroup_root=args.cgroup_root,
+                                   cgroup_max_depth=args.cgroup_max_depth,
+                                   cgroup_max_count=args.cgroup_max_count,
+                                   pressure=args.pressure, pressure_triggers=pressure_triggers,
+                                   adaptive=args.adaptive_intervals)
+    except ValueError as e:
+        # Bad mode/gateway/cgroup/PSI settings, e.g. --cgroups on a cgroup v1 host
+        parser.error(str(e))
     exporter.run()
 
 
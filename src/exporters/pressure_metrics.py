@@ -0,0 +1,69 @@
+"""
+Prometheus collector for system-wide PSI.
+Builds node_pressure_* families from the latest PressureCollector result
+held by the scheduler, and the trigger events seen by the PressureWatcher.
+"""
+from typing import Any, Callable, Dict, Iterator, Optional
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from src.collectors.pressure import PressureWatcher, Trigger
+
+AVERAGES = ('avg10', 'avg60', 'avg300')
+
+
+def threshold_label(trigger: Trigger) -> str:
+    """Label value of a trigger's threshold, e.g. 150ms/1000ms."""
+    return f'{trigger.stall_us // 1000}ms/{trigger.window_us // 1000}ms'
+
+
+class PressureMetricsCollector(Collector):
+    """Exports the latest PSI collection and the PSI trigger events."""
+
+    def __init__(self, result_fn: Callable[[], Dict[str, Any]], watcher: Optional[PressureWatcher] = None):
+        """
+        Args:
+            result_fn: Returns the latest PressureCollector.collect() result
+                ({} before the first collection).
+            watcher: PressureWatcher whose events are exported (optional).
+        """
+        self.result_fn = result_fn
+        self.watcher = watcher
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def collect(self) -> Iterator:
+        """Yield the stall times, the averages and the trigger events."""
+        result = self.result_fn()
+        if result:
+            stalled = CounterMetricFamily('node_pressure_stalled_seconds',
+                                          'Time tasks were stalled on the resource (PSI total)',
+                                          labels=['resource', 'kind'])
+            averages = {window: GaugeMetricFamily(f'node_pressure_{window}_percent',
+                                                  f'Share of the last {window[3:]}s tasks were stalled on '
+                                                  f'the resource', labels=['resource', 'kind'])
+                        for window in AVERAGES}
+            for resource, kinds in result.items():
+                for kind, values in kinds.items():
+                    stalled.add_metric([resource, kind], values['total'] * 1e-6)
+                    for window, family in averages.items():
+                        family.add_metric([resource, kind], values[window])
+            yield stalled
+            yield from averages.values()
+
+        if self.watcher is not None:
+            events = CounterMetricFamily('node_pressure_trigger_events',
+                                         'PSI trigger events: stalls crossing the threshold within its window',
+                                         labels=['resource', 'kind', 'threshold'])
+            last = GaugeMetricFamily('node_pressure_trigger_last_event_timestamp_seconds',
+                                     'Unix time of the latest PSI trigger event',
+                                     labels=['resource', 'kind', 'threshold'])
+            for trigger, count in list(self.watcher.events.items()):
+                labels = [trigger.resource, trigger.kind, threshold_label(trigger)]
+                events.add_metric(labels, count)
+                if trigger in self.watcher.last_event:
+                    last.add_metric(labels, self.watcher.last_event[trigger])
+            yield events
+            yield last
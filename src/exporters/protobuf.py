@@ -0,0 +1,271 @@
+"""
+Minimal protobuf encoder for the Prometheus exposition format.
+Writes io.prometheus.client.MetricFamily messages (metrics.proto) in the
+length-delimited form scraped by Prometheus, without the protobuf runtime.
+"""
+import math
+import struct
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# MetricType enum of metrics.proto
+COUNTER = 0
+GAUGE = 1
+SUMMARY = 2
+UNTYPED = 3
+HISTOGRAM = 4
+GAUGE_HISTOGRAM = 5
+
+# prometheus_client family type -> (MetricType, Metric field number)
+FAMILY_TYPES = {
+    'counter': (COUNTER, 3),
+    'gauge': (GAUGE, 2),
+    'info': (GAUGE, 2),
+    'stateset': (GAUGE, 2),
+    'summary': (SUMMARY, 4),
+    'histogram': (HISTOGRAM, 7),
+    'gaugehistogram': (GAUGE_HISTOGRAM, 7),
+    'unknown': (UNTYPED, 5),
+}
+
+CONTENT_TYPE = 'application/vnd.google.protobuf; proto=io.prometheus.client.MetricFamily; encoding=delimited'
+
+_DOUBLE = struct.Struct('<d')
+
+# Wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+
+
+# Single-byte varints, which cover field keys and most lengths
+_SMALL_VARINTS = [bytes([value]) for value in range(0x80)]
+
+
+def varint(value: int) -> bytes:
+    """Encode an unsigned (or two's complement 64-bit) varint."""
+    if 0 <= value < 0x80:
+        return _SMALL_VARINTS[value]
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def tag(field: int, wire_type: int) -> bytes:
+    """Encode a field key."""
+    return varint(field << 3 | wire_type)
+
+
+def uint_field(field: int, value: int) -> bytes:
+    """Encode a varint field (omitted when zero, as proto3 does)."""
+    return tag(field, VARINT) + varint(value) if value else b''
+
+
+def double_field(field: int, value: float) -> bytes:
+    """Encode a double field (omitted when zero, as proto3 does)."""
+    if value == 0 and math.copysign(1, value) > 0:
+        return b''
+    return tag(field, FIXED64) + _DOUBLE.pack(value)
+
+
+def bytes_field(field: int, value: bytes) -> bytes:
+    """Encode a length-delimited field (string, bytes or sub-message)."""
+    return tag(field, LENGTH_DELIMITED) + varint(len(value)) + value
+
+
+def string_field(field: int, value: str) -> bytes:
+    """Encode a string field (omitted when empty)."""
+    return bytes_field(field, value.encode()) if value else b''
+
+
+def delimited(message: bytes) -> bytes:
+    """Prefix a message with its varint length."""
+    return varint(len(message)) + message
+
+
+def timestamp(seconds: float) -> bytes:
+    """Encode a google.protobuf.Timestamp message."""
+    whole = math.floor(seconds)
+    return uint_field(1, whole) + uint_field(2, int(round((seconds - whole) * 1e9)))
+
+
+@lru_cache(maxsize=65536)
+def label_pair(name: str, value: str) -> bytes:
+    """Encode one LabelPair as field 1 (cached: label values repeat across families)."""
+    return bytes_field(1, string_field(1, name) + string_field(2, value))
+
+
+def label_pairs(labels: Dict[str, str]) -> bytes:
+    """Encode repeated LabelPair fields (field 1), sorted by name."""
+    return b''.join([label_pair(name, value) for name, value in sorted(labels.items())])
+
+
+def exemplar(sample_exemplar) -> bytes:
+    """Encode an Exemplar message from a prometheus_client Exemplar."""
+    message = label_pairs(sample_exemplar.labels) + double_field(2, sample_exemplar.value)
+    if sample_exemplar.timestamp is not None:
+        message += bytes_field(3, timestamp(float(sample_exemplar.timestamp)))
+    return message
+
+
+def encode_family(family) -> bytes:
+    """
+    Encode one prometheus_client metric family as a MetricFamily message.
+
+    Samples are grouped into one Metric per label set (excluding 'le' and
+    'quantile'; stateset states stay separate metrics); _created samples
+    become created_timestamp.
+    """
+    metric_type, value_field = FAMILY_TYPES.get(family.type, (UNTYPED, 5))
+    name = family.name
+    if family.type == 'counter':
+        name += '_total'
+    elif family.type == 'info':
+        name += '_info'
+
+    header = [string_field(1, name), string_field(2, family.documentation), uint_field(3, metric_type)]
+    if metric_type in (GAUGE, UNTYPED):
+        # One sample per metric: skip the grouping below
+        for sample in family.samples:
+            body = label_pairs(sample.labels) + bytes_field(value_field, double_field(1, sample.value))
+            if sample.timestamp is not None:
+                body += uint_field(6, int(float(sample.timestamp) * 1000))
+            header.append(bytes_field(4, body))
+        if getattr(family, 'unit', ''):
+            header.append(string_field(5, family.unit))
+        return b''.join(header)
+
+    metrics: Dict[Tuple, Dict] = {}
+    for sample in family.samples:
+        key = tuple(sorted((k, v) for k, v in sample.labels.items() if k not in ('le', 'quantile')))
+        metric = metrics.get(key)
+        if metric is None:
+            metric = metrics[key] = {'labels': dict(key), 'value': 0.0, 'created': None, 'exemplar': None,
+                                     'count': 0.0, 'sum': 0.0, 'buckets': [], 'quantiles': [],
+                                     'timestamp': sample.timestamp}
+        suffix = sample.name[len(family.name):]
+        if suffix == '_created':
+            metric['created'] = sample.value
+        elif suffix in ('_count', '_gcount'):
+            metric['count'] = sample.value
+        elif suffix in ('_sum', '_gsum'):
+            metric['sum'] = sample.value
+        elif suffix == '_bucket':
+            metric['buckets'].append((float(sample.labels['le']), sample.value, sample.exemplar))
+        elif 'quantile' in sample.labels:
+            metric['quantiles'].append((float(sample.labels['quantile']), sample.value))
+        else:
+            metric['value'] = sample.value
+            metric['exemplar'] = sample.exemplar
+
+    encoded = header
+    for metric in metrics.values():
+        body = label_pairs(metric['labels'])
+        body += bytes_field(value_field, _value_message(family.type, metric))
+        if metric['timestamp'] is not None:
+            body += uint_field(6, int(float(metric['timestamp']) * 1000))
+        encoded.append(bytes_field(4, body))
+    if getattr(family, 'unit', ''):
+        encoded.append(string_field(5, family.unit))
+    return b''.join(encoded)
+
+
+def _value_message(family_type: str, metric: Dict) -> bytes:
+    """Encode the Gauge/Counter/Summary/Untyped/Histogram sub-message."""
+    created = metric['created']
+    if family_type == 'counter':
+        message = double_field(1, metric['value'])
+        if metric['exemplar'] is not None:
+            message += bytes_field(2, exemplar(metric['exemplar']))
+        if created is not None:
+            message += bytes_field(3, timestamp(created))
+        return message
+    if family_type == 'summary':
+        message = uint_field(1, int(metric['count'])) + double_field(2, metric['sum'])
+        for quantile, value in metric['quantiles']:
+            message += bytes_field(3, double_field(1, quantile) + double_field(2, value))
+        if created is not None:
+            message += bytes_field(4, timestamp(created))
+        return message
+    if family_type in ('histogram', 'gaugehistogram'):
+        message = uint_field(1, int(metric['count'])) + double_field(2, metric['sum'])
+        for upper_bound, count, bucket_exemplar in metric['buckets']:
+            bucket = uint_field(1, int(count)) + double_field(2, upper_bound)
+            if bucket_exemplar is not None:
+                bucket += bytes_field(3, exemplar(bucket_exemplar))
+            message += bytes_field(3, bucket)
+        if created is not None:
+            message += bytes_field(15, timestamp(created))
+        return message
+    return double_field(1, metric['value'])
+
+
+def encode_families(families: Iterable) -> bytes:
+    """Encode metric families in the delimited format served on /metrics."""
+    return b''.join(delimited(encode_family(family)) for family in families)
+
+
+def decode_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Decode a varint at offset; returns (value, next offset)."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def decode_fields(message: bytes) -> List[Tuple[int, int, object]]:
+    """
+    Decode one message into (field, wire type, value) tuples.
+
+    Length-delimited values are returned as bytes, fixed64 as float.
+    Used by the tests and tools to inspect encoded output.
+    """
+    fields = []
+    offset = 0
+    while offset < len(message):
+        key, offset = decode_varint(message, offset)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, offset = decode_varint(message, offset)
+        elif wire_type == FIXED64:
+            value = _DOUBLE.unpack_from(message, offset)[0]
+            offset += 8
+        elif wire_type == LENGTH_DELIMITED:
+            length, offset = decode_varint(message, offset)
+            value = message[offset:offset + length]
+            offset += length
+        elif wire_type == 5:
+            value = message[offset:offset + 4]
+            offset += 4
+        else:
+            raise ValueError(f'unsupported wire type {wire_type}')
+        fields.append((field, wire_type, value))
+    return fields
+
+
+def split_delimited(data: bytes) -> List[bytes]:
+    """Split a delimited stream into its messages."""
+    messages = []
+    offset = 0
+    while offset < len(data):
+        length, offset = decode_varint(data, offset)
+        messages.append(data[offset:offset + length])
+        offset += length
+    return messages
+
+
+def find(fields: List[Tuple[int, int, object]], number: int) -> Optional[object]:
+    """Return the first value of a field number, or None."""
+    for field, _, value in fields:
+        if field == number:
+            return value
+    return None
@@ -0,0 +1,391 @@
+"""
+Prometheus remote_write client.
+Queues the samples of each exposition cycle and sends them in batches as
+snappy-compressed prometheus.WriteRequest protobuf messages, retrying with
+exponential backoff and replaying the queue after an outage. Also provides
+a small receiver that decodes remote_write requests, for tests and local
+debugging.
+"""
+import http.client
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from . import protobuf, snappy_codec
+
+CONTENT_TYPE = 'application/x-protobuf'
+PROTOCOL_VERSION = '0.1.0'
+
+# One queued cycle: (timestamp in ms, [(encoded labels, value)])
+Cycle = Tuple[int, List[Tuple[bytes, float]]]
+
+# Encoded label sets kept before the cache is reset (bounds series churn)
+MAX_CACHED_SERIES = 10000
+
+
+class RemoteWriteError(Exception):
+    """A send failed; recoverable errors are retried."""
+
+    def __init__(self, message: str, recoverable: bool):
+        super().__init__(message)
+        self.recoverable = recoverable
+
+
+def encode_labels(name: str, labels: Dict[str, str], external_labels: Dict[str, str]) -> bytes:
+    """Encode the sorted Label fields of a series (field 1 of TimeSeries)."""
+    merged = {**external_labels, **labels, '__name__': name}
+    return protobuf.label_pairs(merged)
+
+
+def encode_write_request(cycles: Iterable[Cycle]) -> bytes:
+    """
+    Encode queued cycles as a prometheus.WriteRequest.
+
+    Samples of one series across cycles are grouped into one TimeSeries,
+    oldest first.
+    """
+    series: Dict[bytes, List[bytes]] = {}
+    for timestamp_ms, samples in cycles:
+        for labels, value in samples:
+            sample = protobuf.double_field(1, value) + protobuf.uint_field(2, timestamp_ms)
+            encoded = protobuf.bytes_field(2, sample)
+            points = series.get(labels)
+            if points is None:
+                series[labels] = [encoded]
+            else:
+                points.append(encoded)
+    return b''.join(
+        protobuf.bytes_field(1, labels + b''.join(points))
+        for labels, points in series.items()
+    )
+
+
+def decode_write_request(body: bytes) -> List[Tuple[Dict[str, str], List[Tuple[int, float]]]]:
+    """Decode a WriteRequest into [(labels, [(timestamp ms, value)])]."""
+    decoded = []
+    for field, _, timeseries in protobuf.decode_fields(body):
+        if field != 1:
+            continue
+        labels = {}
+        samples = []
+        for number, _, value in protobuf.decode_fields(timeseries):
+            if number == 1:
+                pair = protobuf.decode_fields(value)
+                labels[(protobuf.find(pair, 1) or b'').decode()] = (protobuf.find(pair, 2) or b'').decode()
+            elif number == 2:
+                sample = protobuf.decode_fields(value)
+                samples.append((protobuf.find(sample, 2) or 0, protobuf.find(sample, 1) or 0.0))
+        decoded.append((labels, samples))
+    return decoded
+
+
+class RemoteWriter:
+    """
+    Batches exposition cycles and sends them to a remote_write endpoint.
+
+    enqueue() only appends to a bounded queue; a sender thread takes whole
+    cycles until batch_size samples are queued or the oldest cycle is
+    batch_deadline seconds old. Connection errors, 5xx and 429 responses
+    are retried with exponential backoff, keeping every queued cycle (with
+    its original timestamp) for replay; other 4xx responses drop the batch.
+    When the queue exceeds max_queue_samples, the oldest cycles are dropped.
+    """
+
+    def __init__(self, url: str, registry: Optional[CollectorRegistry] = None,
+                 external_labels: Optional[Dict[str, str]] = None, batch_size: int = 2000,
+                 batch_deadline: float = 5.0, max_queue_samples: int = 100000,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 10.0):
+        """
+        Args:
+            url: remote_write endpoint (http or https).
+            registry: Registry for the writer's own metrics (optional).
+            external_labels: Labels added to every series (e.g. instance).
+            batch_size: Samples that trigger a send.
+            batch_deadline: Seconds a cycle waits for a batch to fill.
+            max_queue_samples: Samples buffered before the oldest are dropped.
+            min_backoff: Seconds before the first retry.
+            max_backoff: Upper bound of the retry delay.
+            timeout: Seconds per HTTP request.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Invalid remote_write URL: {url}")
+        self.url = url
+        self.external_labels = dict(external_labels or {})
+        self.batch_size = batch_size
+        self.batch_deadline = batch_deadline
+        self.max_queue_samples = max_queue_samples
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self._parts = parts
+        self._path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._queue: Deque[Tuple[float, Cycle]] = deque()
+        self._queued_samples = 0
+        self._inflight_samples = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # (sample name, sorted labels) -> encoded labels
+        self._labels: Dict[Tuple, bytes] = {}
+        self._create_metrics(registry)
+
+    def _create_metrics(self, registry: Optional[CollectorRegistry]):
+        """Create queue depth, sent/dropped sample, failure and latency metrics."""
+        self.queue_metric = Gauge(
+            'exporter_remote_write_queue_samples',
+            'Samples waiting to be sent, including the batch being sent',
+            registry=registry
+        )
+        self.queue_metric.set_function(lambda: self.pending)
+        self.sent_metric = Counter(
+            'exporter_remote_write_sent_samples_total',
+            'Samples accepted by the remote_write endpoint',
+            registry=registry
+        )
+        self.dropped_metric = Counter(
+            'exporter_remote_write_dropped_samples_total',
+            'Samples dropped because the queue was full or the endpoint rejected them',
+            ['reason'],
+            registry=registry
+        )
+        self.failures_metric = Counter(
+            'exporter_remote_write_failures_total',
+            'Send attempts that failed and will be retried',
+            registry=registry
+        )
+        self.latency_metric = Histogram(
+            'exporter_remote_write_send_duration_seconds',
+            'Duration of remote_write requests',
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+            registry=registry
+        )
+
+    @property
+    def pending(self) -> int:
+        """Samples queued or being sent."""
+        return self._queued_samples + self._inflight_samples
+
+    def enqueue(self, families: Iterable, timestamp: float):
+        """
+        Queue one cycle of prometheus_client families (an ExpositionCache listener).
+
+        _created samples are skipped. Cheap: encoding and sending happen on
+        the sender thread, apart from the per-series label encoding, which
+        is cached.
+        """
+        cache = self._labels
+        if len(cache) > MAX_CACHED_SERIES:
+            cache = self._labels = {}
+        samples = []
+        for family in families:
+            for sample in family.samples:
+                if sample.name.endswith('_created'):
+                    continue
+                key = (sample.name, tuple(sorted(sample.labels.items())))
+                labels = cache.get(key)
+                if labels is None:
+                    labels = cache[key] = encode_labels(sample.name, sample.labels, self.external_labels)
+                samples.append((labels, sample.value))
+        self.enqueue_samples(int(timestamp * 1000), samples)
+
+    def enqueue_samples(self, timestamp_ms: int, samples: List[Tuple[bytes, float]]):
+        """Queue one cycle of (encoded labels, value) samples."""
+        if not samples:
+            return
+        with self._cond:
+            self._queue.append((time.monotonic(), (timestamp_ms, samples)))
+            self._queued_samples += len(samples)
+            while self._queued_samples + self._inflight_samples > self.max_queue_samples and self._queue:
+                _, (_, dropped) = self._queue.popleft()
+                self._queued_samples -= len(dropped)
+                self.dropped_metric.labels('queue_full').inc(len(dropped))
+            self._cond.notify()
+
+    def start(self):
+        """Start the sender thread."""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='remote-write', daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Flush what can be sent within timeout seconds and stop the sender."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _run(self):
+        """Sender loop."""
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._send_until_done(batch)
+
+    def _take_batch(self) -> Optional[List[Cycle]]:
+        """Wait for a full or expired batch and move it in flight; None once stopped and drained."""
+        with self._cond:
+            while True:
+                if self._queue:
+                    age = time.monotonic() - self._queue[0][0]
+                    if self._stopping or self._queued_samples >= self.batch_size or age >= self.batch_deadline:
+                        break
+                    self._cond.wait(self.batch_deadline - age)
+                elif self._stopping:
+                    return None
+                else:
+                    self._cond.wait()
+
+            batch = []
+            samples = 0
+            while self._queue and (not batch or samples + len(self._queue[0][1][1]) <= self.batch_size):
+                _, cycle = self._queue.popleft()
+                batch.append(cycle)
+                samples += len(cycle[1])
+            self._queued_samples -= samples
+            self._inflight_samples = samples
+            return batch
+
+    def _send_until_done(self, batch: List[Cycle]):
+        """Send a batch, retrying recoverable failures with exponential backoff."""
+        body = snappy_codec.compress(encode_write_request(batch))
+        backoff = self.min_backoff
+        try:
+            while True:
+                try:
+                    self.send(body)
+                    self.sent_metric.inc(self._inflight_samples)
+                    return
+                except RemoteWriteError as e:
+                    if not e.recoverable:
+                        self.dropped_metric.labels('rejected').inc(self._inflight_samples)
+                        return
+                    self.failures_metric.inc()
+                with self._cond:
+                    # Wake early only to give up at shutdown
+                    if self._cond.wait_for(lambda: self._stopping, backoff):
+                        self.dropped_metric.labels('shutdown').inc(self._inflight_samples + self._queued_samples)
+                        self._queue.clear()
+                        self._queued_samples = 0
+                        return
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            self._inflight_samples = 0
+
+    def send(self, body: bytes):
+        """
+        POST one compressed WriteRequest.
+
+        Raises:
+            RemoteWriteError: On connection errors or non-2xx responses.
+        """
+        headers = {
+            'Content-Type': CONTENT_TYPE,
+            'Content-Encoding': 'snappy',
+            'X-Prometheus-Remote-Write-Version': PROTOCOL_VERSION,
+            'User-Agent': 'system-exporter',
+        }
+        start = time.monotonic()
+        try:
+            if self._connection is None:
+                connection_class = http.client.HTTPSConnection if self._parts.scheme == 'https' \
+                    else http.client.HTTPConnection
+                self._connection = connection_class(self._parts.hostname, self._parts.port,
+                                                    timeout=self.timeout)
+            self._connection.request('POST', self._path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Reconnect on the next attempt
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            raise RemoteWriteError(f'remote_write request failed: {e}', recoverable=True) from e
+        finally:
+            self.latency_metric.observe(time.monotonic() - start)
+
+        if response.status // 100 != 2:
+            recoverable = response.status >= 500 or response.status == 429
+            raise RemoteWriteError(f'remote_write endpoint returned {response.status}', recoverable)
+
+
+class RemoteWriteHandler(BaseHTTPRequestHandler):
+    """Accepts remote_write POSTs and records the decoded series on the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status = self.server.fail_with
+        if status is None:
+            try:
+                series = decode_write_request(snappy_codec.decompress(body))
+            except (ValueError, IndexError):
+                status = 400
+            else:
+                with self.server.lock:
+                    self.server.requests += 1
+                    for labels, samples in series:
+                        key = tuple(sorted(labels.items()))
+                        self.server.series.setdefault(key, []).extend(samples)
+                status = 204
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        """Do not log every request."""
+
+
+class RemoteWriteReceiver(ThreadingHTTPServer):
+    """
+    Minimal remote_write endpoint keeping every received sample in memory.
+
+    series maps sorted label tuples to [(timestamp ms, value)]. Set
+    fail_with to an HTTP status to simulate an unavailable endpoint.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address):
+        self.series: Dict[Tuple, List[Tuple[int, float]]] = {}
+        self.requests = 0
+        self.fail_with: Optional[int] = None
+        self.lock = threading.Lock()
+        super().__init__(address, RemoteWriteHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/api/v1/write'
+
+    def samples(self, name: str) -> List[Tuple[int, float]]:
+        """Return the samples received for every series named name."""
+        with self.lock:
+            return [point for labels, points in self.series.items()
+                    if ('__name__', name) in labels for point in points]
+
+
+def start_remote_write_receiver(port: int = 0, addr: str = '127.0.0.1') -> RemoteWriteReceiver:
+    """
+    Serve a RemoteWriteReceiver from a daemon thread.
+
+    Returns:
+        The running receiver (call shutdown() to stop it).
+    """
+    receiver = RemoteWriteReceiver((addr, port))
+    thread = threading.Thread(target=receiver.serve_forever, name='remote-write-receiver', daemon=True)
+    thread.start()
+    return receiver
@@ -0,0 +1,331 @@
+"""
+Parallel collection scheduler.
+Runs each collector on a bounded thread pool with its own interval and
+deadline, so one slow or failing collector cannot stall the others.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Callable, Iterable, List, Optional
+from prometheus_client import Gauge, Counter, Histogram, CollectorRegistry
+
+from src.collectors.base_collector import BaseCollector
+
+# Seconds, for both wall and CPU time of one collection
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ALLOCATION_BUCKETS = (0, 100, 1000, 10000, 100000, 1000000)
+
+
+class AdaptiveInterval:
+    """
+    Collection interval that follows how much a collector's values move.
+
+    After each successful collection the watched values are compared with
+    those of the previous one. When one moved by at least its threshold
+    the interval is cut (tighten) down to floor; when none moved by half
+    its threshold the interval grows (backoff) up to ceiling; in between
+    it is kept. Only the extracted values are kept, so results that are
+    reused records can be watched too.
+    """
+
+    def __init__(self, floor: float, ceiling: float, thresholds: Dict[str, float],
+                 values: Optional[Callable[[Any], Dict[str, float]]] = None,
+                 backoff: float = 1.5, tighten: float = 0.5):
+        """
+        Args:
+            floor: Shortest interval, in seconds.
+            ceiling: Longest interval, in seconds.
+            thresholds: Watched value name -> change between two
+                collections that counts as volatile.
+            values: Extracts the watched values from a result (default:
+                the result itself, a collect() dictionary).
+            backoff: Factor applied to the interval while steady.
+            tighten: Factor applied to the interval while volatile.
+
+        Raises:
+            ValueError: On an empty range or factors that do not move the
+                interval in their direction.
+        """
+        if not 0 < floor <= ceiling:
+            raise ValueError("adaptive interval needs 0 < floor <= ceiling")
+        if backoff <= 1 or not 0 < tighten < 1:
+            raise ValueError("backoff must be > 1 and tighten between 0 and 1")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.thresholds = thresholds
+        self.values = values or (lambda result: result)
+        self.backoff = backoff
+        self.tighten = tighten
+        self._previous: Optional[Dict[str, float]] = None
+
+    def clamp(self, interval: float) -> float:
+        """Return interval bounded to [floor, ceiling]."""
+        return min(max(interval, self.floor), self.ceiling)
+
+    def adjust(self, interval: float, result: Any) -> float:
+        """Return the interval to use after a collection that returned result."""
+        current = self.values(result)
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return self.clamp(interval)
+        change = max((abs(current[key] - previous[key]) / threshold
+                      for key, threshold in self.thresholds.items() if key in current and key in previous),
+                     default=0.0)
+        if change >= 1:
+            return max(interval * self.tighten, self.floor)
+        if change < 0.5:
+            return min(interval * self.backoff, self.ceiling)
+        return self.clamp(interval)
+
+
+class ScheduledCollector:
+    """Scheduling state for one collector."""
+
+    def __init__(self, name: str, collector: BaseCollector, interval: float, timeout: float,
+                 policy: Optional[AdaptiveInterval] = None):
+        self.name = name
+        self.collector = collector
+        self.interval = policy.clamp(interval) if policy is not None else interval
+        self.timeout = timeout
+        self.policy = policy
+
+        self.result: Any = {}
+        self.stale = True
+        self.next_due = 0.0
+        self.future = None
+        self.started = 0.0
+        self.duration = 0.0
+        self.cpu_time = 0.0
+        self.allocated_blocks = 0
+        self.last_success = 0.0
+
+    def run(self, profiler=None) -> Any:
+        """
+        Run the collector, recording its cost (called on a worker thread).
+
+        Records wall time, CPU time of this thread (threads the collector
+        starts itself are not included) and the memory blocks still
+        allocated afterwards. The block count is process-wide, so it is
+        approximate while other collectors run concurrently.
+
+        Args:
+            profiler: Optional CollectionProfiler wrapping the call.
+        """
+        start = time.monotonic()
+        cpu_start = time.thread_time()
+        blocks_start = sys.getallocatedblocks()
+        try:
+            if profiler is not None:
+                return profiler.profile(self.collector.sample)
+            return self.collector.sample()
+        finally:
+            self.duration = time.monotonic() - start
+            self.cpu_time = time.thread_time() - cpu_start
+            self.allocated_blocks = max(sys.getallocatedblocks() - blocks_start, 0)
+
+
+class CollectionScheduler:
+    """
+    Runs due collectors concurrently and keeps their latest results.
+
+    A collector that misses its deadline keeps running in the background;
+    its previous result is kept and marked stale until it finishes. It is
+    not resubmitted while still running, so a hung collector occupies at
+    most one worker.
+    """
+
+    def __init__(self, max_workers: int = 4, registry: Optional[CollectorRegistry] = None):
+        """
+        Args:
+            max_workers: Size of the collection thread pool.
+            registry: Registry for the scheduler's own metrics (optional).
+        """
+        self.entries: Dict[str, ScheduledCollector] = {}
+        # Optional CollectionProfiler applied to every collection
+        self.profiler = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='collector')
+        self._create_metrics(registry)
+
+    def _create_metrics(self, registry: Optional[CollectorRegistry]):
+        """Create per-collector duration, timeout, error and staleness metrics."""
+        self.duration_metric = Gauge(
+            'exporter_collector_duration_seconds',
+            'Duration of the last collection per collector',
+            ['collector'],
+            registry=registry
+        )
+        self.timeouts_metric = Counter(
+            'exporter_collector_timeouts_total',
+            'Collections that missed their deadline',
+            ['collector'],
+            registry=registry
+        )
+        self.errors_metric = Counter(
+            'exporter_collector_errors_total',
+            'Collections that raised an exception',
+            ['collector'],
+            registry=registry
+        )
+        self.stale_metric = Gauge(
+            'exporter_collector_stale',
+            'Whether the collector result is stale (1) or fresh (0)',
+            ['collector'],
+            registry=registry
+        )
+        self.last_success_metric = Gauge(
+            'exporter_collector_last_success_timestamp_seconds',
+            'Unix time of the last successful collection',
+            ['collector'],
+            registry=registry
+        )
+        self.wall_metric = Histogram(
+            'exporter_collector_wall_seconds',
+            'Wall time per collection',
+            ['collector'],
+            buckets=DURATION_BUCKETS,
+            registry=registry
+        )
+        self.cpu_metric = Histogram(
+            'exporter_collector_cpu_seconds',
+            'CPU time of the collecting thread per collection',
+            ['collector'],
+            buckets=DURATION_BUCKETS,
+            registry=registry
+        )
+        self.interval_metric = Gauge(
+            'exporter_collector_interval_seconds',
+            'Current interval between collections per collector',
+            ['collector'],
+            registry=registry
+        )
+        self.allocations_metric = Histogram(
+            'exporter_collector_allocated_blocks',
+            'Memory blocks still allocated after a collection (process-wide, approximate)',
+            ['collector'],
+            buckets=ALLOCATION_BUCKETS,
+            registry=registry
+        )
+
+    def add(self, name: str, collector: BaseCollector, interval: float, timeout: float,
+            policy: Optional[AdaptiveInterval] = None):
+        """
+        Schedule a collector.
+
+        Args:
+            name: Key the collector's results are returned under.
+            collector: Collector to run.
+            interval: Seconds between collections (the initial interval
+                with a policy).
+            timeout: Seconds to wait for one collection before marking it stale.
+            policy: Optional AdaptiveInterval adjusting the interval after
+                each successful collection.
+        """
+        entry = self.entries[name] = ScheduledCollector(name, collector, interval, timeout, policy)
+        self.interval_metric.labels(collector=name).set(entry.interval)
+        self.stale_metric.labels(collector=name).set(1)
+        self.timeouts_metric.labels(collector=name)
+        self.errors_metric.labels(collector=name)
+
+    def run_due(self) -> Dict[str, Any]:
+        """
+        Run every due collector in parallel and wait for their deadlines.
+
+        Returns:
+            Latest result per collector (see snapshot()).
+        """
+        # Pick up collectors that finished after missing an earlier deadline
+        for entry in self.entries.values():
+            if entry.future is not None and entry.future.done():
+                self._finish(entry)
+
+        now = time.monotonic()
+        running: List[ScheduledCollector] = []
+        for entry in self.entries.values():
+            if entry.future is None and now >= entry.next_due:
+                entry.started = now
+                entry.next_due = now + entry.interval
+                entry.future = self._pool.submit(entry.run, self.profiler)
+                running.append(entry)
+
+        # Wait for each collector until its own deadline
+        for entry in sorted(running, key=lambda e: e.started + e.timeout):
+            remaining = entry.started + entry.timeout - time.monotonic()
+            wait([entry.future], timeout=max(remaining, 0))
+            if entry.future.done():
+                self._finish(entry)
+            else:
+                entry.stale = True
+                self.timeouts_metric.labels(collector=entry.name).inc()
+                self.stale_metric.labels(collector=entry.name).set(1)
+
+        return self.snapshot()
+
+    def _finish(self, entry: ScheduledCollector):
+        """Record the outcome of a completed collection."""
+        future, entry.future = entry.future, None
+        self.duration_metric.labels(collector=entry.name).set(entry.duration)
+        self.wall_metric.labels(collector=entry.name).observe(entry.duration)
+        self.cpu_metric.labels(collector=entry.name).observe(entry.cpu_time)
+        self.allocations_metric.labels(collector=entry.name).observe(entry.allocated_blocks)
+
+        error = future.exception()
+        if error is not None:
+            # Keep the previous result, but flag it as stale
+            entry.stale = True
+            self.errors_metric.labels(collector=entry.name).inc()
+        else:
+            entry.result = future.result()
+            entry.stale = False
+            if entry.policy is not None:
+                self._adapt(entry)
+            entry.last_success = time.time()
+            self.last_success_metric.labels(collector=entry.name).set(entry.last_success)
+
+        self.stale_metric.labels(collector=entry.name).set(1 if entry.stale else 0)
+
+    def _adapt(self, entry: ScheduledCollector):
+        """Apply the entry's policy to its interval and reschedule it."""
+        scheduled = entry.started + entry.interval
+        entry.interval = entry.policy.adjust(entry.interval, entry.result)
+        if entry.next_due == scheduled:
+            # Not expedited since it was submitted
+            entry.next_due = entry.started + entry.interval
+        self.interval_metric.labels(collector=entry.name).set(entry.interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the latest (possibly stale) result of every collector.
+
+        Results are whatever each collector's sample() returns: a dict, or
+        a reused record such as DiskSample ({} until the first success).
+        """
+        return {name: entry.result for name, entry in self.entries.items()}
+
+    def stale_collectors(self) -> List[str]:
+        """Return the names of collectors whose result is stale."""
+        return [name for name, entry in self.entries.items() if entry.stale]
+
+    def expedite(self, names: Iterable[str]):
+        """
+        Make collectors due now, ahead of their interval.
+
+        Unknown names are ignored; a collector still running is not
+        resubmitted. The next run_due() collects them.
+        """
+        now = time.monotonic()
+        for name in names:
+            entry = self.entries.get(name)
+            if entry is not None:
+                entry.next_due = min(entry.next_due, now)
+
+    def seconds_until_due(self) -> float:
+        """Return seconds until the next collector is due (0 if one is due now)."""
+        if not self.entries:
+            return 0.0
+        next_due = min(entry.next_due for entry in self.entries.values())
+        return max(next_due - time.monotonic(), 0.0)
+
+    def shutdown(self):
+        """Stop accepting work without waiting for hung collectors."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
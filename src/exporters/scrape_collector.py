@@ -0,0 +1,181 @@
+"""
+Scrape-driven Prometheus collector.
+Builds metric families on demand from the system collectors so every
+scrape sees one consistent snapshot.
+"""
+import threading
+import time
+from typing import Dict, Any, Callable, Iterator, Optional
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from prometheus_client.registry import Collector
+
+# (disk_io_rates key, metric name, help); shared with push mode
+DISK_RATE_METRICS = [
+    ('read_bytes_per_sec', 'node_disk_read_bytes_per_second', 'Disk read throughput'),
+    ('write_bytes_per_sec', 'node_disk_write_bytes_per_second', 'Disk write throughput'),
+    ('read_iops', 'node_disk_reads_per_second', 'Completed disk reads per second'),
+    ('write_iops', 'node_disk_writes_per_second', 'Completed disk writes per second'),
+    ('read_await_ms', 'node_disk_read_await_milliseconds', 'Average time per completed read'),
+    ('write_await_ms', 'node_disk_write_await_milliseconds', 'Average time per completed write'),
+    ('await_ms', 'node_disk_await_milliseconds', 'Average time per completed I/O'),
+    ('util_percent', 'node_disk_utilization_percent', 'Share of time the disk was busy'),
+]
+
+
+class SystemMetricsCollector(Collector):
+    """
+    Custom prometheus_client collector that collects on scrape.
+
+    A snapshot younger than min_freshness seconds is reused, and concurrent
+    scrapes wait for the collection already in flight instead of starting
+    their own, so several Prometheus replicas scraping at once share one
+    collection.
+    """
+
+    def __init__(self, snapshot_fn: Callable[[], Dict[str, Any]],
+                 min_freshness: float = 5.0):
+        """
+        Args:
+            snapshot_fn: Callable returning collector results keyed by
+                collector ('cpu', 'memory', 'disk', 'network', 'process'),
+                as returned by CollectionScheduler.run_due().
+            min_freshness: Seconds a snapshot may be reused for.
+        """
+        self.snapshot_fn = snapshot_fn
+        self.min_freshness = min_freshness
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_time = 0.0
+
+    def describe(self):
+        """Skip the collect() call the registry makes on registration."""
+        return []
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Return a cached snapshot, collecting a new one if it is stale."""
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or now - self._snapshot_time >= self.min_freshness:
+                self._snapshot = self.snapshot_fn()
+                self._snapshot_time = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Make the next scrape collect a new snapshot, whatever min_freshness."""
+        with self._lock:
+            self._snapshot = None
+
+    def collect(self) -> Iterator:
+        """Yield metric families built from the current snapshot."""
+        snapshot = self.get_snapshot()
+        yield from self._cpu_families(snapshot.get('cpu', {}))
+        yield from self._memory_families(snapshot.get('memory', {}))
+        # Disk and network results are DiskSample / NetworkSample records
+        # ({} or missing until their collector first succeeds)
+        yield from self._disk_families(snapshot.get('disk'))
+        yield from self._network_families(snapshot.get('network'))
+        yield from self._process_families(snapshot.get('process', {}))
+
+    def _cpu_families(self, cpu_metrics: Dict[str, Any]) -> Iterator:
+        """Build CPU metric families."""
+        yield GaugeMetricFamily('node_cpu_usage_percent', 'CPU usage percentage',
+                                value=cpu_metrics.get('cpu_usage_percent', 0))
+
+        load_average = GaugeMetricFamily('node_load_average', 'Load average', labels=['period'])
+        if 'load_average_1m' in cpu_metrics:
+            for period in ('1m', '5m', '15m'):
+                load_average.add_metric([period], cpu_metrics[f'load_average_{period}'])
+        yield load_average
+
+    def _memory_families(self, mem_metrics: Dict[str, Any]) -> Iterator:
+        """Build memory metric families (total memory is exported with the host facts)."""
+        gauges = [
+            ('node_memory_used_bytes', 'Used memory in bytes', 'memory_used'),
+            ('node_memory_available_bytes', 'Available memory in bytes', 'memory_available'),
+            ('node_memory_usage_percent', 'Memory usage percentage', 'memory_percent'),
+            ('node_swap_total_bytes', 'Total swap in bytes', 'swap_total'),
+            ('node_swap_used_bytes', 'Used swap in bytes', 'swap_used'),
+            ('node_swap_usage_percent', 'Swap usage percentage', 'swap_percent'),
+        ]
+        for name, documentation, key in gauges:
+            yield GaugeMetricFamily(name, documentation, value=mem_metrics.get(key, 0))
+
+    def _disk_families(self, disk: Any) -> Iterator:
+        """Build disk usage and I/O metric families from a DiskSample."""
+        labels = ['device', 'mountpoint']
+        disk_usage = GaugeMetricFamily('node_disk_usage_bytes', 'Disk usage in bytes', labels=labels)
+        disk_total = GaugeMetricFamily('node_disk_total_bytes', 'Total disk space in bytes', labels=labels)
+        disk_usage_percent = GaugeMetricFamily('node_disk_usage_percent', 'Disk usage percentage', labels=labels)
+        read_bytes = CounterMetricFamily('node_disk_io_read_bytes', 'Total bytes read from disk', labels=['device'])
+        write_bytes = CounterMetricFamily('node_disk_io_write_bytes', 'Total bytes written to disk', labels=['device'])
+        # Rate families are always exposed, even before the second sample
+        rate_families = [(key, GaugeMetricFamily(name, documentation, labels=['device']))
+                         for key, name, documentation in DISK_RATE_METRICS]
+
+        if disk:
+            for partition in disk.partitions:
+                label_values = [partition['device'], partition['mountpoint']]
+                disk_total.add_metric(label_values, partition['total'])
+                disk_usage.add_metric(label_values, partition['used'])
+                disk_usage_percent.add_metric(label_values, partition['percent'])
+
+            if disk.has_io:
+                read_column = disk.io.column('read_bytes')
+                write_column = disk.io.column('write_bytes')
+                for device, slot in disk.io.items():
+                    read_bytes.add_metric([device], read_column[slot])
+                    write_bytes.add_metric([device], write_column[slot])
+
+            measured = disk.rate_fields()
+            for key, family in rate_families:
+                if key in measured:
+                    column = disk.rates.column(key)
+                    for device, slot in disk.rates.items():
+                        family.add_metric([device], column[slot])
+
+        yield from (disk_usage, disk_total, disk_usage_percent, read_bytes, write_bytes)
+        for _, family in rate_families:
+            yield family
+
+    def _network_families(self, network: Any) -> Iterator:
+        """Build network metric families from a NetworkSample."""
+        counters = [
+            ('node_network_receive_bytes', 'Total bytes received', 'bytes_recv'),
+            ('node_network_transmit_bytes', 'Total bytes transmitted', 'bytes_sent'),
+            ('node_network_receive_packets', 'Total packets received', 'packets_recv'),
+            ('node_network_transmit_packets', 'Total packets transmitted', 'packets_sent'),
+        ]
+        for name, documentation, key in counters:
+            family = CounterMetricFamily(name, documentation, labels=['interface'])
+            if network and network.has_io:
+                column = network.io.column(key)
+                for interface, slot in network.io.items():
+                    family.add_metric([interface], column[slot])
+            yield family
+
+        if network and network.connections is not None:
+            yield GaugeMetricFamily('node_network_connections_total', 'Total network connections',
+                                    value=network.connections_total)
+
+    def _process_families(self, proc_metrics: Dict[str, Any]) -> Iterator:
+        """Build process metric families (only the current top-N per list)."""
+        if not proc_metrics:
+            return
+        yield GaugeMetricFamily('node_processes', 'Number of processes',
+                                value=proc_metrics.get('process_count', 0))
+        yield GaugeMetricFamily('node_processes_zombie', 'Number of zombie processes',
+                                value=proc_metrics.get('process_zombie_count', 0))
+        yield GaugeMetricFamily('node_threads', 'Total number of threads',
+                                value=proc_metrics.get('thread_count_total', 0))
+
+        top_cpu = GaugeMetricFamily('node_top_process_cpu_percent', 'CPU usage of the top processes by CPU',
+                                    labels=['name', 'pid'])
+        for proc in proc_metrics.get('top_processes_cpu', []):
+            top_cpu.add_metric([proc['name'], str(proc['pid'])], proc['cpu_percent'])
+        yield top_cpu
+
+        top_memory = GaugeMetricFamily('node_top_process_memory_percent',
+                                       'Memory usage of the top processes by memory', labels=['name', 'pid'])
+        for proc in proc_metrics.get('top_processes_memory', []):
+            top_memory.add_metric([proc['name'], str(proc['pid'])], proc['memory_percent'])
+        yield top_memory
@@ -0,0 +1,174 @@
+"""
+Snappy block-format codec.
+remote_write bodies are snappy-compressed protobuf; this implements the raw
+block format (not the framing format) in pure Python, and uses the
+python-snappy extension instead when it is installed.
+"""
+from .protobuf import decode_varint, varint
+
+try:
+    import snappy as _snappy
+except ImportError:  # pragma: no cover - depends on the environment
+    _snappy = None
+
+# Copies reference at most this far back (2-byte offsets)
+MAX_OFFSET = 0xFFFF
+
+# Literal, 1-byte-offset copy, 2-byte-offset copy, 4-byte-offset copy
+LITERAL = 0
+COPY_1 = 1
+COPY_2 = 2
+COPY_4 = 3
+
+
+def compress(data: bytes) -> bytes:
+    """Compress data in the snappy block format."""
+    if _snappy is not None:
+        return _snappy.compress(data)
+    return _compress(bytes(data))
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decompress a snappy block.
+
+    Raises:
+        ValueError: If data is not a valid snappy block.
+    """
+    if _snappy is not None:
+        try:
+            return _snappy.decompress(data)
+        except Exception as e:
+            raise ValueError(f'invalid snappy block: {e}') from e
+    try:
+        return _decompress(bytes(data))
+    except IndexError as e:
+        raise ValueError('truncated snappy block') from e
+
+
+def _compress(data: bytes) -> bytes:
+    """Greedy compressor matching 4-byte sequences through a hash table."""
+    n = len(data)
+    out = bytearray(varint(n))
+    table = {}
+    i = literal_start = 0
+    misses = 32
+    limit = n - 4
+    while i <= limit:
+        key = data[i:i + 4]
+        candidate = table.get(key)
+        table[key] = i
+        if candidate is None or i - candidate > MAX_OFFSET:
+            # Skip ahead faster through incompressible input, as snappy does
+            i += misses >> 5
+            misses += 1
+            continue
+        misses = 32
+
+        length = 4
+        available = n - i
+        while length + 32 <= available and data[candidate + length:candidate + length + 32] == \
+                data[i + length:i + length + 32]:
+            length += 32
+        while length < available and data[candidate + length] == data[i + length]:
+            length += 1
+
+        if literal_start < i:
+            _emit_literal(out, data, literal_start, i)
+        _emit_copy(out, i - candidate, length)
+        i += length
+        literal_start = i
+        if i - 1 <= limit:
+            table[data[i - 1:i + 3]] = i - 1
+
+    if literal_start < n:
+        _emit_literal(out, data, literal_start, n)
+    return bytes(out)
+
+
+def _emit_literal(out: bytearray, data: bytes, start: int, end: int):
+    """Append a literal element for data[start:end]."""
+    length = end - start - 1
+    if length < 60:
+        out.append(length << 2 | LITERAL)
+    elif length < 0x100:
+        out.append(60 << 2 | LITERAL)
+        out.append(length)
+    elif length < 0x10000:
+        out.append(61 << 2 | LITERAL)
+        out += length.to_bytes(2, 'little')
+    elif length < 0x1000000:
+        out.append(62 << 2 | LITERAL)
+        out += length.to_bytes(3, 'little')
+    else:
+        out.append(63 << 2 | LITERAL)
+        out += length.to_bytes(4, 'little')
+    out += data[start:end]
+
+
+def _emit_copy(out: bytearray, offset: int, length: int):
+    """Append copy elements of length bytes from offset bytes back."""
+    # Copies carry at most 64 bytes; keep the remainder at 4 or more
+    while length >= 68:
+        out.append(63 << 2 | COPY_2)
+        out += offset.to_bytes(2, 'little')
+        length -= 64
+    if length > 64:
+        out.append(59 << 2 | COPY_2)
+        out += offset.to_bytes(2, 'little')
+        length -= 60
+    if length < 12 and offset < 2048:
+        out.append((offset >> 8) << 5 | (length - 4) << 2 | COPY_1)
+        out.append(offset & 0xFF)
+    else:
+        out.append((length - 1) << 2 | COPY_2)
+        out += offset.to_bytes(2, 'little')
+
+
+def _decompress(data: bytes) -> bytes:
+    """Decode a snappy block."""
+    expected, i = decode_varint(data, 0)
+    out = bytearray()
+    n = len(data)
+    while i < n:
+        tag = data[i]
+        kind = tag & 3
+        i += 1
+        if kind == LITERAL:
+            length = tag >> 2
+            if length >= 60:
+                size = length - 59
+                length = int.from_bytes(data[i:i + size], 'little')
+                i += size
+            length += 1
+            if i + length > n:
+                raise ValueError('truncated snappy literal')
+            out += data[i:i + length]
+            i += length
+            continue
+
+        if kind == COPY_1:
+            length = (tag >> 2 & 7) + 4
+            offset = (tag >> 5) << 8 | data[i]
+            i += 1
+        elif kind == COPY_2:
+            length = (tag >> 2) + 1
+            offset = int.from_bytes(data[i:i + 2], 'little')
+            i += 2
+        else:
+            length = (tag >> 2) + 1
+            offset = int.from_bytes(data[i:i + 4], 'little')
+            i += 4
+        if offset == 0 or offset > len(out):
+            raise ValueError('invalid snappy copy offset')
+        start = len(out) - offset
+        if offset >= length:
+            out += out[start:start + length]
+        else:
+            # Overlapping copy repeats the last offset bytes
+            pattern = out[start:]
+            out += (pattern * (length // offset + 1))[:length]
+
+    if len(out) != expected:
+        raise ValueError('snappy length mismatch')
+    return bytes(out)
@@ -0,0 +1,8 @@
+"""Local storage of collected metrics."""
+from .ring_store import RingStore, family_samples, series_key
+
+__all__ = [
+    'RingStore',
+    'family_samples',
+    'series_key',
+]
@@ -0,0 +1,273 @@
+"""
+Fixed-size on-disk time-series ring buffer.
+One memory-mapped file holds a timestamp column and one float64 column per
+series; each write overwrites the oldest slot, so the file never grows.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# magic, version, capacity, max_series, head (next slot), count (filled slots)
+HEADER = struct.Struct('<8sIIIIQQ')
+HEADER_SIZE = 64
+MAGIC = b'RINGTS01'
+VERSION = 1
+
+DATA_FILE = 'ring.dat'
+SERIES_FILE = 'series.json'
+
+NAN = float('nan')
+
+
+def capacity_for(max_bytes: int, max_series: int) -> int:
+    """Return how many samples per series fit in max_bytes."""
+    return max((max_bytes - HEADER_SIZE) // (8 * (max_series + 1)), 2)
+
+
+class RingStore:
+    """
+    Circular time-series store backed by a memory-mapped file.
+
+    Layout: a header, the timestamp column (capacity float64), then
+    max_series value columns of capacity float64 each. Series names are
+    kept in a JSON sidecar rewritten only when a series is added or
+    removed. Missing values are NaN. Once every column is taken, the columns
+    of series not written for a full ring (all NaN by then) are reclaimed
+    for new series; series that still find no column are dropped and
+    counted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 4 * 1024 * 1024, max_series: int = 512):
+        """
+        Args:
+            directory: Directory holding the data file (created if missing).
+            max_bytes: Size of the data file.
+            max_series: Number of value columns.
+        """
+        self.directory = directory
+        self.max_series = max_series
+        self.capacity = capacity_for(max_bytes, max_series)
+        self.dropped_series = 0
+        self.reclaimed_series = 0
+        self._lock = threading.Lock()
+        self._series: Dict[str, int] = {}
+        # Columns not assigned to a series, and the number of columns ever assigned
+        self._free: List[int] = []
+        self._columns = 0
+        # Appends so far, and the append that last wrote each series
+        self._cycle = 0
+        self._written: Dict[str, int] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        size = HEADER_SIZE + 8 * self.capacity * (max_series + 1)
+        path = os.path.join(directory, DATA_FILE)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            reuse = os.fstat(fd).st_size == size and self._header_matches(fd)
+            if not reuse:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        # Float views over the mapping: writes are plain item assignments
+        self._floats = memoryview(self._mmap)[HEADER_SIZE:].cast('d')
+        if reuse:
+            self._head, self._count = HEADER.unpack_from(self._mmap)[5:7]
+            self._load_series()
+        else:
+            self._head = self._count = 0
+            self._write_header()
+            self._save_series()
+
+    def _header_matches(self, fd: int) -> bool:
+        """Return True if an existing file has this store's geometry."""
+        header = os.pread(fd, HEADER.size, 0)
+        if len(header) < HEADER.size:
+            return False
+        magic, version, capacity, max_series = HEADER.unpack(header)[:4]
+        return magic == MAGIC and version == VERSION and capacity == self.capacity \
+            and max_series == self.max_series
+
+    def _write_header(self):
+        HEADER.pack_into(self._mmap, 0, MAGIC, VERSION, self.capacity, self.max_series, 0,
+                         self._head, self._count)
+
+    def _load_series(self):
+        try:
+            with open(os.path.join(self.directory, SERIES_FILE)) as f:
+                self._series = {name: int(index) for name, index in json.load(f).items()}
+        except (OSError, ValueError):
+            # Values without names cannot be queried: start over
+            self._series = {}
+            self._head = self._count = 0
+            self._write_header()
+        self._columns = max(self._series.values(), default=-1) + 1
+        self._free = sorted(set(range(self._columns)) - set(self._series.values()), reverse=True)
+        # Last writes are not persisted: reclaimable a full ring after reopening
+        self._written = dict.fromkeys(self._series, 0)
+
+    def _save_series(self):
+        path = os.path.join(self.directory, SERIES_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._series, f)
+        os.replace(path + '.tmp', path)
+
+    def append(self, timestamp: float, samples: Iterable[Tuple[str, float]]):
+        """
+        Write one cycle of samples into the oldest slot.
+
+        Args:
+            timestamp: Unix time of the cycle.
+            samples: (series name, value) pairs.
+        """
+        with self._lock:
+            capacity = self.capacity
+            slot = self._head
+            floats = self._floats
+            cycle = self._cycle = self._cycle + 1
+            written = self._written
+            # Clear the values this slot held a full ring ago
+            for index in self._series.values():
+                floats[capacity * (index + 1) + slot] = NAN
+
+            changed = False
+            for name, value in samples:
+                index = self._series.get(name)
+                if index is None:
+                    index = self._allocate(name)
+                    if index is None:
+                        self.dropped_series += 1
+                        continue
+                    changed = True
+                floats[capacity * (index + 1) + slot] = value
+                written[name] = cycle
+            floats[slot] = timestamp
+
+            self._head = (slot + 1) % capacity
+            self._count = min(self._count + 1, capacity)
+            HEADER.pack_into(self._mmap, 0, MAGIC, VERSION, capacity, self.max_series, 0,
+                             self._head, self._count)
+            if changed:
+                self._save_series()
+
+    def _allocate(self, name: str) -> Optional[int]:
+        """Assign a column to a new series; None if every column holds a live series."""
+        if not self._free and self._columns < self.max_series:
+            self._free.append(self._columns)
+            self._columns += 1
+        if not self._free:
+            self._reclaim()
+            if not self._free:
+                return None
+        index = self._series[name] = self._free.pop()
+        return index
+
+    def _reclaim(self):
+        """Free the columns of series not written for a full ring."""
+        oldest = self._cycle - self.capacity
+        for name, last in list(self._written.items()):
+            if last <= oldest:
+                # Every slot was cleared since its last write: the column is all NaN
+                self._free.append(self._series.pop(name))
+                del self._written[name]
+                self.reclaimed_series += 1
+
+    def series(self) -> List[str]:
+        """Return the stored series names."""
+        with self._lock:
+            return sorted(self._series)
+
+    def query(self, name: str, start: float = 0.0, end: float = math.inf,
+              step: Optional[float] = None) -> List[Tuple]:
+        """
+        Return the samples of a series between start and end (inclusive).
+
+        Args:
+            name: Series name.
+            start: Unix time of the first sample.
+            end: Unix time of the last sample.
+            step: If set, downsample to step-second buckets.
+
+        Returns:
+            [(timestamp, value)] oldest first, or with step
+            [(bucket start, min, max, avg)] for buckets holding samples.
+
+        Raises:
+            KeyError: If the series is unknown.
+        """
+        with self._lock:
+            index = self._series[name]
+            capacity = self.capacity
+            floats = self._floats
+            base = capacity * (index + 1)
+            oldest = (self._head - self._count) % capacity
+            points = []
+            for i in range(self._count):
+                slot = (oldest + i) % capacity
+                timestamp = floats[slot]
+                if start <= timestamp <= end:
+                    value = floats[base + slot]
+                    if value == value:  # not NaN
+                        points.append((timestamp, value))
+
+        if not step:
+            return points
+        return downsample(points, step)
+
+    def flush(self):
+        """Write dirty pages to disk."""
+        self._mmap.flush()
+
+    def close(self):
+        """Flush and unmap the data file."""
+        with self._lock:
+            self._floats.release()
+            self._mmap.flush()
+            self._mmap.close()
+
+
+def downsample(points: List[Tuple[float, float]], step: float) -> List[Tuple[float, float, float, float]]:
+    """Reduce (timestamp, value) points to (bucket start, min, max, avg) per step."""
+    buckets = []
+    current = None
+    for timestamp, value in points:
+        bucket = math.floor(timestamp / step) * step
+        if current is None or bucket != current[0]:
+            if current is not None:
+                buckets.append((current[0], current[1], current[2], current[3] / current[4]))
+            current = [bucket, value, value, value, 1]
+        else:
+            current[1] = min(current[1], value)
+            current[2] = max(current[2], value)
+            current[3] += value
+            current[4] += 1
+    if current is not None:
+        buckets.append((current[0], current[1], current[2], current[3] / current[4]))
+    return buckets
+
+
+def series_key(name: str, labels: Dict[str, str]) -> str:
+    """Return the series name of a sample, e.g. 'node_load1' or 'm{a="x",b="y"}'."""
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+
+def family_samples(families: Iterable) -> Iterator[Tuple[str, float]]:
+    """
+    Yield (series name, value) for the samples of prometheus_client families worth keeping.
+
+    Skips _created and histogram _bucket samples (the _sum and _count stay),
+    and per-process series (a pid label), which churn with the processes.
+    """
+    for family in families:
+        for sample in family.samples:
+            if sample.name.endswith(('_created', '_bucket')) or 'pid' in sample.labels:
+                continue
+            yield series_key(sample.name, sample.labels), sample.value
@@ -1,14 +1,21 @@
 """Integration tests for metrics exporter."""
+import json
 import pytest
+import threading
 import time
 from unittest.mock import patch, MagicMock
 import sys
 import os
+from prometheus_client import generate_latest
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.exporters.metrics_exporter import MetricsExporter
+from src.collectors.pressure import Trigger
+from src.exporters.metrics_exporter import MetricsExporter, disk_activity, main
+from src.exporters.exposition import start_metrics_server
+from src.exporters.gateway import Target
+from src.exporters.remote_write import start_remote_write_receiver
 
 
 class TestMetricsExporter:
@@ -88,6 +95,359 @@ class TestMetricsExporter:
         # Should complete without errors
         assert True
 
+    def test_collector_self_metrics(self):
+        """Test that per-collector scheduler metrics are exported."""
+        exporter = MetricsExporter(port=9101)
+        exporter.update_metrics()
+
+        for collector in ('cpu', 'memory', 'disk', 'network'):
+            labels = {'collector': collector}
+            assert exporter.registry.get_sample_value('exporter_collector_duration_seconds', labels) is not None
+            assert exporter.registry.get_sample_value('exporter_collector_stale', labels) == 0
+
+    def test_process_metrics_exported(self):
+        """Test that process counts and top-N series are exported."""
+        exporter = MetricsExporter(port=9101, top_processes=3)
+        exporter.update_metrics()
+
+        assert exporter.registry.get_sample_value('node_processes') > 0
+        assert exporter.registry.get_sample_value('node_threads') > 0
+        samples = [s for m in exporter.registry.collect() if m.name == 'node_top_process_cpu_percent'
+                   for s in m.samples]
+        assert 0 < len(samples) <= 3
+
+    def test_stale_process_series_removed(self):
+        """Test that processes leaving the top-N are removed from the registry."""
+        exporter = MetricsExporter(port=9101)
+
+        def process_snapshot(pids):
+            top = [{'pid': pid, 'name': f'proc{pid}', 'cpu_percent': 1.0, 'memory_percent': 1.0} for pid in pids]
+            return {'process': {'process_count': len(pids), 'top_processes_cpu': top, 'top_processes_memory': top}}
+
+        def exported_pids():
+            return {s.labels['pid'] for m in exporter.registry.collect()
+                    if m.name == 'node_top_process_cpu_percent' for s in m.samples}
+
+        with patch.object(exporter, 'collect_snapshot', return_value=process_snapshot([1, 2, 3])):
+            exporter.update_metrics()
+        assert exported_pids() == {'1', '2', '3'}
+
+        with patch.object(exporter, 'collect_snapshot', return_value=process_snapshot([3, 4])):
+            exporter.update_metrics()
+        assert exported_pids() == {'3', '4'}
+
+    def test_disk_rate_series_follow_devices(self):
+        """Test that disk rate gauges are exported and removed with the device."""
+        exporter = MetricsExporter(port=9101)
+        sample = exporter.disk_collector.sample()
+        rates = (1024.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 50.0)
+        sample.has_busy_time = True
+
+        sample.rates.begin()
+        sample.rates.put('sda', rates)
+        sample.rates.put('sdb', rates)
+        with patch.object(exporter, 'collect_snapshot', return_value={'disk': sample}):
+            exporter.update_metrics()
+        assert exporter.registry.get_sample_value('node_disk_read_bytes_per_second', {'device': 'sda'}) == 1024.0
+        assert exporter.registry.get_sample_value('node_disk_utilization_percent', {'device': 'sdb'}) == 50.0
+
+        sample.rates.begin()
+        sample.rates.put('sda', rates)
+        with patch.object(exporter, 'collect_snapshot', return_value={'disk': sample}):
+            exporter.update_metrics()
+        assert exporter.registry.get_sample_value('node_disk_read_bytes_per_second', {'device': 'sdb'}) is None
+
+    def test_exposition_rendered_per_cycle(self):
+        """Test that update_metrics() renders the /metrics body once for all scrapes."""
+        exporter = MetricsExporter(port=9101)
+        exporter.update_metrics()
+        rendered = exporter.exposition.get()
+
+        assert exporter.exposition.renders == 1
+        assert exporter.exposition.get() is rendered
+        assert b'node_cpu_usage_percent' in rendered.body
+
+    def test_snapshot_dict_is_json(self):
+        """Test that the /api/snapshot payload serialises collector samples."""
+        exporter = MetricsExporter(port=9101, server='asyncio')
+        exporter.update_metrics()
+
+        snapshot = json.loads(json.dumps(exporter.snapshot_dict()))
+
+        assert 'disk_partitions' in snapshot['disk']
+        assert 'network_io' in snapshot['network']
+        assert snapshot['stale'] == []
+
+    def test_health(self):
+        """Test that health fails only when every collector is stale after running."""
+        exporter = MetricsExporter(port=9101)
+        assert exporter.health()[0]
+
+        exporter.update_metrics()
+        assert exporter.health() == (True, {'stale': []})
+
+        for entry in exporter.scheduler.entries.values():
+            entry.stale = True
+        assert not exporter.health()[0]
+
+    def test_history_recorded_per_cycle(self, tmp_path):
+        """Test that each cycle is recorded and served by the history routes."""
+        exporter = MetricsExporter(port=9101, history_dir=str(tmp_path), history_size_mb=1)
+        exporter.update_metrics()
+        exporter.update_metrics()
+
+        status, payload = exporter.history_series({})
+        assert status == 200
+        assert 'node_memory_usage_percent' in payload['series']
+        assert not any('_bucket' in name or 'pid=' in name for name in payload['series'])
+        assert payload['dropped'] == 0
+        assert exporter.registry.get_sample_value('exporter_history_dropped_series_total') == 0
+
+        status, payload = exporter.history_query({'series': 'node_memory_usage_percent', 'step': '60'})
+        assert status == 200
+        assert len(payload['points'][0]) == 4
+
+        assert exporter.history_query({'series': 'missing'})[0] == 404
+        for bad in ({'step': 'x'}, {'step': '0'}, {'step': 'nan'}, {'step': 'inf'},
+                    {'start': 'nan'}, {'end': 'nan'}):
+            assert exporter.history_query({'series': 'node_memory_usage_percent', **bad})[0] == 400
+        assert exporter.history_query({'series': 'node_memory_usage_percent', 'start': '-inf'})[0] == 200
+        assert set(exporter.routes) == {'/api/history', '/api/history/series'}
+        exporter.close_history()
+
+    def test_debug_profile_route(self):
+        """Test that /debug/profile profiles the cycles run during the capture."""
+        exporter = MetricsExporter(port=9101, profiling=True)
+        assert '/debug/profile' in exporter.routes
+
+        def sleep(seconds):
+            exporter.update_metrics()
+
+        report = exporter.profiler.capture(1, sleep=sleep)
+        assert '_update_metrics' in report
+        assert exporter.scheduler.stale_collectors() == []
+        assert exporter.debug_profile({'seconds': 'x'})[0] == 400
+        assert exporter.debug_profile({'seconds': '0'})[0] == 400
+        exporter.profiler.start()
+        assert exporter.debug_profile({'seconds': '1'})[0] == 409
+        exporter.profiler.stop(1)
+
+        exporter.update_metrics()
+        assert exporter.registry.get_sample_value('exporter_collector_cycle_seconds_count') == 2
+        assert exporter.registry.get_sample_value(
+            'exporter_collector_wall_seconds_count', {'collector': 'cpu'}) >= 1
+        exporter.shutdown()
+
+    def test_remote_write_pushes_cycles(self):
+        """Test that push cycles reach a remote_write receiver with the instance label."""
+        receiver = start_remote_write_receiver()
+        exporter = MetricsExporter(port=9101, remote_write_url=receiver.url,
+                                   remote_write_labels={'instance': 'host-1'})
+        exporter.remote_writer.batch_deadline = 0.01
+        exporter.remote_writer.start()
+        try:
+            exporter.update_metrics()
+            exporter.update_metrics()
+            deadline = time.monotonic() + 5
+            while len(receiver.samples('node_cpu_usage_percent')) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            exporter.shutdown()
+            receiver.shutdown()
+            receiver.server_close()
+
+        assert len(receiver.samples('node_cpu_usage_percent')) == 2
+        assert all(('instance', 'host-1') in labels for labels in receiver.series)
+
+    def test_gateway_mode_serves_targets(self):
+        """Test that gateway mode serves two real exporters as one cached exposition."""
+        exporters = [MetricsExporter(port=0) for _ in range(2)]
+        servers = []
+        for exporter in exporters:
+            exporter.update_metrics()
+            servers.append(start_metrics_server(0, exporter.exposition, addr='127.0.0.1'))
+        targets = [Target(f'host-{i}', '127.0.0.1', server.server_address[1], '/metrics')
+                   for i, server in enumerate(servers)]
+        gateway = MetricsExporter(port=9101, mode='gateway', gateway_targets=targets, min_freshness=60,
+                                  gateway_aggregate=['node_memory_usage_percent'])
+        try:
+            body = gateway.exposition.get().body.decode()
+            assert gateway.exposition.get().body is gateway.exposition.get().body
+            assert gateway.health() == (True, {'stale': [], 'down': []})
+        finally:
+            gateway.shutdown()
+            for exporter, server in zip(exporters, servers):
+                server.shutdown()
+                server.server_close()
+                exporter.shutdown()
+
+        assert 'node_cpu_usage_percent{instance="host-0"}' in body
+        assert 'node_cpu_usage_percent{instance="host-1"}' in body
+        assert 'fleet:node_memory_usage_percent:avg ' in body
+        # The gateway's own collectors, scheduler and cycle metrics are not exported
+        assert '\nnode_cpu_usage_percent ' not in body
+        assert 'exporter_collector_stale{collector="cpu"}' not in body
+        assert 'exporter_collector_cycle_seconds_count ' not in body
+        # Each family once, with the targets' samples merged under it
+        types = [line.split()[2] for line in body.splitlines() if line.startswith('# TYPE ')]
+        assert len(types) == len(set(types))
+        assert 'exporter_collector_duration_seconds' in types
+
+    def test_gateway_mode_requires_targets(self):
+        """Test that gateway mode and gateway targets go together."""
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, mode='gateway')
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, gateway_targets=[Target('a', '127.0.0.1', 9100, '/metrics')])
+
+    def test_remote_write_requires_push_mode(self):
+        """Test that remote_write in scrape mode raises ValueError."""
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, mode='scrape', remote_write_url='http://127.0.0.1:9201/write')
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+    def test_hires_sampling_exported(self):
+        """Test that high-resolution aggregates are exported alongside the cycle."""
+        exporter = MetricsExporter(port=9101, hires_rate=100)
+        exporter.hires_sampler.start()
+        try:
+            time.sleep(0.2)
+            exporter.update_metrics()
+        finally:
+            exporter.shutdown()
+
+        body = exporter.exposition.get().body
+        assert b'node_hires_procs_running_window{stat="p99"}' in body
+        assert b'node_hires_cpu_busy_ratio_bucket' in body
+        assert b'exporter_hires_sample_interval_seconds' in body
+        # Scrapes, not push cycles, close the hires window
+        assert len(exporter.exposition.served_listeners) == 1
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+    def test_cgroup_metrics_exported(self, tmp_path):
+        """Test that per-cgroup series are exported from the scheduled cgroup collection."""
+        root = tmp_path / 'cgroup'
+        (root / 'system.slice').mkdir(parents=True)
+        (root / 'cgroup.controllers').write_text('cpu memory\n')
+        for path in (root, root / 'system.slice'):
+            (path / 'cpu.stat').write_text('usage_usec 1500000\nuser_usec 1000000\nsystem_usec 500000\n')
+        exporter = MetricsExporter(port=9101, cgroups=True, cgroup_root=str(root))
+        try:
+            exporter.update_metrics()
+        finally:
+            exporter.shutdown()
+
+        body = exporter.exposition.get().body
+        assert b'node_cgroup_cpu_usage_seconds_total{cgroup="/system.slice"} 1.5' in body
+        assert b'exporter_cgroup_tracked 2.0' in body
+
+    def test_pressure_trigger_collects_out_of_cycle(self, tmp_path):
+        """Test that a PSI trigger event collects the stalled resource at once and is exported."""
+        (tmp_path / 'pressure').mkdir()
+        for resource in ('cpu', 'memory', 'io'):
+            (tmp_path / 'pressure' / resource).touch()
+        trigger = Trigger('memory', 'some', 150000, 1000000)
+        exporter = MetricsExporter(port=9101, procfs_root=str(tmp_path), pressure_triggers=[trigger])
+        # After the watcher wrote its threshold to the stand-in memory file
+        for resource in ('cpu', 'memory', 'io'):
+            (tmp_path / 'pressure' / resource).write_text(
+                'some avg10=30.00 avg60=5.00 avg300=1.00 total=2500000\n'
+                'full avg10=10.00 avg60=2.00 avg300=0.50 total=1000000\n')
+        try:
+            exporter.update_metrics()
+            assert exporter.scheduler.seconds_until_due() > 1
+
+            exporter.pressure_watcher.events[trigger] += 1
+            exporter._pressure_event(trigger)
+            assert exporter._wakeup.is_set()
+            exporter.update_metrics()
+        finally:
+            exporter.shutdown()
+
+        registry = exporter.registry
+        assert registry.get_sample_value('exporter_collector_wall_seconds_count', {'collector': 'memory'}) == 2
+        assert registry.get_sample_value('exporter_collector_wall_seconds_count', {'collector': 'pressure'}) == 2
+        assert registry.get_sample_value('exporter_collector_wall_seconds_count', {'collector': 'disk'}) == 1
+        body = exporter.exposition.get().body
+        assert b'node_pressure_stalled_seconds_total{kind="full",resource="memory"} 1.0' in body
+        assert b'node_pressure_trigger_events_total{kind="some",resource="memory",threshold="150ms/1000ms"} 1.0' in body
+
+    def test_pressure_trigger_refreshes_scrape_snapshot(self, tmp_path):
+        """Test that in scrape mode a trigger event makes the next scrape collect within min_freshness."""
+        (tmp_path / 'pressure').mkdir()
+        (tmp_path / 'pressure' / 'memory').touch()
+        trigger = Trigger('memory', 'some', 150000, 1000000)
+        exporter = MetricsExporter(port=9101, mode='scrape', min_freshness=60, procfs_root=str(tmp_path),
+                                   pressure_triggers=[trigger])
+        (tmp_path / 'pressure' / 'memory').write_text('some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n')
+        try:
+            first = exporter.exposition.get()
+            assert exporter.exposition.get() is first
+            exporter._pressure_event(trigger)
+            assert exporter.exposition.get() is not first
+        finally:
+            exporter.shutdown()
+        assert exporter.registry.get_sample_value('exporter_collector_wall_seconds_count',
+                                                  {'collector': 'memory'}) == 2
+        assert exporter.registry.get_sample_value('exporter_collector_errors_total', {'collector': 'pressure'}) == 0
+
+    def test_adaptive_intervals(self):
+        """Test that adaptive collectors start at their interval, back off while steady and expose it."""
+        exporter = MetricsExporter(port=9101, adaptive=True)
+        entries = exporter.scheduler.entries
+        assert entries['network'].policy is None
+        assert (entries['cpu'].policy.floor, entries['cpu'].policy.ceiling) == (5, 60)
+
+        steady = {'memory_total': 8 << 30, 'memory_percent': 40.0, 'swap_percent': 0.0}
+        with patch.object(exporter.memory_collector, 'collect', return_value=steady):
+            exporter.update_metrics()
+            for entry in entries.values():
+                entry.next_due = 0.0
+            exporter.update_metrics()
+        exporter.shutdown()
+
+        assert entries['memory'].interval == 7.5
+        assert exporter.registry.get_sample_value('exporter_collector_interval_seconds',
+                                                  {'collector': 'memory'}) == 7.5
+        assert exporter.registry.get_sample_value('exporter_collector_interval_seconds',
+                                                  {'collector': 'network'}) == 15
+
+    def test_disk_activity(self):
+        """Test the values watched on a DiskSample."""
+        exporter = MetricsExporter(port=9101)
+        sample = exporter.disk_collector.sample()
+        sample.has_busy_time = True
+        sample.rates.begin()
+        sample.rates.put('sda', (2 << 20, 1 << 20, 0.0, 0.0, 0.0, 0.0, 0.0, 30.0))
+        sample.rates.put('sdb', (1 << 20, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 80.0))
+        assert disk_activity(sample) == {'throughput_mib': 4.0, 'util_percent': 80.0}
+
+    @pytest.mark.parametrize('mode', ['push', 'scrape'])
+    def test_host_facts_read_once(self, mode):
+        """Test that the host facts are exported without being re-read every cycle."""
+        exporter = MetricsExporter(port=9101, mode=mode)
+        exporter.update_metrics()
+        exporter.update_metrics()
+        output = generate_latest(exporter.registry).decode()
+        generate_latest(exporter.registry)
+
+        assert 'node_info{' in output
+        assert exporter.registry.get_sample_value('node_cpu_count') == exporter.host_facts.get().cpu_count
+        assert exporter.registry.get_sample_value('node_memory_total_bytes') > 0
+        assert exporter.host_facts.refreshes == 1
+        exporter.shutdown()
+
+    def test_cgroups_rejected_in_gateway_mode(self, tmp_path):
+        """Test that the cgroup collector cannot be enabled on a gateway."""
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, mode='gateway', gateway_targets=[Target('a', '127.0.0.1', 9100, '/metrics')],
+                            cgroups=True)
+
+    def test_invalid_server_rejected(self):
+        """Test that an unknown HTTP server raises ValueError."""
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, server='twisted')
+
     def test_custom_port(self):
         """Test that custom port is set correctly."""
         ports = [9100, 9101, 9102]
@@ -95,3 +455,101 @@ class TestMetricsExporter:
         for port in ports:
             exporter = MetricsExporter(port=port)
             assert exporter.port == port
+
+
+class TestScrapeMode:
+    """Integration tests for the scrape-driven exporter mode."""
+
+    def test_invalid_mode_rejected(self):
+        """Test that an unknown mode raises ValueError."""
+        with pytest.raises(ValueError):
+            MetricsExporter(port=9101, mode='poll')
+
+    def test_scrape_collects_on_demand(self):
+        """Test that a scrape builds metric families from the collectors."""
+        exporter = MetricsExporter(port=9101, mode='scrape')
+
+        output = generate_latest(exporter.registry).decode()
+
+        assert 'node_cpu_usage_percent' in output
+        assert 'node_memory_usage_percent' in output
+        assert 'node_disk_io_read_bytes_total' in output or 'node_disk_usage_bytes' in output
+
+    def test_first_scrape_reports_its_collection(self):
+        """Test that scheduler self-metrics on the first scrape describe the collection it ran."""
+        exporter = MetricsExporter(port=9101, mode='scrape')
+        try:
+            output = generate_latest(exporter.registry).decode()
+        finally:
+            exporter.shutdown()
+
+        assert 'exporter_collector_stale{collector="cpu"} 0.0' in output
+        assert 'exporter_collector_wall_seconds_count{collector="cpu"} 1.0' in output
+        assert 'exporter_collector_last_success_timestamp_seconds{collector="cpu"} 0.0' not in output
+
+    def test_concurrent_scrapes_share_snapshot(self):
+        """Test that scrapes within min_freshness reuse one collection."""
+        exporter = MetricsExporter(port=9101, mode='scrape', min_freshness=60)
+        calls = []
+        original = exporter.collect_snapshot
+
+        def counting_snapshot():
+            calls.append(1)
+            return original()
+
+        exporter.scrape_collector.snapshot_fn = counting_snapshot
+
+        threads = [threading.Thread(target=generate_latest, args=(exporter.registry,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+
+    def test_stale_snapshot_is_refreshed(self):
+        """Test that a snapshot older than min_freshness is recollected."""
+        exporter = MetricsExporter(port=9101, mode='scrape', min_freshness=0)
+        snapshot = {'cpu': {'cpu_usage_percent': 12.5, 'cpu_count': 2}}
+        exporter.scrape_collector.snapshot_fn = MagicMock(return_value=snapshot)
+
+        generate_latest(exporter.registry)
+        output = generate_latest(exporter.registry).decode()
+
+        assert exporter.scrape_collector.snapshot_fn.call_count == 2
+        assert 'node_cpu_usage_percent 12.5' in output
+
+    def test_exposition_reused_within_min_freshness(self):
+        """Test that scrape mode renders at most once per min_freshness window."""
+        exporter = MetricsExporter(port=9101, mode='scrape', min_freshness=60)
+
+        first = exporter.exposition.get()
+
+        assert exporter.exposition.get() is first
+        assert b'node_cpu_usage_percent' in first.body
+
+
+class TestCommandLine:
+    """Integration tests for the command-line entry point."""
+
+    @staticmethod
+    def run_main(capsys, *args):
+        """Run main() with args and return its usage error message."""
+        with patch.object(sys, 'argv', ['metrics_exporter.py', *args]), \
+                patch.object(MetricsExporter, 'run') as run, pytest.raises(SystemExit) as exit_info:
+            main()
+        assert exit_info.value.code == 2
+        run.assert_not_called()
+        return capsys.readouterr().err
+
+    def test_constructor_errors_are_usage_errors(self, capsys, tmp_path):
+        """Test that settings rejected by MetricsExporter are reported without a traceback."""
+        err = self.run_main(capsys, '--cgroups', '--cgroup-root', str(tmp_path))
+        assert 'cgroup v2' in err
+        assert 'Traceback' not in err
+
+    @pytest.mark.parametrize('interval', ['cpu=abc', 'cpu=0', 'cpu=-5', 'cpu=nan', 'cpu=inf', 'cpu=', 'gpu=10'])
+    def test_invalid_interval(self, capsys, interval):
+        """Test that unparsable, non-positive and non-finite --interval values are usage errors."""
+        err = self.run_main(capsys, '--interval', interval)
+        assert f"invalid --interval '{interval}'" in err
@@ -0,0 +1,209 @@
+"""Unit tests for the asyncio HTTP server."""
+import asyncio
+import gzip
+import json
+import threading
+from prometheus_client import CollectorRegistry, Gauge
+from src.exporters.async_server import AsyncMetricsServer
+from src.exporters.exposition import ExpositionCache
+
+
+def make_server(**kwargs):
+    """Server over a one-gauge registry on an ephemeral port."""
+    registry = CollectorRegistry()
+    Gauge('test_value', 'A test gauge', registry=registry).set(7)
+    options = {
+        'snapshot_fn': lambda: {'cpu': {'cpu_usage_percent': 1.5}},
+        'health_fn': lambda: (True, {'stale': []}),
+        'host': '127.0.0.1',
+        'port': 0,
+    }
+    options.update(kwargs)
+    return AsyncMetricsServer(ExpositionCache(registry), **options)
+
+
+async def exchange(reader, writer, request):
+    """Send a raw request and read one response; returns (status, headers, body)."""
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return int(status_line.split()[1]), headers, body
+
+
+def serve(server, client):
+    """Start server, run client(port) and stop the server."""
+    async def main():
+        await server.start()
+        try:
+            return await client(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+class TestAsyncMetricsServer:
+    """Test cases for AsyncMetricsServer."""
+
+    def test_keep_alive_serves_several_requests(self):
+        """Test that one connection serves /metrics, /healthz and /api/snapshot."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            metrics = await exchange(reader, writer, b'GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n')
+            health = await exchange(reader, writer, b'GET /healthz HTTP/1.1\r\nHost: x\r\n\r\n')
+            snapshot = await exchange(reader, writer, b'GET /api/snapshot HTTP/1.1\r\nHost: x\r\n\r\n')
+            writer.close()
+            return metrics, health, snapshot
+
+        metrics, health, snapshot = serve(make_server(), client)
+
+        assert metrics[0] == 200
+        assert b'test_value 7.0' in metrics[2]
+        assert metrics[1]['connection'] == 'keep-alive'
+        assert json.loads(health[2]) == {'status': 'ok', 'stale': []}
+        assert json.loads(snapshot[2]) == {'cpu': {'cpu_usage_percent': 1.5}}
+
+    def test_gzip_and_not_modified(self):
+        """Test content negotiation and conditional requests."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            first = await exchange(reader, writer,
+                                   b'GET /metrics HTTP/1.1\r\nAccept-Encoding: gzip\r\n\r\n')
+            etag = first[1]['etag'].encode()
+            second = await exchange(reader, writer,
+                                    b'GET /metrics HTTP/1.1\r\nIf-None-Match: ' + etag + b'\r\n\r\n')
+            writer.close()
+            return first, second
+
+        first, second = serve(make_server(), client)
+
+        assert first[1]['content-encoding'] == 'gzip'
+        assert b'test_value 7.0' in gzip.decompress(first[2])
+        assert second[0] == 304
+
+    def test_unhealthy_returns_503(self):
+        """Test that /healthz reports failure with 503."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await exchange(reader, writer, b'GET /healthz HTTP/1.0\r\n\r\n')
+            writer.close()
+            return response
+
+        status, headers, body = serve(make_server(health_fn=lambda: (False, {'stale': ['disk']})), client)
+
+        assert status == 503
+        assert headers['connection'] == 'close'
+        assert json.loads(body)['stale'] == ['disk']
+
+    def test_errors(self):
+        """Test 404, 405 and 400 responses."""
+        async def client(port):
+            results = []
+            for request in (b'GET /nope HTTP/1.1\r\n\r\n', b'POST /metrics HTTP/1.1\r\n\r\n',
+                            b'garbage\r\n\r\n'):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                results.append((await exchange(reader, writer, request))[0])
+                writer.close()
+            return results
+
+        assert serve(make_server(), client) == [404, 405, 400]
+
+    def test_request_timeout(self):
+        """Test that a client sending an incomplete head gets 408."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /metrics HTTP/1.1\r\n')
+            status_line = await asyncio.wait_for(reader.readline(), 5)
+            writer.close()
+            return status_line
+
+        assert b' 408 ' in serve(make_server(request_timeout=0.1), client)
+
+    def test_connection_limit(self):
+        """Test that connections beyond max_connections are rejected with 503."""
+        server = make_server(max_connections=1)
+
+        async def client(port):
+            held = await asyncio.open_connection('127.0.0.1', port)
+            await asyncio.sleep(0.05)
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status_line = await asyncio.wait_for(reader.readline(), 5)
+            writer.close()
+            held[1].close()
+            return status_line
+
+        assert b' 503 ' in serve(server, client)
+        assert server.rejected == 1
+
+    def test_blocking_render_runs_off_loop(self):
+        """Test that /metrics renders on the executor when the cache is stale."""
+        server = make_server()
+        server.cache.max_age = 0
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for _ in range(3):
+                await exchange(reader, writer, b'GET /metrics HTTP/1.1\r\n\r\n')
+            writer.close()
+
+        serve(server, client)
+        assert server.cache.renders == 3
+
+    def test_slow_text_route_does_not_block_metrics(self):
+        """Test that a long-running route is served as text without holding up /metrics."""
+        release = threading.Event()
+
+        def profile(params):
+            release.wait(5)
+            return 200, f"profiled {params['seconds']}s\n"
+
+        server = make_server(routes={'/debug/profile': profile})
+        server.cache.max_age = 0
+
+        async def client(port):
+            slow = await asyncio.open_connection('127.0.0.1', port)
+            pending = asyncio.ensure_future(
+                exchange(*slow, b'GET /debug/profile?seconds=3 HTTP/1.1\r\n\r\n'))
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            metrics = await exchange(reader, writer, b'GET /metrics HTTP/1.1\r\n\r\n')
+            finished_first = not pending.done()
+            release.set()
+            route = await pending
+            writer.close()
+            slow[1].close()
+            return metrics, route, finished_first
+
+        metrics, route, finished_first = serve(server, client)
+
+        assert metrics[0] == 200
+        assert finished_first
+        assert route[0] == 200
+        assert route[1]['content-type'].startswith('text/plain')
+        assert route[2] == b'profiled 3s\n'
+
+    def test_failing_route_returns_500(self):
+        """Test that a route raising an exception is answered with 500 and the connection is closed."""
+        def broken(params):
+            raise RuntimeError('boom')
+
+        server = make_server(routes={'/debug/broken': broken})
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await exchange(reader, writer, b'GET /debug/broken HTTP/1.1\r\n\r\n')
+            closed = await reader.read() == b''
+            writer.close()
+            return response, closed
+
+        (status, headers, _), closed = serve(server, client)
+        assert status == 500
+        assert headers['connection'] == 'close'
+        assert closed
@@ -0,0 +1,178 @@
+"""Unit tests for the cgroup v2 collector."""
+import shutil
+import sys
+import pytest
+from prometheus_client import CollectorRegistry
+from src.collectors.cgroup_collector import CgroupCollector
+from src.collectors.inotify import Inotify
+from src.exporters.cgroup_metrics import CgroupMetricsCollector
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+
+CPU_STAT = b"""usage_usec 2500000
+user_usec 2000000
+system_usec 500000
+nr_periods 10
+nr_throttled 3
+throttled_usec 150000
+"""
+
+MEMORY_STAT = b"""anon 1048576
+file 2097152
+kernel 65536
+kernel_stack 16384
+slab 32768
+sock 0
+shmem 4096
+file_dirty 0
+file_writeback 0
+pgfault 1200
+pgmajfault 7
+"""
+
+IO_STAT = b"""8:0 rbytes=4096 wbytes=8192 rios=1 wios=2 dbytes=0 dios=0
+259:0 rbytes=1000 wbytes=0 rios=3 wios=0 dbytes=0 dios=0
+"""
+
+PRESSURE = b"""some avg10=1.50 avg60=0.75 avg300=0.10 total=2000000
+full avg10=0.50 avg60=0.25 avg300=0.00 total=500000
+"""
+
+
+def make_cgroup(path, memory=True):
+    """Write one cgroup directory's interface files."""
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'cpu.stat').write_bytes(CPU_STAT)
+    (path / 'io.stat').write_bytes(IO_STAT)
+    for resource in ('cpu', 'memory', 'io'):
+        (path / f'{resource}.pressure').write_bytes(PRESSURE)
+    if memory:
+        (path / 'memory.current').write_bytes(b'3145728\n')
+        (path / 'memory.stat').write_bytes(MEMORY_STAT)
+
+
+@pytest.fixture
+def cgroup_root(tmp_path):
+    """A small unified hierarchy: two slices with a service and a pod."""
+    root = tmp_path / 'cgroup'
+    make_cgroup(root, memory=False)
+    (root / 'cgroup.controllers').write_bytes(b'cpu io memory pids\n')
+    make_cgroup(root / 'system.slice')
+    make_cgroup(root / 'system.slice' / 'nginx.service')
+    make_cgroup(root / 'kubepods.slice')
+    make_cgroup(root / 'kubepods.slice' / 'pod-1.slice')
+    make_cgroup(root / 'kubepods.slice' / 'pod-1.slice' / 'cri-containerd-abc.scope')
+    return root
+
+
+class TestCgroupCollector:
+    """Test cases for CgroupCollector."""
+
+    def test_reads_every_cgroup(self, cgroup_root):
+        """Test per-cgroup CPU, memory, I/O and pressure values."""
+        collector = CgroupCollector(str(cgroup_root))
+        metrics = collector.collect()
+        collector.close()
+
+        assert sorted(metrics['cgroups']) == [
+            '/', '/kubepods.slice', '/kubepods.slice/pod-1.slice',
+            '/kubepods.slice/pod-1.slice/cri-containerd-abc.scope',
+            '/system.slice', '/system.slice/nginx.service',
+        ]
+        service = metrics['cgroups']['/system.slice/nginx.service']
+        assert service['cpu']['usage_usec'] == 2500000
+        assert service['cpu']['nr_throttled'] == 3
+        assert service['memory_current'] == 3145728
+        assert service['memory']['anon'] == 1048576
+        assert service['memory']['pgmajfault'] == 7
+        assert service['io'] == {'rbytes': 5096, 'wbytes': 8192, 'rios': 4, 'wios': 2}
+        assert service['pressure']['memory']['full']['total'] == 500000
+        # The root has no memory controller files
+        assert 'memory_current' not in metrics['cgroups']['/']
+        assert metrics['cgroup_count'] == 6
+        assert metrics['cgroup_dropped'] == 0
+
+    def test_depth_and_cardinality_limits(self, cgroup_root):
+        """Test that deep cgroups are skipped and the count keeps shallow cgroups first."""
+        collector = CgroupCollector(str(cgroup_root), max_depth=1)
+        assert sorted(collector.collect()['cgroups']) == ['/', '/kubepods.slice', '/system.slice']
+        collector.close()
+
+        collector = CgroupCollector(str(cgroup_root), max_cgroups=4)
+        metrics = collector.collect()
+        collector.close()
+        assert sorted(metrics['cgroups']) == ['/', '/kubepods.slice', '/kubepods.slice/pod-1.slice',
+                                              '/system.slice']
+        assert metrics['cgroup_dropped'] == 2
+
+    @pytest.mark.skipif(not Inotify.available(), reason='inotify not available')
+    def test_rescans_only_on_tree_changes(self, cgroup_root):
+        """Test that the tree is walked again only after a cgroup is created or removed."""
+        collector = CgroupCollector(str(cgroup_root))
+        collector.collect()
+        collector.collect()
+        assert collector.rescans == 1
+
+        make_cgroup(cgroup_root / 'system.slice' / 'redis.service')
+        metrics = collector.collect()
+        assert collector.rescans == 2
+        assert '/system.slice/redis.service' in metrics['cgroups']
+
+        shutil.rmtree(cgroup_root / 'kubepods.slice' / 'pod-1.slice')
+        metrics = collector.collect()
+        collector.close()
+        assert collector.rescans == 3
+        assert '/kubepods.slice/pod-1.slice' not in metrics['cgroups']
+
+    def test_removed_cgroup_skipped_without_events(self, cgroup_root):
+        """Test that a cgroup removed between scans is skipped and triggers a rescan."""
+        collector = CgroupCollector(str(cgroup_root), rescan_interval=3600)
+        collector.collect()
+        # As if inotify had missed the removal
+        if collector._inotify is not None:
+            collector._inotify.close()
+            collector._inotify = None
+        shutil.rmtree(cgroup_root / 'system.slice' / 'nginx.service')
+
+        metrics = collector.collect()
+        assert '/system.slice/nginx.service' not in metrics['cgroups']
+        assert collector.rescans == 1
+        collector.collect()
+        collector.close()
+        assert collector.rescans == 2
+
+    def test_requires_cgroup_v2(self, tmp_path):
+        """Test that a directory without cgroup.controllers raises ValueError."""
+        with pytest.raises(ValueError):
+            CgroupCollector(str(tmp_path))
+
+
+class TestCgroupMetricsCollector:
+    """Test cases for the exported cgroup families."""
+
+    def test_families(self, cgroup_root):
+        """Test that cgroup results are exported with the cgroup label."""
+        collector = CgroupCollector(str(cgroup_root))
+        result = collector.collect()
+        collector.close()
+        registry = CollectorRegistry()
+        registry.register(CgroupMetricsCollector(lambda: result))
+
+        labels = {'cgroup': '/system.slice/nginx.service'}
+        assert registry.get_sample_value('node_cgroup_cpu_usage_seconds_total', labels) == 2.5
+        assert registry.get_sample_value('node_cgroup_cpu_throttled_seconds_total', labels) == 0.15
+        assert registry.get_sample_value('node_cgroup_memory_current_bytes', labels) == 3145728
+        assert registry.get_sample_value('node_cgroup_memory_stat_bytes', {**labels, 'type': 'file'}) == 2097152
+        assert registry.get_sample_value('node_cgroup_memory_major_page_faults_total', labels) == 7
+        assert registry.get_sample_value('node_cgroup_io_read_bytes_total', labels) == 5096
+        assert registry.get_sample_value('node_cgroup_pressure_stalled_seconds_total',
+                                         {**labels, 'resource': 'io', 'kind': 'some'}) == 2.0
+        assert registry.get_sample_value('node_cgroup_pressure_avg10_percent',
+                                         {**labels, 'resource': 'cpu', 'kind': 'full'}) == 0.5
+        assert registry.get_sample_value('exporter_cgroup_tracked') == 6
+
+    def test_nothing_before_first_collection(self):
+        """Test that no family is exported before the collector has run."""
+        registry = CollectorRegistry()
+        registry.register(CgroupMetricsCollector(lambda: {}))
+        assert list(registry.collect()) == []
@@ -0,0 +1,101 @@
+"""Unit tests for CPU sampler."""
+import time
+import pytest
+from src.collectors.cpu_sampler import CPUSampler
+
+FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'guest', 'guest_nice')
+
+
+class FakeTimes:
+    """Feeds a scripted sequence of per-core CPU time snapshots."""
+
+    def __init__(self, snapshots):
+        self.snapshots = list(snapshots)
+
+    def __call__(self):
+        return FIELDS, self.snapshots.pop(0)
+
+
+class TestCPUSampler:
+    """Test cases for CPUSampler."""
+
+    def test_first_sample_uses_since_boot_counters(self):
+        """Test that the first sample is computed against zero counters."""
+        source = FakeTimes([
+            [(30.0, 0.0, 10.0, 60.0, 0.0, 0.0, 0.0)],
+        ])
+        sample = CPUSampler(source).sample()
+
+        assert sample['usage_percent'] == 40.0
+        assert sample['per_core'] == [40.0]
+
+    def test_delta_between_samples(self):
+        """Test that percentages come from the delta since the last call."""
+        source = FakeTimes([
+            [(10.0, 0.0, 0.0, 90.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 100.0, 0.0, 0.0, 0.0)],
+            [(19.0, 0.0, 1.0, 90.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 110.0, 0.0, 0.0, 0.0)],
+        ])
+        sampler = CPUSampler(source)
+        sampler.sample()
+        sample = sampler.sample()
+
+        assert sample['per_core'] == [100.0, 0.0]
+        assert sample['usage_percent'] == 50.0
+        assert sample['modes']['user'] == 45.0
+        assert sample['modes']['system'] == 5.0
+        assert sample['modes']['idle'] == 50.0
+
+    def test_total_consistent_with_per_core(self):
+        """Test that overall usage equals the mean of equally loaded cores."""
+        source = FakeTimes([
+            [(0.0,) * 7] * 4,
+            [(5.0, 0.0, 0.0, 5.0, 0.0, 0.0, 0.0)] * 2 + [(1.0, 0.0, 1.0, 8.0, 0.0, 0.0, 0.0)] * 2,
+        ])
+        sampler = CPUSampler(source)
+        sampler.sample()
+        sample = sampler.sample()
+
+        mean = sum(sample['per_core']) / len(sample['per_core'])
+        assert sample['usage_percent'] == pytest.approx(mean)
+
+    def test_iowait_counts_as_idle_and_guest_not_double_counted(self):
+        """Test that iowait is not busy time and guest time is excluded."""
+        source = FakeTimes([
+            [(20.0, 0.0, 0.0, 40.0, 40.0, 20.0, 0.0)],
+        ])
+        sample = CPUSampler(source).sample()
+
+        assert sample['usage_percent'] == 20.0
+        assert sample['modes']['iowait'] == 40.0
+
+    def test_no_elapsed_ticks_reuses_last_result(self):
+        """Test that a repeated snapshot returns the previous percentages."""
+        snapshot = [(30.0, 0.0, 10.0, 60.0, 0.0, 0.0, 0.0)]
+        sampler = CPUSampler(FakeTimes([snapshot, snapshot]))
+        first = sampler.sample()
+        second = sampler.sample()
+
+        assert second == first
+
+    def test_counters_going_backwards_are_clamped(self):
+        """Test that decreasing counters never produce negative usage."""
+        source = FakeTimes([
+            [(10.0, 0.0, 0.0, 90.0, 0.0, 0.0, 0.0)],
+            [(15.0, 0.0, 0.0, 80.0, 0.0, 0.0, 0.0)],
+        ])
+        sampler = CPUSampler(source)
+        sampler.sample()
+        sample = sampler.sample()
+
+        assert sample['usage_percent'] == 100.0
+        assert all(0.0 <= value <= 100.0 for value in sample['modes'].values())
+
+    def test_sample_does_not_block(self):
+        """Test that sampling with the real source returns immediately."""
+        sampler = CPUSampler()
+        start = time.monotonic()
+        sample = sampler.sample()
+        sampler.sample()
+
+        assert time.monotonic() - start < 0.5
+        assert 0 <= sample['usage_percent'] <= 100
@@ -1,6 +1,14 @@
 """Unit tests for Disk collector."""
+import threading
+import time
+import types
+from collections import namedtuple
 import pytest
+from src.collectors import disk_collector
 from src.collectors.disk_collector import DiskCollector
+from src.collectors.mount_table import Mount
+
+Usage = namedtuple('Usage', ['total', 'used', 'free', 'percent'])
 
 
 class TestDiskCollector:
@@ -60,3 +68,200 @@ class TestDiskCollector:
                 assert 'write_bytes' in io_total
                 assert io_total['read_bytes'] >= 0
                 assert io_total['write_bytes'] >= 0
+
+
+class TestDiskCollectorMounts:
+    """Test cases for mount filtering and parallel usage queries."""
+
+    MOUNTS = [
+        Mount('/dev/sda1', '/', 'ext4', '8:1'),
+        Mount('/dev/sdb1', '/data', 'xfs', '8:17'),
+        Mount('/dev/sdb1', '/data/bind/deep', 'xfs', '8:17'),
+        Mount('server:/export', '/mnt/nfs', 'nfs4', '0:45'),
+        Mount('overlay', '/var/lib/docker/overlay2/x/merged', 'overlay', '0:50'),
+    ]
+
+    def collector(self, **kwargs):
+        """DiskCollector with a fixed mount list."""
+        collector = DiskCollector(**kwargs)
+        collector.mount_table.mounts = lambda: self.MOUNTS
+        return collector
+
+    def test_dedupes_same_device(self):
+        """Test that bind mounts of one device are reported once."""
+        mountpoints = [m.mountpoint for m in self.collector()._monitored_mounts()]
+
+        assert mountpoints == ['/', '/data', '/mnt/nfs']
+
+    def test_include_exclude_regexes(self):
+        """Test mountpoint and fstype regex filters."""
+        assert [m.mountpoint for m in self.collector(include=r'^/data')._monitored_mounts()] == ['/data']
+        assert [m.mountpoint for m in self.collector(exclude=r'^/mnt/')._monitored_mounts()] == ['/', '/data']
+        assert [m.mountpoint for m in self.collector(fstype_exclude=r'^nfs')._monitored_mounts()] == ['/', '/data']
+
+    def test_hung_statvfs_times_out(self, monkeypatch):
+        """Test that one stuck mount does not block the others."""
+        release = threading.Event()
+
+        def disk_usage(mountpoint):
+            if mountpoint == '/mnt/nfs':
+                release.wait(5)
+            return Usage(100, 40, 60, 40.0)
+
+        monkeypatch.setattr(disk_collector.psutil, 'disk_usage', disk_usage)
+        collector = self.collector(statvfs_timeout=0.1)
+
+        start = time.monotonic()
+        partitions = collector.collect()['disk_partitions']
+        assert time.monotonic() - start < 1
+        assert [p['mountpoint'] for p in partitions] == ['/', '/data']
+
+        # Not resubmitted while the hung call is outstanding
+        assert '/mnt/nfs' in collector._pending
+        collector.collect()
+        assert len(collector._pending) == 1
+
+        release.set()
+        time.sleep(0.05)
+        partitions = collector.collect()['disk_partitions']
+        assert [p['mountpoint'] for p in partitions] == ['/', '/data', '/mnt/nfs']
+
+    def test_close_does_not_wait_for_hung_statvfs(self, monkeypatch):
+        """Test that close() stops the pool and mount table without waiting on a stuck mount."""
+        release = threading.Event()
+        monkeypatch.setattr(disk_collector.psutil, 'disk_usage', lambda mountpoint: release.wait(5))
+        collector = self.collector(statvfs_timeout=0.1)
+        collector.collect()
+
+        start = time.monotonic()
+        collector.close()
+        assert time.monotonic() - start < 1
+        assert collector._pending == {}
+        assert collector.mount_table._file is None
+        with pytest.raises(RuntimeError):
+            collector._statvfs_pool.submit(int)
+        release.set()
+
+
+DiskIO = namedtuple('DiskIO', disk_collector.IO_FIELDS + ('busy_time',))
+
+
+def io_counters(reads=0, writes=0, read_bytes=0, write_bytes=0, read_time=0, write_time=0, busy_time=0):
+    """Build psutil-style per-disk counters."""
+    return DiskIO(reads, writes, read_bytes, write_bytes, read_time, write_time, busy_time)
+
+
+class TestDiskRates:
+    """Test cases for derived throughput, IOPS, await and utilisation."""
+
+    @pytest.fixture
+    def disks(self, monkeypatch):
+        """Serve settable per-disk counters and a settable monotonic clock."""
+        state = types.SimpleNamespace(now=100.0, counters={})
+        monkeypatch.setattr(disk_collector, 'time', types.SimpleNamespace(monotonic=lambda: state.now))
+        monkeypatch.setattr(disk_collector.psutil, 'disk_io_counters',
+                            lambda perdisk=False: dict(state.counters) if perdisk else None)
+        return state
+
+    @staticmethod
+    def rates(collector, disks, counters, elapsed=10.0):
+        """Advance the clock, collect, and return disk_io_rates."""
+        disks.now += elapsed
+        disks.counters = counters
+        return collector.collect()['disk_io_rates']
+
+    def test_first_sample_has_no_rates(self, disks):
+        """Test that rates need two samples."""
+        assert self.rates(DiskCollector(), disks, {'sda': io_counters()}) == {}
+
+    def test_rates_between_samples(self, disks):
+        """Test throughput, IOPS, await and %util over the interval."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sda': io_counters()})
+        rates = self.rates(collector, disks, {'sda': io_counters(
+            reads=100, writes=50, read_bytes=10240, write_bytes=5120,
+            read_time=200, write_time=400, busy_time=2500)})['sda']
+
+        assert rates['read_bytes_per_sec'] == 1024
+        assert rates['write_bytes_per_sec'] == 512
+        assert rates['read_iops'] == 10
+        assert rates['write_iops'] == 5
+        assert rates['read_await_ms'] == 2
+        assert rates['write_await_ms'] == 8
+        assert rates['await_ms'] == 4
+        assert rates['util_percent'] == 25
+
+    def test_idle_disk_has_zero_await(self, disks):
+        """Test that a disk without completed I/O reports zero latency."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sda': io_counters(reads=5)})
+        rates = self.rates(collector, disks, {'sda': io_counters(reads=5)})['sda']
+
+        assert rates['await_ms'] == 0.0
+        assert rates['read_iops'] == 0.0
+
+    def test_32bit_counter_wrap(self, disks):
+        """Test that a 32-bit counter wrapping around yields the true delta."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sda': io_counters(busy_time=2 ** 32 - 500)})
+        rates = self.rates(collector, disks, {'sda': io_counters(busy_time=500)}, elapsed=1.0)['sda']
+
+        assert rates['util_percent'] == 100.0
+
+    def test_reset_counters_skip_one_cycle(self, disks):
+        """Test that counters going back (device re-added) produce no rate."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sda': io_counters(read_bytes=2 ** 40)})
+        assert self.rates(collector, disks, {'sda': io_counters(read_bytes=10)}, elapsed=1.0) == {}
+        assert self.rates(collector, disks, {'sda': io_counters(read_bytes=20)},
+                          elapsed=1.0)['sda']['read_bytes_per_sec'] == 10
+
+    def test_small_counters_going_back_are_a_reset(self, disks):
+        """Test that a reset below 2**32 is not taken for a wrap (loop or dm device re-attached)."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'loop0': io_counters(reads=1000, read_bytes=1000, read_time=1000)})
+        assert self.rates(collector, disks, {'loop0': io_counters(reads=10, read_bytes=10, read_time=10)},
+                          elapsed=1.0) == {}
+        assert collector._counter_delta(10, 1000, wraps=False) is None
+        rates = self.rates(collector, disks, {'loop0': io_counters(reads=20, read_bytes=20, read_time=30)},
+                           elapsed=1.0)['loop0']
+        assert rates['read_bytes_per_sec'] == 10
+        assert rates['read_await_ms'] == 2
+
+    def test_removed_and_new_devices(self, disks):
+        """Test that vanished disks are forgotten and new ones start next cycle."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sda': io_counters(), 'sdb': io_counters()})
+        rates = self.rates(collector, disks, {'sda': io_counters(), 'sdc': io_counters()})
+
+        assert set(rates) == {'sda'}
+        assert set(collector.collect()['disk_io']) == {'sda', 'sdc'}
+
+    def test_reused_slot_does_not_mix_devices(self, disks):
+        """Test that a new disk taking a vanished disk's slot gets no rate from it."""
+        collector = DiskCollector()
+        self.rates(collector, disks, {'sdb': io_counters(read_bytes=100)})
+        self.rates(collector, disks, {})
+        rates = self.rates(collector, disks, {'sdc': io_counters(read_bytes=1000)})
+
+        assert rates == {}
+
+    def test_samples_are_reused(self, disks):
+        """Test that sample() alternates between two preallocated samples."""
+        collector = DiskCollector()
+        disks.counters = {'sda': io_counters()}
+        first, second, third = collector.sample(), collector.sample(), collector.sample()
+
+        assert first is third
+        assert first is not second
+        assert first.io.columns[0] is third.io.columns[0]
+
+    def test_collect_reports_rates(self):
+        """Test that collect() includes disk_io_rates."""
+        collector = DiskCollector()
+        collector.collect()
+        metrics = collector.collect()
+
+        assert isinstance(metrics['disk_io_rates'], dict)
+        for rates in metrics['disk_io_rates'].values():
+            assert rates['read_bytes_per_sec'] >= 0
@@ -0,0 +1,224 @@
+"""Unit tests for the cached /metrics exposition."""
+import gzip
+import json
+import http.client
+import pytest
+from prometheus_client import CollectorRegistry, Gauge
+from src.exporters import protobuf
+from src.exporters.exposition import (
+    ExpositionCache, accepts_gzip, etag_matches, negotiate, start_metrics_server,
+    TEXT, OPENMETRICS, PROTOBUF,
+)
+
+PROMETHEUS_ACCEPT = ('application/vnd.google.protobuf;proto=io.prometheus.client.MetricFamily;'
+                     'encoding=delimited;q=0.7,text/plain;version=0.0.4;q=0.3,*/*;q=0.2')
+
+
+@pytest.fixture
+def registry():
+    """Registry with one gauge."""
+    registry = CollectorRegistry()
+    Gauge('test_value', 'A test gauge', registry=registry).set(42)
+    return registry
+
+
+@pytest.fixture
+def server(registry):
+    """Metrics server on an ephemeral port."""
+    server = start_metrics_server(0, ExpositionCache(registry), addr='127.0.0.1')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, path='/metrics', headers=None, method='GET'):
+    """Send one request and return (response, body)."""
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+class TestExpositionCache:
+    """Test cases for ExpositionCache."""
+
+    def test_renders_once_until_next_cycle(self, registry):
+        """Test that get() reuses the body rendered by render()."""
+        cache = ExpositionCache(registry)
+        first = cache.render()
+
+        assert cache.get() is first
+        assert cache.get() is first
+        assert cache.renders == 1
+        assert b'test_value 42.0' in first.body
+        assert gzip.decompress(first.gzipped) == first.body
+
+    def test_etag_follows_content(self, registry):
+        """Test that the ETag changes only when the body does."""
+        cache = ExpositionCache(registry)
+        first = cache.render()
+        assert cache.render().etag == first.etag
+
+        Gauge('other_value', 'Another gauge', registry=registry).set(1)
+        assert cache.render().etag != first.etag
+
+    def test_max_age_rerenders(self, registry):
+        """Test that a body older than max_age is rendered again."""
+        cache = ExpositionCache(registry, max_age=0)
+        cache.get()
+        cache.get()
+
+        assert cache.renders == 2
+
+    def test_formats_share_one_collection(self, registry):
+        """Test that every format in a cycle is rendered once from one collection."""
+        cache = ExpositionCache(registry)
+        cache.render()
+        openmetrics = cache.get(OPENMETRICS)
+        encoded = cache.get(PROTOBUF)
+
+        assert cache.get(OPENMETRICS) is openmetrics
+        assert cache.renders == 3
+        assert openmetrics.body.endswith(b'# EOF\n')
+        assert encoded.content_type == protobuf.CONTENT_TYPE
+        assert protobuf.split_delimited(encoded.body)
+
+    def test_render_starts_new_cycle(self, registry):
+        """Test that render() drops bodies of the previous cycle."""
+        cache = ExpositionCache(registry)
+        cache.render()
+        first = cache.get(PROTOBUF)
+        cache.render()
+
+        assert cache.fresh(PROTOBUF) is None
+        assert cache.get(PROTOBUF) is not first
+
+    def test_listeners_called_per_collection(self, registry):
+        """Test that listeners receive the families of each collection, not of each format."""
+        cache = ExpositionCache(registry)
+        calls = []
+        cache.listeners.append(lambda families, now: calls.append([f.name for f in families]))
+
+        cache.render()
+        cache.get(OPENMETRICS)
+        cache.render()
+
+        assert calls == [['test_value'], ['test_value']]
+
+
+class TestHeaders:
+    """Test cases for header parsing."""
+
+    @pytest.mark.parametrize('header, expected', [
+        (None, TEXT),
+        ('*/*', TEXT),
+        ('text/plain;version=0.0.4', TEXT),
+        (PROMETHEUS_ACCEPT, PROTOBUF),
+        ('application/openmetrics-text;version=1.0.0;q=0.9,text/plain;q=0.5', OPENMETRICS),
+        ('application/openmetrics-text;q=0.2,text/plain;q=0.5', TEXT),
+        ('application/vnd.google.protobuf;proto=other.Message;encoding=delimited', TEXT),
+        ('application/vnd.google.protobuf;proto=io.prometheus.client.MetricFamily;encoding=text', TEXT),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test Accept negotiation with q-values and protobuf parameters."""
+        assert negotiate(header) == expected
+
+    @pytest.mark.parametrize('header, expected', [
+        (None, False),
+        ('', False),
+        ('gzip', True),
+        ('deflate, gzip;q=0.5', True),
+        ('gzip;q=0', False),
+        ('identity', False),
+        ('*', True),
+    ])
+    def test_accepts_gzip(self, header, expected):
+        """Test Accept-Encoding parsing, including q=0."""
+        assert accepts_gzip(header) is expected
+
+    def test_etag_matches(self):
+        """Test If-None-Match lists, weak validators and '*'."""
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches('*', '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+
+class TestMetricsServer:
+    """Test cases for the /metrics HTTP handler."""
+
+    def test_plain_response(self, server):
+        """Test that a client without gzip gets the text body."""
+        response, body = request(server)
+
+        assert response.status == 200
+        assert response.getheader('Content-Encoding') is None
+        assert response.getheader('Content-Type').startswith('text/plain')
+        assert b'test_value 42.0' in body
+
+    def test_gzip_response(self, server):
+        """Test that the pre-compressed copy is served when accepted."""
+        response, body = request(server, headers={'Accept-Encoding': 'gzip'})
+
+        assert response.getheader('Content-Encoding') == 'gzip'
+        assert response.getheader('Vary') == 'Accept, Accept-Encoding'
+        assert b'test_value 42.0' in gzip.decompress(body)
+
+    def test_conditional_request(self, server):
+        """Test that a matching If-None-Match gets 304 without a body."""
+        response, _ = request(server)
+        etag = response.getheader('ETag')
+
+        response, body = request(server, headers={'If-None-Match': etag})
+
+        assert response.status == 304
+        assert body == b''
+        assert server.cache.renders == 1
+
+    def test_accept_negotiation(self, server):
+        """Test that a Prometheus protobuf Accept header gets protobuf."""
+        response, body = request(server, headers={'Accept': PROMETHEUS_ACCEPT})
+
+        assert response.getheader('Content-Type') == protobuf.CONTENT_TYPE
+        assert response.getheader('Vary') == 'Accept, Accept-Encoding'
+        assert protobuf.split_delimited(body)
+
+    def test_head_and_unknown_path(self, server):
+        """Test HEAD responses and 404 for other paths."""
+        response, body = request(server, method='HEAD')
+        assert response.status == 200
+        assert int(response.getheader('Content-Length')) > 0
+        assert body == b''
+
+        response, _ = request(server, path='/other')
+        assert response.status == 404
+
+    def test_json_route(self, registry):
+        """Test that routes are served as JSON with their query parameters."""
+        routes = {'/api/echo': lambda params: (200, params)}
+        server = start_metrics_server(0, ExpositionCache(registry), addr='127.0.0.1', routes=routes)
+        try:
+            response, body = request(server, path='/api/echo?a=1&b=x%20y')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.getheader('Content-Type') == 'application/json'
+        assert json.loads(body) == {'a': '1', 'b': 'x y'}
+
+    def test_text_route(self, registry):
+        """Test that routes returning a string are served as plain text."""
+        routes = {'/debug/text': lambda params: (200, 'report\n')}
+        server = start_metrics_server(0, ExpositionCache(registry), addr='127.0.0.1', routes=routes)
+        try:
+            response, body = request(server, path='/debug/text')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.getheader('Content-Type').startswith('text/plain')
+        assert body == b'report\n'
@@ -0,0 +1,193 @@
+"""Unit tests for the multi-host aggregation gateway."""
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Gauge, generate_latest
+from src.exporters.exposition import ExpositionCache, start_metrics_server
+from src.exporters.gateway import GatewayCollector, Target, parse_target, read_targets
+
+
+class StandIn:
+    """A local exporter serving a few node_* series."""
+
+    def __init__(self, cpu, routes=None):
+        self.registry = CollectorRegistry()
+        self.cpu = Gauge('node_cpu_usage_percent', 'CPU usage percentage', registry=self.registry)
+        self.cpu.set(cpu)
+        disk = Gauge('node_disk_usage_percent', 'Disk usage percentage', ['device'], registry=self.registry)
+        disk.labels('sda').set(cpu / 2)
+        Counter('node_network_receive_bytes', 'Total bytes received', ['interface'],
+                registry=self.registry).labels('eth0').inc(1000)
+        self.server = start_metrics_server(0, ExpositionCache(self.registry, max_age=0), addr='127.0.0.1',
+                                           routes=routes)
+
+    def target(self, instance, path='/metrics'):
+        return Target(instance, '127.0.0.1', self.server.server_address[1], path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins():
+    """Three stand-in exporters with CPU usage 10, 20 and 60."""
+    servers = [StandIn(cpu) for cpu in (10, 20, 60)]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def collect(gateway):
+    """Register the gateway in a registry; every read of the registry scrapes the targets."""
+    registry = CollectorRegistry()
+    registry.register(gateway)
+    return registry
+
+
+def sample_values(families):
+    """Map (sample name, labels) to value for one collection."""
+    return {(sample.name, frozenset(sample.labels.items())): sample.value
+            for family in families for sample in family.samples}
+
+
+class TestParseTarget:
+    """Test cases for target parsing."""
+
+    def test_forms(self):
+        """Test host:port, URL and instance=URL targets."""
+        assert parse_target('web-1:9100') == Target('web-1:9100', 'web-1', 9100, '/metrics')
+        assert parse_target('http://10.0.0.1:9200/custom') == Target('10.0.0.1:9200', '10.0.0.1', 9200, '/custom')
+        assert parse_target('db=db-1.internal:9100') == Target('db', 'db-1.internal', 9100, '/metrics')
+
+    def test_invalid(self):
+        """Test that non-HTTP or host-less targets raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_target('https://web-1:9100')
+        with pytest.raises(ValueError):
+            parse_target('x=')
+
+    def test_targets_file(self, tmp_path):
+        """Test one target per line with comments and blank lines."""
+        path = tmp_path / 'targets'
+        path.write_text('# fleet\nweb-1:9100\n\nweb-2:9100  # canary\n')
+        assert [target.instance for target in read_targets(str(path))] == ['web-1:9100', 'web-2:9100']
+
+
+class TestGatewayCollector:
+    """Test cases for GatewayCollector."""
+
+    def test_merges_with_instance_label(self, stand_ins):
+        """Test that every target's series are exported with its instance."""
+        gateway = GatewayCollector([server.target(f'host-{i}') for i, server in enumerate(stand_ins)])
+        registry = collect(gateway)
+        try:
+            for i, cpu in enumerate((10, 20, 60)):
+                labels = {'instance': f'host-{i}'}
+                assert registry.get_sample_value('node_cpu_usage_percent', labels) == cpu
+                assert registry.get_sample_value('node_disk_usage_percent', {**labels, 'device': 'sda'}) == cpu / 2
+                assert registry.get_sample_value('node_network_receive_bytes_total',
+                                                 {**labels, 'interface': 'eth0'}) == 1000
+                assert registry.get_sample_value('exporter_gateway_target_up', labels) == 1
+            assert gateway.down() == []
+            # One family per name, typed as on the targets
+            text = generate_latest(registry).decode()
+            assert text.count('# TYPE node_cpu_usage_percent gauge') == 1
+            assert '# TYPE node_network_receive_bytes_total counter' in text
+        finally:
+            gateway.close()
+
+    def test_reuses_pooled_connections(self, stand_ins):
+        """Test that repeated scrapes reuse one keep-alive connection per target."""
+        gateway = GatewayCollector([server.target(f'host-{i}') for i, server in enumerate(stand_ins)])
+        registry = collect(gateway)
+        try:
+            for cpu in (11, 12, 13):
+                stand_ins[0].cpu.set(cpu)
+                generate_latest(registry)
+            assert registry.get_sample_value('node_cpu_usage_percent', {'instance': 'host-0'}) == 13
+            assert gateway.pool.opened == 3
+            assert registry.get_sample_value('exporter_gateway_connections_opened_total') == 3
+        finally:
+            gateway.close()
+
+    def test_failed_and_slow_targets_are_down(self, stand_ins):
+        """Test that a refused, a non-200 and a slow target are reported down without delaying the rest."""
+        release = threading.Event()
+        slow = StandIn(5, routes={'/slow': lambda params: (200, release.wait(5) and 'late\n')})
+        closed = StandIn(0)
+        closed.close()
+        targets = [
+            stand_ins[0].target('ok'),
+            slow.target('slow', path='/slow'),
+            closed.target('refused'),
+            stand_ins[1].target('missing', path='/nothing'),
+        ]
+        gateway = GatewayCollector(targets, timeout=0.3)
+        try:
+            start = time.monotonic()
+            values = sample_values(gateway.collect())
+            elapsed = time.monotonic() - start
+
+            assert elapsed < 2
+            assert sorted(gateway.down()) == ['missing', 'refused', 'slow']
+            assert values[('node_cpu_usage_percent', frozenset({('instance', 'ok')}))] == 10
+            assert ('node_cpu_usage_percent', frozenset({('instance', 'slow')})) not in values
+            assert values[('exporter_gateway_target_up', frozenset({('instance', 'slow')}))] == 0
+            assert values[('exporter_gateway_target_scrape_errors_total', frozenset({('instance', 'refused')}))] == 1
+
+            # A scrape still running from the previous cycle: the next cycle does not start another one
+            # (the timed-out scrape above may already have ended on its socket timeout)
+            stuck = Future()
+            gateway.states[targets[1]].future = stuck
+            values = sample_values(gateway.collect())
+            assert values[('exporter_gateway_target_scrape_errors_total', frozenset({('instance', 'slow')}))] == 2
+            assert gateway.states[targets[1]].future is stuck
+        finally:
+            release.set()
+            gateway.close()
+            slow.close()
+
+    def test_fleet_aggregates(self, stand_ins):
+        """Test fleet sums, averages and interpolated quantiles."""
+        gateway = GatewayCollector([server.target(f'host-{i}') for i, server in enumerate(stand_ins)],
+                                   aggregate=['node_cpu_usage_percent', 'node_disk_usage_percent'],
+                                   quantiles=(0.5, 0.9))
+        registry = collect(gateway)
+        try:
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:sum') == 90
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:avg') == 30
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:max') == 60
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:count') == 3
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:quantile', {'quantile': '0.5'}) == 20
+            assert registry.get_sample_value('fleet:node_cpu_usage_percent:quantile',
+                                             {'quantile': '0.9'}) == pytest.approx(52)
+            # Grouped by the labels other than instance
+            assert registry.get_sample_value('fleet:node_disk_usage_percent:sum', {'device': 'sda'}) == 45
+        finally:
+            gateway.close()
+
+    def test_target_instance_label_kept_as_exported_instance(self):
+        """Test that a target's own instance label is renamed like Prometheus does."""
+        registry = CollectorRegistry()
+        Gauge('pushed_value', 'A value with an instance', ['instance'], registry=registry).labels('inner').set(1)
+        server = start_metrics_server(0, ExpositionCache(registry), addr='127.0.0.1')
+        gateway = GatewayCollector([Target('outer', '127.0.0.1', server.server_address[1], '/metrics')])
+        try:
+            merged = collect(gateway)
+            assert merged.get_sample_value('pushed_value', {'instance': 'outer', 'exported_instance': 'inner'}) == 1
+        finally:
+            gateway.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_invalid_configuration(self):
+        """Test that an empty target list, duplicate instances and bad quantiles raise ValueError."""
+        target = Target('a', '127.0.0.1', 9100, '/metrics')
+        with pytest.raises(ValueError):
+            GatewayCollector([])
+        with pytest.raises(ValueError):
+            GatewayCollector([target, target])
+        with pytest.raises(ValueError):
+            GatewayCollector([target], quantiles=(1.5,))
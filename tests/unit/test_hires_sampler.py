@@ -0,0 +1,171 @@
+"""Unit tests for the high-resolution sampler and its collector."""
+import time
+import pytest
+from prometheus_client import CollectorRegistry
+from src.collectors.hires_sampler import HiresSampler, WindowBuffer
+from src.exporters.exposition import ExpositionCache
+from src.exporters.hires_collector import MAX_SEGMENTS, HiresCollector
+
+
+class FakeProcfs:
+    """Returns scripted cpu_total_ticks values and fixed task and memory readings."""
+
+    def __init__(self, cpu_ticks):
+        self.cpu_ticks = list(cpu_ticks)
+        self.running = 3
+
+    def cpu_total_ticks(self):
+        return self.cpu_ticks.pop(0)
+
+    def procs_running(self):
+        return self.running
+
+    def mem_available(self):
+        return 1024
+
+
+class TestWindowBuffer:
+    """Test cases for WindowBuffer."""
+
+    def test_window_stats(self):
+        """Test min, max and nearest-rank percentiles of one window."""
+        buffer = WindowBuffer(1000)
+        for value in range(1, 101):
+            buffer.add(float(value))
+
+        stats = buffer.drain()
+
+        assert (stats.count, stats.min, stats.max, stats.p50, stats.p99) == (100, 1.0, 100.0, 50.0, 99.0)
+        assert buffer.drain().count == 0
+
+    def test_min_max_exact_after_wrap(self):
+        """Test that min/max cover the whole window while percentiles use the last samples."""
+        buffer = WindowBuffer(4)
+        for value in (100.0, 1.0, 2.0, 3.0, 4.0, 5.0):
+            buffer.add(value)
+
+        stats = buffer.drain()
+
+        assert stats.max == 100.0 and stats.min == 1.0
+        assert stats.p99 == 5.0 and stats.p50 == 3.0
+
+    def test_histogram_is_cumulative(self):
+        """Test that bucket counts accumulate across windows."""
+        buffer = WindowBuffer(8, buckets=(0.5, 1.0))
+        buffer.add(0.2)
+        buffer.drain()
+        buffer.add(0.7)
+        buffer.add(2.0)
+
+        assert buffer.cumulative_buckets() == [('0.5', 1), ('1.0', 2), ('+Inf', 3)]
+        assert buffer.total_sum == pytest.approx(2.9)
+
+
+class TestHiresSampler:
+    """Test cases for HiresSampler."""
+
+    def test_cpu_ratio_from_tick_deltas(self):
+        """Test that CPU ratios come from deltas and ticks without progress are skipped."""
+        procfs = FakeProcfs([(0, 0, 0), (50, 10, 100), (50, 10, 100), (150, 10, 200)])
+        sampler = HiresSampler(procfs)
+        for _ in range(4):
+            sampler.sample_once()
+
+        window = sampler.drain()
+
+        assert window['cpu_busy_ratio'].count == 2
+        assert (window['cpu_busy_ratio'].min, window['cpu_busy_ratio'].max) == (0.5, 1.0)
+        assert window['cpu_iowait_ratio'].max == 0.1
+        assert window['procs_running'].count == 4
+
+    def test_budget_stretches_interval(self):
+        """Test that an expensive sample lowers the rate to fit the CPU budget."""
+        sampler = HiresSampler(FakeProcfs([]), rate=100, cpu_budget=0.05)
+
+        sampler.record_cost(0.001)
+        assert sampler.interval == pytest.approx(0.02)
+        assert sampler.throttled == 1
+
+        for _ in range(100):
+            sampler.record_cost(0.0001)
+        assert sampler.interval == pytest.approx(0.01)
+
+    def test_invalid_rate(self):
+        """Test that a non-positive rate raises ValueError."""
+        with pytest.raises(ValueError):
+            HiresSampler(FakeProcfs([]), rate=0)
+
+    def test_thread_samples_until_stopped(self):
+        """Test that the background thread samples at about the target rate."""
+        procfs = FakeProcfs([(i, 0, 10 * i) for i in range(10000)])
+        sampler = HiresSampler(procfs, rate=200, cpu_budget=1.0)
+        sampler.start()
+        time.sleep(0.2)
+        sampler.stop()
+
+        assert 10 <= sampler.samples <= 60
+        assert sampler.cost > 0
+
+
+class TestHiresCollector:
+    """Test cases for HiresCollector."""
+
+    def test_exports_window_and_histogram(self):
+        """Test that collection exports window stats once and keeps them for empty windows."""
+        procfs = FakeProcfs([(0, 0, 0), (25, 0, 100)])
+        sampler = HiresSampler(procfs)
+        registry = CollectorRegistry()
+        registry.register(HiresCollector(sampler))
+        sampler.sample_once()
+        sampler.sample_once()
+
+        for _ in range(2):
+            assert registry.get_sample_value('node_hires_cpu_busy_ratio_window', {'stat': 'max'}) == 0.25
+        assert registry.get_sample_value('node_hires_cpu_busy_ratio_bucket', {'le': '0.25'}) == 1
+        assert registry.get_sample_value('node_hires_procs_running_count') == 2
+        assert registry.get_sample_value('node_hires_memory_available_bytes_window', {'stat': 'p50'}) == 1024
+        assert registry.get_sample_value('exporter_hires_samples_total') == 2
+
+    def test_push_cycles_between_scrapes_keep_spikes(self):
+        """Test that push-mode renders between two scrapes do not close the window."""
+        procfs = FakeProcfs([(0, 0, 0), (90, 0, 100), (100, 0, 200), (110, 0, 300), (120, 0, 400)])
+        sampler = HiresSampler(procfs)
+        registry = CollectorRegistry()
+        collector = HiresCollector(sampler)
+        registry.register(collector)
+        exposition = ExpositionCache(registry)
+        exposition.served_listeners.append(collector.served)
+
+        def window_max(body):
+            line = next(line for line in body.decode().splitlines()
+                        if line.startswith('node_hires_cpu_busy_ratio_window{stat="max"}'))
+            return float(line.split()[-1])
+
+        # A spike, then two quiet push cycles before the scrape
+        sampler.sample_once()
+        sampler.sample_once()
+        exposition.render()
+        sampler.sample_once()
+        exposition.render()
+        sampler.sample_once()
+        exposition.render()
+        assert window_max(exposition.get().body) == 0.9
+
+        # The next window starts after the served collection
+        sampler.sample_once()
+        exposition.render()
+        assert window_max(exposition.get().body) == 0.1
+        assert registry.get_sample_value('node_hires_procs_running_window', {'stat': 'max'}) == 3
+
+    def test_unscraped_segments_are_merged(self):
+        """Test that cycles without a scrape are folded into a bounded number of segments."""
+        sampler = HiresSampler(FakeProcfs([]))
+        collector = HiresCollector(sampler)
+        for value in range(MAX_SEGMENTS * 2):
+            sampler.buffers['procs_running'].add(value)
+            list(collector.collect())
+
+        assert len(collector._segments) == MAX_SEGMENTS
+        assert collector._last['procs_running'].min == 0
+        assert collector._last['procs_running'].max == MAX_SEGMENTS * 2 - 1
+        assert collector._last['procs_running'].count == MAX_SEGMENTS * 2
@@ -0,0 +1,126 @@
+"""Unit tests for the host facts cache."""
+import socket
+import pytest
+from prometheus_client import CollectorRegistry
+from src.collectors.host_facts import HostFactsCache, is_hotplug_event
+from src.exporters.host_facts_metrics import HostFactsCollector
+
+CPUINFO = b"""processor\t: 0
+vendor_id\t: GenuineIntel
+model name\t: Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz
+
+processor\t: 1
+model name\t: Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz
+"""
+
+
+def uevent(action, devpath, subsystem):
+    """Build a kernel uevent message."""
+    return (f'{action}@{devpath}\0ACTION={action}\0DEVPATH={devpath}\0'
+            f'SUBSYSTEM={subsystem}\0SEQNUM=4242\0').encode()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A facts cache reading a fake cpuinfo, with a socket pair standing in for the uevent socket."""
+    (tmp_path / 'cpuinfo').write_bytes(CPUINFO)
+    facts = HostFactsCache(proc_root=str(tmp_path))
+    if facts._uevents is not None:
+        facts._uevents.close()
+    facts._uevents, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    facts._uevents.setblocking(False)
+    yield facts, kernel
+    facts.close()
+    kernel.close()
+
+
+class TestIsHotplugEvent:
+    """Test cases for uevent filtering."""
+
+    def test_cpu_and_memory_hotplug(self):
+        """Test that CPU and memory block state changes are hotplugs."""
+        assert is_hotplug_event(uevent('offline', '/devices/system/cpu/cpu3', 'cpu'))
+        assert is_hotplug_event(uevent('online', '/devices/system/memory/memory32', 'memory'))
+        assert is_hotplug_event(uevent('add', '/devices/system/cpu/cpu8', 'cpu'))
+
+    def test_other_events(self):
+        """Test that other devices and actions are ignored."""
+        assert not is_hotplug_event(uevent('add', '/devices/virtual/net/veth0', 'net'))
+        assert not is_hotplug_event(uevent('change', '/devices/system/cpu/cpu3', 'cpu'))
+        assert not is_hotplug_event(b'libudev\0\xfe\xed')
+
+
+class TestHostFactsCache:
+    """Test cases for HostFactsCache."""
+
+    def test_read_once(self, cache):
+        """Test that the facts are read on first use and then served from the cache."""
+        facts, _ = cache
+        first = facts.get()
+        assert facts.get() is first
+        assert facts.refreshes == 1
+        assert first.cpu_count >= 1
+        assert first.memory_total > 0
+
+    def test_cpu_model_from_cpuinfo(self, cache):
+        """Test that the CPU model comes from the first model name line."""
+        facts, _ = cache
+        assert facts.get().cpu_model == 'Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz'
+
+    def test_hotplug_refreshes(self, cache):
+        """Test that a CPU hotplug uevent makes the next get() re-read the facts."""
+        facts, kernel = cache
+        first = facts.get()
+        kernel.send(uevent('offline', '/devices/system/cpu/cpu1', 'cpu'))
+        assert facts.get() is not first
+        assert facts.refreshes == 2
+        assert facts.get() is facts.get()
+        assert facts.refreshes == 2
+
+    def test_unrelated_events_ignored(self, cache):
+        """Test that non-hotplug uevents keep the cached facts."""
+        facts, kernel = cache
+        first = facts.get()
+        kernel.send(uevent('add', '/devices/virtual/net/veth0', 'net'))
+        kernel.send(uevent('change', '/devices/system/cpu/cpu1', 'cpu'))
+        assert facts.get() is first
+        assert facts.refreshes == 1
+
+    def test_invalidate(self, cache):
+        """Test that invalidate() forces a re-read."""
+        facts, _ = cache
+        facts.get()
+        facts.invalidate()
+        facts.get()
+        assert facts.refreshes == 2
+
+    def test_interval_without_uevents(self, tmp_path):
+        """Test that without a uevent socket the facts are re-read on the refresh interval."""
+        facts = HostFactsCache(proc_root=str(tmp_path), refresh_interval=0)
+        facts.close()
+        facts.get()
+        facts.get()
+        assert facts.refreshes == 2
+        assert facts.get().cpu_model is not None
+
+
+class TestHostFactsCollector:
+    """Test cases for the exported host facts."""
+
+    def test_families(self, cache):
+        """Test node_info and the fact gauges."""
+        facts, _ = cache
+        registry = CollectorRegistry()
+        registry.register(HostFactsCollector(facts))
+        current = facts.get()
+
+        info = [sample for family in registry.collect() if family.name == 'node'
+                for sample in family.samples]
+        assert len(info) == 1
+        assert info[0].name == 'node_info'
+        assert info[0].labels['cpu_model'] == 'Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz'
+        assert info[0].labels['cpu_count'] == str(current.cpu_count)
+        assert info[0].labels['memory_total_bytes'] == str(current.memory_total)
+        assert registry.get_sample_value('node_cpu_count') == current.cpu_count
+        assert registry.get_sample_value('node_memory_total_bytes') == current.memory_total
+        assert registry.get_sample_value('exporter_host_facts_refreshes_total') == 1
@@ -0,0 +1,80 @@
+"""Unit tests for the cached mount table."""
+import sys
+import pytest
+from src.collectors.mount_table import MountTable, parse_mountinfo
+
+MOUNTINFO = b"""23 28 0:22 / /proc rw,relatime - proc proc rw
+28 1 254:0 / / rw,relatime shared:1 - ext4 /dev/vda rw
+29 28 254:16 / /data ro,nosuid master:2 - xfs /dev/vdb ro
+30 28 254:16 /sub /srv/bind\\040mount rw - xfs /dev/vdb rw
+31 28 0:45 / /mnt/nfs rw - nfs4 server:/export rw
+"""
+
+FILESYSTEMS = b"""nodev\tproc
+nodev\ttmpfs
+\text4
+\txfs
+nodev\tnfs4
+"""
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """Build /proc/self/mountinfo and /proc/filesystems."""
+    (tmp_path / 'self').mkdir()
+    (tmp_path / 'self' / 'mountinfo').write_bytes(MOUNTINFO)
+    (tmp_path / 'filesystems').write_bytes(FILESYSTEMS)
+    return tmp_path
+
+
+class TestParseMountinfo:
+    """Test cases for parse_mountinfo."""
+
+    def test_fields(self):
+        """Test that device, mountpoint, fstype and dev_id are parsed."""
+        mounts = parse_mountinfo(MOUNTINFO)
+
+        assert mounts[1].device == '/dev/vda'
+        assert mounts[1].mountpoint == '/'
+        assert mounts[1].fstype == 'ext4'
+        assert mounts[1].dev_id == '254:0'
+
+    def test_optional_fields_and_escapes(self):
+        """Test that optional fields are skipped and octal escapes decoded."""
+        mounts = parse_mountinfo(MOUNTINFO)
+
+        assert mounts[2].fstype == 'xfs'
+        assert mounts[3].mountpoint == '/srv/bind mount'
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+class TestMountTable:
+    """Test cases for MountTable."""
+
+    def test_only_physical_filesystems(self, proc_root):
+        """Test that nodev filesystems are dropped like disk_partitions(all=False)."""
+        table = MountTable(proc_root=str(proc_root))
+
+        assert [m.mountpoint for m in table.mounts()] == ['/', '/data', '/srv/bind mount']
+
+    def test_cached_until_changed(self, proc_root):
+        """Test that the table is parsed once until a change is signalled."""
+        table = MountTable(proc_root=str(proc_root))
+        first = table.mounts()
+        (proc_root / 'self' / 'mountinfo').write_bytes(MOUNTINFO.splitlines(True)[1])
+
+        assert table.mounts() is first
+        assert table.reloads == 1
+
+        table.invalidate()
+        assert [m.mountpoint for m in table.mounts()] == ['/']
+        assert table.reloads == 2
+
+    def test_live_mountinfo_not_reloaded_without_changes(self):
+        """Test that polling the real mountinfo reports no spurious changes."""
+        table = MountTable()
+        table.mounts()
+        table.mounts()
+
+        assert table.reloads == 1
+        table.close()
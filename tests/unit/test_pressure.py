@@ -0,0 +1,133 @@
+"""Unit tests for the PSI collector and trigger watcher."""
+import os
+import sys
+import pytest
+from prometheus_client import CollectorRegistry
+from src.collectors.pressure import PressureCollector, PressureWatcher, Trigger, parse_trigger
+from src.exporters.pressure_metrics import PressureMetricsCollector
+
+PRESSURE = b"""some avg10=12.50 avg60=4.00 avg300=1.25 total=3000000
+full avg10=2.00 avg60=0.50 avg300=0.00 total=750000
+"""
+
+
+def psi_writable():
+    """Return True if triggers can be registered on this kernel."""
+    try:
+        watcher = PressureWatcher([Trigger('memory', 'some', 150000, 2000000)], lambda trigger: None)
+    except OSError:
+        return False
+    watcher.close()
+    return True
+
+
+@pytest.fixture
+def procfs_root(tmp_path):
+    """A procfs root holding only pressure files."""
+    (tmp_path / 'pressure').mkdir()
+    for resource in ('cpu', 'memory', 'io'):
+        (tmp_path / 'pressure' / resource).write_bytes(PRESSURE)
+    return tmp_path
+
+
+class TestParseTrigger:
+    """Test cases for trigger parsing."""
+
+    def test_milliseconds(self):
+        """Test that stall and window are given in milliseconds."""
+        assert parse_trigger('memory:some:150:1000') == Trigger('memory', 'some', 150000, 1000000)
+        assert parse_trigger('io:full:0.5:500') == Trigger('io', 'full', 500, 500000)
+
+    def test_invalid(self):
+        """Test that malformed triggers and ones the kernel rejects raise ValueError."""
+        for text in ('memory:some:150', 'disk:some:150:1000', 'cpu:most:150:1000',
+                     'cpu:some:x:1000', 'cpu:some:150:100', 'cpu:some:150:20000', 'cpu:some:2000:1000'):
+            with pytest.raises(ValueError):
+                parse_trigger(text)
+
+
+class TestPressureCollector:
+    """Test cases for PressureCollector."""
+
+    def test_reads_every_resource(self, procfs_root):
+        """Test that each pressure file is parsed."""
+        collector = PressureCollector(str(procfs_root))
+        metrics = collector.collect()
+        collector.close()
+        assert sorted(metrics) == ['cpu', 'io', 'memory']
+        assert metrics['memory']['some'] == {'avg10': 12.5, 'avg60': 4.0, 'avg300': 1.25, 'total': 3000000}
+        assert metrics['io']['full']['total'] == 750000
+
+    def test_rereads_open_files(self, procfs_root):
+        """Test that a later collection sees updated values."""
+        collector = PressureCollector(str(procfs_root))
+        collector.collect()
+        (procfs_root / 'pressure' / 'cpu').write_bytes(PRESSURE.replace(b'total=3000000', b'total=4000000'))
+        assert collector.collect()['cpu']['some']['total'] == 4000000
+        collector.close()
+
+    def test_requires_psi(self, tmp_path):
+        """Test that a kernel without /proc/pressure raises ValueError."""
+        with pytest.raises(ValueError):
+            PressureCollector(str(tmp_path))
+
+
+class TestPressureWatcher:
+    """Test cases for PressureWatcher."""
+
+    def test_writes_trigger_thresholds(self, procfs_root):
+        """Test that each trigger's threshold is written to its resource's pressure file."""
+        trigger = Trigger('io', 'full', 100000, 1000000)
+        watcher = PressureWatcher([trigger], lambda trigger: None, str(procfs_root))
+        watcher.close()
+        assert (procfs_root / 'pressure' / 'io').read_bytes().startswith(b'full 100000 1000000\0')
+        assert watcher.events == {trigger: 0}
+
+    def test_missing_file_raises(self, tmp_path):
+        """Test that a trigger that cannot be registered raises OSError."""
+        with pytest.raises(OSError):
+            PressureWatcher([Trigger('cpu', 'some', 100000, 1000000)], lambda trigger: None, str(tmp_path))
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux') or not os.path.exists('/proc/pressure')
+                        or not psi_writable(), reason='PSI triggers not available')
+    def test_kernel_trigger_lifecycle(self):
+        """Test registering kernel triggers, waiting on them and closing the watcher."""
+        triggers = [Trigger('memory', 'full', 500000, 2000000), Trigger('io', 'full', 500000, 2000000)]
+        watcher = PressureWatcher(triggers, lambda trigger: None)
+        watcher.start()
+        assert sorted(watcher.triggers) == sorted(triggers)
+        watcher.close()
+        watcher.close()
+        assert watcher.triggers == []
+
+
+class TestPressureMetricsCollector:
+    """Test cases for the exported PSI families."""
+
+    def test_families(self, procfs_root):
+        """Test stall times, averages and trigger events."""
+        collector = PressureCollector(str(procfs_root))
+        result = collector.collect()
+        collector.close()
+        trigger = Trigger('memory', 'some', 150000, 1000000)
+        watcher = PressureWatcher([trigger], lambda trigger: None, str(procfs_root))
+        watcher.close()
+        watcher.events[trigger] = 3
+        watcher.last_event[trigger] = 1700000000.0
+
+        registry = CollectorRegistry()
+        registry.register(PressureMetricsCollector(lambda: result, watcher))
+        labels = {'resource': 'memory', 'kind': 'full'}
+        assert registry.get_sample_value('node_pressure_stalled_seconds_total', labels) == 0.75
+        assert registry.get_sample_value('node_pressure_avg10_percent', labels) == 2.0
+        assert registry.get_sample_value('node_pressure_avg300_percent', {**labels, 'kind': 'some'}) == 1.25
+        event_labels = {'resource': 'memory', 'kind': 'some', 'threshold': '150ms/1000ms'}
+        assert registry.get_sample_value('node_pressure_trigger_events_total', event_labels) == 3
+        assert registry.get_sample_value('node_pressure_trigger_last_event_timestamp_seconds',
+                                         event_labels) == 1700000000.0
+
+    def test_nothing_before_first_collection(self):
+        """Test that no family is exported before the collector has run and without triggers."""
+        registry = CollectorRegistry()
+        registry.register(PressureMetricsCollector(lambda: {}))
+        assert list(registry.collect()) == []
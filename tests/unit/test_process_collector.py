@@ -0,0 +1,161 @@
+"""Unit tests for Process collector."""
+import os
+import sys
+import time
+import types
+import pytest
+from src.collectors import process_collector
+from src.collectors.process_collector import ProcessCollector
+from src.collectors.procfs import ProcfsReader
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+
+
+def write_stat(proc, pid, comm, state='S', utime=0, stime=0, threads=1, starttime=0, rss=0):
+    """Write a /proc/<pid>/stat line."""
+    (proc / str(pid)).mkdir()
+    (proc / str(pid) / 'stat').write_text(
+        f'{pid} ({comm}) {state} 1 {pid} {pid} 0 -1 0 0 0 0 0 {utime} {stime} 0 0 '
+        f'20 0 {threads} 0 {starttime} 0 {rss} 0\n'
+    )
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """Build a small process table under a fake /proc."""
+    ticks = os.sysconf('SC_CLK_TCK')
+    page_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+    (tmp_path / 'meminfo').write_text(f'MemTotal: {1000 * page_kb} kB\n')
+    (tmp_path / 'uptime').write_text('100.00 50.00\n')
+    (tmp_path / 'self').mkdir()
+
+    # pid, comm, cpu seconds, rss pages
+    write_stat(tmp_path, 1, 'init', utime=1 * ticks, threads=1, rss=10)
+    write_stat(tmp_path, 2, 'busy worker', utime=40 * ticks, stime=10 * ticks, threads=8, rss=100)
+    write_stat(tmp_path, 3, 'cache (db)', utime=5 * ticks, threads=4, rss=500)
+    write_stat(tmp_path, 4, 'defunct', state='Z', threads=1)
+    return tmp_path
+
+
+class TestProcessCollector:
+    """Test cases for ProcessCollector."""
+
+    def test_collect_returns_dict(self):
+        """Test that collect() returns the process metrics."""
+        metrics = ProcessCollector().collect()
+
+        assert isinstance(metrics, dict)
+        assert metrics['process_count'] > 0
+        assert metrics['thread_count_total'] >= metrics['process_count']
+        assert len(metrics['top_processes_cpu']) <= 10
+
+    def test_top_n_configurable(self):
+        """Test that the top lists are bounded by top_n."""
+        metrics = ProcessCollector(top_n=2).collect()
+
+        assert len(metrics['top_processes_cpu']) <= 2
+        assert len(metrics['top_processes_memory']) <= 2
+
+    @linux_only
+    def test_single_pass_counts(self, proc_root):
+        """Test process, zombie and thread counts from /proc/<pid>/stat."""
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)))
+        metrics = collector.collect()
+
+        assert metrics['process_count'] == 4
+        assert metrics['process_zombie_count'] == 1
+        assert metrics['thread_count_total'] == 14
+
+    @linux_only
+    def test_top_lists_ordered(self, proc_root):
+        """Test that top lists are sorted and names with spaces/parens survive."""
+        collector = ProcessCollector(top_n=2, procfs=ProcfsReader(root=str(proc_root)))
+        metrics = collector.collect()
+
+        top_cpu = metrics['top_processes_cpu']
+        assert [p['name'] for p in top_cpu] == ['busy worker', 'cache (db)']
+        assert top_cpu[0]['cpu_percent'] == pytest.approx(50.0)
+
+        top_memory = metrics['top_processes_memory']
+        assert [p['pid'] for p in top_memory] == [3, 2]
+        assert top_memory[0]['memory_percent'] == pytest.approx(50.0)
+
+    @linux_only
+    def test_vanished_process_skipped(self, proc_root):
+        """Test that a pid directory without a readable stat is skipped."""
+        (proc_root / '99').mkdir()
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)))
+
+        assert collector.collect()['process_count'] == 4
+
+
+class TestProcessCache:
+    """Test cases for the cross-cycle process cache."""
+
+    @linux_only
+    def test_cpu_percent_from_delta_between_cycles(self, proc_root, monkeypatch):
+        """Test that the second cycle reports CPU used since the first."""
+        ticks = os.sysconf('SC_CLK_TCK')
+        clock = iter([1000.0, 1010.0])
+        fake_time = types.SimpleNamespace(monotonic=lambda: next(clock), time=time.time)
+        monkeypatch.setattr(process_collector, 'time', fake_time)
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)))
+        collector.collect()
+
+        # init used 5 more CPU seconds over the 10 second interval
+        (proc_root / '1' / 'stat').unlink()
+        (proc_root / '1').rmdir()
+        write_stat(proc_root, 1, 'init', utime=6 * ticks, rss=10)
+        metrics = collector.collect()
+
+        init = next(p for p in metrics['top_processes_cpu'] if p['pid'] == 1)
+        assert init['cpu_percent'] == pytest.approx(50.0)
+        busy = next(p for p in metrics['top_processes_cpu'] if p['pid'] == 2)
+        assert busy['cpu_percent'] == 0.0
+
+    @linux_only
+    def test_reused_pid_detected(self, proc_root):
+        """Test that a PID with a new start time is treated as a new process."""
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)))
+        collector.collect()
+        old_entry = collector.cache.entries[2]
+
+        (proc_root / '2' / 'stat').unlink()
+        (proc_root / '2').rmdir()
+        write_stat(proc_root, 2, 'new', starttime=5000, utime=0)
+        collector.collect()
+
+        assert collector.cache.entries[2] is not old_entry
+        assert collector.cache.entries[2].name == 'new'
+
+    @linux_only
+    def test_exited_processes_evicted(self, proc_root):
+        """Test that processes no longer in /proc leave the cache."""
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)))
+        collector.collect()
+        assert 3 in collector.cache.entries
+
+        (proc_root / '3' / 'stat').unlink()
+        (proc_root / '3').rmdir()
+        collector.collect()
+
+        assert 3 not in collector.cache.entries
+
+    @linux_only
+    def test_cache_size_capped(self, proc_root):
+        """Test that the cache never exceeds max_cached_processes."""
+        collector = ProcessCollector(procfs=ProcfsReader(root=str(proc_root)), max_cached_processes=2)
+        metrics = collector.collect()
+
+        assert len(collector.cache.entries) == 2
+        assert metrics['process_count'] == 4
+
+    def test_psutil_path_caches_handles(self):
+        """Test that psutil handles are reused across cycles."""
+        collector = ProcessCollector()
+        collector.scan_proc = False
+        collector.collect()
+        handle = collector.cache.entries[os.getpid()].handle
+        collector.collect()
+
+        assert collector.cache.entries[os.getpid()].handle is handle
@@ -0,0 +1,263 @@
+"""Unit tests for the /proc fast-path readers."""
+import os
+import sys
+import warnings
+import psutil
+import pytest
+from src.collectors import memory_collector
+from src.collectors.procfs import ProcfsReader, ProcFile, open_default_reader, parse_pressure
+from src.collectors.snapshot import CounterTable, DeviceTable
+from src.collectors.memory_collector import MemoryCollector
+from src.collectors.disk_collector import DiskCollector
+from src.collectors.network_collector import NetworkCollector
+from src.collectors.cpu_collector import CPUCollector
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+
+MEMINFO = b"""MemTotal:        8000000 kB
+MemFree:         1000000 kB
+MemAvailable:    6000000 kB
+Buffers:          100000 kB
+Cached:          2000000 kB
+SwapCached:            0 kB
+Active:          3000000 kB
+Inactive:        1500000 kB
+SReclaimable:     200000 kB
+SwapTotal:       2000000 kB
+SwapFree:        1500000 kB
+HugePages_Total:       0
+"""
+
+VMSTAT = b"""nr_free_pages 250000
+pswpin 10
+pswpout 20
+"""
+
+STAT = b"""cpu  300 0 100 600 0 0 0 0 0 0
+cpu0 200 0 50 250 0 0 0 0 0 0
+cpu1 100 0 50 350 0 0 0 0 0 0
+intr 12345
+ctxt 6789
+"""
+
+LOADAVG = b"0.50 0.25 0.10 1/123 4567\n"
+
+DISKSTATS = b"""   8       0 sda 100 5 2000 30 50 2 1000 20 0 40 50 0 0 0 0
+   8       1 sda1 90 5 1800 25 45 2 900 18 0 35 43 0 0 0 0
+   7       0 loop0 1 0 8 0 0 0 0 0 0 0 0 0 0 0 0
+"""
+
+NET_DEV = (
+    b"Inter-|   Receive                                                |  Transmit\n"
+    b" face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop"
+    b" fifo colls carrier compressed\n"
+    b"    lo:    1000      10    0    0    0     0          0         0     1000      10    0    0"
+    b"    0     0       0          0\n"
+    b"  eth0:  500000     400    1    2    0     0          0         0   250000     300    3    4"
+    b"    0     0       0          0\n"
+)
+
+TCP = b"""  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 0100007F:1F90 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 100 1
+   1: 0100007F:1F90 0100007F:C350 01 00000000:00000000 00:00000000 00000000     0        0 101 1
+"""
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """Build a minimal /proc and /sys tree."""
+    proc = tmp_path / 'proc'
+    (proc / 'net').mkdir(parents=True)
+    (proc / 'meminfo').write_bytes(MEMINFO)
+    (proc / 'vmstat').write_bytes(VMSTAT)
+    (proc / 'stat').write_bytes(STAT)
+    (proc / 'loadavg').write_bytes(LOADAVG)
+    (proc / 'diskstats').write_bytes(DISKSTATS)
+    (proc / 'net' / 'dev').write_bytes(NET_DEV)
+    for disk in ('sda', 'loop0'):
+        (tmp_path / 'sys' / 'block' / disk).mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.fixture
+def reader(proc_root):
+    """ProcfsReader pointed at the fixture tree."""
+    reader = ProcfsReader(root=str(proc_root / 'proc'), sys_root=str(proc_root / 'sys'))
+    yield reader
+    reader.close()
+
+
+class TestProcFile:
+    """Test cases for ProcFile."""
+
+    def test_rereads_current_contents(self, tmp_path):
+        """Test that each read returns the file's current contents."""
+        path = tmp_path / 'file'
+        path.write_bytes(b'first')
+        proc_file = ProcFile(str(path))
+
+        assert proc_file.read() == b'first'
+        with open(path, 'r+b') as f:
+            f.write(b'FIRST')
+        assert proc_file.read() == b'FIRST'
+        proc_file.close()
+
+    def test_grows_buffer_for_large_files(self, tmp_path):
+        """Test that files larger than the buffer are read completely."""
+        path = tmp_path / 'file'
+        path.write_bytes(b'x' * 10000)
+        proc_file = ProcFile(str(path), bufsize=16)
+
+        assert len(proc_file.read()) == 10000
+        proc_file.close()
+
+
+class TestProcfsReader:
+    """Test cases for ProcfsReader parsers."""
+
+    def test_meminfo(self, reader):
+        """Test that meminfo values are converted to bytes."""
+        mem = reader.meminfo()
+        assert mem[b'MemTotal'] == 8000000 * 1024
+        assert mem[b'HugePages_Total'] == 0
+
+    def test_cpu_times(self, reader):
+        """Test that per-core times are parsed and the aggregate line skipped."""
+        fields, per_core = reader.cpu_times()
+
+        assert fields[:4] == ('user', 'nice', 'system', 'idle')
+        assert len(per_core) == 2
+        ticks = os.sysconf('SC_CLK_TCK')
+        assert per_core[0][0] == pytest.approx(200 / ticks)
+
+    def test_loadavg(self, reader):
+        """Test that the three load averages are parsed."""
+        assert reader.loadavg() == (0.5, 0.25, 0.1)
+
+    def test_cheap_readers(self, reader):
+        """Test the single-value readers used by the high-resolution sampler."""
+        assert reader.cpu_total_ticks() == (400, 0, 1000)
+        assert reader.procs_running() == 1
+        assert reader.mem_available() == 6000000 * 1024
+
+    def test_parse_pressure(self):
+        """Test parsing of a PSI file."""
+        assert parse_pressure(b'some avg10=1.00 avg60=2.00 avg300=3.00 total=42\n'
+                              b'full avg10=0.50 avg60=0.00 avg300=0.00 total=7\n') == {
+            'some': {'avg10': 1.0, 'avg60': 2.0, 'avg300': 3.0, 'total': 42},
+            'full': {'avg10': 0.5, 'avg60': 0.0, 'avg300': 0.0, 'total': 7},
+        }
+
+    def test_diskstats(self, reader):
+        """Test that sectors are converted to bytes."""
+        disks = reader.diskstats()
+        assert disks['sda']['read_bytes'] == 2000 * 512
+        assert disks['sda']['busy_time'] == 40
+        assert reader.is_storage_device('sda')
+        assert not reader.is_storage_device('sda1')
+
+    def test_net_dev(self, reader):
+        """Test that receive and transmit columns map to psutil names."""
+        eth0 = reader.net_dev()['eth0']
+        assert eth0['bytes_recv'] == 500000
+        assert eth0['bytes_sent'] == 250000
+        assert eth0['dropin'] == 2
+        assert eth0['errout'] == 3
+
+    def test_rows_into_table(self, reader):
+        """Test that the table variants write the requested fields in table order."""
+        devices = DeviceTable()
+        disks = CounterTable(('write_bytes', 'read_bytes'), devices)
+        interfaces = CounterTable(('bytes_recv',), DeviceTable())
+
+        reader.diskstats_into(disks)
+        reader.net_dev_into(interfaces)
+
+        assert disks.as_dict()['sda'] == {'write_bytes': reader.diskstats()['sda']['write_bytes'],
+                                          'read_bytes': 2000 * 512}
+        assert interfaces.as_dict()['eth0'] == {'bytes_recv': 500000}
+
+
+class TestProcfsCollectors:
+    """Test that collectors produce the same keys with the procfs backend."""
+
+    def test_memory_collector(self, reader):
+        """Test memory metrics computed from meminfo."""
+        metrics = MemoryCollector(procfs=reader).collect()
+
+        assert set(metrics) == set(MemoryCollector().collect())
+        assert metrics['memory_percent'] == 25.0
+        assert metrics['memory_cached'] == 2200000 * 1024
+        assert metrics['swap_percent'] == 25.0
+        assert metrics['swap_sin'] == 10 * 4096
+
+    @pytest.mark.parametrize('excludes_available, used_kb', [(True, 2000000), (False, 4700000)])
+    def test_memory_used_follows_psutil(self, reader, monkeypatch, excludes_available, used_kb):
+        """Test both psutil definitions of used memory (7.1+: total - available)."""
+        monkeypatch.setattr(memory_collector, 'USED_EXCLUDES_AVAILABLE', excludes_available)
+        assert MemoryCollector(procfs=reader).collect()['memory_used'] == used_kb * 1024
+
+    def test_memory_collector_matches_psutil(self, reader, proc_root, monkeypatch):
+        """Test that both backends report the same memory values for one meminfo."""
+        monkeypatch.setattr(psutil, 'PROCFS_PATH', str(proc_root / 'proc'))
+        with warnings.catch_warnings():
+            # The fixture has no Shmem/Slab lines
+            warnings.simplefilter('ignore', RuntimeWarning)
+            vm = psutil.virtual_memory()
+        metrics = MemoryCollector(procfs=reader).collect()
+
+        assert metrics['memory_total'] == vm.total
+        assert metrics['memory_available'] == vm.available
+        assert metrics['memory_used'] == vm.used
+        assert metrics['memory_free'] == vm.free
+        assert metrics['memory_cached'] == vm.cached
+        assert metrics['memory_percent'] == vm.percent
+
+    def test_disk_collector_totals_skip_partitions(self, reader):
+        """Test that disk totals only count whole disks."""
+        metrics = DiskCollector(procfs=reader).collect()
+
+        assert set(metrics['disk_io']['sda']) == set(DiskCollector.IO_FIELDS) | {'busy_time'}
+        assert metrics['disk_io_total']['read_count'] == 101
+
+    def test_network_collector(self, reader):
+        """Test network totals summed over interfaces."""
+        metrics = NetworkCollector(procfs=reader).collect()
+
+        assert metrics['network_io_total']['bytes_recv'] == 501000
+        assert set(metrics['network_io']['lo']) == set(NetworkCollector.IO_FIELDS)
+
+    def test_network_collector_other_root_counts_its_sockets(self, proc_root, reader):
+        """Test that sockets are counted from the files of a non-default procfs root."""
+        (proc_root / 'proc' / 'net' / 'tcp').write_bytes(TCP)
+        collector = NetworkCollector(procfs=reader)
+        metrics = collector.collect()
+
+        assert collector.sock_diag is None
+        assert metrics['network_connections']['LISTEN'] == 1
+        assert metrics['network_connections']['ESTABLISHED'] == 1
+        assert metrics['network_connections_total'] == 2
+
+    def test_open_default_reader_root(self, proc_root, tmp_path):
+        """Test that open_default_reader reads the given root, or returns None without one."""
+        reader = open_default_reader(str(proc_root / 'proc'), str(proc_root / 'sys'))
+        assert reader.loadavg() == (0.5, 0.25, 0.1)
+        reader.close()
+        assert open_default_reader(str(tmp_path / 'missing')) is None
+
+    def test_cpu_collector(self, reader):
+        """Test CPU usage and load average from /proc."""
+        metrics = CPUCollector(procfs=reader).collect()
+
+        assert metrics['cpu_per_core'] == [50.0, 30.0]
+        assert metrics['cpu_usage_percent'] == 40.0
+        assert metrics['load_average_1m'] == 0.5
+
+    def test_real_proc_matches_psutil_keys(self):
+        """Test that the live /proc backend returns the psutil key set."""
+        if not ProcfsReader.available():
+            pytest.skip('procfs backend not available')
+        reader = ProcfsReader()
+        for collector_cls in (CPUCollector, MemoryCollector, DiskCollector):
+            assert set(collector_cls(procfs=reader).collect()) == set(collector_cls().collect())
+        reader.close()
@@ -0,0 +1,114 @@
+"""Unit tests for the collection profiler."""
+import cProfile
+import threading
+import time
+import pytest
+from src.collectors.base_collector import BaseCollector
+from src.exporters import profiler as profiler_module
+from src.exporters.profiler import CollectionProfiler, ProfileBusyError, MAX_SECONDS
+from src.exporters.scheduler import CollectionScheduler
+
+
+def collect_work():
+    """Stand-in collection that allocates."""
+    return [str(i) for i in range(1000)]
+
+
+class ExclusiveProfile(cProfile.Profile):
+    """cProfile as on Python 3.12+: one enabled profiler per interpreter."""
+
+    enabled = 0
+    lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        with self.lock:
+            if ExclusiveProfile.enabled:
+                raise ValueError('Another profiling tool is already active')
+            ExclusiveProfile.enabled += 1
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self.lock:
+            ExclusiveProfile.enabled -= 1
+
+
+class SlowCollector(BaseCollector):
+    """Collection that overlaps with the others on the scheduler's pool."""
+
+    def collect(self):
+        time.sleep(0.05)
+        return {'value': len(collect_work())}
+
+
+class TestCollectionProfiler:
+    """Test cases for CollectionProfiler."""
+
+    def test_inactive_profile_calls_through(self):
+        """Test that profile() only calls the function outside a capture."""
+        profiler = CollectionProfiler()
+        assert profiler.profile(lambda a, b: a + b, 1, 2) == 3
+        assert profiler._profiles == []
+
+    def test_capture_reports_calls_made_during_it(self):
+        """Test that calls profiled during the capture appear in the report."""
+        profiler = CollectionProfiler()
+
+        def sleep(seconds):
+            # Collections run on other threads while the capture sleeps
+            worker = threading.Thread(target=profiler.profile, args=(collect_work,))
+            worker.start()
+            worker.join()
+            profiler.profile(collect_work)
+
+        report = profiler.capture(2, sleep=sleep)
+
+        assert report.startswith('# collection profile over 2s: 2 profiled calls')
+        assert 'collect_work' in report
+        assert 'allocation sites' in report
+        assert not profiler.active
+
+    @pytest.mark.parametrize('exclusive', [False, True])
+    def test_capture_with_scheduler_pool(self, monkeypatch, exclusive):
+        """Test that collections overlapping on the scheduler's workers neither fail nor go stale."""
+        if exclusive:
+            monkeypatch.setattr(profiler_module.cProfile, 'Profile', ExclusiveProfile)
+        profiler = CollectionProfiler()
+        scheduler = CollectionScheduler(max_workers=4)
+        scheduler.profiler = profiler
+        for name in ('cpu', 'memory', 'disk', 'network'):
+            scheduler.add(name, SlowCollector(), interval=0, timeout=2)
+
+        def sleep(seconds):
+            for _ in range(2):
+                assert all(result == {'value': 1000} for result in scheduler.run_due().values())
+
+        report = profiler.capture(1, sleep=sleep)
+        scheduler.shutdown()
+
+        assert scheduler.stale_collectors() == []
+        assert 'collect_work' in report
+        if exclusive:
+            assert 'run unprofiled while another was profiled' in report
+
+    def test_capture_without_collections(self):
+        """Test the report of a capture during which nothing ran."""
+        report = CollectionProfiler().capture(1, sleep=lambda seconds: None)
+        assert 'no collection ran during the capture' in report
+
+    def test_concurrent_capture_rejected(self):
+        """Test that a second capture raises ProfileBusyError."""
+        profiler = CollectionProfiler()
+        profiler.start()
+        try:
+            with pytest.raises(ProfileBusyError):
+                profiler.capture(1, sleep=lambda seconds: None)
+        finally:
+            profiler.stop(1)
+        assert not profiler.active
+
+    @pytest.mark.parametrize('seconds', [0, -1, MAX_SECONDS + 1])
+    def test_invalid_duration(self, seconds):
+        """Test that durations outside (0, MAX_SECONDS] raise ValueError."""
+        with pytest.raises(ValueError):
+            CollectionProfiler().capture(seconds, sleep=lambda s: None)
@@ -0,0 +1,136 @@
+"""Unit tests for the protobuf exposition encoder."""
+import struct
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, Summary
+from prometheus_client.core import GaugeHistogramMetricFamily, SummaryMetricFamily
+from src.exporters import protobuf
+from src.exporters.protobuf import decode_fields, find, split_delimited
+
+
+def families(registry):
+    """Encode a registry and decode each MetricFamily into fields."""
+    return [decode_fields(message) for message in split_delimited(protobuf.encode_families(registry.collect()))]
+
+
+class TestWireFormat:
+    """Test cases for the low-level encoders."""
+
+    @pytest.mark.parametrize('value, encoded', [
+        (0, b'\x00'), (1, b'\x01'), (127, b'\x7f'), (128, b'\x80\x01'), (300, b'\xac\x02'),
+    ])
+    def test_varint(self, value, encoded):
+        """Test varint encoding against known values."""
+        assert protobuf.varint(value) == encoded
+        assert protobuf.decode_varint(encoded, 0) == (value, len(encoded))
+
+    def test_negative_varint_is_ten_bytes(self):
+        """Test that negative int64 values use two's complement."""
+        assert len(protobuf.varint(-1)) == 10
+
+    def test_double_field(self):
+        """Test fixed64 doubles and proto3 zero omission."""
+        assert protobuf.double_field(1, 1.5) == b'\x09' + struct.pack('<d', 1.5)
+        assert protobuf.double_field(1, 0.0) == b''
+
+
+class TestEncodeFamilies:
+    """Test cases for MetricFamily encoding."""
+
+    def test_gauge_with_labels(self):
+        """Test name, help, type, labels and value of a gauge."""
+        registry = CollectorRegistry()
+        Gauge('node_disk_util', 'Disk utilisation', ['device'], registry=registry).labels('sda').set(12.5)
+
+        [family] = families(registry)
+        metric = decode_fields(find(family, 4))
+        label = decode_fields(find(metric, 1))
+        gauge = decode_fields(find(metric, 2))
+
+        assert find(family, 1) == b'node_disk_util'
+        assert find(family, 2) == b'Disk utilisation'
+        assert find(family, 3) == protobuf.GAUGE
+        assert label == [(1, 2, b'device'), (2, 2, b'sda')]
+        assert find(gauge, 1) == 12.5
+
+    def test_counter_created_and_exemplar(self):
+        """Test that counters get _total, created_timestamp and exemplars."""
+        registry = CollectorRegistry()
+        Counter('requests', 'Requests', registry=registry).inc(3, exemplar={'trace_id': 'abc'})
+
+        [family] = families(registry)
+        counter = decode_fields(find(decode_fields(find(family, 4)), 3))
+        exemplar = decode_fields(find(counter, 2))
+
+        assert find(family, 1) == b'requests_total'
+        # COUNTER is the enum default and is omitted
+        assert find(family, 3) is None
+        assert find(counter, 1) == 3.0
+        assert decode_fields(find(exemplar, 1)) == [(1, 2, b'trace_id'), (2, 2, b'abc')]
+        assert find(decode_fields(find(counter, 3)), 1) > 0
+
+    def test_histogram_buckets(self):
+        """Test histogram count, sum and cumulative buckets."""
+        registry = CollectorRegistry()
+        Histogram('latency', 'Latency', buckets=(0.1, 1.0), registry=registry).observe(0.5)
+
+        [family] = families(registry)
+        histogram = decode_fields(find(decode_fields(find(family, 4)), 7))
+        buckets = [decode_fields(value) for field, _, value in histogram if field == 3]
+
+        assert find(family, 3) == protobuf.HISTOGRAM
+        assert find(histogram, 1) == 1
+        assert find(histogram, 2) == 0.5
+        assert [(find(b, 2), find(b, 1)) for b in buckets] == [(0.1, None), (1.0, 1), (float('inf'), 1)]
+
+    def test_summary_fields(self):
+        """Test summary count, sum, quantiles and created_timestamp at their metrics.proto field numbers."""
+        registry = CollectorRegistry()
+        Summary('rpc', 'RPC duration', registry=registry).observe(0.25)
+
+        [family] = families(registry)
+        summary = decode_fields(find(decode_fields(find(family, 4)), 4))
+
+        assert find(family, 3) == protobuf.SUMMARY
+        assert find(summary, 1) == 1
+        assert find(summary, 2) == 0.25
+        assert find(decode_fields(find(summary, 4)), 1) > 0
+
+    def test_summary_quantiles(self):
+        """Test that quantile samples become Quantile messages (field 3)."""
+        family = SummaryMetricFamily('rpc', 'RPC duration', count_value=4, sum_value=2.0)
+        family.add_sample('rpc', {'quantile': '0.5'}, 0.4)
+        family.add_sample('rpc', {'quantile': '0.99'}, 0.9)
+
+        [message] = split_delimited(protobuf.encode_families([family]))
+        metrics = [value for field, _, value in decode_fields(message) if field == 4]
+        summary = decode_fields(find(decode_fields(metrics[0]), 4))
+        quantiles = [decode_fields(value) for field, _, value in summary if field == 3]
+
+        assert len(metrics) == 1
+        assert (find(summary, 1), find(summary, 2)) == (4, 2.0)
+        assert [(find(q, 1), find(q, 2)) for q in quantiles] == [(0.5, 0.4), (0.99, 0.9)]
+
+    def test_gauge_histogram_type(self):
+        """Test that gauge histograms are typed GAUGE_HISTOGRAM with histogram fields."""
+        family = GaugeHistogramMetricFamily('queue', 'Queue sizes', buckets=[('1.0', 2), ('+Inf', 3)], gsum_value=4.0)
+
+        [message] = split_delimited(protobuf.encode_families([family]))
+        fields = decode_fields(message)
+        histogram = decode_fields(find(decode_fields(find(fields, 4)), 7))
+        buckets = [decode_fields(value) for field, _, value in histogram if field == 3]
+
+        assert find(fields, 3) == protobuf.GAUGE_HISTOGRAM == 5
+        assert find(histogram, 1) == 3
+        assert find(histogram, 2) == 4.0
+        assert [(find(b, 2), find(b, 1)) for b in buckets] == [(1.0, 2), (float('inf'), 3)]
+
+    def test_one_metric_per_label_set(self):
+        """Test that each label set becomes one Metric message."""
+        registry = CollectorRegistry()
+        gauge = Gauge('node_cpu', 'Per-core', ['core'], registry=registry)
+        for core in range(4):
+            gauge.labels(str(core)).set(core)
+
+        [family] = families(registry)
+
+        assert sum(1 for field, _, _ in family if field == 4) == 4
@@ -0,0 +1,136 @@
+"""Unit tests for the remote_write client and receiver."""
+import time
+import pytest
+from prometheus_client import CollectorRegistry, Gauge
+from src.exporters import snappy_codec
+from src.exporters.remote_write import (RemoteWriteError, RemoteWriter, decode_write_request, encode_labels,
+                                        encode_write_request, start_remote_write_receiver)
+
+
+@pytest.fixture
+def receiver():
+    """remote_write receiver on an ephemeral port."""
+    receiver = start_remote_write_receiver()
+    yield receiver
+    receiver.shutdown()
+    receiver.server_close()
+
+
+@pytest.fixture
+def registry():
+    """Registry with one labelled gauge."""
+    registry = CollectorRegistry()
+    Gauge('test_value', 'A test gauge', ['device'], registry=registry).labels('sda').set(3)
+    return registry
+
+
+def wait_for(predicate, timeout=5.0):
+    """Poll predicate until it is true or timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+class TestEncoding:
+    """Test cases for the WriteRequest encoding."""
+
+    def test_round_trip_groups_series(self):
+        """Test that samples of one series across cycles share a TimeSeries."""
+        up = encode_labels('up', {}, {'instance': 'h'})
+        load = encode_labels('load', {'cpu': '0'}, {})
+        body = encode_write_request([(1000, [(up, 1.0), (load, 0.5)]), (2000, [(up, 0.0)])])
+
+        decoded = decode_write_request(body)
+
+        assert decoded == [
+            ({'__name__': 'up', 'instance': 'h'}, [(1000, 1.0), (2000, 0.0)]),
+            ({'__name__': 'load', 'cpu': '0'}, [(1000, 0.5)]),
+        ]
+
+    def test_sample_labels_override_external(self):
+        """Test that a sample's own label wins over an external label."""
+        labels = encode_labels('m', {'instance': 'own'}, {'instance': 'external'})
+        decoded = decode_write_request(encode_write_request([(1, [(labels, 1.0)])]))
+        assert decoded[0][0] == {'__name__': 'm', 'instance': 'own'}
+
+
+class TestRemoteWriter:
+    """Test cases for RemoteWriter."""
+
+    def test_invalid_url(self):
+        """Test that a non-HTTP URL raises ValueError."""
+        with pytest.raises(ValueError):
+            RemoteWriter('localhost:9201')
+
+    def test_batches_cycles(self, receiver, registry):
+        """Test that cycles queued within the deadline are sent in one request."""
+        writer = RemoteWriter(receiver.url, external_labels={'instance': 'h'}, batch_deadline=0.2)
+        writer.start()
+        for i in range(3):
+            writer.enqueue(registry.collect(), 100 + i)
+
+        wait_for(lambda: writer.pending == 0 and receiver.requests)
+        writer.close()
+
+        assert receiver.requests == 1
+        assert receiver.samples('test_value') == [(100000, 3.0), (101000, 3.0), (102000, 3.0)]
+        labels = next(iter(receiver.series))
+        assert ('instance', 'h') in labels and ('device', 'sda') in labels
+
+    def test_retries_and_replays_after_outage(self, receiver, registry):
+        """Test that samples queued during an outage are delivered once it ends."""
+        metrics = CollectorRegistry()
+        writer = RemoteWriter(receiver.url, registry=metrics, batch_size=1, batch_deadline=0.01,
+                              min_backoff=0.01, max_backoff=0.05)
+        receiver.fail_with = 503
+        writer.start()
+        writer.enqueue(registry.collect(), 1)
+        writer.enqueue(registry.collect(), 2)
+        wait_for(lambda: metrics.get_sample_value('exporter_remote_write_failures_total') >= 2)
+        assert metrics.get_sample_value('exporter_remote_write_queue_samples') == 2
+
+        receiver.fail_with = None
+        wait_for(lambda: writer.pending == 0)
+        writer.close()
+
+        assert receiver.samples('test_value') == [(1000, 3.0), (2000, 3.0)]
+        assert metrics.get_sample_value('exporter_remote_write_sent_samples_total') == 2
+        assert metrics.get_sample_value('exporter_remote_write_send_duration_seconds_count') >= 3
+
+    def test_rejected_batch_is_dropped(self, receiver, registry):
+        """Test that a 4xx response drops the batch instead of retrying."""
+        metrics = CollectorRegistry()
+        writer = RemoteWriter(receiver.url, registry=metrics, batch_deadline=0.01)
+        receiver.fail_with = 400
+        writer.start()
+        writer.enqueue(registry.collect(), 1)
+        wait_for(lambda: metrics.get_sample_value('exporter_remote_write_dropped_samples_total',
+                                                  {'reason': 'rejected'}) == 1)
+        writer.close()
+
+        assert metrics.get_sample_value('exporter_remote_write_failures_total') == 0
+
+    def test_full_queue_drops_oldest(self):
+        """Test that the queue bound drops the oldest cycles."""
+        metrics = CollectorRegistry()
+        writer = RemoteWriter('http://127.0.0.1:1/write', registry=metrics, max_queue_samples=3)
+        for i in range(5):
+            writer.enqueue_samples(i, [(b'a', 1.0), (b'b', 2.0)])
+
+        assert writer.pending == 2
+        assert metrics.get_sample_value('exporter_remote_write_dropped_samples_total',
+                                        {'reason': 'queue_full'}) == 8
+
+
+class TestReceiver:
+    """Test cases for the stand-in receiver."""
+
+    def test_rejects_invalid_body(self, receiver):
+        """Test that a body that is not snappy protobuf gets 400."""
+        writer = RemoteWriter(receiver.url)
+        with pytest.raises(RemoteWriteError) as excinfo:
+            writer.send(b'\xff\xff\xff')
+        assert excinfo.value.recoverable is False
+        writer.send(snappy_codec.compress(b''))
+        writer.close()
@@ -0,0 +1,169 @@
+"""Unit tests for the on-disk ring-buffer time-series store."""
+import os
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from src.storage import RingStore, family_samples, series_key
+from src.storage.ring_store import DATA_FILE, capacity_for, downsample
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Store with room for 4 series."""
+    store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+    yield store
+    store.close()
+
+
+class TestRingStore:
+    """Test cases for RingStore."""
+
+    def test_file_size_is_fixed(self, store, tmp_path):
+        """Test that the data file is preallocated and does not grow with writes."""
+        size = os.path.getsize(tmp_path / DATA_FILE)
+        assert size <= 8 * 1024
+        for i in range(3 * store.capacity):
+            store.append(1000.0 + i, [('a', i)])
+        assert os.path.getsize(tmp_path / DATA_FILE) == size
+
+    def test_query_range(self, store):
+        """Test that query returns the points between start and end, oldest first."""
+        for i in range(10):
+            store.append(1000.0 + i, [('a', float(i)), ('b', -float(i))])
+
+        assert store.query('a', 1003, 1005) == [(1003.0, 3.0), (1004.0, 4.0), (1005.0, 5.0)]
+        assert store.query('b')[-1] == (1009.0, -9.0)
+        assert store.series() == ['a', 'b']
+
+    def test_wrap_around_keeps_latest(self, store):
+        """Test that the oldest slots are overwritten once the ring is full."""
+        total = store.capacity + 5
+        for i in range(total):
+            store.append(float(i), [('a', float(i))])
+
+        points = store.query('a')
+        assert len(points) == store.capacity
+        assert points[0] == (5.0, 5.0)
+        assert points[-1] == (float(total - 1), float(total - 1))
+
+    def test_missing_values_are_skipped(self, store):
+        """Test that cycles without a series' sample do not return stale values."""
+        store.append(1.0, [('a', 1.0), ('b', 1.0)])
+        store.append(2.0, [('a', 2.0)])
+        store.append(3.0, [('a', 3.0), ('b', 3.0)])
+
+        assert store.query('b') == [(1.0, 1.0), (3.0, 3.0)]
+
+    def test_overwritten_slot_is_cleared(self, store):
+        """Test that a wrapped slot does not keep a value from a previous lap."""
+        store.append(0.0, [('a', 0.0), ('b', 100.0)])
+        for i in range(1, store.capacity + 1):
+            store.append(float(i), [('a', float(i))])
+
+        assert store.query('b') == []
+
+    def test_series_limit(self, store):
+        """Test that series beyond max_series are dropped and counted."""
+        store.append(1.0, [(f's{i}', float(i)) for i in range(6)])
+
+        assert len(store.series()) == 4
+        assert store.dropped_series == 2
+        with pytest.raises(KeyError):
+            store.query('s5')
+
+    def test_churned_series_reclaimed(self, store):
+        """Test that series gone for a full ring free their columns for new ones."""
+        store.append(0.0, [(f'pid{i}', float(i)) for i in range(4)])
+        store.append(1.0, [('pid4', 4.0)])
+        assert store.dropped_series == 1
+
+        # pid0 keeps being written; pid1-3 are gone for a full ring
+        for i in range(2, store.capacity + 2):
+            store.append(float(i), [('pid0', 0.0)])
+        store.append(100.0, [('pid0', 0.0), ('pid5', 5.0), ('pid6', 6.0), ('pid7', 7.0), ('pid8', 8.0)])
+
+        assert store.series() == ['pid0', 'pid5', 'pid6', 'pid7']
+        assert store.reclaimed_series == 3
+        assert store.dropped_series == 2
+        # A reclaimed column starts empty
+        assert store.query('pid5') == [(100.0, 5.0)]
+        with pytest.raises(KeyError):
+            store.query('pid1')
+
+    def test_reclaimed_after_reopen(self, tmp_path):
+        """Test that the series index survives reclaiming and reopening."""
+        store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+        store.append(0.0, [(f's{i}', float(i)) for i in range(4)])
+        for i in range(1, store.capacity + 1):
+            store.append(float(i), [('s0', 0.0)])
+        store.append(1000.0, [('s0', 0.0), ('new', 1.0)])
+        store.close()
+
+        store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+        store.append(1001.0, [('other', 2.0), ('new', 3.0)])
+        assert store.series() == ['new', 'other', 's0']
+        assert store.query('new') == [(1000.0, 1.0), (1001.0, 3.0)]
+        assert store.query('other') == [(1001.0, 2.0)]
+        store.close()
+
+    def test_downsample(self, store):
+        """Test that step returns min, max and avg per bucket."""
+        for i, value in enumerate([1.0, 5.0, 3.0, 10.0, 20.0]):
+            store.append(100.0 + i, [('a', value)])
+
+        assert store.query('a', step=3) == [(99.0, 1.0, 5.0, 3.0), (102.0, 3.0, 20.0, 11.0)]
+
+    def test_reopen_keeps_data(self, tmp_path):
+        """Test that a store reopened with the same geometry keeps its samples."""
+        store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+        store.append(1.0, [('a', 1.5)])
+        store.append(2.0, [('a', 2.5)])
+        store.close()
+
+        store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+        store.append(3.0, [('a', 3.5)])
+        assert store.query('a') == [(1.0, 1.5), (2.0, 2.5), (3.0, 3.5)]
+        store.close()
+
+    def test_reopen_with_other_geometry_starts_over(self, tmp_path):
+        """Test that changing the size discards the old file instead of misreading it."""
+        store = RingStore(str(tmp_path), max_bytes=8 * 1024, max_series=4)
+        store.append(1.0, [('a', 1.0)])
+        store.close()
+
+        store = RingStore(str(tmp_path), max_bytes=16 * 1024, max_series=4)
+        assert store.capacity == capacity_for(16 * 1024, 4)
+        assert store.series() == []
+        store.close()
+
+
+class TestHelpers:
+    """Test cases for the series naming and downsampling helpers."""
+
+    def test_series_key(self):
+        """Test that labels are sorted into the series name."""
+        assert series_key('up', {}) == 'up'
+        assert series_key('m', {'b': '2', 'a': '1'}) == 'm{a="1",b="2"}'
+
+    def test_family_samples_skip_created(self):
+        """Test that _created samples are not recorded."""
+        registry = CollectorRegistry()
+        Gauge('g', 'gauge', ['x'], registry=registry).labels('1').set(2)
+        Counter('c', 'counter', registry=registry).inc(3)
+
+        samples = dict(family_samples(registry.collect()))
+
+        assert samples == {'g{x="1"}': 2.0, 'c_total': 3.0}
+
+    def test_family_samples_skip_buckets_and_pids(self):
+        """Test that histogram buckets and per-process series are not recorded."""
+        registry = CollectorRegistry()
+        Histogram('h', 'histogram', buckets=(1.0,), registry=registry).observe(0.5)
+        Gauge('top', 'top process', ['name', 'pid'], registry=registry).labels('init', '1').set(2)
+
+        samples = dict(family_samples(registry.collect()))
+
+        assert samples == {'h_count': 1.0, 'h_sum': 0.5}
+
+    def test_downsample_empty(self):
+        """Test that no points give no buckets."""
+        assert downsample([], 60) == []
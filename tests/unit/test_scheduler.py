@@ -0,0 +1,255 @@
+"""Unit tests for the collection scheduler."""
+import threading
+import time
+import pytest
+from prometheus_client import CollectorRegistry
+from src.collectors.base_collector import BaseCollector
+from src.exporters.scheduler import AdaptiveInterval, CollectionScheduler
+
+
+class StaticCollector(BaseCollector):
+    """Returns a fixed result and counts calls."""
+
+    def __init__(self, value=1):
+        self.value = value
+        self.calls = 0
+
+    def collect(self):
+        self.calls += 1
+        return {'value': self.value}
+
+
+class BlockingCollector(BaseCollector):
+    """Blocks until released, like a statvfs on a hung NFS mount."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def collect(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {'value': self.calls}
+
+
+class FailingCollector(BaseCollector):
+    """Always raises."""
+
+    def collect(self):
+        raise OSError('collector failed')
+
+
+def sample(registry, name, collector):
+    """Read a per-collector sample value from the registry."""
+    return registry.get_sample_value(name, {'collector': collector})
+
+
+class TestCollectionScheduler:
+    """Test cases for CollectionScheduler."""
+
+    def test_runs_all_collectors(self):
+        """Test that every collector is run on the first cycle."""
+        scheduler = CollectionScheduler()
+        scheduler.add('a', StaticCollector(1), interval=10, timeout=1)
+        scheduler.add('b', StaticCollector(2), interval=10, timeout=1)
+
+        assert scheduler.run_due() == {'a': {'value': 1}, 'b': {'value': 2}}
+        assert scheduler.stale_collectors() == []
+
+    def test_collectors_run_in_parallel(self):
+        """Test that slow collectors overlap instead of running back to back."""
+        class SlowCollector(BaseCollector):
+            def collect(self):
+                time.sleep(0.2)
+                return {}
+
+        scheduler = CollectionScheduler(max_workers=4)
+        for name in ('a', 'b', 'c', 'd'):
+            scheduler.add(name, SlowCollector(), interval=10, timeout=2)
+
+        start = time.monotonic()
+        scheduler.run_due()
+        assert time.monotonic() - start < 0.6
+
+    def test_respects_interval(self):
+        """Test that a collector is not rerun before its interval elapses."""
+        fast, slow = StaticCollector(), StaticCollector()
+        scheduler = CollectionScheduler()
+        scheduler.add('fast', fast, interval=0, timeout=1)
+        scheduler.add('slow', slow, interval=60, timeout=1)
+
+        scheduler.run_due()
+        scheduler.run_due()
+
+        assert fast.calls == 2
+        assert slow.calls == 1
+        assert scheduler.seconds_until_due() == 0.0
+
+    def test_expedite_runs_ahead_of_interval(self):
+        """Test that expedited collectors run on the next cycle and the others wait."""
+        memory, disk = StaticCollector(), StaticCollector()
+        scheduler = CollectionScheduler()
+        scheduler.add('memory', memory, interval=60, timeout=1)
+        scheduler.add('disk', disk, interval=60, timeout=1)
+        scheduler.run_due()
+
+        scheduler.expedite(['memory', 'unknown'])
+        assert scheduler.seconds_until_due() == 0.0
+        scheduler.run_due()
+
+        assert memory.calls == 2
+        assert disk.calls == 1
+        assert scheduler.seconds_until_due() > 50
+
+    def test_timeout_keeps_previous_result_as_stale(self):
+        """Test that a collector missing its deadline keeps its last result."""
+        registry = CollectorRegistry()
+        collector = BlockingCollector()
+        scheduler = CollectionScheduler(registry=registry)
+        scheduler.add('disk', collector, interval=0, timeout=0.05)
+
+        collector.release.set()
+        assert scheduler.run_due() == {'disk': {'value': 1}}
+
+        collector.release.clear()
+        assert scheduler.run_due() == {'disk': {'value': 1}}
+        assert scheduler.stale_collectors() == ['disk']
+        assert sample(registry, 'exporter_collector_timeouts_total', 'disk') == 1
+        assert sample(registry, 'exporter_collector_stale', 'disk') == 1
+
+        # Not resubmitted while the hung call is still running
+        scheduler.run_due()
+        assert collector.calls == 2
+
+        collector.release.set()
+        time.sleep(0.05)
+        scheduler.run_due()
+        assert scheduler.snapshot()['disk']['value'] >= 2
+        assert sample(registry, 'exporter_collector_stale', 'disk') == 0
+        scheduler.shutdown()
+
+    def test_error_does_not_abort_other_collectors(self):
+        """Test that one failing collector does not affect the others."""
+        registry = CollectorRegistry()
+        scheduler = CollectionScheduler(registry=registry)
+        scheduler.add('bad', FailingCollector(), interval=10, timeout=1)
+        scheduler.add('good', StaticCollector(), interval=10, timeout=1)
+
+        results = scheduler.run_due()
+
+        assert results['good'] == {'value': 1}
+        assert results['bad'] == {}
+        assert scheduler.stale_collectors() == ['bad']
+        assert sample(registry, 'exporter_collector_errors_total', 'bad') == 1
+        assert sample(registry, 'exporter_collector_errors_total', 'good') == 0
+
+    def test_duration_metric_recorded(self):
+        """Test that per-collector duration is exported."""
+        registry = CollectorRegistry()
+        scheduler = CollectionScheduler(registry=registry)
+        scheduler.add('a', StaticCollector(), interval=10, timeout=1)
+        scheduler.run_due()
+
+        assert sample(registry, 'exporter_collector_duration_seconds', 'a') >= 0
+        assert sample(registry, 'exporter_collector_last_success_timestamp_seconds', 'a') > 0
+
+    def test_cost_histograms_recorded(self):
+        """Test that wall time, CPU time and allocations are observed per collection."""
+        registry = CollectorRegistry()
+        scheduler = CollectionScheduler(registry=registry)
+        scheduler.add('a', StaticCollector(), interval=0, timeout=1)
+        scheduler.run_due()
+        scheduler.run_due()
+
+        for name in ('exporter_collector_wall_seconds', 'exporter_collector_cpu_seconds',
+                     'exporter_collector_allocated_blocks'):
+            assert sample(registry, f'{name}_count', 'a') == 2
+            assert sample(registry, f'{name}_sum', 'a') >= 0
+        entry = scheduler.entries['a']
+        assert entry.cpu_time >= 0
+        assert entry.allocated_blocks >= 0
+
+    def test_profiler_wraps_collections(self):
+        """Test that an attached profiler sees every collection."""
+        class Recorder:
+            def __init__(self):
+                self.calls = []
+
+            def profile(self, fn, *args):
+                self.calls.append(fn)
+                return fn(*args)
+
+        scheduler = CollectionScheduler()
+        scheduler.profiler = Recorder()
+        collector = StaticCollector(3)
+        scheduler.add('a', collector, interval=10, timeout=1)
+
+        assert scheduler.run_due() == {'a': {'value': 3}}
+        assert scheduler.profiler.calls == [collector.sample]
+
+    def test_adaptive_interval_rescheduled(self):
+        """Test that the policy's interval is applied to the next due time and exported."""
+        registry = CollectorRegistry()
+        collector = StaticCollector(50)
+        scheduler = CollectionScheduler(registry=registry)
+        scheduler.add('cpu', collector, interval=10, timeout=1,
+                      policy=AdaptiveInterval(5, 40, {'value': 10}))
+        scheduler.run_due()
+        assert sample(registry, 'exporter_collector_interval_seconds', 'cpu') == 10
+
+        # Steady: the interval grows
+        scheduler.expedite(['cpu'])
+        scheduler.run_due()
+        assert scheduler.entries['cpu'].interval == 15
+        assert 14 < scheduler.seconds_until_due() <= 15
+        assert sample(registry, 'exporter_collector_interval_seconds', 'cpu') == 15
+
+        # Volatile: it shrinks
+        collector.value = 90
+        scheduler.expedite(['cpu'])
+        scheduler.run_due()
+        assert scheduler.entries['cpu'].interval == 7.5
+        assert sample(registry, 'exporter_collector_interval_seconds', 'cpu') == 7.5
+
+
+class TestAdaptiveInterval:
+    """Test cases for AdaptiveInterval."""
+
+    def test_backs_off_while_steady(self):
+        """Test that unchanged values grow the interval up to the ceiling."""
+        policy = AdaptiveInterval(5, 60, {'cpu_usage_percent': 10.0})
+        interval = policy.adjust(15, {'cpu_usage_percent': 20.0})
+        assert interval == 15
+        for expected in (22.5, 33.75, 50.625, 60, 60):
+            interval = policy.adjust(interval, {'cpu_usage_percent': 21.0})
+            assert interval == expected
+
+    def test_tightens_when_volatile(self):
+        """Test that a change of at least the threshold shrinks the interval down to the floor."""
+        policy = AdaptiveInterval(5, 60, {'cpu_usage_percent': 10.0, 'load': 1.0})
+        policy.adjust(60, {'cpu_usage_percent': 20.0, 'load': 1.0})
+        assert policy.adjust(60, {'cpu_usage_percent': 20.0, 'load': 2.5}) == 30
+        assert policy.adjust(30, {'cpu_usage_percent': 80.0, 'load': 2.5}) == 15
+        assert policy.adjust(15, {'cpu_usage_percent': 20.0, 'load': 2.5}) == 7.5
+        assert policy.adjust(7.5, {'cpu_usage_percent': 90.0, 'load': 2.5}) == 5
+
+    def test_keeps_interval_in_between(self):
+        """Test that a change between half the threshold and the threshold keeps the interval."""
+        policy = AdaptiveInterval(5, 60, {'memory_percent': 2.0})
+        policy.adjust(20, {'memory_percent': 50.0})
+        assert policy.adjust(20, {'memory_percent': 51.5}) == 20
+
+    def test_values_extractor(self):
+        """Test that watched values can be extracted from a record result."""
+        policy = AdaptiveInterval(1, 8, {'util': 10.0}, values=lambda result: {'util': result[0]})
+        policy.adjust(4, (10.0,))
+        assert policy.adjust(4, (50.0,)) == 2
+
+    def test_invalid(self):
+        """Test that an empty range or non-moving factors raise ValueError."""
+        with pytest.raises(ValueError):
+            AdaptiveInterval(10, 5, {})
+        with pytest.raises(ValueError):
+            AdaptiveInterval(5, 10, {}, backoff=1.0)
+        with pytest.raises(ValueError):
+            AdaptiveInterval(5, 10, {}, tighten=1.0)
@@ -0,0 +1,70 @@
+"""Unit tests for the snappy block codec."""
+import importlib
+import importlib.util
+import os
+import sys
+import types
+import pytest
+from src.exporters import snappy_codec
+
+
+class TestSnappy:
+    """Test cases for the pure-Python snappy codec."""
+
+    @pytest.mark.parametrize('data', [
+        b'',
+        b'x',
+        b'abcd' * 1000,
+        bytes(200000),
+        os.urandom(5000),
+        b'node_cpu_usage_percent' * 20 + os.urandom(300) + b'node_cpu_usage_percent' * 50,
+    ])
+    def test_round_trip(self, data):
+        """Test that compressed data decompresses to the input."""
+        assert snappy_codec._decompress(snappy_codec._compress(data)) == data
+
+    def test_repetitive_input_compresses(self):
+        """Test that repeated label strings shrink."""
+        data = b'{__name__="node_network_receive_bytes_total",device="eth0"}' * 100
+        assert len(snappy_codec._compress(data)) < len(data) // 10
+
+    def test_known_encoding(self):
+        """Test decoding a block with a literal and an overlapping copy."""
+        # length 10, literal 'ab', copy offset 2 length 8
+        block = bytes([10, 1 << 2, ord('a'), ord('b'), 1 | (8 - 4) << 2, 2])
+        assert snappy_codec._decompress(block) == b'ababababab'
+
+    def test_invalid_block(self):
+        """Test that corrupt input raises ValueError."""
+        with pytest.raises(ValueError):
+            snappy_codec.decompress(b'\x0a\x05\x01')
+        with pytest.raises(ValueError):
+            snappy_codec.decompress(bytes([4, 1 | 0 << 2, 9]))
+
+
+class TestExtension:
+    """Test cases for the python-snappy fast path."""
+
+    @pytest.fixture
+    def extension(self, monkeypatch):
+        """Install a stand-in python-snappy module and reload the codec with it."""
+        module = types.ModuleType('snappy')
+        module.compress = lambda data: b'c:' + data
+        module.decompress = lambda data: data[2:]
+        monkeypatch.setitem(sys.modules, 'snappy', module)
+        yield importlib.reload(snappy_codec)
+        monkeypatch.undo()
+        importlib.reload(snappy_codec)
+
+    def test_extension_used_when_importable(self, extension):
+        """Test that the installed extension is picked up instead of the pure-Python codec."""
+        assert extension._snappy is sys.modules['snappy']
+        assert extension.compress(b'abc') == b'c:abc'
+        assert extension.decompress(b'c:abc') == b'abc'
+
+    def test_not_shadowed_from_its_directory(self, monkeypatch):
+        """Test that running from src/exporters (sys.path[0]) does not make the codec import itself."""
+        monkeypatch.syspath_prepend(os.path.dirname(snappy_codec.__file__))
+        monkeypatch.delitem(sys.modules, 'snappy', raising=False)
+        spec = importlib.util.find_spec('snappy')
+        assert spec is None or os.path.dirname(spec.origin) != os.path.dirname(snappy_codec.__file__)
@@ -0,0 +1,92 @@
+"""Unit tests for the reusable snapshot buffers."""
+from array import array
+from src.collectors.snapshot import CounterTable, DeviceTable
+
+
+class TestDeviceTable:
+    """Test cases for DeviceTable."""
+
+    def test_slots_are_stable(self):
+        """Test that a name keeps its slot across lookups."""
+        devices = DeviceTable()
+        assert devices.slot('sda') == 0
+        assert devices.slot('sdb') == 1
+        assert devices.slot('sda') == 0
+        assert len(devices) == 2
+
+    def test_released_slots_are_reused(self):
+        """Test that device churn does not grow the table."""
+        devices = DeviceTable()
+        devices.slot('veth0')
+        devices.release('veth0')
+
+        assert devices.slot('veth1') == 0
+        assert devices.capacity == 1
+
+
+class TestCounterTable:
+    """Test cases for CounterTable."""
+
+    def test_rows_present_for_current_cycle_only(self):
+        """Test that begin() hides rows not written again."""
+        table = CounterTable(('rx', 'tx'), DeviceTable())
+        table.put('eth0', (1, 2))
+        table.put('eth1', (3, 4))
+        table.begin()
+        table.put('eth1', (5, 6))
+
+        assert table.as_dict() == {'eth1': {'rx': 5, 'tx': 6}}
+        assert len(table) == 1
+
+    def test_columns_are_written_in_place(self):
+        """Test that repeated cycles reuse the same arrays."""
+        table = CounterTable(('rx',), DeviceTable())
+        table.put('eth0', (1,))
+        column = table.column('rx')
+        for value in range(10):
+            table.begin()
+            table.put('eth0', (value,))
+
+        assert table.column('rx') is column
+        assert column[0] == 9
+
+    def test_sweep_releases_missing_devices(self):
+        """Test that devices not written this cycle give back their slot."""
+        devices = DeviceTable()
+        table = CounterTable(('rx',), devices)
+        table.put('eth0', (1,))
+        table.put('veth0', (1,))
+        table.begin()
+        table.put('eth0', (2,))
+        table.sweep()
+
+        assert set(devices.slots) == {'eth0'}
+
+    def test_has_checks_slot_owner(self):
+        """Test that has() rejects a slot now holding a different device."""
+        devices = DeviceTable()
+        previous = CounterTable(('rx',), devices)
+        slot = previous.put('veth0', (1,))
+
+        assert previous.has(slot, 'veth0')
+        assert not previous.has(slot, 'veth1')
+        assert not previous.has(slot + 100, 'veth0')
+
+    def test_totals_with_filter(self):
+        """Test that totals() sums the selected present rows."""
+        table = CounterTable(('rx', 'tx'), DeviceTable())
+        table.put('sda', (10, 1))
+        table.put('sda1', (7, 1))
+        table.put('sdb', (5, 2))
+        totals = array('Q', [99, 99])
+
+        table.totals(totals, lambda name: not name[-1].isdigit())
+
+        assert list(totals) == [15, 3]
+
+    def test_as_dict_field_subset(self):
+        """Test that as_dict() can restrict the reported fields."""
+        table = CounterTable(('rx', 'tx', 'busy'), DeviceTable(), 'd')
+        table.put('sda', (1.5, 2.5, 3.5))
+
+        assert table.as_dict(('rx', 'busy')) == {'sda': {'rx': 1.5, 'busy': 3.5}}
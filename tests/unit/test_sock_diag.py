@@ -0,0 +1,96 @@
+"""Unit tests for socket state counting."""
+import socket
+import sys
+import pytest
+from src.collectors.sock_diag import SockDiagCounter, count_proc_net, STATE_NAMES
+from src.collectors.network_collector import NetworkCollector
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux only')
+
+TCP = (
+    b"  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout"
+    b" inode\n"
+    b"   0: 0100007F:0277 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1001"
+    b" 1 0000000000000000 100 0 0 10 0\n"
+    b"   1: 0100007F:9C40 0100007F:0277 01 00000000:00000000 00:00000000 00000000     0        0 1002"
+    b" 1 0000000000000000 20 4 30 10 -1\n"
+    b"   2: 0100007F:9C41 0100007F:0277 06 00000000:00000000 03:00000F9F 00000000     0        0 0 3"
+    b" 0000000000000000\n"
+)
+
+TCP6 = (
+    b"  sl  local_address                         remote_address                        st tx_queue"
+    b" rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+    b"   0: 00000000000000000000000000000000:0016 00000000000000000000000000000000:0000 0A"
+    b" 00000000:00000000 00:00000000 00000000     0        0 2001 1 0000000000000000 100 0 0 10 0\n"
+)
+
+UDP = (
+    b"   sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout"
+    b" inode ref pointer drops\n"
+    b"  100: 3500007F:0035 00000000:0000 07 00000000:00000000 00:00000000 00000000   101        0"
+    b" 3001 2 0000000000000000 0\n"
+)
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """Build /proc/net socket tables (udp6 missing, as with IPv6 disabled)."""
+    net = tmp_path / 'net'
+    net.mkdir()
+    (net / 'tcp').write_bytes(TCP)
+    (net / 'tcp6').write_bytes(TCP6)
+    (net / 'udp').write_bytes(UDP)
+    return str(tmp_path)
+
+
+def histogram_without_zeros(histogram):
+    """Drop states with no sockets."""
+    return {state: count for state, count in histogram.items() if count}
+
+
+class TestSocketStateCounting:
+    """Test cases for socket state histograms."""
+
+    def test_count_proc_net(self, proc_root):
+        """Test that the hex state column is mapped to psutil names."""
+        histogram = count_proc_net(proc_root)
+
+        assert set(histogram) == set(STATE_NAMES)
+        assert histogram_without_zeros(histogram) == {
+            'LISTEN': 2, 'ESTABLISHED': 1, 'TIME_WAIT': 1, 'NONE': 1,
+        }
+
+    def test_sock_diag_matches_proc_net(self):
+        """Test that the netlink and /proc paths agree on live sockets."""
+        if not SockDiagCounter.available():
+            pytest.skip('AF_NETLINK not available')
+
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        client = socket.create_connection(server.getsockname())
+        try:
+            try:
+                via_netlink = SockDiagCounter().count()
+            except OSError as e:
+                pytest.skip(f'sock_diag unavailable: {e}')
+            via_proc = count_proc_net()
+        finally:
+            client.close()
+            server.close()
+
+        assert via_netlink == via_proc
+        assert via_netlink['LISTEN'] >= 1
+        assert via_netlink['ESTABLISHED'] >= 2
+
+    def test_network_collector_shape(self, proc_root):
+        """Test that the collector keeps the network_connections dict shape."""
+        collector = NetworkCollector()
+        collector.proc_root = proc_root
+        collector.sock_diag = None
+
+        metrics = collector.collect()
+
+        assert set(metrics['network_connections']) == set(STATE_NAMES)
+        assert metrics['network_connections_total'] == 5